@@ -10,17 +10,10 @@ import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 # Importar layouts e dados com caminho absoluto
-from dashboard.layouts import (
-    barra_lateral,
-    criar_layout_contextualizacao,
-    criar_layout_limpeza_dados,
-    criar_layout_analise_preliminar,
-    criar_layout_dashboard_analise,
-    criar_layout_previsao_vendas,
-    criar_layout_analise_lojas,
-    criar_layout_analise_3d
-)
-from dashboard.data_loader import carregar_dados
+from dashboard.layouts import barra_lateral, PAGINAS
+from dashboard.dados_compartilhados import carregar_dados_compartilhados
+from dashboard.repositorio_dados import registrar_dados, obter_dados_atuais, ao_preparar_versao
+from dashboard.recarga_dados import iniciar_monitor_dados
 from dashboard.callbacks import registrar_callbacks
 
 # ==============================================================================
@@ -43,41 +36,66 @@ aplicativo = dash.Dash(
 servidor = aplicativo.server
 aplicativo.title = "Rossmann Sales Dashboard"
 
-# Carregar os dados uma vez
-dados = carregar_dados()
+# Carregar os dados uma vez: o primeiro processo publica os DataFrames em arquivos Arrow e
+# todos os workers do gunicorn os mapeiam em memória, compartilhando as mesmas páginas
+dados = carregar_dados_compartilhados()
 
-# Converter o DataFrame principal para JSON para armazenar no dcc.Store
-df_principal_json = dados["df_principal"].to_json(date_format='iso', orient='split')
+# Registrar os dados no processo: o dcc.Store guarda apenas a chave de versão,
+# e os callbacks resolvem essa chave para o DataFrame já carregado em memória
+versao_dados = registrar_dados(dados)
 
 # ==============================================================================
 # Layout do Aplicativo
 # ==============================================================================
-# Carregar todos os layouts no início
-# A visibilidade será controlada por um callback que altera o 'display'
-aplicativo.layout = html.Div([
-    dcc.Location(id='url', refresh=False),
-    # Componente de armazenamento para o DataFrame principal
-    dcc.Store(id='armazenamento-df-principal', data=df_principal_json),
-    barra_lateral,
-    html.Div(
-        id='conteudo-pagina',
-        className='content',
-        children=[
-            html.Div(criar_layout_contextualizacao(dados), id='conteudo-pagina-/', style={'display': 'block'}),
-            html.Div(criar_layout_limpeza_dados(dados), id='conteudo-pagina-/limpeza-dados', style={'display': 'none'}),
-            html.Div(criar_layout_analise_preliminar(dados), id='conteudo-pagina-/analise-preliminar', style={'display': 'none'}),
-            html.Div(criar_layout_dashboard_analise(dados), id='conteudo-pagina-/dashboard', style={'display': 'none'}),
-            html.Div(criar_layout_analise_lojas(dados), id='conteudo-pagina-/analise-lojas', style={'display': 'none'}),
-            html.Div(criar_layout_analise_3d(dados), id='conteudo-pagina-/analise-3d', style={'display': 'none'}),
-            html.Div(criar_layout_previsao_vendas(), id='conteudo-pagina-/previsao-vendas', style={'display': 'none'}),
-        ]
-    )
-])
+# Um contêiner vazio por página: o conteúdo é montado na primeira visita (ver layouts/paginas.py)
+# e a visibilidade é controlada por um callback que altera o 'display'
+def montar_layout(dados):
+    return html.Div([
+        dcc.Location(id='url', refresh=False),
+        # Chave de versão do dataset principal (resolvida no servidor pelos callbacks)
+        dcc.Store(id='armazenamento-df-principal', data=dados["versao"]),
+        # Páginas já montadas nesta sessão
+        dcc.Store(id='armazenamento-paginas-montadas', data=[]),
+        barra_lateral,
+        html.Div(
+            id='conteudo-pagina',
+            className='content',
+            children=[
+                html.Div(id=f'conteudo-pagina-{pagina}', style={'display': 'block' if pagina == '/' else 'none'})
+                for pagina in PAGINAS
+            ]
+        )
+    ])
+
+# Layout montado uma vez por versão dos dados; a próxima versão é montada antes da troca
+layouts_por_versao = {versao_dados: montar_layout(dados)}
+
+@ao_preparar_versao
+def preparar_layout(dados_novos):
+    # Mantém apenas o layout da versão atual (ainda servido até a troca) e o da nova
+    versao_atual = obter_dados_atuais()["versao"]
+    for versao_antiga in [v for v in layouts_por_versao if v != versao_atual]:
+        layouts_por_versao.pop(versao_antiga, None)
+    layouts_por_versao[dados_novos["versao"]] = montar_layout(dados_novos)
+
+def layout_atual():
+    dados_atuais = obter_dados_atuais()
+    layout = layouts_por_versao.get(dados_atuais["versao"])
+    if layout is None:
+        layout = layouts_por_versao.setdefault(dados_atuais["versao"], montar_layout(dados_atuais))
+    return layout
+
+aplicativo.layout = layout_atual
 
 # ==============================================================================
 # Registro de Callbacks
 # ==============================================================================
-registrar_callbacks(aplicativo, dados)
+registrar_callbacks(aplicativo)
+
+# Recarregar os dados em segundo plano quando os arquivos de dataset/ mudarem
+# (o dicionário inicial não é mais referenciado aqui, para poder ser liberado após uma troca)
+del dados
+iniciar_monitor_dados()
 
 # ==============================================================================
 # Execução do Aplicativo
@@ -0,0 +1,80 @@
+/**
+ * Callbacks clientside de navegação e apresentação do dashboard.
+ * Só alteram classes, estilos e valores já conhecidos pelo navegador, sem ida ao servidor.
+ */
+
+window.dash_clientside = Object.assign({}, window.dash_clientside, {
+    navegacao: {
+        /**
+         * Alterna a barra lateral entre expandida e recolhida, salvando o estado e trocando o ícone e o logo.
+         * Na carga inicial (sem cliques), reaplica o estado salvo na sessão.
+         *
+         * @returns {Array} [classe da barra, classe do conteúdo, estado, classe do ícone, src do logo]
+         */
+        alternarBarraLateral: function(n_clicks, estadoAtual) {
+            var estado;
+            if (n_clicks === null || n_clicks === undefined) {
+                estado = estadoAtual || 'expanded';
+            } else {
+                estado = estadoAtual === 'expanded' ? 'collapsed' : 'expanded';
+            }
+
+            if (estado === 'collapsed') {
+                return [
+                    'sidebar d-flex flex-column collapsed',
+                    'content collapsed',
+                    estado,
+                    'fas fa-angle-double-right',
+                    '/assets/images/rossmann_logo1.png'
+                ];
+            }
+            return [
+                'sidebar d-flex flex-column',
+                'content',
+                estado,
+                'fas fa-angle-double-left',
+                '/assets/images/rossmann_logo2.png'
+            ];
+        },
+
+        /**
+         * Exibe o contêiner da página da URL e esconde os demais (caminhos desconhecidos exibem a primeira página).
+         *
+         * @param {string} caminho - pathname atual
+         * @param {Array} paginas - caminhos das páginas, na ordem dos Outputs
+         * @returns {Array} um estilo 'display' por página
+         */
+        exibirPagina: function(caminho, paginas) {
+            var indice = paginas.indexOf(caminho);
+            if (indice < 0) {
+                indice = 0;
+            }
+            return paginas.map(function(pagina, i) {
+                return {'display': i === indice ? 'block' : 'none'};
+            });
+        },
+
+        /**
+         * Corrige a data final do filtro de datas: se o início passar da última data do dataset, a data
+         * final vira essa data; se passar da data final, a data final vira a data de início.
+         *
+         * @returns {string} nova data final, ou no_update
+         */
+        validarDatas: function(dataInicio, dataFim, dataMaxima) {
+            // Datas sem hora são interpretadas como meia-noite local, como as com hora
+            var paraData = function(texto) {
+                return new Date(String(texto).length === 10 ? texto + 'T00:00:00' : texto).getTime();
+            };
+
+            if (dataInicio) {
+                if (dataMaxima && paraData(dataInicio) > paraData(dataMaxima)) {
+                    return dataMaxima;
+                }
+                if (dataFim && paraData(dataInicio) > paraData(dataFim)) {
+                    return dataInicio;
+                }
+            }
+            return window.dash_clientside.no_update;
+        }
+    }
+});
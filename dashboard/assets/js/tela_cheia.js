@@ -8,15 +8,20 @@ window.dash_clientside = Object.assign({}, window.dash_clientside, {
         /**
          * Alterna entre modo tela cheia e modo normal.
          * Usa a API Fullscreen do navegador para controlar o estado.
+         * Usada pelo callback clientside dos botões 'botao-tela-cheia' (MATCH) de cada página.
          * 
+         * @param {number} n_clicks - cliques no botão (nada é feito sem cliques)
          * @returns {undefined} Retorna undefined para não atualizar nenhum output no Dash
          */
-        alternarTelaCheia: function() {
+        alternarTelaCheia: function(n_clicks) {
+            if (!n_clicks) {
+                return window.dash_clientside.no_update;
+            }
             if (!document.fullscreenElement) {
                 document.documentElement.requestFullscreen().catch(err => {
                     console.error(`Erro ao tentar entrar em tela cheia: ${err.message} (${err.name})`);
                 });
-            } else {
+            } else if (document.exitFullscreen) {
                 document.exitFullscreen();
             }
             return window.dash_clientside.no_update; // Não atualiza nenhum output no Dash
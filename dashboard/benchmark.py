@@ -0,0 +1,152 @@
+# dashboard/benchmark.py
+"""
+Mede o carregamento dos dados e a latência dos principais callbacks em cada modo de dados.
+
+Uso (a partir da raiz do projeto):
+    python -m dashboard.benchmark                 # modos reduzido e completo
+    python -m dashboard.benchmark --modo completo --repeticoes 5
+    python -m dashboard.benchmark --motores pandas duckdb polars
+
+Para cada modo são informados o tempo de carregamento, a memória do df_principal e, para
+cada callback, a mediana do tempo de execução e o tamanho da resposta serializada em JSON
+(o que de fato trafega até o navegador).
+
+Com --motores, em vez dos callbacks são executadas as consultas de referência da camada de
+consultas (`consultas.py`) em cada motor: a mediana do tempo e a paridade do resultado com o
+motor pandas. Motores cuja dependência não estiver instalada são informados e ignorados.
+"""
+import argparse
+import json
+import statistics
+import time
+
+import dash
+import plotly
+
+from .data_loader import CAMINHOS_POR_MODO, MODOS_DADOS, carregar_dados
+from .callbacks import registrar_callbacks
+from .consultas import MOTORES, MotorPandas, criar_motor, resultados_equivalentes
+from .repositorio_dados import registrar_dados
+
+
+def _funcoes_callbacks(aplicativo):
+    """Retorna {nome da função: função original} dos callbacks registrados."""
+    funcoes = {}
+    for definicao in aplicativo.callback_map.values():
+        funcao = getattr(definicao.get('callback'), '__wrapped__', None)
+        if funcao is not None:
+            funcoes[funcao.__name__] = funcao
+    return funcoes
+
+
+def _medir(funcao, argumentos, repeticoes):
+    tempos_ms = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        resposta = funcao(*argumentos)
+        tempos_ms.append((time.perf_counter() - inicio) * 1000)
+    tamanho_kb = len(json.dumps(resposta, cls=plotly.utils.PlotlyJSONEncoder)) / 1024
+    return statistics.median(tempos_ms), tempos_ms[0], tamanho_kb
+
+
+def executar_benchmark(modo, repeticoes):
+    print(f"\n=== Modo {modo} ===")
+    inicio = time.perf_counter()
+    dados = carregar_dados(modo)
+    tempo_carga = time.perf_counter() - inicio
+    df_principal = dados["df_principal"]
+    print(f"Carregamento: {tempo_carga:.2f} s | df_principal: {len(df_principal):,} linhas, "
+          f"{df_principal.memory_usage(deep=True).sum() / 1024 ** 2:.1f} MB")
+
+    aplicativo = dash.Dash(__name__, suppress_callback_exceptions=True)
+    registrar_dados(dados)
+    registrar_callbacks(aplicativo)
+    funcoes = _funcoes_callbacks(aplicativo)
+
+    data_inicio = str(df_principal['Date'].min().date())
+    data_fim = str(df_principal['Date'].max().date())
+    tipos = sorted(dados["dimensao_lojas"]['StoreType'].dropna().unique().tolist())
+    filtros_3d = {'data_inicio': data_inicio, 'data_fim': data_fim, 'feriado_estadual': 'all', 'feriado_escolar': 'all'}
+    cenarios = [
+        ('atualizar_pagina_dashboard', (data_inicio, data_fim, tipos, [], 'Sales', 'all', 'all')),
+        ('atualizar_pagina_dashboard', (data_inicio, data_fim, tipos, [1, 2, 3], 'Customers', 'all', 'all')),
+        ('atualizar_grafico_comportamento_promocao', ('SalesPerCustomer', data_inicio, data_fim, tipos, [], 'all', 'all')),
+        ('atualizar_grafico_serie_temporal', ('D', 'Sales', data_inicio, data_fim, tipos, [], 'all', 'all', None)),
+        ('atualizar_histograma_vendas', ('Sales',)),
+        ('atualizar_grafico_fatores_3d', (filtros_3d, tipos, [])),
+        ('atualizar_grafico_promocao_3d', (filtros_3d, tipos, [])),
+    ]
+
+    print(f"{'callback':<45} {'1ª (ms)':>10} {'mediana (ms)':>13} {'resposta (KB)':>14}")
+    for nome, argumentos in cenarios:
+        mediana_ms, primeira_ms, tamanho_kb = _medir(funcoes[nome], argumentos, repeticoes)
+        print(f"{nome:<45} {primeira_ms:>10.1f} {mediana_ms:>13.1f} {tamanho_kb:>14.1f}")
+
+
+def _consultas_referencia(dados):
+    """(descrição, argumentos de `agregar`) cobrindo chaves do fato e das dimensões, cada função e cada filtro."""
+    df_principal = dados["df_principal"]
+    data_inicio = str(df_principal['Date'].min().date())
+    data_fim = str(df_principal['Date'].max().date())
+    meio = str((df_principal['Date'].min() + (df_principal['Date'].max() - df_principal['Date'].min()) / 2).date())
+    tipos = sorted(dados["dimensao_lojas"]['StoreType'].dropna().unique().tolist())
+    lojas = dados["dimensao_lojas"].index[:10].tolist()
+    return [
+        ('vendas por loja (soma)', (['Store'], {'Vendas': ('Sales', 'sum')}, data_inicio, data_fim, tipos)),
+        ('médias por loja', (['Store'], {'Vendas': ('Sales', 'mean'), 'Clientes': ('Customers', 'mean')}, data_inicio, data_fim)),
+        ('vendas por data', (['Date'], {'Vendas': ('Sales', 'sum'), 'Linhas': ('Sales', 'count')}, data_inicio, data_fim)),
+        ('dia da semana x mês', (['DayOfWeek', 'Month'], {'Vendas': ('Sales', 'mean')}, data_inicio, data_fim)),
+        ('tipo x promoção', (['StoreType', 'Promo'], {'Mínimo': ('Sales', 'min'), 'Máximo': ('Sales', 'max')}, data_inicio, data_fim)),
+        ('sortimento, 1 tipo, metade do período', (['Assortment'], {'Vendas': ('Sales', 'sum')}, meio, data_fim, tipos[:1])),
+        ('10 lojas por semana ISO', (['Store', 'WeekOfYear'], {'Clientes': ('Customers', 'sum')}, data_inicio, data_fim, None, lojas)),
+        ('feriados estadual/escolar', (['Year'], {'Vendas': ('Sales', 'mean')}, data_inicio, data_fim, tipos, None, '0', '1')),
+        ('total geral', ([], {'Vendas': ('Sales', 'sum'), 'Clientes': ('Customers', 'sum')}, data_inicio, data_fim)),
+    ]
+
+
+def executar_benchmark_motores(modo, nomes_motores, repeticoes):
+    print(f"\n=== Modo {modo}: motores de consultas ===")
+    dados = carregar_dados(modo)
+    registrar_dados(dados)
+    referencia = MotorPandas(dados)
+    motores = []
+    for nome in nomes_motores:
+        motor = referencia if nome == MotorPandas.nome else criar_motor(nome, dados)
+        if motor.nome != nome:
+            print(f"Motor '{nome}' ignorado (dependência não instalada).")
+            continue
+        motores.append(motor)
+
+    print(f"{'consulta':<40} {'motor':<8} {'mediana (ms)':>13} {'grupos':>8}  paridade")
+    for descricao, argumentos in _consultas_referencia(dados):
+        esperado = referencia.agregar(*argumentos)
+        for motor in motores:
+            tempos_ms = []
+            for _ in range(repeticoes):
+                inicio = time.perf_counter()
+                obtido = motor.agregar(*argumentos)
+                tempos_ms.append((time.perf_counter() - inicio) * 1000)
+            iguais, diferenca = resultados_equivalentes(esperado, obtido, argumentos[0])
+            paridade = 'ok' if iguais else f"DIFERENTE ({diferenca})"
+            print(f"{descricao:<40} {motor.nome:<8} {statistics.median(tempos_ms):>13.1f} {len(obtido):>8}  {paridade}")
+    for motor in motores:
+        motor.fechar()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--modo', choices=MODOS_DADOS, action='append', help="Modo(s) a medir (padrão: todos os disponíveis)")
+    parser.add_argument('--repeticoes', type=int, default=3)
+    parser.add_argument('--motores', nargs='+', choices=tuple(MOTORES), help="Compara os motores de consultas em vez dos callbacks")
+    argumentos = parser.parse_args()
+
+    modos = argumentos.modo or [m for m in MODOS_DADOS if CAMINHOS_POR_MODO[m]['treino'].exists()]
+    for modo in modos:
+        if argumentos.motores:
+            executar_benchmark_motores(modo, argumentos.motores, argumentos.repeticoes)
+        else:
+            executar_benchmark(modo, argumentos.repeticoes)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,322 @@
+# dashboard/cache.py
+"""
+Caches em memória compartilhados pelos callbacks de um mesmo worker.
+
+`CacheLRU` é um cache limitado por número de entradas, por memória estimada e,
+opcionalmente, por tempo de vida, com contadores de acertos e falhas. `ResultadoFiltrado`
+guarda um DataFrame filtrado junto com os agrupamentos já calculados sobre ele, para que
+callbacks disparados pelo mesmo filtro reaproveitem tanto a filtragem quanto as agregações.
+`saida_em_cache` guarda as figuras (e textos) já serializados de cada gráfico, para que a mesma
+combinação de filtros pedida por outra sessão seja respondida sem refazer consultas nem figuras.
+"""
+import json
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+import plotly
+
+from .config import MAX_ENTRADAS_CACHE_FIGURAS, MAX_MB_CACHE_FIGURAS, TTL_CACHE_FIGURAS_S
+from .cubo import METRICAS_CUBO
+from .dimensao_datas import COLUNA_CHAVE_DATA, atributos_das_datas, inicio_periodo
+from .dimensao_lojas import anexar_atributos_loja, atributos_das_lojas
+from .repositorio_dados import descartar_versoes_removidas
+from .utils import remover_categorias_nao_usadas
+
+
+def estimar_tamanho_bytes(valor):
+    """Estimativa rasa de memória para DataFrames/Series (via memory_usage) e demais objetos."""
+    if isinstance(valor, tuple):
+        return sum(estimar_tamanho_bytes(item) for item in valor)
+    uso_memoria = getattr(valor, 'memory_usage', None)
+    if uso_memoria is not None:
+        try:
+            uso = uso_memoria(index=True)
+            return int(uso.sum()) if hasattr(uso, 'sum') else int(uso)
+        except TypeError:
+            pass
+    tamanho_bytes = getattr(valor, 'tamanho_bytes', None)
+    if tamanho_bytes is not None:
+        return tamanho_bytes()
+    return sys.getsizeof(valor)
+
+
+class CacheLRU:
+    """
+    Cache LRU limitado por quantidade de entradas e por bytes estimados. Com `ttl_s`, cada
+    entrada expira esse número de segundos depois de guardada.
+    """
+
+    def __init__(self, max_entradas, max_bytes=None, calcular_tamanho=estimar_tamanho_bytes, ttl_s=None):
+        self.max_entradas = max_entradas
+        self.max_bytes = max_bytes
+        self.calcular_tamanho = calcular_tamanho
+        self.ttl_s = ttl_s
+        self._entradas = OrderedDict()  # chave -> (valor, tamanho em bytes, instante de expiração)
+        self._bytes = 0
+        self._trava = threading.RLock()
+        self._calculos_em_andamento = {}
+        self.acertos = 0
+        self.falhas = 0
+
+    def _entrada_valida(self, chave):
+        """Entrada da chave marcada como recente, ou None (as expiradas são removidas). Chamar com a trava."""
+        entrada = self._entradas.get(chave)
+        if entrada is None:
+            return None
+        if entrada[2] is not None and entrada[2] <= time.monotonic():
+            self._bytes -= self._entradas.pop(chave)[1]
+            return None
+        self._entradas.move_to_end(chave)
+        return entrada
+
+    def obter(self, chave, padrao=None):
+        """Retorna o valor da chave (marcando-o como recente) ou `padrao`."""
+        with self._trava:
+            entrada = self._entrada_valida(chave)
+            if entrada is None:
+                self.falhas += 1
+                return padrao
+            self.acertos += 1
+            return entrada[0]
+
+    def guardar(self, chave, valor):
+        """Guarda o valor e descarta as entradas menos recentes que excederem os limites."""
+        tamanho = self.calcular_tamanho(valor)
+        expira_em = time.monotonic() + self.ttl_s if self.ttl_s is not None else None
+        with self._trava:
+            if chave in self._entradas:
+                self._bytes -= self._entradas.pop(chave)[1]
+            if self.max_bytes is not None and tamanho > self.max_bytes:
+                return valor  # Maior que o cache inteiro: não vale a pena guardar
+            self._entradas[chave] = (valor, tamanho, expira_em)
+            self._bytes += tamanho
+            while self._entradas and (
+                len(self._entradas) > self.max_entradas
+                or (self.max_bytes is not None and self._bytes > self.max_bytes)
+            ):
+                _, (_, tamanho_removido, _) = self._entradas.popitem(last=False)
+                self._bytes -= tamanho_removido
+        return valor
+
+    def obter_ou_calcular(self, chave, funcao):
+        """
+        Retorna o valor em cache ou o calcula com `funcao()`.
+
+        Chamadas simultâneas para a mesma chave (callbacks disparados pelo mesmo filtro)
+        esperam o primeiro cálculo em vez de repeti-lo.
+        """
+        with self._trava:
+            entrada = self._entrada_valida(chave)
+            if entrada is not None:
+                self.acertos += 1
+                return entrada[0]
+            trava_chave = self._calculos_em_andamento.setdefault(chave, threading.Lock())
+
+        with trava_chave:
+            with self._trava:
+                entrada = self._entrada_valida(chave)
+                if entrada is not None:
+                    self.acertos += 1
+                    return entrada[0]
+                self.falhas += 1
+            try:
+                return self.guardar(chave, funcao())
+            finally:
+                with self._trava:
+                    self._calculos_em_andamento.pop(chave, None)
+
+    def limpar(self):
+        """Remove todas as entradas (os contadores são mantidos)."""
+        with self._trava:
+            self._entradas.clear()
+            self._bytes = 0
+
+    def remover_se(self, predicado):
+        """Remove as entradas cuja chave satisfaz `predicado(chave)` (ex.: chaves de uma versão antiga dos dados)."""
+        with self._trava:
+            for chave in [chave for chave in self._entradas if predicado(chave)]:
+                self._bytes -= self._entradas.pop(chave)[1]
+
+    def __len__(self):
+        return len(self._entradas)
+
+    def estatisticas(self):
+        """Retorna os contadores de uso do cache."""
+        with self._trava:
+            total = self.acertos + self.falhas
+            return {
+                'acertos': self.acertos,
+                'falhas': self.falhas,
+                'taxa_acerto': self.acertos / total if total else 0.0,
+                'entradas': len(self._entradas),
+                'memoria_mb': self._bytes / 1024 ** 2,
+            }
+
+
+class ResultadoFiltrado:
+    """
+    DataFrame filtrado e os agrupamentos já calculados sobre ele.
+
+    Se `fatia_cubo` (ver `cubo.FatiaCubo`) for informada, somas, médias e médias agrupadas
+    por dimensões do cubo são respondidas pelas parciais pré-agregadas em vez das linhas.
+    Agrupamentos por atributos de loja ou de data que não são colunas do fato usam
+    `dimensao_lojas` e `dimensao_datas`. `filtros` são os argumentos de `filtrar_dataframe` que
+    produziram `df` (data_inicio, data_fim, tipos_loja, lojas_especificas, feriado_estadual,
+    feriado_escolar), repassados ao motor de consultas.
+    """
+
+    def __init__(self, df, fatia_cubo=None, dimensao_lojas=None, dimensao_datas=None, filtros=None):
+        self.df = df
+        self.filtros = filtros
+        self.fatia_cubo = fatia_cubo
+        self.dimensao_lojas = dimensao_lojas
+        self.dimensao_datas = dimensao_datas
+        self._agregados = {}
+        self._trava = threading.Lock()
+
+    def agregar(self, chave, funcao):
+        """Retorna o agregado identificado por `chave`, calculando `funcao(df)` na primeira vez."""
+        with self._trava:
+            if chave in self._agregados:
+                return self._agregados[chave]
+        resultado = funcao(self.df)
+        with self._trava:
+            return self._agregados.setdefault(chave, resultado)
+
+    def _colunas_agrupamento(self, df, chaves):
+        """Séries de agrupamento de `chaves`; atributos de loja ou de data ausentes do fato são resolvidos pelas dimensões."""
+        chaves = [chaves] if isinstance(chaves, str) else list(chaves)
+        faltantes = [chave for chave in chaves if chave not in df.columns]
+        series = {}
+        if faltantes and self.dimensao_datas is not None:
+            de_datas = [chave for chave in faltantes if chave in self.dimensao_datas.columns]
+            if de_datas:
+                series.update(atributos_das_datas(self.dimensao_datas, df[COLUNA_CHAVE_DATA].to_numpy(), de_datas, indice=df.index).items())
+        de_lojas = [chave for chave in faltantes if chave not in series]
+        if de_lojas:
+            series.update(atributos_das_lojas(self.dimensao_lojas, df['Store'].to_numpy(), de_lojas, indice=df.index).items())
+        return [df[chave] if chave in df.columns else series[chave] for chave in chaves]
+
+    def com_atributos_loja(self, colunas, atributos):
+        """Colunas `colunas` do DataFrame filtrado com os atributos de loja `atributos` anexados (calculado uma vez)."""
+        return self.agregar(
+            ('atributos', tuple(colunas), tuple(atributos)),
+            lambda df: anexar_atributos_loja(df[colunas], self.dimensao_lojas, atributos),
+        )
+
+    @staticmethod
+    def _chave_media(chaves, metrica):
+        return ('media', tuple(chaves) if isinstance(chaves, list) else chaves, metrica)
+
+    def preparar_medias(self, dimensoes, metricas):
+        """
+        Calcula em lote as médias de várias métricas por várias dimensões.
+
+        Cada dimensão (ou lista de colunas) custa um único agrupamento, que produz as médias
+        de todas as métricas pendentes de uma vez; os resultados ficam disponíveis em `media_por`.
+        """
+        for chaves in dimensoes:
+            with self._trava:
+                pendentes = [m for m in metricas if self._chave_media(chaves, m) not in self._agregados]
+            if not pendentes:
+                continue
+            if all(self._usa_cubo(chaves, m) for m in pendentes):
+                medias = self.fatia_cubo.medias_por(chaves, pendentes)
+            else:
+                medias = self.df.groupby(self._colunas_agrupamento(self.df, chaves), observed=True)[pendentes].mean().reset_index()
+            colunas_chave = [chaves] if isinstance(chaves, str) else list(chaves)
+            with self._trava:
+                for metrica in pendentes:
+                    self._agregados.setdefault(self._chave_media(chaves, metrica), medias[colunas_chave + [metrica]])
+
+    def preparar_totais(self, metricas):
+        """Calcula em uma passada a soma e a contagem de não nulos de cada métrica."""
+        if all(self._usa_cubo([], m) for m in metricas):
+            somas, contagens = self.fatia_cubo.totais(metricas)
+        else:
+            totais = self.df[metricas].agg(['sum', 'count'])
+            somas, contagens = totais.loc['sum'].to_dict(), totais.loc['count'].astype(int).to_dict()
+        with self._trava:
+            for metrica in metricas:
+                self._agregados.setdefault(('soma', metrica), somas[metrica])
+                self._agregados.setdefault(('contagem', metrica), contagens[metrica])
+
+    def media_por(self, chaves, metrica):
+        """Média de `metrica` agrupada por `chaves`; devolve uma cópia, que o chamador pode alterar."""
+        self.preparar_medias([chaves], [metrica])
+        return remover_categorias_nao_usadas(self._agregados[self._chave_media(chaves, metrica)].copy())
+
+    def media_por_periodo(self, frequencia, chaves, metrica):
+        """Média de `metrica` por período ('M', 'W' ou 'D', coluna 'Date_Period') e `chaves`."""
+        chave_agregado = ('periodo', frequencia, tuple(chaves), metrica)
+        if self._usa_cubo(['Date'] + list(chaves), metrica):
+            funcao = lambda df: self.fatia_cubo.media_por_periodo(frequencia, chaves, metrica)
+        else:
+            def funcao(df):
+                if frequencia == 'D':
+                    periodo = df['Date'].rename('Date_Period')
+                else:
+                    periodo = pd.Series(inicio_periodo(self.dimensao_datas, df[COLUNA_CHAVE_DATA].to_numpy(), frequencia), index=df.index, name='Date_Period')
+                return df.groupby([periodo] + self._colunas_agrupamento(df, chaves), observed=True)[metrica].mean().reset_index()
+        return remover_categorias_nao_usadas(self.agregar(chave_agregado, funcao).copy())
+
+    def valores_por_promocao(self, metrica):
+        """Retorna (valores sem promoção, valores com promoção) de `metrica`, separados em uma única passada."""
+        def separar(df):
+            promo = df['Promo'].to_numpy()
+            valores = df[metrica]
+            return valores[promo == 0], valores[promo == 1]
+        return self.agregar(('valores_promocao', metrica), separar)
+
+    def soma(self, metrica):
+        self.preparar_totais([metrica])
+        return self._agregados[('soma', metrica)]
+
+    def contagem(self, metrica):
+        self.preparar_totais([metrica])
+        return self._agregados[('contagem', metrica)]
+
+    def media(self, metrica):
+        contagem = self.contagem(metrica)
+        return self.soma(metrica) / contagem if contagem else np.nan
+
+    def _usa_cubo(self, chaves, metrica):
+        return (
+            self.fatia_cubo is not None
+            and metrica in METRICAS_CUBO
+            and self.fatia_cubo.suporta([chaves] if isinstance(chaves, str) else chaves)
+        )
+
+    def tamanho_bytes(self):
+        """Memória estimada do DataFrame filtrado mais os agregados."""
+        tamanho_fatia = estimar_tamanho_bytes(self.fatia_cubo.tabela) if self.fatia_cubo is not None else 0
+        return estimar_tamanho_bytes(self.df) + tamanho_fatia + sum(
+            estimar_tamanho_bytes(agregado) for agregado in self._agregados.values()
+        )
+
+
+# ==============================================================================
+# Cache de figuras serializadas
+# ==============================================================================
+# Saídas de gráficos por (id do gráfico, versão dos dados, entradas), guardadas como texto JSON:
+# o tamanho é exato e cada requisição recebe sua própria cópia, sem objetos compartilhados
+CACHE_FIGURAS = descartar_versoes_removidas(
+    CacheLRU(MAX_ENTRADAS_CACHE_FIGURAS, MAX_MB_CACHE_FIGURAS * 1024 ** 2, calcular_tamanho=len, ttl_s=TTL_CACHE_FIGURAS_S),
+    lambda chave: chave[1]
+)
+
+
+def saida_em_cache(id_grafico, versao, entradas, construir):
+    """
+    Retorna a saída de `construir()` (figura, tupla de figura e texto, componentes...) já
+    serializada em estruturas JSON, reaproveitando a de uma chamada anterior com o mesmo
+    `id_grafico`, a mesma `versao` dos dados e as mesmas `entradas` (valores dos filtros já
+    normalizados, ver `normalizar_filtros`). Não use para saídas com `dash.no_update`.
+    """
+    chave = (id_grafico, versao, json.dumps(entradas, sort_keys=True, default=str))
+    texto = CACHE_FIGURAS.obter_ou_calcular(chave, lambda: json.dumps(construir(), cls=plotly.utils.PlotlyJSONEncoder))
+    return json.loads(texto)
@@ -8,13 +8,16 @@ from .callbacks_analise_lojas import registrar_callbacks_analise_lojas
 from .callbacks_dashboard_geral import registrar_callbacks_dashboard_geral
 
 
-def registrar_callbacks(aplicativo, dados):
-    """Registra todos os callbacks da aplicação."""
-    registrar_callbacks_gerais(aplicativo, dados)
-    registrar_callbacks_analise_preliminar(aplicativo, dados)
-    registrar_callbacks_dashboard_geral(aplicativo, dados)
-    registrar_callbacks_analise_3d(aplicativo, dados)
-    # Para a página de análise de lojas, usamos o dcc.Store em vez de passar o DataFrame diretamente
+def registrar_callbacks(aplicativo):
+    """
+    Registra todos os callbacks da aplicação. Nenhum callback guarda DataFrames em closures:
+    os dados são obtidos de `repositorio_dados` a cada chamada, para acompanhar recargas.
+    """
+    registrar_callbacks_gerais(aplicativo)
+    registrar_callbacks_analise_preliminar(aplicativo)
+    registrar_callbacks_dashboard_geral(aplicativo)
+    registrar_callbacks_analise_3d(aplicativo)
+    # Para a página de análise de lojas, o DataFrame é resolvido pela chave de versão guardada no dcc.Store
     registrar_callbacks_analise_lojas(aplicativo)
 
     # Nota: A página 'Limpeza de Dados' é estática em sua maioria, não precisando de callbacks aqui.
\ No newline at end of file
@@ -4,21 +4,29 @@ import dash
 import pandas as pd
 import plotly.graph_objects as go
 import plotly.express as px
-from io import StringIO
 import numpy as np
 
 from ..utils import criar_figura_vazia, filtrar_dataframe_para_3d # Importar as funções utilitárias refatoradas
+from ..repositorio_dados import obter_dados_atuais
+from ..consultas import obter_motor
+from ..cache import saida_em_cache
+from ..dimensao_datas import atributos_das_datas
+from ..dimensao_lojas import anexar_atributos_loja, atributos_das_lojas, lojas_dos_tipos
 from ..config import VERMELHO_ROSSMANN, AZUL_ESCURO, CINZA_NEUTRO, PALETA_CORES_GRAFICO, MAPEAMENTO_DIAS_SEMANA, ORDEM_DIAS_SEMANA # Importar as novas constantes
 
-def registrar_callbacks_analise_3d(aplicativo, dados):
+def registrar_callbacks_analise_3d(aplicativo):
     """
     Registra todos os callbacks relacionados à análise 3D no aplicativo Dash.
+    O DataFrame principal é obtido da versão atual dos dados a cada chamada.
     
     Args:
         aplicativo: Instância do aplicativo Dash
-        dados: DataFrame contendo os dados das lojas
     """
-    df_principal = dados["df_principal"] # Usar o novo nome do DataFrame principal
+
+    colunas_3d = [
+        'Store', 'StoreType', 'DayOfWeek', 'Month', 'Sales', 'Customers',
+        'SalesPerCustomer', 'Promo', 'CompetitionDistance'
+    ]
 
     @aplicativo.callback( # Usar 'aplicativo'
         Output('armazenamento-dados-base-3d', 'data'), # Refatorar ID
@@ -33,10 +41,13 @@ def registrar_callbacks_analise_3d(aplicativo, dados):
     )
     def atualizar_dados_base_3d(estilo_pagina, data_inicio, data_fim, feriado_estadual, feriado_escolar, dados_existentes): # Refatorar nome da função e parâmetros
         """
-        Filtra e otimiza os dados para a página 3D, com lógica de cache.
+        Define os filtros gerais da página 3D, com lógica de cache.
         - Calcula na primeira visita (quando o estilo da página muda para 'block').
         - Recalcula quando um filtro é alterado.
-        - Mantém os dados em cache em navegações subsequentes.
+        - Mantém os filtros em cache em navegações subsequentes.
+
+        O armazenamento guarda apenas os filtros (alguns bytes); as linhas são filtradas no
+        servidor por `preprocessar_dados_3d`, em vez de trafegar o DataFrame filtrado em JSON.
         """
         id_gatilho = ctx.triggered_id # Refatorar nome da variável
 
@@ -49,50 +60,36 @@ def registrar_callbacks_analise_3d(aplicativo, dados):
             return dash.no_update
 
         # Para o primeiro carregamento ou mudança de filtro, processa os dados.
+        df_principal = obter_dados_atuais()["df_principal"]
         data_inicio = data_inicio or df_principal['Date'].min().date() # Usar df_principal
         data_fim = data_fim or df_principal['Date'].max().date() # Usar df_principal
         feriado_estadual = feriado_estadual or 'all'
         feriado_escolar = feriado_escolar or 'all'
 
-        df_filtrado = filtrar_dataframe_para_3d(df_principal, data_inicio, data_fim, feriado_estadual, feriado_escolar) # Refatorar nome da variável e função
-
-        if df_filtrado.empty:
-            return pd.DataFrame().to_json(date_format='iso', orient='split')
+        return {
+            'data_inicio': str(pd.to_datetime(data_inicio).date()),
+            'data_fim': str(pd.to_datetime(data_fim).date()),
+            'feriado_estadual': feriado_estadual,
+            'feriado_escolar': feriado_escolar,
+        }
 
-        colunas_manter = [ # Refatorar nome da variável
-            'Store', 'StoreType', 'DayOfWeek', 'Month', 'Sales', 'Customers',
-            'SalesPerCustomer', 'Promo', 'CompetitionDistance'
-        ]
-        colunas_existentes = [col for col in colunas_manter if col in df_filtrado.columns] # Refatorar nome da variável
-        df_otimizado = df_filtrado[colunas_existentes] # Refatorar nome da variável
 
-        return df_otimizado.to_json(date_format='iso', orient='split') # Retornar novo nome de variável
-
-
-    def obter_grafico_superficie_sazonalidade(df_filtrado):
+    def obter_grafico_superficie_sazonalidade(medias_vendas):
         """
         Cria um gráfico de superfície 3D para visualizar padrões de sazonalidade nas vendas.
         A superfície mostra a interação entre dias da semana e meses do ano.
         
         Args:
-            df_filtrado: DataFrame com os dados filtrados para análise
+            medias_vendas: Médias de vendas por DayOfWeek e Month (resultado do motor de consultas)
             
         Returns:
             tuple: (figura do gráfico, texto de análise)
         """
-        df_para_plotar = df_filtrado.copy()
-
-        if df_para_plotar.empty:
+        if medias_vendas.empty:
             return criar_figura_vazia(f"Sem dados para a seleção atual"), "Ajuste os filtros para visualizar dados."
 
-        # Cria uma tabela pivô com médias de vendas por dia da semana e mês
-        pivo_vendas = pd.pivot_table(
-            df_para_plotar,
-            values='Sales',
-            index='DayOfWeek',
-            columns='Month',
-            aggfunc='mean'
-        ).fillna(0)
+        # Tabela pivô com as médias de vendas por dia da semana e mês
+        pivo_vendas = medias_vendas.pivot(index='DayOfWeek', columns='Month', values='Sales').fillna(0)
 
         # Garante que a grade esteja completa para uma superfície contínua
         pivo_vendas = pivo_vendas.reindex(columns=range(1, 13), fill_value=0)
@@ -169,17 +166,14 @@ def registrar_callbacks_analise_3d(aplicativo, dados):
         return fig, texto_analise
 
 
-    def obter_grafico_dispersao_3d_fatores_loja(df_filtrado): # Refatorar nome da função e parâmetro
-        """Cria um gráfico de dispersão 3D para fatores da loja."""
-        if df_filtrado.empty:
+    def obter_grafico_dispersao_3d_fatores_loja(medias_loja): # Refatorar nome da função e parâmetro
+        """Cria um gráfico de dispersão 3D para fatores da loja (`medias_loja`: médias por loja do motor de consultas)."""
+        if medias_loja.empty:
             return criar_figura_vazia("Sem dados para a dispersão 3D"), "Filtre por pelo menos um tipo de loja." # Usar a função refatorada
 
-        agg_loja = df_filtrado.groupby('Store').agg( # Refatorar nome da variável
-            MetricValue=('Sales', 'mean'), # Renomeado para mais genérico
-            Customers=('Customers', 'mean'), # Adicionado Customers para usar no gráfico
-            CompetitionDistance=('CompetitionDistance', 'first'),
-            StoreType=('StoreType', 'first')
-        ).reset_index().dropna()
+        # Distância do concorrente e tipo vêm da dimensão de lojas (uma linha por loja)
+        atributos = atributos_das_lojas(obter_dados_atuais()["dimensao_lojas"], medias_loja['Store'].to_numpy(), ['CompetitionDistance', 'StoreType'], indice=medias_loja.index)
+        agg_loja = pd.concat([medias_loja, atributos.astype({'StoreType': object})], axis=1).dropna() # Refatorar nome da variável
 
         if agg_loja.empty:
             return criar_figura_vazia("Dados agregados de loja insuficientes"), "Nenhuma loja encontrada para os tipos selecionados." # Usar a função refatorada
@@ -208,13 +202,13 @@ def registrar_callbacks_analise_3d(aplicativo, dados):
         texto_analise = "Este gráfico correlaciona três fatores-chave: distância do concorrente, média de clientes e média de vendas. Cada ponto representa uma loja. Permite identificar se lojas com concorrentes mais próximos (eixo X) têm desempenho diferente em termos de fluxo de clientes (eixo Y) e receita (eixo Z)." # Refatorar nome da variável
         return fig, texto_analise
 
-    def preprocessar_dados_3d(dados_json, tipos_loja, lojas_especificas):
+    def preprocessar_dados_3d(filtros_gerais, tipos_loja, lojas_especificas):
         """
         Função auxiliar para pré-processar dados para os gráficos 3D.
-        Realiza validação, leitura de JSON e filtragem dos dados.
+        Realiza validação e filtragem dos dados (filtros gerais da página e filtros de loja do gráfico).
         
         Args:
-            dados_json: String JSON com os dados
+            filtros_gerais: Filtros de período e feriados guardados em 'armazenamento-dados-base-3d'
             tipos_loja: Lista de tipos de loja para filtrar
             lojas_especificas: Lista de IDs de lojas específicas
             
@@ -224,19 +218,28 @@ def registrar_callbacks_analise_3d(aplicativo, dados):
         estilo_visivel = {'height': '65vh', 'visibility': 'visible'}
 
         try:
-            df_principal = pd.read_json(StringIO(dados_json), orient='split')
-            if df_principal.empty:
+            dados = obter_dados_atuais()
+            dimensao_lojas = dados["dimensao_lojas"]
+            df_periodo = filtrar_dataframe_para_3d(
+                dados["df_principal"], filtros_gerais['data_inicio'], filtros_gerais['data_fim'],
+                filtros_gerais['feriado_estadual'], filtros_gerais['feriado_escolar']
+            )
+            if df_periodo.empty:
                 figura = criar_figura_vazia("Sem dados para os filtros gerais")
                 mensagem = "Altere o período ou os filtros de feriado."
                 return None, figura, mensagem, estilo_visivel
 
             # Aplica filtros de loja
             if lojas_especificas:
-                df_filtrado = df_principal[df_principal['Store'].isin(lojas_especificas)]
+                df_periodo = df_periodo[df_periodo['Store'].isin(lojas_especificas)]
             elif tipos_loja:
-                df_filtrado = df_principal[df_principal['StoreType'].isin(tipos_loja)]
-            else:
-                df_filtrado = df_principal
+                df_periodo = df_periodo[df_periodo['Store'].isin(lojas_dos_tipos(dimensao_lojas, tipos_loja))]
+
+            # Os atributos da loja (tipo, distância do concorrente) vêm da dimensão de lojas e o mês, do calendário
+            df_filtrado = df_periodo[[col for col in colunas_3d if col in df_periodo.columns]]
+            df_filtrado = df_filtrado.assign(Month=atributos_das_datas(dados["dimensao_datas"], df_periodo['DateKey'].to_numpy(), ['Month'])['Month'].to_numpy())
+            df_filtrado = anexar_atributos_loja(df_filtrado, dimensao_lojas, [col for col in colunas_3d if col in dimensao_lojas.columns])
+            df_filtrado = df_filtrado[[col for col in colunas_3d if col in df_filtrado.columns]]
 
             if df_filtrado.empty:
                 figura = criar_figura_vazia("Nenhuma loja encontrada para os filtros selecionados")
@@ -250,6 +253,43 @@ def registrar_callbacks_analise_3d(aplicativo, dados):
             return None, figura, "Ocorreu um erro ao processar os dados.", estilo_visivel
 
 
+    def agregar_dados_3d(filtros_gerais, tipos_loja, lojas_especificas, chaves, agregacoes):
+        """
+        Equivalente agregado de `preprocessar_dados_3d` para os gráficos que só usam médias:
+        filtro e agrupamento são feitos pelo motor de consultas, sem montar as linhas filtradas.
+
+        Returns:
+            tuple: (DataFrame agregado, figura de erro, mensagem de erro, estilo)
+        """
+        estilo_visivel = {'height': '65vh', 'visibility': 'visible'}
+
+        try:
+            # Lojas específicas têm prioridade sobre os tipos, como em `preprocessar_dados_3d`
+            filtros_loja = (None, lojas_especificas) if lojas_especificas else (tipos_loja or None, None)
+            filtros = (filtros_gerais['data_inicio'], filtros_gerais['data_fim']) + filtros_loja + (filtros_gerais['feriado_estadual'], filtros_gerais['feriado_escolar'])
+            agregado = obter_motor().agregar(chaves, agregacoes, *filtros)
+            if not agregado.empty:
+                return agregado, None, None, estilo_visivel
+
+            # Sem grupos: distingue período/feriados vazios de filtros de loja sem correspondência
+            if filtrar_dataframe_para_3d(
+                obter_dados_atuais()["df_principal"], filtros_gerais['data_inicio'], filtros_gerais['data_fim'],
+                filtros_gerais['feriado_estadual'], filtros_gerais['feriado_escolar']
+            ).empty:
+                return None, criar_figura_vazia("Sem dados para os filtros gerais"), "Altere o período ou os filtros de feriado.", estilo_visivel
+            return None, criar_figura_vazia("Nenhuma loja encontrada para os filtros selecionados"), "Ajuste os filtros de loja para visualizar dados.", estilo_visivel
+
+        except Exception as e:
+            figura = criar_figura_vazia(f"Erro ao processar dados: {str(e)}")
+            return None, figura, "Ocorreu um erro ao processar os dados.", estilo_visivel
+
+
+    def saida_3d_em_cache(id_grafico, filtros_gerais, tipos_loja, lojas_especificas, construir):
+        """Saída de `construir()` servida do cache de figuras para os mesmos filtros gerais e de loja."""
+        entradas = (filtros_gerais, sorted(tipos_loja or []), sorted(int(loja) for loja in lojas_especificas or []))
+        return saida_em_cache(id_grafico, obter_dados_atuais()["versao"], entradas, construir)
+
+
     @aplicativo.callback( # Usar 'aplicativo'
         [Output('grafico-superficie-3d', 'figure'), # Refatorar ID
          Output('analise-superficie-3d', 'children'), # Refatorar ID
@@ -258,17 +298,22 @@ def registrar_callbacks_analise_3d(aplicativo, dados):
          Input('filtro-tipo-loja-superficie', 'value'), # Refatorar ID
          Input('filtro-loja-especifica-superficie', 'value')] # Refatorar ID
     )
-    def atualizar_grafico_superficie_3d(dados_json, tipos_loja, lojas_especificas): # Refatorar nome da função e parâmetros
+    def atualizar_grafico_superficie_3d(filtros_gerais, tipos_loja, lojas_especificas): # Refatorar nome da função e parâmetros
         """Atualiza o gráfico de superfície 3D, controlando sua visibilidade."""
-        if not dados_json:
+        if not filtros_gerais:
             return dash.no_update, dash.no_update, dash.no_update
 
-        df_filtrado, figura_erro, mensagem_erro, estilo = preprocessar_dados_3d(dados_json, tipos_loja, lojas_especificas) # Refatorar nome das variáveis e função
-        if figura_erro is not None:
-            return figura_erro, mensagem_erro, estilo
+        def construir():
+            medias_vendas, figura_erro, mensagem_erro, estilo = agregar_dados_3d(
+                filtros_gerais, tipos_loja, lojas_especificas, ['DayOfWeek', 'Month'], {'Sales': ('Sales', 'mean')}
+            )
+            if figura_erro is not None:
+                return figura_erro, mensagem_erro, estilo
+
+            fig, texto_analise = obter_grafico_superficie_sazonalidade(medias_vendas) # Refatorar nome das variáveis e função
+            return fig, texto_analise, estilo
 
-        fig, texto_analise = obter_grafico_superficie_sazonalidade(df_filtrado) # Refatorar nome das variáveis e função
-        return fig, texto_analise, estilo
+        return saida_3d_em_cache('grafico-superficie-3d', filtros_gerais, tipos_loja, lojas_especificas, construir)
 
     @aplicativo.callback( # Usar 'aplicativo'
         [Output('grafico-dispersao-3d', 'figure'), # Refatorar ID
@@ -278,17 +323,23 @@ def registrar_callbacks_analise_3d(aplicativo, dados):
          Input('filtro-tipo-loja-fatores', 'value'), # Refatorar ID
          Input('filtro-loja-especifica-fatores', 'value')] # Refatorar ID
     )
-    def atualizar_grafico_fatores_3d(dados_json, tipos_loja, lojas_especificas): # Refatorar nome da função e parâmetros
+    def atualizar_grafico_fatores_3d(filtros_gerais, tipos_loja, lojas_especificas): # Refatorar nome da função e parâmetros
         """Atualiza o gráfico de dispersão 3D de fatores da loja, controlando sua visibilidade."""
-        if not dados_json:
+        if not filtros_gerais:
             return dash.no_update, dash.no_update, dash.no_update
 
-        df_filtrado, figura_erro, mensagem_erro, estilo = preprocessar_dados_3d(dados_json, tipos_loja, lojas_especificas) # Refatorar nome das variáveis e função
-        if figura_erro is not None:
-            return figura_erro, mensagem_erro, estilo
+        def construir():
+            medias_loja, figura_erro, mensagem_erro, estilo = agregar_dados_3d(
+                filtros_gerais, tipos_loja, lojas_especificas, ['Store'],
+                {'MetricValue': ('Sales', 'mean'), 'Customers': ('Customers', 'mean')}
+            )
+            if figura_erro is not None:
+                return figura_erro, mensagem_erro, estilo
 
-        fig, texto_analise = obter_grafico_dispersao_3d_fatores_loja(df_filtrado) # Refatorar nome das variáveis e função
-        return fig, texto_analise, estilo
+            fig, texto_analise = obter_grafico_dispersao_3d_fatores_loja(medias_loja) # Refatorar nome das variáveis e função
+            return fig, texto_analise, estilo
+
+        return saida_3d_em_cache('grafico-dispersao-3d', filtros_gerais, tipos_loja, lojas_especificas, construir)
 
     @aplicativo.callback( # Usar 'aplicativo'
         [Output('grafico-dinamica-promocao-3d', 'figure'), # Refatorar ID
@@ -298,17 +349,20 @@ def registrar_callbacks_analise_3d(aplicativo, dados):
          Input('filtro-tipo-loja-promocao', 'value'), # Refatorar ID
          Input('filtro-loja-especifica-promocao', 'value')] # Refatorar ID
     )
-    def atualizar_grafico_promocao_3d(dados_json, filtro_tipos_loja, filtro_lojas_especificas): # Refatorar nome da função e parâmetros
+    def atualizar_grafico_promocao_3d(filtros_gerais, filtro_tipos_loja, filtro_lojas_especificas): # Refatorar nome da função e parâmetros
         """Atualiza o gráfico de dispersão 3D da dinâmica de promoções, controlando sua visibilidade."""
-        if not dados_json:
+        if not filtros_gerais:
             return dash.no_update, dash.no_update, dash.no_update
 
-        df_filtrado, figura_erro, mensagem_erro, estilo = preprocessar_dados_3d(dados_json, filtro_tipos_loja, filtro_lojas_especificas) # Refatorar nome das variáveis e função
-        if figura_erro is not None:
-            return figura_erro, mensagem_erro, estilo
+        def construir():
+            df_filtrado, figura_erro, mensagem_erro, estilo = preprocessar_dados_3d(filtros_gerais, filtro_tipos_loja, filtro_lojas_especificas) # Refatorar nome das variáveis e função
+            if figura_erro is not None:
+                return figura_erro, mensagem_erro, estilo
 
-        fig, texto_analise = obter_grafico_dispersao_3d_dinamica_promocao(df_filtrado) # Refatorar nome das variáveis e função
-        return fig, texto_analise, estilo
+            fig, texto_analise = obter_grafico_dispersao_3d_dinamica_promocao(df_filtrado) # Refatorar nome das variáveis e função
+            return fig, texto_analise, estilo
+
+        return saida_3d_em_cache('grafico-dinamica-promocao-3d', filtros_gerais, filtro_tipos_loja, filtro_lojas_especificas, construir)
 
     @aplicativo.callback(
         [Output('grafico-correlacao-3d', 'figure'),
@@ -324,7 +378,7 @@ def registrar_callbacks_analise_3d(aplicativo, dados):
         Mostra as relações entre diferentes variáveis numéricas do dataset.
         
         Args:
-            dados_armazenados: Dados JSON armazenados
+            dados_armazenados: Filtros gerais armazenados
             tipos_loja: Lista de tipos de loja selecionados
             lojas_especificas: Lista de lojas específicas selecionadas
             
@@ -334,50 +388,53 @@ def registrar_callbacks_analise_3d(aplicativo, dados):
         if not dados_armazenados:
             return dash.no_update, dash.no_update, dash.no_update
 
-        df_filtrado, figura_erro, mensagem_erro, estilo = preprocessar_dados_3d(dados_armazenados, tipos_loja, lojas_especificas)
-
-        if figura_erro is not None:
-            return figura_erro, mensagem_erro, estilo
+        def construir():
+            df_filtrado, figura_erro, mensagem_erro, estilo = preprocessar_dados_3d(dados_armazenados, tipos_loja, lojas_especificas)
+
+            if figura_erro is not None:
+                return figura_erro, mensagem_erro, estilo
+
+            try:
+                if df_filtrado.select_dtypes(include=np.number).shape[1] < 3:
+                    fig = criar_figura_vazia("Dados insuficientes para gerar matriz de correlação.")
+                    texto_analise = "Filtro resultou em dados insuficientes."
+                    return fig, texto_analise, estilo
+
+                # Calcula a matriz de correlação
+                matriz_corr = df_filtrado.select_dtypes(include=np.number).corr()
+
+                for col in ['Sales', 'Customers', 'Promo']:
+                    if col not in matriz_corr.columns:
+                        matriz_corr[col] = np.nan
+
+                df_corr_3d = matriz_corr.reset_index().rename(columns={'index': 'Variavel'})
+                df_corr_3d['Abs_Corr_Sales'] = abs(df_corr_3d['Sales'])
+
+                # Cria o gráfico de dispersão 3D das correlações
+                fig = px.scatter_3d(
+                    df_corr_3d,
+                    x='Sales', y='Customers', z='Promo',
+                    text='Variavel', hover_name='Variavel',
+                    color='Abs_Corr_Sales', color_continuous_scale='Reds',
+                    title=None
+                )
+                fig.update_traces(textposition='top center', marker=dict(size=5))
+                fig.update_layout(
+                    scene=dict(
+                        xaxis_title='Corr. Vendas',
+                        yaxis_title='Corr. Clientes',
+                        zaxis_title='Corr. Promoções'
+                    ),
+                    margin=dict(l=0, r=0, b=0, t=0)
+                )
+
+                num_lojas = df_filtrado['Store'].nunique()
+                texto_analise = f"Para as {num_lojas} loja(s) selecionada(s), este gráfico mapeia como as variáveis se correlacionam com os três principais impulsionadores do negócio: Vendas, Clientes e Promoções. A posição de cada ponto no espaço revela a natureza dessas inter-relações."
 
-        try:
-            if df_filtrado.select_dtypes(include=np.number).shape[1] < 3:
-                fig = criar_figura_vazia("Dados insuficientes para gerar matriz de correlação.")
-                texto_analise = "Filtro resultou em dados insuficientes."
                 return fig, texto_analise, estilo
 
-            # Calcula a matriz de correlação
-            matriz_corr = df_filtrado.select_dtypes(include=np.number).corr()
-
-            for col in ['Sales', 'Customers', 'Promo']:
-                if col not in matriz_corr.columns:
-                    matriz_corr[col] = np.nan
-
-            df_corr_3d = matriz_corr.reset_index().rename(columns={'index': 'Variavel'})
-            df_corr_3d['Abs_Corr_Sales'] = abs(df_corr_3d['Sales'])
-
-            # Cria o gráfico de dispersão 3D das correlações
-            fig = px.scatter_3d(
-                df_corr_3d,
-                x='Sales', y='Customers', z='Promo',
-                text='Variavel', hover_name='Variavel',
-                color='Abs_Corr_Sales', color_continuous_scale='Reds',
-                title=None
-            )
-            fig.update_traces(textposition='top center', marker=dict(size=5))
-            fig.update_layout(
-                scene=dict(
-                    xaxis_title='Corr. Vendas',
-                    yaxis_title='Corr. Clientes',
-                    zaxis_title='Corr. Promoções'
-                ),
-                margin=dict(l=0, r=0, b=0, t=0)
-            )
-
-            num_lojas = df_filtrado['Store'].nunique()
-            texto_analise = f"Para as {num_lojas} loja(s) selecionada(s), este gráfico mapeia como as variáveis se correlacionam com os três principais impulsionadores do negócio: Vendas, Clientes e Promoções. A posição de cada ponto no espaço revela a natureza dessas inter-relações."
+            except Exception as e:
+                fig = criar_figura_vazia(f"Erro ao gerar gráfico: {str(e)}")
+                return fig, "Ocorreu um erro ao gerar o gráfico.", estilo
 
-            return fig, texto_analise, estilo
-
-        except Exception as e:
-            fig = criar_figura_vazia(f"Erro ao gerar gráfico: {str(e)}")
-            return fig, "Ocorreu um erro ao gerar o gráfico.", estilo
\ No newline at end of file
+        return saida_3d_em_cache('grafico-correlacao-3d', dados_armazenados, tipos_loja, lojas_especificas, construir)
@@ -1,29 +1,31 @@
 # dashboard/callbacks/callbacks_analise_lojas.py
 import dash
-from dash import Input, Output, State, html, dcc
+from dash import ALL, Input, Output, State, html, dcc, ctx
+from dash.dash_table.Format import Format, Group, Scheme, Symbol
 import dash_bootstrap_components as dbc
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
 import statsmodels.api as sm
-import json
-from io import StringIO
-from sklearn.preprocessing import StandardScaler
-from sklearn.metrics.pairwise import cosine_similarity
 import numpy as np
 
-from ..utils import criar_figura_vazia, filtrar_dataframe # Importar as funções utilitárias refatoradas
+from ..utils import criar_figura_vazia, filtrar_dataframe, normalizar_filtros, reduzir_series # Importar as funções utilitárias refatoradas
 from ..config import VERMELHO_ROSSMANN, AZUL_ESCURO, CINZA_NEUTRO, MAPEAMENTO_DIAS_SEMANA, ORDEM_DIAS_SEMANA # Importar as novas constantes
-from ..config import AZUL_DESTAQUE, PALETA_CORES_GRAFICO # Importar as novas constantes
-
-# Função auxiliar para deserializar o DataFrame do JSON
-def deserializar_df(df_principal_json):
-    """Lê o JSON do dcc.Store, converte para DataFrame e ajusta o tipo da coluna de data."""
-    if not df_principal_json:
-        return None
-    df = pd.read_json(StringIO(df_principal_json), orient='split')
-    df['Date'] = pd.to_datetime(df['Date'])
-    return df
+from ..config import AZUL_DESTAQUE, PALETA_CORES_GRAFICO, VERDE_DESTAQUE # Importar as novas constantes
+from ..config import LOJAS_SEMELHANTES_EXIBIDAS
+from ..repositorio_dados import obter_dados, obter_df_principal, obter_dimensao_lojas
+from ..cache import saida_em_cache
+from ..ranking import obter_ranking, referencia_ranking
+from ..somas_acumuladas import agregar_por_loja
+from ..lojas_semelhantes import lojas_semelhantes
+
+# KPIs dos cartões de loja e da comparação entre lojas: {nome: (coluna, função)}
+AGREGACOES_KPI_LOJA = {
+    'media_vendas': ('Sales', 'mean'),
+    'media_clientes': ('Customers', 'mean'),
+    'media_ticket': ('SalesPerCustomer', 'mean'),
+    'total_vendas': ('Sales', 'sum'),
+}
 
 def registrar_callbacks_analise_lojas(aplicativo):
     """Registra os callbacks para a página de análise de lojas."""
@@ -35,143 +37,174 @@ def registrar_callbacks_analise_lojas(aplicativo):
          Input('filtro-data', 'start_date'),
          Input('filtro-data', 'end_date'),
          Input('filtro-tipo-loja', 'value'),
-         Input('filtro-loja-especifica', 'value'),
          Input('filtro-feriado-estadual', 'value'),
          Input('filtro-feriado-escolar', 'value'),
-         Input('seletor-metrica-ranking', 'value'),
-         Input('seletor-ordem-ranking', 'value')]  # Novo input para centralizar a lógica
+         Input('seletor-metrica-ranking', 'value')]
     )
-    def atualizar_dados_ranking(caminho_pagina, df_principal_json, data_inicio, data_fim, tipos_loja, lojas_especificas,
-                            feriado_estadual, feriado_escolar, metrica, ordem):  # Novo parâmetro 'ordem'
+    def atualizar_dados_ranking(caminho_pagina, versao_dados, data_inicio, data_fim, tipos_loja,
+                            feriado_estadual, feriado_escolar, metrica):
         if caminho_pagina != '/analise-lojas':
             return dash.no_update
 
-        # Usar a função auxiliar para deserializar o DataFrame
-        df_principal = deserializar_df(df_principal_json)
-        if df_principal is None:
+        # Resolve a chave de versão do dcc.Store para os dados em memória
+        dados = obter_dados(versao_dados)
+        if dados is None:
             return dash.no_update
-        
-        # Ranking é calculado para todas as lojas que obedecem aos filtros globais
-        # Passamos None para o filtro de lojas específicas para que o ranking seja calculado
-        # com base em TODOS os dados que passam pelos filtros globais, ignorando a seleção específica de lojas
-        df_filtrado = filtrar_dataframe(df_principal, data_inicio, data_fim, tipos_loja, None, feriado_estadual, feriado_escolar)
 
-        if df_filtrado.empty:
-            return pd.DataFrame().to_json(date_format='iso', orient='split')
-
-        mapeamento_metrica = {
-            'Sales_sum': ('Sales', 'sum'), 'Sales_mean': ('Sales', 'mean'),
-            'Customers_sum': ('Customers', 'sum'), 'Customers_mean': ('Customers', 'mean'),
-            'SalesPerCustomer_mean': ('SalesPerCustomer', 'mean')
+        # Ranking é calculado para todas as lojas que obedecem aos filtros globais
+        # (a seleção de lojas específicas só restringe o que a tabela exibe). A ordem não faz parte
+        # da agregação: inverter a ordem ou paginar reaproveita o mesmo vetor por loja, em cache.
+        referencia = referencia_ranking(dados["versao"], metrica, data_inicio, data_fim, tipos_loja,
+                                        feriado_estadual, feriado_escolar)
+        obter_ranking(referencia)
+        return referencia
+
+    def colunas_tabela_ranking(metrica):
+        """Colunas da tabela de ranking; a métrica é formatada no navegador (moeda ou contagem)."""
+        nomes_cabecalho = {
+            'Sales_sum': 'Vendas Totais', 'Sales_mean': 'Vendas Médias',
+            'Customers_sum': 'Clientes Totais', 'Customers_mean': 'Clientes Médios',
+            'SalesPerCustomer_mean': 'Ticket Médio'
         }
-        coluna_metrica, funcao_agg = mapeamento_metrica[metrica]
-
-        df_ranking_loja = df_filtrado.groupby('Store').agg({
-            coluna_metrica: funcao_agg,
-            'StoreType': 'first',
-            'Assortment': 'first'
-        }).rename(columns={coluna_metrica: 'Métrica'}).reset_index()
-        
-        # --- NOVA LÓGICA CENTRALIZADA ---
-        # Ordenação e atribuição do ranking já acontecem aqui
-        if not df_ranking_loja.empty:
-            eh_ascendente = ordem == 'asc'
-            df_ranking_loja = df_ranking_loja.sort_values(by='Métrica', ascending=eh_ascendente)
-            df_ranking_loja['Ranking'] = range(1, len(df_ranking_loja) + 1)
-            
-            # Salvar uma cópia do valor numérico para cálculo de barra de progresso
-            df_ranking_loja['MetricValue'] = df_ranking_loja['Métrica'].copy()
-        # ---------------------------------
-
-        return df_ranking_loja.to_json(date_format='iso', orient='split')
+        if "Sales" in metrica or "SalesPerCustomer" in metrica:
+            formato = Format(precision=2, scheme=Scheme.fixed, group=Group.yes, symbol=Symbol.yes, symbol_prefix='€ ')
+        else:
+            formato = Format(precision=0, scheme=Scheme.fixed, group=Group.yes)
+        return [
+            {'name': '#', 'id': 'Posicao'},
+            {'name': 'Loja', 'id': 'Store'},
+            {'name': 'Tipo', 'id': 'StoreType'},
+            {'name': 'Sortimento', 'id': 'Assortment'},
+            {'name': nomes_cabecalho.get(metrica, 'Métrica'), 'id': 'Métrica', 'type': 'numeric', 'format': formato},
+        ]
 
     @aplicativo.callback(
-        Output('tabela-ranking-lojas', 'children'),
+        [Output('tabela-ranking-lojas', 'data'),
+         Output('tabela-ranking-lojas', 'columns'),
+         Output('tabela-ranking-lojas', 'page_count'),
+         Output('tabela-ranking-lojas', 'page_current'),
+         Output('tabela-ranking-lojas', 'page_size'),
+         Output('tabela-ranking-lojas', 'style_data_conditional'),
+         Output('aviso-ranking-lojas', 'children')],
         [Input('armazenamento-dados-ranking', 'data'),
          Input('slider-contagem-ranking', 'value'),
+         Input('tabela-ranking-lojas', 'page_current'),
+         Input('tabela-ranking-lojas', 'sort_by'),
          Input('armazenamento-id-loja-selecionada', 'data'),
          Input('seletor-metrica-ranking', 'value'),
-         Input('filtro-loja-especifica', 'value')],
-        [State('seletor-ordem-ranking', 'value')]  # Adicionado State para acessar a ordem sem recalcular o callback
+         Input('filtro-loja-especifica', 'value'),
+         Input('seletor-ordem-ranking', 'value')]
     )
-    def atualizar_tabela_ranking_lojas(dados_json, contagem, ids_lojas_selecionadas, metrica, lojas_especificas, ordem):
-        if not dados_json:
-            return dash.no_update
-
-        # O DataFrame já vem ordenado e com as colunas 'Ranking' e 'MetricValue'
-        ranking_lojas = pd.read_json(StringIO(dados_json), orient='split')
-        if ranking_lojas.empty:
-            return dbc.Alert("Nenhuma loja encontrada para os filtros selecionados.", color="warning")
-
-        nomes_cabecalho = {
-            'Sales_sum': 'Vendas Totais', 'Sales_mean': 'Vendas Médias',
-            'Customers_sum': 'Clientes Totais', 'Customers_mean': 'Clientes Médios',
-            'SalesPerCustomer_mean': 'Ticket Médio'
-        }
-
-        # Decide qual subconjunto de lojas exibir
-        df_a_exibir = ranking_lojas
-        if lojas_especificas:
-            # Filtra pelas lojas selecionadas, mas mantém a coluna 'Ranking' original
-            df_a_exibir = ranking_lojas[ranking_lojas['Store'].isin(lojas_especificas)]
-        else:
-            # Mostra o Top N
-            df_a_exibir = ranking_lojas.head(contagem)
-
-        # Formatação da métrica para exibição
-        if "Sales" in metrica or "SalesPerCustomer" in metrica:
-            df_a_exibir['Métrica'] = df_a_exibir['Métrica'].apply(lambda x: f"€ {x:,.2f}")
+    def atualizar_tabela_ranking_lojas(dados_ranking, lojas_por_pagina, pagina_atual, ordenacao, ids_lojas_selecionadas, metrica, lojas_especificas, ordem):
+        """
+        Envia só a página atual do ranking. Ordem, ordenação (cabeçalhos) e paginação são feitas
+        aqui, sobre o vetor da métrica por loja já agregado, e a seleção de lojas é destacada por
+        regras de estilo da página.
+        """
+        ranking = obter_ranking(dados_ranking)
+        if ranking is None:
+            return (dash.no_update,) * 7
+
+        colunas = colunas_tabela_ranking(metrica)
+        if len(ranking) == 0:
+            aviso = dbc.Alert("Nenhuma loja encontrada para os filtros selecionados.", color="warning")
+            return [], colunas, 0, 0, lojas_por_pagina, [], aviso
+
+        # Máximo para normalizar a barra de progresso (de todas as lojas do ranking)
+        valor_max_metrica = np.fmax.reduce(ranking.valores)
+
+        # Mudança de filtros, métrica, ordem, ordenação ou tamanho da página volta para a primeira página
+        mudou_pagina = 'tabela-ranking-lojas.page_current' in ctx.triggered_prop_ids
+        pagina = (pagina_atual or 0) if mudou_pagina else 0
+
+        if not lojas_especificas and not ordenacao:
+            # Caso comum: a página é um trecho do topo do ranking, obtido por seleção parcial
+            total_lojas = len(ranking)
+            total_paginas = max(-(-total_lojas // lojas_por_pagina), 1)
+            pagina = min(pagina, total_paginas - 1)
+            inicio = pagina * lojas_por_pagina
+            indices_pagina = ranking.primeiros(inicio + lojas_por_pagina, ordem)[inicio:]
+            posicoes_pagina = np.arange(inicio + 1, inicio + len(indices_pagina) + 1)
         else:
-            df_a_exibir['Métrica'] = df_a_exibir['Métrica'].apply(lambda x: f"{x:,.0f}")
+            # Lojas buscadas no filtro: só elas, mantendo a posição original no ranking
+            posicoes = ranking.posicoes(ordem)
+            if lojas_especificas:
+                indices = ranking.indices_das_lojas(lojas_especificas)
+                indices = indices[np.argsort(posicoes[indices], kind='stable')]
+            else:
+                indices = ranking.ordem(ordem)
+
+            # Ordenação pelo cabeçalho clicado ('#' ordena pela posição no ranking)
+            if ordenacao:
+                valores_coluna = {
+                    'Posicao': posicoes, 'Store': ranking.lojas, 'StoreType': ranking.tipos_loja,
+                    'Assortment': ranking.sortimentos, 'Métrica': ranking.valores
+                }[ordenacao[0]['column_id']]
+                ordenados = pd.Series(valores_coluna[indices]).sort_values(ascending=ordenacao[0]['direction'] == 'asc', kind='stable')
+                indices = indices[ordenados.index.to_numpy()]
+
+            total_paginas = max(-(-len(indices) // lojas_por_pagina), 1)
+            pagina = min(pagina, total_paginas - 1)
+            indices_pagina = indices[pagina * lojas_por_pagina:(pagina + 1) * lojas_por_pagina]
+            posicoes_pagina = posicoes[indices_pagina]
+
+        df_pagina = pd.DataFrame({
+            'Store': ranking.lojas[indices_pagina],
+            'Ranking': posicoes_pagina,
+            'StoreType': ranking.tipos_loja[indices_pagina],
+            'Assortment': ranking.sortimentos[indices_pagina],
+            'MetricValue': ranking.valores[indices_pagina],
+        })
 
-        # Máximo para normalizar a barra de progresso (do DataFrame completo)
-        valor_max_metrica = ranking_lojas['MetricValue'].max() if not ranking_lojas.empty else 0
         medalhas = {1: "🥇", 2: "🥈", 3: "🥉"}
-
-        cabecalho_tabela = [html.Thead(html.Tr([
-            html.Th("#"), html.Th("Loja"), html.Th("Tipo"), html.Th("Sortimento"), html.Th(nomes_cabecalho.get(metrica, "Métrica"))
-        ], className="table-dark"))]
-
-        corpo_tabela = [html.Tbody([
-            html.Tr([
-                # Coluna posição com medalhas
-                html.Td(f"{medalhas.get(rank['Ranking'], '')} {rank['Ranking']}"),
-                html.Td(rank['Store']),
-                html.Td(rank['StoreType'].upper()), html.Td(rank['Assortment'].upper()),
-                # Coluna métrica + barra de progresso
-                html.Td([
-                    html.Span(rank['Métrica'], className="d-block"),
-                    dbc.Progress(value= (rank['MetricValue']/valor_max_metrica*100) if valor_max_metrica else 0,
-                                 color='success' if ordem == 'desc' else 'danger',  # Corrigido para usar o parâmetro ordem
-                                 style={'height':'6px'})
-                ])
-            ], id={'type': 'linha-ranking', 'index': rank['Store']}, n_clicks=0,
-               className="ranking-row ranking-row-selected" if rank['Store'] in ids_lojas_selecionadas else "ranking-row")
-            for _, rank in df_a_exibir.iterrows()
-        ])]
-
-        return dbc.Table(cabecalho_tabela + corpo_tabela, bordered=True, striped=True, hover=True, responsive=True, className="mt-3")
+        dados_pagina = pd.DataFrame({
+            'id': df_pagina['Store'],
+            'Posicao': df_pagina['Ranking'].map(medalhas).fillna('') + ' ' + df_pagina['Ranking'].astype(str),
+            'Store': df_pagina['Store'],
+            'StoreType': df_pagina['StoreType'].str.upper(),
+            'Assortment': df_pagina['Assortment'].str.upper(),
+            'Métrica': df_pagina['MetricValue'],
+        }).to_dict('records')
+
+        # Barra de progresso de cada linha (embaixo do valor) e destaque das lojas selecionadas
+        cor_barra = VERDE_DESTAQUE if ordem == 'desc' else VERMELHO_ROSSMANN
+        percentuais = (df_pagina['MetricValue'] / valor_max_metrica * 100).fillna(0) if valor_max_metrica else pd.Series(0, index=df_pagina.index)
+        estilos = [
+            {'if': {'filter_query': f'{{Store}} = {loja}', 'column_id': 'Métrica'},
+             'background': f'linear-gradient(90deg, {cor_barra} {percentual:.1f}%, #e9ecef {percentual:.1f}%) bottom / 100% 6px no-repeat'}
+            for loja, percentual in zip(df_pagina['Store'], percentuais)
+        ]
+        for loja in ids_lojas_selecionadas or []:
+            estilos.append({'if': {'filter_query': f'{{Store}} = {loja}'},
+                            'backgroundColor': '#fff5f5', 'color': VERMELHO_ROSSMANN, 'fontWeight': 600})
+            estilos.append({'if': {'filter_query': f'{{Store}} = {loja}', 'column_id': 'Posicao'},
+                            'borderLeft': f'6px solid {VERMELHO_ROSSMANN}'})
+        return dados_pagina, colunas, total_paginas, pagina, lojas_por_pagina, estilos, None
 
     # ==============================================================================
     # HELPER FUNCTIONS PARA A PÁGINA DE ANÁLISE DE LOJAS
     # ==============================================================================
 
-    def gerar_visualizacao_loja_unica(id_loja, dados_json, ordem_ranking, data_inicio, data_fim, feriado_estadual, feriado_escolar, metrica_ranking, df_principal_json):
+    def obter_kpis_lojas(ids_lojas, versao_dados, data_inicio, data_fim, feriado_estadual, feriado_escolar, df_filtrado=None):
+        """
+        KPIs (AGREGACOES_KPI_LOJA) de cada loja no período, indexados pela loja; lojas sem vendas
+        ficam de fora. Vêm das somas acumuladas por loja; com filtro de feriado, das linhas
+        (`df_filtrado`, se o chamador já as tiver).
+        """
+        kpis = agregar_por_loja(obter_dados(versao_dados), AGREGACOES_KPI_LOJA, data_inicio, data_fim, None, ids_lojas,
+                                feriado_estadual, feriado_escolar, df_filtrado=df_filtrado)
+        return kpis.set_index('Store')
+
+    def gerar_visualizacao_loja_unica(id_loja, dados_ranking, ordem_ranking, data_inicio, data_fim, feriado_estadual, feriado_escolar, metrica_ranking, versao_dados):
         """Gera o layout completo de detalhes para uma única loja."""
         
-        # Verificar se temos os dados do DataFrame principal
-        if not df_principal_json:
-            return dbc.Alert("Erro interno: DataFrame principal não encontrado.", color="danger")
-            
-        # Usar a função auxiliar para deserializar o DataFrame
-        df_principal = deserializar_df(df_principal_json)
+        # Resolve a chave de versão do dcc.Store para o DataFrame em memória
+        df_principal = obter_df_principal(versao_dados)
         if df_principal is None:
-            return dbc.Alert("Erro interno: Falha ao processar os dados.", color="danger")
-
-        # Para obter o StoreType para o filtro, precisamos do df original ou do df principal filtrado por data
-        tipo_loja_para_filtro = df_principal[df_principal['Store'] == id_loja]['StoreType'].iloc[0]
+            return dbc.Alert("Erro interno: DataFrame principal não encontrado.", color="danger")
 
-        df_filtrado_loja = filtrar_dataframe(df_principal, data_inicio, data_fim, [tipo_loja_para_filtro], [id_loja], feriado_estadual, feriado_escolar)
+        # A loja já determina o tipo de loja: basta filtrar pela loja
+        df_filtrado_loja = filtrar_dataframe(df_principal, data_inicio, data_fim, None, [id_loja], feriado_estadual, feriado_escolar)
         if df_filtrado_loja.empty:
             return dbc.Alert(f"Não foram encontrados dados para a loja {id_loja} com os filtros atuais.", color="warning")
 
@@ -179,9 +212,10 @@ def registrar_callbacks_analise_lojas(aplicativo):
         df_filtrado_loja = df_filtrado_loja.sort_values(by='Date')
 
         # Geração de cards e gráficos
-        media_vendas = df_filtrado_loja['Sales'].mean()
-        media_clientes = df_filtrado_loja['Customers'].mean()
-        media_ticket = df_filtrado_loja['SalesPerCustomer'].mean() if df_filtrado_loja['SalesPerCustomer'].count() > 0 else 0
+        kpis_loja = obter_kpis_lojas([id_loja], versao_dados, data_inicio, data_fim, feriado_estadual, feriado_escolar, df_filtrado_loja).loc[id_loja]
+        media_vendas = kpis_loja['media_vendas']
+        media_clientes = kpis_loja['media_clientes']
+        media_ticket = kpis_loja['media_ticket'] if pd.notna(kpis_loja['media_ticket']) else 0
         
         # Layout base para os gráficos
         layout_base = {
@@ -202,16 +236,14 @@ def registrar_callbacks_analise_lojas(aplicativo):
         ], className="p-3"), className="mb-3")
 
         # Código para gerar o card de detalhes estáticos...
-        info_loja = df_principal[df_principal['Store'] == id_loja].iloc[0]
+        # Atributos da loja: uma linha da dimensão de lojas
+        info_loja = obter_dimensao_lojas(versao_dados).loc[id_loja]
         str_ranking = "N/A"
-        if dados_json:
-            df_ranking = pd.read_json(StringIO(dados_json), orient='split')
-            if not df_ranking.empty:
-                info_ranking_loja = df_ranking[df_ranking['Store'] == id_loja]
-                if not info_ranking_loja.empty:
-                    rank = info_ranking_loja['Ranking'].iloc[0]
-                    total = len(df_ranking)
-                    str_ranking = f"{rank}º de {total}"
+        ranking = obter_ranking(dados_ranking)
+        if ranking is not None:
+            rank = ranking.posicao(id_loja, ordem_ranking)
+            if rank is not None:
+                str_ranking = f"{rank}º de {len(ranking)}"
                     
         str_distancia = f"{info_loja['CompetitionDistance']:,.0f} m" if pd.notna(info_loja['CompetitionDistance']) else "N/A"
         status_promo2 = "Sim" if info_loja['Promo2'] == 1 else "Não"
@@ -241,6 +273,29 @@ def registrar_callbacks_analise_lojas(aplicativo):
             ], className="justify-content-center")
         ], className="p-1"), className="mb-1")
 
+        # Lojas de perfil de vendas mais parecido (tabela de vizinhos da versão dos dados); um clique compara com esta
+        df_semelhantes = lojas_semelhantes(obter_dados(versao_dados), id_loja, LOJAS_SEMELHANTES_EXIBIDAS)
+        itens_semelhantes = [
+            dbc.ListGroupItem(
+                html.Div([
+                    html.Span([html.I(className="fas fa-store me-2"), f"Loja {int(linha.Store)}"], className="fw-bold"),
+                    html.Span(f"Tipo {linha.StoreType.upper()} · {mapeamento_sortimento.get(linha.Assortment, linha.Assortment)}",
+                              className="text-muted small"),
+                    dbc.Badge(f"{linha.Similaridade:.0%}", color="light", text_color="dark", pill=True)
+                ], className="d-flex justify-content-between align-items-center"),
+                id={'type': 'botao-loja-semelhante', 'index': int(linha.Store)}, action=True, n_clicks=0
+            )
+            for linha in df_semelhantes.itertuples(index=False)
+        ]
+        card_lojas_semelhantes = dbc.Card(dbc.CardBody([
+            html.H5("Lojas Semelhantes", className="card-title text-center"),
+            html.P("Perfil de vendas de todo o histórico (dia da semana, sazonalidade, promoção, ticket, "
+                   "concorrência, tipo e sortimento). Clique em uma loja para compará-la com esta.",
+                   className="text-muted small text-center"),
+            dbc.ListGroup(itens_semelhantes, flush=True) if itens_semelhantes
+            else html.P("Nenhuma loja semelhante encontrada.", className="text-muted text-center")
+        ], className="p-3"), className="mt-3")
+
         mapeamento_metrica = {'Sales_sum': 'Sales', 'Sales_mean': 'Sales', 'Customers_sum': 'Customers', 'Customers_mean': 'Customers', 'SalesPerCustomer_mean': 'SalesPerCustomer'}
         mapeamento_rotulo = {'Sales': 'Vendas', 'Customers': 'Clientes', 'SalesPerCustomer': 'Ticket Médio'}
         mapeamento_titulo_eixo_y = {'Sales': 'Vendas Diárias (€)', 'Customers': 'Nº de Clientes Diário', 'SalesPerCustomer': 'Ticket Médio Diário (€)'}
@@ -248,40 +303,46 @@ def registrar_callbacks_analise_lojas(aplicativo):
         rotulo_metrica = mapeamento_rotulo.get(coluna_metrica, 'Vendas')
         titulo_eixo_y = mapeamento_titulo_eixo_y.get(coluna_metrica, 'Vendas Diárias (€)')
 
-        # Gráficos com layout base
-        fig_ts = px.line(df_filtrado_loja, x='Date', y=coluna_metrica, title=f'Série Temporal de {rotulo_metrica} - Loja {id_loja}')
-        fig_ts.update_traces(line=dict(color=VERMELHO_ROSSMANN))
-        fig_ts.update_layout(**layout_base, yaxis_title=titulo_eixo_y)
+        def construir_graficos():
+            # Gráficos com layout base (a série diária é reduzida por LTTB se tiver mais pontos que pixels)
+            fig_ts = px.line(reduzir_series(df_filtrado_loja, 'Date', coluna_metrica), x='Date', y=coluna_metrica, title=f'Série Temporal de {rotulo_metrica} - Loja {id_loja}')
+            fig_ts.update_traces(line=dict(color=VERMELHO_ROSSMANN))
+            fig_ts.update_layout(**layout_base, yaxis_title=titulo_eixo_y)
         
-        fig_promo = px.box(df_filtrado_loja, x='Promo', y=coluna_metrica, color='Promo', 
-                          title=f'Impacto da Promoção em {rotulo_metrica}', 
-                          labels={coluna_metrica: titulo_eixo_y, 'Promo': 'Promoção'}, 
-                          color_discrete_map={0: CINZA_NEUTRO, 1: VERMELHO_ROSSMANN})
-        fig_promo.update_layout(**layout_base, showlegend=False)
-        fig_promo.update_xaxes(tickvals=[0, 1], ticktext=['Sem Promoção', 'Com Promoção'])
+            fig_promo = px.box(df_filtrado_loja, x='Promo', y=coluna_metrica, color='Promo', 
+                              title=f'Impacto da Promoção em {rotulo_metrica}', 
+                              labels={coluna_metrica: titulo_eixo_y, 'Promo': 'Promoção'}, 
+                              color_discrete_map={0: CINZA_NEUTRO, 1: VERMELHO_ROSSMANN})
+            fig_promo.update_layout(**layout_base, showlegend=False)
+            fig_promo.update_xaxes(tickvals=[0, 1], ticktext=['Sem Promoção', 'Com Promoção'])
         
-        df_dia_semana = df_filtrado_loja.groupby('DayOfWeek')[coluna_metrica].mean().reset_index()
-        df_dia_semana['DayName'] = df_dia_semana['DayOfWeek'].map(MAPEAMENTO_DIAS_SEMANA)
-        fig_dia_semana = px.bar(df_dia_semana, x='DayName', y=coluna_metrica, 
-                               title=f'Média de {rotulo_metrica} por Dia da Semana', 
-                               labels={coluna_metrica: f"Média de {rotulo_metrica}", 'DayName': 'Dia da Semana'}, 
-                               color_discrete_sequence=[VERMELHO_ROSSMANN])
-        fig_dia_semana.update_layout(**layout_base, xaxis={'categoryorder':'array', 'categoryarray': ORDEM_DIAS_SEMANA})
+            df_dia_semana = df_filtrado_loja.groupby('DayOfWeek')[coluna_metrica].mean().reset_index()
+            df_dia_semana['DayName'] = df_dia_semana['DayOfWeek'].map(MAPEAMENTO_DIAS_SEMANA)
+            fig_dia_semana = px.bar(df_dia_semana, x='DayName', y=coluna_metrica, 
+                                   title=f'Média de {rotulo_metrica} por Dia da Semana', 
+                                   labels={coluna_metrica: f"Média de {rotulo_metrica}", 'DayName': 'Dia da Semana'}, 
+                                   color_discrete_sequence=[VERMELHO_ROSSMANN])
+            fig_dia_semana.update_layout(**layout_base, xaxis={'categoryorder':'array', 'categoryarray': ORDEM_DIAS_SEMANA})
         
-        fig_dist = px.histogram(df_filtrado_loja, x=coluna_metrica, nbins=50, 
-                               title=f'Distribuição de {rotulo_metrica}', 
-                               labels={coluna_metrica: rotulo_metrica}, 
-                               color_discrete_sequence=[AZUL_DESTAQUE])
-        fig_dist.update_layout(**layout_base)
-
-        # Gráfico DNA da Loja
-        fig_dna = px.scatter(
-            df_filtrado_loja, x="Customers", y="Sales",
-            title=f"DNA da Loja: Vendas vs. Clientes - Loja {id_loja}",
-            labels={'Customers': 'Número de Clientes (por dia)', 'Sales': 'Vendas (por dia)'},
-            trendline="ols", trendline_color_override=AZUL_ESCURO
-        )
-        fig_dna.update_layout(**layout_base)
+            fig_dist = px.histogram(df_filtrado_loja, x=coluna_metrica, nbins=50, 
+                                   title=f'Distribuição de {rotulo_metrica}', 
+                                   labels={coluna_metrica: rotulo_metrica}, 
+                                   color_discrete_sequence=[AZUL_DESTAQUE])
+            fig_dist.update_layout(**layout_base)
+
+            # Gráfico DNA da Loja (um ponto por dia aberto: no máximo ~950 pontos por loja)
+            fig_dna = px.scatter(
+                df_filtrado_loja, x="Customers", y="Sales",
+                title=f"DNA da Loja: Vendas vs. Clientes - Loja {id_loja}",
+                labels={'Customers': 'Número de Clientes (por dia)', 'Sales': 'Vendas (por dia)'},
+                trendline="ols", trendline_color_override=AZUL_ESCURO
+            )
+            fig_dna.update_layout(**layout_base)
+            return fig_ts, fig_promo, fig_dia_semana, fig_dist, fig_dna
+
+        # As figuras (a mais cara é a regressão do DNA) vêm do cache quando a mesma loja e filtros já foram exibidos
+        entradas = (id_loja, normalizar_filtros(data_inicio, data_fim, None, None, feriado_estadual, feriado_escolar), coluna_metrica)
+        fig_ts, fig_promo, fig_dia_semana, fig_dist, fig_dna = saida_em_cache('detalhe-loja', obter_dados(versao_dados)["versao"], entradas, construir_graficos)
 
         # Organiza gráficos em abas
         componente_abas = dbc.Tabs([
@@ -295,13 +356,14 @@ def registrar_callbacks_analise_lojas(aplicativo):
         return html.Div([
             card_kpi,
             card_detalhes_estaticos,
+            card_lojas_semelhantes,
             componente_abas
         ])
 
-    def criar_coluna_comparacao(id_loja, df_filtrado_loja, str_ranking): # Refatorar nome da função e parâmetros
-        media_vendas = df_filtrado_loja['Sales'].mean() # Refatorar nome da variable
-        media_clientes = df_filtrado_loja['Customers'].mean() # Refatorar nome da variable
-        media_ticket = df_filtrado_loja['SalesPerCustomer'].mean() if df_filtrado_loja['SalesPerCustomer'].count() > 0 else 0 # Refatorar nome da variable
+    def criar_coluna_comparacao(id_loja, kpis_loja, str_ranking): # Refatorar nome da função e parâmetros
+        media_vendas = kpis_loja['media_vendas'] # Refatorar nome da variable
+        media_clientes = kpis_loja['media_clientes'] # Refatorar nome da variable
+        media_ticket = kpis_loja['media_ticket'] if pd.notna(kpis_loja['media_ticket']) else 0 # Refatorar nome da variable
 
         def criar_kpi(titulo, valor, eh_moeda=True): # Refatorar nome da função e parâmetro
             valor_formatado = f"€ {valor:,.2f}" if eh_moeda else f"{valor:,.0f}" # Refatorar nome da variable
@@ -379,21 +441,21 @@ def registrar_callbacks_analise_lojas(aplicativo):
             style={'backgroundColor': '#ffffff'}
         )
 
-    def gerar_comparacao_detalhada(id_loja1, id_loja2, df_filtrado1, df_filtrado2): # Refatorar nome da função e parâmetros
-        """Gera o conteúdo detalhado da comparação entre lojas."""
-        if df_filtrado1.empty or df_filtrado2.empty:
+    def gerar_comparacao_detalhada(id_loja1, id_loja2, kpis): # Refatorar nome da função e parâmetros
+        """Gera o conteúdo detalhado da comparação entre lojas (`kpis`: ver `obter_kpis_lojas`)."""
+        if id_loja1 not in kpis.index or id_loja2 not in kpis.index:
             return html.Div("Dados insuficientes para comparação.")
 
         # Calcular métricas para comparação
         metricas = { # Refatorar nome da variable
-            'Vendas Médias/Dia': ('Sales', 'mean', '€ {:,.2f}'),
-            'Clientes Médios/Dia': ('Customers', 'mean', '{:,.0f}'),
-            'Ticket Médio': ('SalesPerCustomer', 'mean', '€ {:,.2f}'),
-            'Vendas Totais': ('Sales', 'sum', '€ {:,.2f}')
+            'Vendas Médias/Dia': ('media_vendas', '€ {:,.2f}'),
+            'Clientes Médios/Dia': ('media_clientes', '{:,.0f}'),
+            'Ticket Médio': ('media_ticket', '€ {:,.2f}'),
+            'Vendas Totais': ('total_vendas', '€ {:,.2f}')
         }
 
-        metricas_loja1 = {nome: df_filtrado1[col].agg(func) for nome, (col, func, _) in metricas.items()} # Refatorar nome da variable
-        metricas_loja2 = {nome: df_filtrado2[col].agg(func) for nome, (col, func, _) in metricas.items()} # Refatorar nome da variable
+        metricas_loja1 = {nome: kpis.at[id_loja1, kpi] for nome, (kpi, _) in metricas.items()} # Refatorar nome da variable
+        metricas_loja2 = {nome: kpis.at[id_loja2, kpi] for nome, (kpi, _) in metricas.items()} # Refatorar nome da variable
 
         # Calcular diferenças percentuais
         diferencas = {} # Refatorar nome da variable
@@ -523,7 +585,7 @@ def registrar_callbacks_analise_lojas(aplicativo):
         # Criar linhas de comparação para cada métrica
         linhas_comparacao = [ # Refatorar nome da variable
             criar_linha_metrica(nome, fmt)
-            for nome, (_, _, fmt) in metricas.items()
+            for nome, (_, fmt) in metricas.items()
         ]
 
         # Análise de Desempenho
@@ -622,28 +684,21 @@ def registrar_callbacks_analise_lojas(aplicativo):
             )
         ])
 
-    def gerar_visualizacao_comparacao(ids_lojas, dados_json, ordem_ranking, data_inicio, data_fim, feriado_estadual, feriado_escolar, metrica_ranking, df_principal_json):
+    def gerar_visualizacao_comparacao(ids_lojas, dados_ranking, ordem_ranking, data_inicio, data_fim, feriado_estadual, feriado_escolar, metrica_ranking, versao_dados):
         """Gera a visualização comparativa entre duas lojas."""
         if len(ids_lojas) != 2:
             return dash.no_update
 
-        # Verificar se temos os dados do DataFrame principal
-        if not df_principal_json:
-            return dbc.Alert("Erro interno: DataFrame principal não encontrado.", color="danger")
-            
-        # Usar a função auxiliar para deserializar o DataFrame
-        df_principal = deserializar_df(df_principal_json)
+        # Resolve a chave de versão do dcc.Store para o DataFrame em memória
+        df_principal = obter_df_principal(versao_dados)
         if df_principal is None:
-            return dbc.Alert("Erro interno: Falha ao processar os dados.", color="danger")
+            return dbc.Alert("Erro interno: DataFrame principal não encontrado.", color="danger")
 
         id_loja1, id_loja2 = ids_lojas
 
-        tipo_loja1 = df_principal[df_principal['Store'] == id_loja1]['StoreType'].iloc[0]
-        tipo_loja2 = df_principal[df_principal['Store'] == id_loja2]['StoreType'].iloc[0]
-
-        # Filtra dados para cada loja
-        df_filtrado1 = filtrar_dataframe(df_principal, data_inicio, data_fim, [tipo_loja1], [id_loja1], feriado_estadual, feriado_escolar)
-        df_filtrado2 = filtrar_dataframe(df_principal, data_inicio, data_fim, [tipo_loja2], [id_loja2], feriado_estadual, feriado_escolar)
+        # Filtra dados para cada loja (a loja já determina o tipo de loja)
+        df_filtrado1 = filtrar_dataframe(df_principal, data_inicio, data_fim, None, [id_loja1], feriado_estadual, feriado_escolar)
+        df_filtrado2 = filtrar_dataframe(df_principal, data_inicio, data_fim, None, [id_loja2], feriado_estadual, feriado_escolar)
 
         if df_filtrado1.empty or df_filtrado2.empty:
             return dbc.Alert("Não foram encontrados dados para uma ou ambas as lojas com os filtros atuais.", color="warning")
@@ -671,20 +726,13 @@ def registrar_callbacks_analise_lojas(aplicativo):
         # --- Gera Colunas de Detalhes e KPIs ---
         # Ranking de cada loja
         str_ranking1, str_ranking2 = "N/A", "N/A"
-        if dados_json:
-            try:
-                df_ranking = pd.read_json(StringIO(dados_json), orient='split')
-                if not df_ranking.empty:
-                    total = len(df_ranking)
-                    def obter_ranking(id_loja):
-                        linha = df_ranking[df_ranking['Store'] == id_loja]
-                        if not linha.empty:
-                            return f"{int(linha['Ranking'].iloc[0])}º de {total}"
-                        return "N/A"
-                    str_ranking1 = obter_ranking(id_loja1)
-                    str_ranking2 = obter_ranking(id_loja2)
-            except Exception:
-                pass
+        ranking = obter_ranking(dados_ranking)
+        if ranking is not None:
+            def texto_ranking(id_loja):
+                rank = ranking.posicao(id_loja, ordem_ranking)
+                return f"{rank}º de {len(ranking)}" if rank is not None else "N/A"
+            str_ranking1 = texto_ranking(id_loja1)
+            str_ranking2 = texto_ranking(id_loja2)
 
         # Botão de comparação removido/oculto conforme solicitado
         botao_comparacao = dbc.Button(
@@ -695,7 +743,8 @@ def registrar_callbacks_analise_lojas(aplicativo):
         )
 
         # Modal para mostrar a comparação detalhada
-        conteudo_comparacao = gerar_comparacao_detalhada(id_loja1, id_loja2, df_filtrado1, df_filtrado2)
+        kpis = obter_kpis_lojas(ids_lojas, versao_dados, data_inicio, data_fim, feriado_estadual, feriado_escolar)
+        conteudo_comparacao = gerar_comparacao_detalhada(id_loja1, id_loja2, kpis)
 
         # KPI row com o botão de comparação ao lado do título
         linha_kpi = html.Div([
@@ -721,8 +770,8 @@ def registrar_callbacks_analise_lojas(aplicativo):
             # Cards das lojas
             dbc.Row(
                 [
-                    dbc.Col(criar_coluna_comparacao(id_loja1, df_filtrado1, str_ranking1), width=6),
-                    dbc.Col(criar_coluna_comparacao(id_loja2, df_filtrado2, str_ranking2), width=6),
+                    dbc.Col(criar_coluna_comparacao(id_loja1, kpis.loc[id_loja1], str_ranking1), width=6),
+                    dbc.Col(criar_coluna_comparacao(id_loja2, kpis.loc[id_loja2], str_ranking2), width=6),
                     conteudo_comparacao
                 ],
                 className="g-3 mb-4"
@@ -748,18 +797,20 @@ def registrar_callbacks_analise_lojas(aplicativo):
             )
         }
 
-        # Série Temporal
+        # Série Temporal (cada série diária é reduzida por LTTB se tiver mais pontos que pixels)
+        serie1 = reduzir_series(df_filtrado1, 'Date', coluna_metrica)
+        serie2 = reduzir_series(df_filtrado2, 'Date', coluna_metrica)
         fig_ts = go.Figure()
         fig_ts.add_trace(go.Scatter(
-            x=df_filtrado1['Date'],
-            y=df_filtrado1[coluna_metrica],
+            x=serie1['Date'],
+            y=serie1[coluna_metrica],
             mode='lines',
             name=f'Loja {id_loja1}',
             line=dict(color=VERMELHO_ROSSMANN, width=2)
         ))
         fig_ts.add_trace(go.Scatter(
-            x=df_filtrado2['Date'],
-            y=df_filtrado2[coluna_metrica],
+            x=serie2['Date'],
+            y=serie2[coluna_metrica],
             mode='lines',
             name=f'Loja {id_loja2}',
             line=dict(color=AZUL_ESCURO, width=2)
@@ -942,7 +993,7 @@ def registrar_callbacks_analise_lojas(aplicativo):
          Input('armazenamento-df-principal', 'data')],
         [State("modal-comparacao", "is_open")]
     )
-    def atualizar_modal(n1, n2, ids_lojas_selecionadas, dados_json, data_inicio, data_fim, feriado_estadual, feriado_escolar, df_principal_json, esta_aberto):
+    def atualizar_modal(n1, n2, ids_lojas_selecionadas, dados_ranking, data_inicio, data_fim, feriado_estadual, feriado_escolar, versao_dados, esta_aberto):
         contexto = dash.callback_context
         id_gatilho = contexto.triggered[0]['prop_id'].split('.')[0]
 
@@ -950,25 +1001,15 @@ def registrar_callbacks_analise_lojas(aplicativo):
         if len(ids_lojas_selecionadas) != 2:
             return False, None
 
-        # Usar a função auxiliar para deserializar o DataFrame
-        df_principal = deserializar_df(df_principal_json)
-        if df_principal is None:
+        # Resolve a chave de versão do dcc.Store para o DataFrame em memória
+        if obter_df_principal(versao_dados) is None:
             return False, dbc.Alert("Erro interno: DataFrame principal não encontrado.", color="danger")
 
         # Obtém os IDs das lojas selecionadas
         id_loja1, id_loja2 = ids_lojas_selecionadas
 
-        # Obtém os tipos das lojas
-        tipo_loja1 = df_principal[df_principal['Store'] == id_loja1]['StoreType'].iloc[0]
-        tipo_loja2 = df_principal[df_principal['Store'] == id_loja2]['StoreType'].iloc[0]
-
-        # Filtra dados para cada loja
-        df_filtrado1 = filtrar_dataframe(df_principal, data_inicio, data_fim, [tipo_loja1], [id_loja1], feriado_estadual, feriado_escolar)
-        df_filtrado2 = filtrar_dataframe(df_principal, data_inicio, data_fim, [tipo_loja2], [id_loja2], feriado_estadual, feriado_escolar)
-
-        # CORREÇÃO CRÍTICA: Ordenar os DataFrames por data antes de plotar as séries temporais
-        df_filtrado1 = df_filtrado1.sort_values(by='Date')
-        df_filtrado2 = df_filtrado2.sort_values(by='Date')
+        # Os KPIs comparados vêm das somas acumuladas por loja (a loja já determina o tipo de loja)
+        kpis = obter_kpis_lojas(ids_lojas_selecionadas, versao_dados, data_inicio, data_fim, feriado_estadual, feriado_escolar)
 
         # Gera o conteúdo do modal
         conteudo_modal = [
@@ -988,7 +1029,7 @@ def registrar_callbacks_analise_lojas(aplicativo):
                 [
                     # Métricas Comparativas
                     html.Div(
-                        gerar_comparacao_detalhada(id_loja1, id_loja2, df_filtrado1, df_filtrado2),
+                        gerar_comparacao_detalhada(id_loja1, id_loja2, kpis),
                         style={'marginBottom': '1rem'}
                     )
                 ]
@@ -1020,25 +1061,34 @@ def registrar_callbacks_analise_lojas(aplicativo):
 
     @aplicativo.callback(
         [Output('conteudo-detalhe-loja', 'children'),
-         Output('armazenamento-id-loja-selecionada', 'data')],
-        [Input({'type': 'linha-ranking', 'index': dash.ALL}, 'n_clicks'),
+         Output('armazenamento-id-loja-selecionada', 'data'),
+         Output('tabela-ranking-lojas', 'active_cell')],
+        [Input('tabela-ranking-lojas', 'active_cell'),
          Input('armazenamento-dados-ranking', 'data'),
          Input('filtro-loja-especifica', 'value'),
-         Input('armazenamento-df-principal', 'data')],
-        [State({'type': 'linha-ranking', 'index': dash.ALL}, 'id'),
-         State('armazenamento-id-loja-selecionada', 'data'),
+         Input('armazenamento-df-principal', 'data'),
+         Input('seletor-ordem-ranking', 'value'),
+         Input({'type': 'botao-loja-semelhante', 'index': ALL}, 'n_clicks')],
+        [State('armazenamento-id-loja-selecionada', 'data'),
          State('filtro-data', 'start_date'), State('filtro-data', 'end_date'),
          State('filtro-tipo-loja', 'value'),
          State('filtro-feriado-estadual', 'value'), State('filtro-feriado-escolar', 'value'),
-         State('seletor-metrica-ranking', 'value'),
-         State('seletor-ordem-ranking', 'value')]
+         State('seletor-metrica-ranking', 'value')]
     )
-    def atualizar_detalhes_loja_e_selecao(lista_n_clicks, dados_json, selecao_lojas_especificas, df_principal_json,
-                                           lista_id, ids_lojas_selecionadas, data_inicio, data_fim,
-                                           tipos_loja, feriado_estadual, feriado_escolar, metrica_ranking,
-                                           ordem_ranking):
+    def atualizar_detalhes_loja_e_selecao(celula_ativa, dados_ranking, selecao_lojas_especificas, versao_dados,
+                                           ordem_ranking, cliques_lojas_semelhantes, ids_lojas_selecionadas, data_inicio, data_fim,
+                                           tipos_loja, feriado_estadual, feriado_escolar, metrica_ranking):
         contexto = dash.callback_context
         id_propriedade_gatilho = contexto.triggered[0]['prop_id']
+
+        # A célula clicada é desmarcada logo após o clique (para que um novo clique na mesma loja
+        # também dispare); essa desmarcação não muda a seleção
+        if id_propriedade_gatilho == 'tabela-ranking-lojas.active_cell' and not celula_ativa:
+            return dash.no_update, dash.no_update, dash.no_update
+        # Os itens de lojas semelhantes disparam também quando são criados, ainda sem cliques
+        clicou_loja_semelhante = isinstance(ctx.triggered_id, dict)
+        if clicou_loja_semelhante and not any(gatilho['value'] for gatilho in contexto.triggered):
+            return dash.no_update, dash.no_update, dash.no_update
         
         # Inicializa a lista se for None
         if ids_lojas_selecionadas is None:
@@ -1054,11 +1104,10 @@ def registrar_callbacks_analise_lojas(aplicativo):
                 else:
                     novos_ids_selecionados = selecao_lojas_especificas.copy()
 
-        # Cenário 2: Clique na tabela
-        elif 'linha-ranking' in id_propriedade_gatilho:
+        # Cenário 2: Clique na tabela (o id da linha é o número da loja) ou em uma loja semelhante
+        elif id_propriedade_gatilho == 'tabela-ranking-lojas.active_cell' or clicou_loja_semelhante:
             try:
-                id_clicado = json.loads(id_propriedade_gatilho.split('.')[0])
-                id_loja_clicada = id_clicado['index']
+                id_loja_clicada = ctx.triggered_id['index'] if clicou_loja_semelhante else celula_ativa['row_id']
                 if id_loja_clicada in novos_ids_selecionados:
                     # Se já está selecionada, remove (toggle)
                     novos_ids_selecionados.remove(id_loja_clicada)
@@ -1069,31 +1118,30 @@ def registrar_callbacks_analise_lojas(aplicativo):
                         # Já existem duas lojas; substitui a mais antiga (primeira) pela nova
                         novos_ids_selecionados.pop(0)
                         novos_ids_selecionados.append(id_loja_clicada)
-            except (json.JSONDecodeError, IndexError, TypeError):
+            except (KeyError, IndexError, TypeError):
                 pass
 
-        # Cenário 3: Filtros principais (data, tipo) foram alterados
-        elif id_propriedade_gatilho == 'armazenamento-dados-ranking.data':
+        # Cenário 3: Filtros principais (data, tipo) ou a ordem do ranking foram alterados
+        elif id_propriedade_gatilho in ('armazenamento-dados-ranking.data', 'seletor-ordem-ranking.value'):
             # Limpa seleção para evitar mostrar uma loja que não pertence ao novo ranking
             novos_ids_selecionados = []
-            if dados_json:
-                df_ranking = pd.read_json(StringIO(dados_json), orient='split')
-                if not df_ranking.empty and len(df_ranking) > 0:
-                    # O ranking já vem ordenado do callback anterior
-                    loja_topo = df_ranking.iloc[0]
-                    novos_ids_selecionados.append(loja_topo['Store'])
-
-        # Usar a função auxiliar para deserializar o DataFrame
-        df_principal = deserializar_df(df_principal_json)
+            ranking = obter_ranking(dados_ranking)
+            if ranking is not None and len(ranking) > 0:
+                # Seleciona a primeira loja do ranking na ordem escolhida
+                loja_topo = ranking.lojas[ranking.primeiros(1, ordem_ranking)[0]]
+                novos_ids_selecionados.append(int(loja_topo))
+
+        # Resolve a chave de versão do dcc.Store para o DataFrame em memória
+        df_principal = obter_df_principal(versao_dados)
         if df_principal is None:
             conteudo = dbc.Alert("Erro interno: DataFrame principal não encontrado.", color="danger")
-            return conteudo, novos_ids_selecionados
+            return conteudo, novos_ids_selecionados, None
 
         # Decide qual view renderizar
         if len(novos_ids_selecionados) == 2:
-            conteudo = gerar_visualizacao_comparacao(novos_ids_selecionados, dados_json, ordem_ranking, data_inicio, data_fim, feriado_estadual, feriado_escolar, metrica_ranking, df_principal_json)
+            conteudo = gerar_visualizacao_comparacao(novos_ids_selecionados, dados_ranking, ordem_ranking, data_inicio, data_fim, feriado_estadual, feriado_escolar, metrica_ranking, versao_dados)
         elif len(novos_ids_selecionados) == 1:
-            conteudo = gerar_visualizacao_loja_unica(novos_ids_selecionados[0], dados_json, ordem_ranking, data_inicio, data_fim, feriado_estadual, feriado_escolar, metrica_ranking, df_principal_json)
+            conteudo = gerar_visualizacao_loja_unica(novos_ids_selecionados[0], dados_ranking, ordem_ranking, data_inicio, data_fim, feriado_estadual, feriado_escolar, metrica_ranking, versao_dados)
         else:
             conteudo = html.Div([
                 html.I(className="fas fa-tasks me-2"),
@@ -1101,5 +1149,5 @@ def registrar_callbacks_analise_lojas(aplicativo):
                 html.P("Clique em uma loja no ranking ou use a busca para ver os detalhes.", className="text-muted")
             ], className="text-center mt-5")
 
-        return conteudo, novos_ids_selecionados
+        return conteudo, novos_ids_selecionados, None
 
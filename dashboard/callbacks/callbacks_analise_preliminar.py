@@ -1,12 +1,19 @@
 # dashboard/callbacks/callbacks_analise_preliminar.py
-from dash import Input, Output, html
+from dash import Input, Output, html, ctx
+import dash
 import plotly.express as px
 import plotly.graph_objects as go
 import numpy as np
 import statsmodels.api as sm
 import pandas as pd
 
-from ..utils import criar_figura_vazia # Importar a função utilitária refatorada
+from ..utils import ( # Importar as funções utilitárias refatoradas
+    criar_figura_vazia, criar_tracos_histograma, precisa_resumir, faixa_visivel, mascara_faixa, criar_traco_densidade,
+    criar_traco_tendencia
+)
+from ..repositorio_dados import obter_dados_atuais
+from ..dimensao_datas import anexar_atributos_data, atributos_das_datas
+from ..dimensao_lojas import anexar_atributos_loja, atributos_das_lojas
 from ..config import VERMELHO_ROSSMANN, CINZA_NEUTRO, AZUL_DESTAQUE # Importar as novas constantes
 
 LAYOUT_GRAFICO_COMUM = { # Refatorar nome da constante
@@ -14,32 +21,48 @@ LAYOUT_GRAFICO_COMUM = { # Refatorar nome da constante
     'margin': dict(l=80, r=40, b=40, t=90)
 }
 
-def registrar_callbacks_analise_preliminar(aplicativo, dados): # Refatorar nome da função e parâmetro 'app' para 'aplicativo'
-    df_principal = dados["df_principal"] # Usar o novo nome do DataFrame principal
-    df_vendas_antes_preprocessamento = dados["df_vendas_antes_preprocessamento"] # Usar o novo nome do DataFrame
-    df_vendas_depois_preprocessamento = dados["df_vendas_depois_preprocessamento"] # Usar o novo nome do DataFrame
-    df_lojas_original = dados["df_lojas_original"] # Usar o novo nome do DataFrame
-    df_lojas_tratado = dados["df_lojas_tratado"] # Usar o novo nome do DataFrame
+def registrar_callbacks_analise_preliminar(aplicativo): # Refatorar nome da função e parâmetro 'app' para 'aplicativo'
+    # Os DataFrames são obtidos da versão atual a cada chamada, para acompanhar recargas dos dados
+    def dataframes_vendas():
+        dados = obter_dados_atuais()
+        return dados["df_vendas_antes_preprocessamento"], dados["df_vendas_depois_preprocessamento"]
+
+    def dataframes_lojas():
+        dados = obter_dados_atuais()
+        return dados["df_lojas_original"], dados["df_lojas_tratado"]
 
     # --- Callback para Scatter Plot da Matriz de Correlação ---
     @aplicativo.callback( # Usar 'aplicativo'
         Output('grafico-dispersao-correlacao', 'figure'), # Refatorar ID
-        Input('grafico-matriz-correlacao', 'clickData') # Refatorar ID
+        Input('grafico-matriz-correlacao', 'clickData'), # Refatorar ID
+        Input('grafico-dispersao-correlacao', 'relayoutData')
     )
-    def exibir_dados_clicados(dados_clicados): # Refatorar nome da função e parâmetro
+    def exibir_dados_clicados(dados_clicados, dados_relayout): # Refatorar nome da função e parâmetro
+        dados = obter_dados_atuais()
+        df_principal = dados["df_principal"]
         if dados_clicados is None:
             return criar_figura_vazia("Clique em uma célula da matriz") # Usar a função refatorada
 
+        # Com poucas linhas o zoom é feito no navegador; com muitas, o mapa de densidade é refeito para a área visível
+        foi_zoom = ctx.triggered_id == 'grafico-dispersao-correlacao'
+        if foi_zoom and (not precisa_resumir(df_principal) or not any('range' in chave for chave in dados_relayout or {})):
+            return dash.no_update  # Zoom no navegador, ou evento sem mudança de faixa (ex.: autosize)
+
         try:
             ponto = dados_clicados['points'][0] # Refatorar nome da variável
             col_x = ponto['x'] # Refatorar nome da variável
             col_y = ponto['y'] # Refatorar nome da variável
 
-            if col_x not in df_principal.select_dtypes(include=np.number).columns or col_y not in df_principal.select_dtypes(include=np.number).columns: # Usar df_principal
-                return criar_figura_vazia(f"Não é possível plotar '{col_x}' vs '{col_y}'. Selecione colunas numéricas.") # Usar a função refatorada
+            if precisa_resumir(df_principal):
+                return obter_dispersao_densidade(dados, col_x, col_y, dados_relayout if foi_zoom else None)
 
             tamanho_amostra = min(len(df_principal), 5000) # Refatorar nome da variável, usar df_principal
-            df_amostra = df_principal.sample(n=tamanho_amostra, random_state=42) # Refatorar nome da variável, usar df_principal
+            # Os atributos da loja (ex.: CompetitionDistance) e da data (ex.: Month) são anexados só às linhas da amostra
+            df_amostra = anexar_atributos_loja(df_principal.sample(n=tamanho_amostra, random_state=42), dados["dimensao_lojas"]) # Refatorar nome da variável, usar df_principal
+            df_amostra = anexar_atributos_data(df_amostra, dados["dimensao_datas"], remover_chave=True)
+
+            if col_x not in df_amostra.select_dtypes(include=np.number).columns or col_y not in df_amostra.select_dtypes(include=np.number).columns: # Usar df_principal
+                return criar_figura_vazia(f"Não é possível plotar '{col_x}' vs '{col_y}'. Selecione colunas numéricas.") # Usar a função refatorada
 
             fig = px.scatter(df_amostra, x=col_x, y=col_y, title=f'Dispersão: {col_x} vs {col_y}', color_discrete_sequence=[VERMELHO_ROSSMANN], render_mode='webgl') # Usar df_amostra e constante refatorada
             fig.update_layout(
@@ -58,21 +81,77 @@ def registrar_callbacks_analise_preliminar(aplicativo, dados): # Refatorar nome
         except Exception as e:
             return criar_figura_vazia(f"Erro ao gerar gráfico de dispersão: {e}") # Usar a função refatorada
 
+    def obter_dispersao_densidade(dados, col_x, col_y, dados_relayout):
+        """
+        Dispersão de todas as linhas (em vez de uma amostra) para o modo de dados completo: acima de
+        LIMITE_PONTOS_BRUTOS_GRAFICO pontos na área visível, envia a grade de densidade; abaixo, os marcadores.
+        """
+        df_principal = dados["df_principal"]
+
+        def valores_coluna(coluna):
+            # Colunas do fato, ou atributos de loja/data resolvidos pelas dimensões (None se não for numérica)
+            if coluna in df_principal.columns:
+                serie = df_principal[coluna]
+            elif coluna in dados["dimensao_lojas"].columns:
+                serie = atributos_das_lojas(dados["dimensao_lojas"], df_principal['Store'].to_numpy(), [coluna])[coluna]
+            elif coluna in dados["dimensao_datas"].columns:
+                serie = atributos_das_datas(dados["dimensao_datas"], df_principal['DateKey'].to_numpy(), [coluna])[coluna]
+            else:
+                return None
+            return serie.to_numpy(dtype='float64') if pd.api.types.is_numeric_dtype(serie) and not pd.api.types.is_bool_dtype(serie) else None
+
+        x, y = valores_coluna(col_x), valores_coluna(col_y)
+        if x is None or y is None:
+            return criar_figura_vazia(f"Não é possível plotar '{col_x}' vs '{col_y}'. Selecione colunas numéricas.")
+
+        faixa_x, faixa_y = faixa_visivel(dados_relayout, 'xaxis'), faixa_visivel(dados_relayout, 'yaxis')
+        visiveis = mascara_faixa(x, y, faixa_x, faixa_y)
+        if not visiveis.any():
+            return criar_figura_vazia("Nenhum ponto na área selecionada")
+        x_visivel, y_visivel = x[visiveis], y[visiveis]
+
+        fig = go.Figure()
+        if precisa_resumir(x_visivel):
+            fig.add_trace(criar_traco_densidade(x_visivel, y_visivel, faixa_x, faixa_y, name='Densidade'))
+            titulo = f'Densidade: {col_x} vs {col_y} ({len(x_visivel):,} pontos)'
+        else:
+            fig.add_trace(go.Scattergl(x=x_visivel, y=y_visivel, mode='markers', marker=dict(color=VERMELHO_ROSSMANN), name='Pontos'))
+            titulo = f'Dispersão: {col_x} vs {col_y}'
+
+        # A tendência usa os pontos visíveis
+        fig.add_trace(criar_traco_tendencia(x_visivel, y_visivel, name='Linha de Tendência', line=dict(color=AZUL_DESTAQUE, width=3)))
+
+        fig.update_layout(
+            **LAYOUT_GRAFICO_COMUM,
+            title=titulo,
+            xaxis_title=col_x,
+            yaxis_title=col_y,
+            plot_bgcolor='white'
+        )
+        if faixa_x is not None:
+            fig.update_xaxes(range=faixa_x)
+        if faixa_y is not None:
+            fig.update_yaxes(range=faixa_y)
+        return fig
+
     # --- Callback para Histograma Comparativo de Vendas ---
     @aplicativo.callback( # Usar 'aplicativo'
         Output('histograma-vendas-comparativo', 'figure'), # Refatorar ID
         Input('dropdown-histograma-vendas', 'value') # Refatorar ID
     )
     def atualizar_histograma_vendas(coluna_selecionada): # Refatorar nome da função e parâmetro
+        df_vendas_antes_preprocessamento, df_vendas_depois_preprocessamento = dataframes_vendas()
         if df_vendas_antes_preprocessamento.empty or df_vendas_depois_preprocessamento.empty or coluna_selecionada is None: # Usar os novos nomes dos DataFrames
             return criar_figura_vazia("Dados de vendas não carregados ou coluna não selecionada.") # Usar a função refatorada
 
         if coluna_selecionada not in df_vendas_antes_preprocessamento.columns or coluna_selecionada not in df_vendas_depois_preprocessamento.columns: # Usar os novos nomes dos DataFrames
             return criar_figura_vazia(f"Coluna '{coluna_selecionada}' não disponível para comparação de histogramas.") # Usar a função refatorada
 
-        fig = go.Figure()
-        fig.add_trace(go.Histogram(x=df_vendas_antes_preprocessamento[coluna_selecionada], name='Antes', opacity=0.7, marker_color=CINZA_NEUTRO, nbinsx=40)) # Usar o novo nome do DataFrame e constante refatorada
-        fig.add_trace(go.Histogram(x=df_vendas_depois_preprocessamento[coluna_selecionada], name='Depois', opacity=0.7, marker_color=VERMELHO_ROSSMANN, nbinsx=40)) # Usar o novo nome do DataFrame e constante refatorada
+        # No modo completo as colunas têm ~1M valores: acima do limite as contagens são calculadas no servidor
+        fig = go.Figure(criar_tracos_histograma([
+            ('Antes', df_vendas_antes_preprocessamento[coluna_selecionada], CINZA_NEUTRO),
+            ('Depois', df_vendas_depois_preprocessamento[coluna_selecionada], VERMELHO_ROSSMANN),
+        ], nbins=40, opacity=0.7))
 
         if coluna_selecionada in ['Sales', 'Customers']:
             fig.update_yaxes(type="log", title_text='Frequência (Escala Log)')
@@ -94,6 +173,7 @@ def registrar_callbacks_analise_preliminar(aplicativo, dados): # Refatorar nome
         Input('dropdown-histograma-lojas', 'value') # Refatorar ID
     )
     def atualizar_histograma_lojas(coluna_selecionada): # Refatorar nome da função e parâmetro
+        df_lojas_original, df_lojas_tratado = dataframes_lojas()
         if df_lojas_original.empty or df_lojas_tratado.empty or coluna_selecionada is None: # Usar os novos nomes dos DataFrames
             return criar_figura_vazia("Dados de lojas não carregados ou coluna não selecionada.") # Usar a função refatorada
 
@@ -140,10 +220,12 @@ def registrar_callbacks_analise_preliminar(aplicativo, dados): # Refatorar nome
         Input('dropdown-histograma-vendas', 'value') # Refatorar ID
     )
     def atualizar_grafico_estatisticas_vendas(coluna_selecionada): # Refatorar nome da função e parâmetro
+        df_vendas_antes_preprocessamento, df_vendas_depois_preprocessamento = dataframes_vendas()
         if coluna_selecionada is None or df_vendas_depois_preprocessamento.empty or df_vendas_antes_preprocessamento.empty: # Usar os novos nomes dos DataFrames
             return criar_figura_vazia("Selecione uma variável para ver as estatísticas.") # Usar a função refatorada
 
-        if coluna_selecionada not in df_vendas_antes_preprocessamento.columns: # Usar o novo nome do DataFrame
+        # O "depois" só tem dias de loja aberta, sem a coluna Open
+        if coluna_selecionada not in df_vendas_antes_preprocessamento.columns or coluna_selecionada not in df_vendas_depois_preprocessamento.columns: # Usar os novos nomes dos DataFrames
             return criar_figura_vazia(f"Coluna '{coluna_selecionada}' não encontrada.") # Usar a função refatorada
 
         estats_antes = df_vendas_antes_preprocessamento[coluna_selecionada].describe() # Refatorar nome da variável e do DataFrame
@@ -189,6 +271,7 @@ def registrar_callbacks_analise_preliminar(aplicativo, dados): # Refatorar nome
         Input('dropdown-histograma-lojas', 'value') # Refatorar ID
     )
     def atualizar_grafico_estatisticas_lojas(coluna_selecionada): # Refatorar nome da função e parâmetro
+        df_lojas_original, df_lojas_tratado = dataframes_lojas()
         if coluna_selecionada is None or df_lojas_tratado.empty or df_lojas_original.empty: # Usar os novos nomes dos DataFrames
             return criar_figura_vazia("Selecione uma variável para ver as estatísticas.") # Usar a função refatorada
 
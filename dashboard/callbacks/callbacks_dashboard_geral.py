@@ -1,5 +1,5 @@
 # dashboard/callbacks/callbacks_dashboard_geral.py
-from dash import Input, Output, State, html
+from dash import Input, Output, State, html, ctx
 import dash
 import pandas as pd
 import numpy as np
@@ -8,11 +8,19 @@ import plotly.graph_objects as go
 import statsmodels.api as sm
 import dash_bootstrap_components as dbc
 
-from ..utils import criar_figura_vazia, filtrar_dataframe
+from ..utils import (
+    criar_figura_vazia, filtrar_dataframe, normalizar_filtros, CronometroEtapas,
+    precisa_resumir, criar_trace_box_resumido, criar_tracos_histograma,
+    faixa_visivel, reduzir_series
+)
+from ..cache import CacheLRU, ResultadoFiltrado, saida_em_cache
+from ..consultas import obter_motor
+from ..dimensao_lojas import atributos_das_lojas
+from ..repositorio_dados import obter_dados_atuais, descartar_versoes_removidas
 from ..config import (
     VERMELHO_ROSSMANN, AZUL_ESCURO, CINZA_NEUTRO, AZUL_DESTAQUE, VERDE_DESTAQUE,
     PALETA_CORES_GRAFICO, MAPEAMENTO_DIAS_SEMANA, ORDEM_DIAS_SEMANA,
-    ALTURA_GRAFICO, ALTURA_GRAFICO_LARGURA_TOTAL
+    ALTURA_GRAFICO, ALTURA_GRAFICO_LARGURA_TOTAL, MAX_ENTRADAS_CACHE_FILTROS, MAX_MB_CACHE_FILTROS
 )
 
 TITULOS_EIXO_Y = {
@@ -27,34 +35,56 @@ ROUTULOS_EIXO_Y = {
     'SalesPerCustomer': 'Ticket Médio'
 }
 
-def registrar_callbacks_dashboard_geral(aplicativo, dados):
-    df_principal = dados["df_principal"]
+# Métricas dos KPIs e dimensões dos gráficos de médias da página (agregadas em lote)
+METRICAS_KPI = ['Sales', 'Customers', 'SalesPerCustomer']
+DIMENSOES_DASHBOARD = ['Month', 'Year', ['StoreType', 'Promo'], 'DayOfWeek', 'Day', 'Promo2', 'Assortment', 'StateHoliday']
+
+# Resultados de filtro compartilhados pelos callbacks desta página (um cache por worker)
+CACHE_FILTROS = descartar_versoes_removidas(CacheLRU(MAX_ENTRADAS_CACHE_FILTROS, MAX_MB_CACHE_FILTROS * 1024 ** 2), lambda chave: chave[0])
+
+def registrar_callbacks_dashboard_geral(aplicativo):
+    def obter_resultado_filtrado(data_inicio, data_fim, tipos_loja, lojas_especificas, feriado_estadual, feriado_escolar):
+        """Filtra o DataFrame principal uma única vez por combinação de filtros e reaproveita o resultado."""
+        # A versão atual é resolvida a cada chamada: após uma recarga, as chaves antigas deixam de ser usadas
+        dados = obter_dados_atuais()
+        df_principal = dados["df_principal"]
+        dimensao_lojas = dados["dimensao_lojas"]
+        cubo_vendas = dados.get("cubo_vendas")
+        chave = (dados["versao"],) + normalizar_filtros(data_inicio, data_fim, tipos_loja, lojas_especificas, feriado_estadual, feriado_escolar)
+        def calcular():
+            df_filtrado = filtrar_dataframe(df_principal, data_inicio, data_fim, tipos_loja, lojas_especificas, feriado_estadual, feriado_escolar, dimensao_lojas)
+            fatia_cubo = cubo_vendas.consultar(data_inicio, data_fim, tipos_loja, lojas_especificas, feriado_estadual, feriado_escolar) if cubo_vendas is not None else None
+            filtros = (data_inicio, data_fim, tipos_loja, lojas_especificas, feriado_estadual, feriado_escolar)
+            return ResultadoFiltrado(df_filtrado, fatia_cubo, dimensao_lojas, dados["dimensao_datas"], filtros)
+        return CACHE_FILTROS.obter_ou_calcular(chave, calcular)
+
+    def saida_dashboard_em_cache(id_grafico, filtros, entradas, construir):
+        """Saída de `construir()` para os `filtros` do dashboard, servida do cache de figuras quando já calculada."""
+        chave = (normalizar_filtros(*filtros), entradas)
+        return saida_em_cache(id_grafico, obter_dados_atuais()["versao"], chave, construir)
 
     # --- Funções Auxiliares de Geração de Gráficos (Dashboard) ---
-    def obter_grafico_serie_temporal(df_filtrado, tipo_granularidade, metrica, texto_rotulo_eixo_y, texto_titulo_eixo_y, lojas_especificas_selecionadas):
-        df_temporal = df_filtrado.copy()
-
+    def obter_grafico_serie_temporal(resultado, tipo_granularidade, metrica, texto_rotulo_eixo_y, texto_titulo_eixo_y, lojas_especificas_selecionadas, faixa_x=None):
         chave_agrupamento = 'Store' if lojas_especificas_selecionadas else 'StoreType'
         entidade_titulo = "Loja" if lojas_especificas_selecionadas else "Tipo de Loja"
 
         if tipo_granularidade == 'M':
-            df_temporal['Date_Period'] = df_temporal['Date'].dt.to_period('M').dt.to_timestamp()
             sufixo_titulo = 'Mensal'
         elif tipo_granularidade == 'W':
-            df_temporal['Date_Period'] = df_temporal['Date'].dt.to_period('W').dt.to_timestamp()
             sufixo_titulo = 'Semanal'
         else:
             sufixo_titulo = 'Diária (Suavizado 7 dias)'
 
         if tipo_granularidade != 'D':
-            df_agrupado = df_temporal.groupby(['Date_Period', chave_agrupamento])[metrica].mean().reset_index()
+            df_agrupado = resultado.media_por_periodo(tipo_granularidade, [chave_agrupamento], metrica)
             df_agrupado.rename(columns={metrica: 'Value'}, inplace=True)
         else:
-            metrica_diaria = df_filtrado.groupby(['Date', chave_agrupamento])[metrica].mean().unstack()
+            metrica_diaria = resultado.media_por_periodo('D', [chave_agrupamento], metrica).set_index(['Date_Period', chave_agrupamento])[metrica].unstack()
             metrica_suavizada = metrica_diaria.rolling(window=7, center=True, min_periods=1).mean()
             df_agrupado = metrica_suavizada.stack().reset_index(name='Value')
-            df_agrupado.rename(columns={'Date': 'Date_Period'}, inplace=True)
 
+        # Muitas lojas ou histórico longo: cada linha é reduzida (LTTB) à área visível antes de ir ao navegador
+        df_agrupado = reduzir_series(df_agrupado, 'Date_Period', 'Value', chave_agrupamento, faixa_x)
         fig = px.line(df_agrupado, x='Date_Period', y='Value', color=chave_agrupamento, title=f'{texto_rotulo_eixo_y} por {entidade_titulo} ({sufixo_titulo})')
         fig.update_layout(
             height=ALTURA_GRAFICO_LARGURA_TOTAL,
@@ -63,11 +93,13 @@ def registrar_callbacks_dashboard_geral(aplicativo, dados):
             plot_bgcolor='rgba(0,0,0,0)',
             paper_bgcolor='rgba(0,0,0,0)'
         )
+        if faixa_x is not None:
+            fig.update_xaxes(range=faixa_x)
         texto_analise = f"O gráfico exibe a tendência de {texto_rotulo_eixo_y} por {entidade_titulo}. Ele permite observar a performance relativa e a sazonalidade de cada categoria ao longo do tempo, na granularidade selecionada ({sufixo_titulo})."
         return fig, texto_analise
 
-    def obter_grafico_media_mensal(df_filtrado, metrica, texto_rotulo_eixo_y, texto_titulo_eixo_y):
-        df_media_mensal = df_filtrado.groupby('Month')[metrica].mean().reset_index()
+    def obter_grafico_media_mensal(resultado, metrica, texto_rotulo_eixo_y, texto_titulo_eixo_y):
+        df_media_mensal = resultado.media_por('Month', metrica)
         fig = px.line(df_media_mensal, x='Month', y=metrica, markers=True, title=f'Média de {texto_rotulo_eixo_y} por Mês', labels={metrica: texto_titulo_eixo_y, 'Month': 'Mês'}, color_discrete_sequence=[VERMELHO_ROSSMANN])
         fig.update_layout(
             xaxis=dict(tickmode='array', tickvals=list(range(1, 13))),
@@ -79,8 +111,8 @@ def registrar_callbacks_dashboard_geral(aplicativo, dados):
         texto_analise = f"Este gráfico mostra a sazonalidade anual da métrica '{texto_rotulo_eixo_y}'. Picos e vales podem indicar períodos de alta e baixa demanda, como festas de fim de ano ou meses de férias."
         return fig, texto_analise
 
-    def obter_grafico_media_anual(df_filtrado, metrica, texto_rotulo_eixo_y, texto_titulo_eixo_y):
-        df_media_anual = df_filtrado.groupby('Year')[metrica].mean().reset_index()
+    def obter_grafico_media_anual(resultado, metrica, texto_rotulo_eixo_y, texto_titulo_eixo_y):
+        df_media_anual = resultado.media_por('Year', metrica)
         fig = px.line(df_media_anual, x='Year', y=metrica, markers=True, title=f'Média de {texto_rotulo_eixo_y} por Ano', labels={metrica: texto_titulo_eixo_y, 'Year': 'Ano'}, color_discrete_sequence=[VERMELHO_ROSSMANN])
         fig.update_layout(
             height=ALTURA_GRAFICO,
@@ -91,16 +123,16 @@ def registrar_callbacks_dashboard_geral(aplicativo, dados):
         texto_analise = f"A média de {texto_rotulo_eixo_y} por ano mostra a tendência geral ao longo do período selecionado. É útil para identificar crescimento, declínio ou estagnação no longo prazo."
         return fig, texto_analise
 
-    def obter_grafico_promocao_tipo_loja(df_filtrado, metrica, texto_rotulo_eixo_y, texto_titulo_eixo_y):
-        df_promo_tipo_loja = df_filtrado.groupby(['StoreType', 'Promo'])[metrica].mean().reset_index()
+    def obter_grafico_promocao_tipo_loja(resultado, metrica, texto_rotulo_eixo_y, texto_titulo_eixo_y):
+        df_promo_tipo_loja = resultado.media_por(['StoreType', 'Promo'], metrica)
         df_promo_tipo_loja['Promo'] = df_promo_tipo_loja['Promo'].map({0: 'Sem Promoção', 1: 'Com Promoção'})
         fig = px.bar(df_promo_tipo_loja, x='StoreType', y=metrica, color='Promo', barmode='group', text_auto='.0f', title=f'Promoção Vs {texto_rotulo_eixo_y} por Tipo de Loja', labels={metrica: texto_titulo_eixo_y, 'Promo': 'Status da Promoção', 'StoreType': 'Tipo de Loja'}, color_discrete_map={'Sem Promoção': CINZA_NEUTRO, 'Com Promoção': VERMELHO_ROSSMANN})
         fig.update_layout(height=ALTURA_GRAFICO, plot_bgcolor='rgba(0,0,0,0)', paper_bgcolor='rgba(0,0,0,0)')
         texto_analise = f"Este gráfico compara a média de {texto_rotulo_eixo_y} em dias com e sem promoção, para cada tipo de loja. É útil para avaliar a eficácia das promoções por segmento."
         return fig, texto_analise
 
-    def obter_grafico_dia_semana(df_filtrado, metrica, texto_rotulo_eixo_y, texto_titulo_eixo_y):
-        df_dia_semana = df_filtrado.groupby('DayOfWeek')[metrica].mean().reset_index()
+    def obter_grafico_dia_semana(resultado, metrica, texto_rotulo_eixo_y, texto_titulo_eixo_y):
+        df_dia_semana = resultado.media_por('DayOfWeek', metrica)
         df_dia_semana['DayName'] = df_dia_semana['DayOfWeek'].map(MAPEAMENTO_DIAS_SEMANA)
         fig = px.line(df_dia_semana, x='DayName', y=metrica, markers=True, title=f'{texto_rotulo_eixo_y} Médio por Dia da Semana', labels={metrica: texto_titulo_eixo_y, 'DayName': 'Dia da Semana'}, color_discrete_sequence=[VERMELHO_ROSSMANN])
         fig.update_layout(
@@ -112,15 +144,27 @@ def registrar_callbacks_dashboard_geral(aplicativo, dados):
         texto_analise = f"Aqui vemos a variação média da métrica '{texto_rotulo_eixo_y}' ao longo da semana. Padrões podem indicar dias de maior movimento, como inícios de semana ou fins de semana."
         return fig, texto_analise
 
-    def obter_grafico_dia_do_mes(df_filtrado, metrica, texto_rotulo_eixo_y, texto_titulo_eixo_y):
-        df_dia_mes = df_filtrado.groupby('Day')[metrica].mean().reset_index()
+    def obter_grafico_dia_do_mes(resultado, metrica, texto_rotulo_eixo_y, texto_titulo_eixo_y):
+        df_dia_mes = resultado.media_por('Day', metrica)
         fig = px.line(df_dia_mes, x='Day', y=metrica, markers=True, title=f'{texto_rotulo_eixo_y} Médio por Dia do Mês', labels={metrica: texto_titulo_eixo_y, 'Day': 'Dia do Mês'}, color_discrete_sequence=[VERMELHO_ROSSMANN])
         fig.update_layout(height=ALTURA_GRAFICO, plot_bgcolor='rgba(0,0,0,0)', paper_bgcolor='rgba(0,0,0,0)')
         texto_analise = f"Este gráfico revela o padrão de {texto_rotulo_eixo_y} ao longo do mês. Picos no início e no final do mês podem estar correlacionados com ciclos de pagamento de salários."
         return fig, texto_analise
 
+    def valores_por_grupo(df, chaves, metrica):
+        """Retorna {grupo: valores} de `metrica`, para montar boxplots com estatísticas pré-calculadas."""
+        return {grupo: valores.to_numpy() for grupo, valores in df.groupby(chaves, observed=True)[metrica]}
+
     def obter_boxplot_promocao_tipo_loja(df_filtrado, metrica, texto_rotulo_eixo_y, texto_titulo_eixo_y):
-        fig = px.box(df_filtrado, x='StoreType', y=metrica, color='Promo', title=f'Distribuição de {texto_rotulo_eixo_y} por Loja/Promo', labels={metrica: texto_titulo_eixo_y, 'StoreType': 'Tipo de Loja', 'Promo': 'Promoção Ativa?'}, color_discrete_map={0: CINZA_NEUTRO, 1: VERMELHO_ROSSMANN})
+        if precisa_resumir(df_filtrado):
+            # Muitas linhas: envia só quartis e cercas de cada caixa em vez de todos os valores
+            fig = go.Figure()
+            for promo, cor in ((0, CINZA_NEUTRO), (1, VERMELHO_ROSSMANN)):
+                df_promo = df_filtrado[df_filtrado['Promo'] == promo]
+                fig.add_trace(criar_trace_box_resumido(valores_por_grupo(df_promo, 'StoreType', metrica), str(promo), cor, legendgroup=str(promo)))
+            fig.update_layout(title=f'Distribuição de {texto_rotulo_eixo_y} por Loja/Promo', xaxis_title='Tipo de Loja', legend_title_text='Promoção Ativa?')
+        else:
+            fig = px.box(df_filtrado, x='StoreType', y=metrica, color='Promo', title=f'Distribuição de {texto_rotulo_eixo_y} por Loja/Promo', labels={metrica: texto_titulo_eixo_y, 'StoreType': 'Tipo de Loja', 'Promo': 'Promoção Ativa?'}, color_discrete_map={0: CINZA_NEUTRO, 1: VERMELHO_ROSSMANN})
         fig.update_layout(
             boxmode='group',
             height=ALTURA_GRAFICO,
@@ -131,10 +175,15 @@ def registrar_callbacks_dashboard_geral(aplicativo, dados):
         texto_analise = f"O boxplot mostra a distribuição da métrica  '{texto_rotulo_eixo_y}' por tipo de loja, distinguindo dias com e sem promoção. Ajuda a entender a média e a consistência do impacto."
         return fig, texto_analise
 
-    def obter_boxplot_promocao_geral(df_filtrado, metrica, texto_rotulo_eixo_y, texto_titulo_eixo_y):
+    def obter_boxplot_promocao_geral(resultado, metrica, texto_rotulo_eixo_y, texto_titulo_eixo_y):
+        valores_sem_promocao, valores_com_promocao = resultado.valores_por_promocao(metrica)
         fig = go.Figure()
-        fig.add_trace(go.Box(y=df_filtrado[df_filtrado['Promo'] == 0][metrica], name='Sem Promoção', marker_color=CINZA_NEUTRO))
-        fig.add_trace(go.Box(y=df_filtrado[df_filtrado['Promo'] == 1][metrica], name='Com Promoção', marker_color=VERMELHO_ROSSMANN))
+        if precisa_resumir(valores_sem_promocao, valores_com_promocao):
+            fig.add_trace(criar_trace_box_resumido({'Sem Promoção': valores_sem_promocao}, 'Sem Promoção', CINZA_NEUTRO))
+            fig.add_trace(criar_trace_box_resumido({'Com Promoção': valores_com_promocao}, 'Com Promoção', VERMELHO_ROSSMANN))
+        else:
+            fig.add_trace(go.Box(y=valores_sem_promocao, name='Sem Promoção', marker_color=CINZA_NEUTRO))
+            fig.add_trace(go.Box(y=valores_com_promocao, name='Com Promoção', marker_color=VERMELHO_ROSSMANN))
         fig.update_layout(
             title=f'Distribuição de {texto_rotulo_eixo_y} (Geral)',
             yaxis_title=texto_titulo_eixo_y,
@@ -147,10 +196,12 @@ def registrar_callbacks_dashboard_geral(aplicativo, dados):
         texto_analise = f"Este boxplot compara a distribuição da métrica  '{texto_rotulo_eixo_y}' em dias com e sem promoção. Um deslocamento para cima na caixa 'Com Promoção' sugere impacto positivo"
         return fig, texto_analise
 
-    def obter_histograma_promocao_geral(df_filtrado, metrica, texto_rotulo_eixo_y, texto_titulo_eixo_y):
-        fig = go.Figure()
-        fig.add_trace(go.Histogram(x=df_filtrado[df_filtrado['Promo'] == 0][metrica], name='Sem Promoção', marker_color=CINZA_NEUTRO, opacity=0.6, histnorm='density', nbinsx=50))
-        fig.add_trace(go.Histogram(x=df_filtrado[df_filtrado['Promo'] == 1][metrica], name='Com Promoção', marker_color=VERMELHO_ROSSMANN, opacity=0.6, histnorm='density', nbinsx=50))
+    def obter_histograma_promocao_geral(resultado, metrica, texto_rotulo_eixo_y, texto_titulo_eixo_y):
+        valores_sem_promocao, valores_com_promocao = resultado.valores_por_promocao(metrica)
+        fig = go.Figure(criar_tracos_histograma(
+            [('Sem Promoção', valores_sem_promocao, CINZA_NEUTRO), ('Com Promoção', valores_com_promocao, VERMELHO_ROSSMANN)],
+            nbins=50, histnorm='density', opacity=0.6
+        ))
         fig.update_layout(
             barmode='overlay',
             title=f'Distribuição Comparativa de {texto_rotulo_eixo_y}',
@@ -164,18 +215,30 @@ def registrar_callbacks_dashboard_geral(aplicativo, dados):
         texto_analise = f"Este histograma de densidade compara a forma da distribuição de {texto_rotulo_eixo_y} para dias com e sem promoção. Curva vermelha à direita indica maiores valores com promoção."
         return fig, texto_analise
 
-    def obter_grafico_impacto_distancia_concorrencia(df_filtrado, metrica, texto_rotulo_eixo_y, texto_titulo_eixo_y):
+    def obter_dados_nivel_loja(resultado, metrica):
+        """
+        Agrega as linhas filtradas por loja (um ponto por loja), reaproveitando o resultado entre chamadas.
+        A agregação é feita pelo motor de consultas; os atributos da loja são obtidos da dimensão
+        de lojas, já no nível de uma linha por loja.
+        """
+        def agregar_por_loja(df):
+            por_loja = obter_motor().agregar(
+                ['Store'],
+                {'MetricValue': (metrica, 'mean'), 'AvgCustomers': ('Customers', 'mean')}, # AvgCustomers: tamanho da bolha
+                *resultado.filtros, df_filtrado=df
+            ).set_index('Store')
+            atributos = atributos_das_lojas(resultado.dimensao_lojas, por_loja.index.to_numpy(), ['CompetitionDistance', 'StoreType'], indice=por_loja.index)
+            por_loja = pd.concat([por_loja, atributos], axis=1)[['MetricValue', 'CompetitionDistance', 'StoreType', 'AvgCustomers']]
+            return por_loja.dropna(subset=['CompetitionDistance', 'MetricValue'])
+        return resultado.agregar(('nivel_loja', metrica), agregar_por_loja)
+
+    def obter_grafico_impacto_distancia_concorrencia(resultado, metrica, texto_rotulo_eixo_y, texto_titulo_eixo_y):
         """
         Gera um gráfico de dispersão (bubble chart) para analisar a relação entre
         a performance da loja, a distância do concorrente, o tipo de loja e o volume de clientes.
         """
         # Agrupar por loja para ter um ponto por loja no gráfico
-        dados_nivel_loja = df_filtrado.groupby('Store').agg(
-            MetricValue=(metrica, 'mean'),
-            CompetitionDistance=('CompetitionDistance', 'first'),
-            StoreType=('StoreType', 'first'),
-            AvgCustomers=('Customers', 'mean') # Usado para o tamanho da bolha
-        ).dropna(subset=['CompetitionDistance', 'MetricValue'])
+        dados_nivel_loja = obter_dados_nivel_loja(resultado, metrica).copy()
 
         if dados_nivel_loja.empty:
             return criar_figura_vazia("Sem dados suficientes para este gráfico."), "Não há lojas com dados de concorrência nos filtros selecionados."
@@ -204,23 +267,23 @@ def registrar_callbacks_dashboard_geral(aplicativo, dados):
         texto_analise = f"Cada bolha representa uma loja. O gráfico mostra a relação entre a {texto_rotulo_eixo_y} (eixo y) e a distância do concorrente (eixo x). O tamanho da bolha indica o volume médio de clientes. É útil para identificar se lojas mais isoladas realmente performam melhor e para encontrar lojas atípicas (ex: perto de concorrentes, mas com alto volume e vendas)."
         return fig, texto_analise
 
-    def obter_grafico_impacto_promo2(df_filtrado, metrica, texto_rotulo_eixo_y, texto_titulo_eixo_y):
-        df_promo2_metrica = df_filtrado.groupby('Promo2')[metrica].mean().reset_index()
+    def obter_grafico_impacto_promo2(resultado, metrica, texto_rotulo_eixo_y, texto_titulo_eixo_y):
+        df_promo2_metrica = resultado.media_por('Promo2', metrica)
         df_promo2_metrica['Promo2_Label'] = df_promo2_metrica['Promo2'].map({0: 'Não Participa', 1: 'Participa'})
         fig = px.bar(df_promo2_metrica, x='Promo2_Label', y=metrica, title=f'Média de {texto_rotulo_eixo_y} (Promo2)', labels={metrica: texto_titulo_eixo_y, 'Promo2_Label': 'Participação em Promo2'}, color='Promo2_Label', color_discrete_map={'Não Participa': CINZA_NEUTRO, 'Participa': VERMELHO_ROSSMANN})
         fig.update_layout(height=ALTURA_GRAFICO, plot_bgcolor='rgba(0,0,0,0)', paper_bgcolor='rgba(0,0,0,0)')
         texto_analise = f"Análise do impacto da 'Promo2' (promoção contínua) na média de {texto_rotulo_eixo_y}. Permite comparar o desempenho de lojas que participam deste programa com as que não participam."
         return fig, texto_analise
 
-    def obter_grafico_impacto_sortimento(df_filtrado, metrica, texto_rotulo_eixo_y, texto_titulo_eixo_y):
-        df_sortimento_metrica = df_filtrado.groupby('Assortment')[metrica].mean().reset_index()
+    def obter_grafico_impacto_sortimento(resultado, metrica, texto_rotulo_eixo_y, texto_titulo_eixo_y):
+        df_sortimento_metrica = resultado.media_por('Assortment', metrica)
         fig = px.bar(df_sortimento_metrica, x='Assortment', y=metrica, title=f'{texto_rotulo_eixo_y} Médio por Tipo de Sortimento', labels={metrica: texto_titulo_eixo_y, 'Assortment': 'Tipo de Sortimento'}, color='Assortment')
         fig.update_layout(height=ALTURA_GRAFICO, plot_bgcolor='rgba(0,0,0,0)', paper_bgcolor='rgba(0,0,0,0)')
         texto_analise = f"O gráfico mostra como diferentes tipos de sortimento (a=básico, b=extra, c=estendido) se relacionam com a performance média da métrica '{texto_rotulo_eixo_y}'."
         return fig, texto_analise
 
-    def obter_grafico_tipo_feriado(df_filtrado, metrica, texto_rotulo_eixo_y, texto_titulo_eixo_y):
-        df_feriado_metrica = df_filtrado.groupby('StateHoliday')[metrica].mean().reset_index()
+    def obter_grafico_tipo_feriado(resultado, metrica, texto_rotulo_eixo_y, texto_titulo_eixo_y):
+        df_feriado_metrica = resultado.media_por('StateHoliday', metrica)
         mapeamento_feriado = {'0': 'Dia Normal', 'a': 'Feriado Público', 'b': 'Páscoa', 'c': 'Natal'}
         df_feriado_metrica['StateHoliday_Label'] = df_feriado_metrica['StateHoliday'].map(mapeamento_feriado)
         ordem = [h for h in mapeamento_feriado.values() if h in df_feriado_metrica['StateHoliday_Label'].unique()]
@@ -229,13 +292,13 @@ def registrar_callbacks_dashboard_geral(aplicativo, dados):
         texto_analise = f"Comparação da média de {texto_rotulo_eixo_y} em dias normais e feriados, destacando o impacto de feriados específicos, quando muitas lojas podem fechar."
         return fig, texto_analise
 
-    def gerar_kpis(df_filtrado):
+    def gerar_kpis(resultado):
         """Gera os KPIs globais."""
-        vendas_totais = df_filtrado['Sales'].sum()
-        vendas_media_dia = df_filtrado['Sales'].mean()
-        clientes_totais = df_filtrado['Customers'].sum()
-        clientes_media_dia = df_filtrado['Customers'].mean()
-        ticket_medio = df_filtrado['SalesPerCustomer'].mean() if df_filtrado['SalesPerCustomer'].count() > 0 else 0
+        vendas_totais = resultado.soma('Sales')
+        vendas_media_dia = resultado.media('Sales')
+        clientes_totais = resultado.soma('Customers')
+        clientes_media_dia = resultado.media('Customers')
+        ticket_medio = resultado.media('SalesPerCustomer') if resultado.contagem('SalesPerCustomer') > 0 else 0
 
         dados_kpi = [
             {"title": "Vendas Totais", "value": f"€{vendas_totais:,.0f}"},
@@ -260,16 +323,20 @@ def registrar_callbacks_dashboard_geral(aplicativo, dados):
             ) for kpi in dados_kpi
         ]
 
-    def gerar_kpis_por_tipo_loja(df_filtrado):
+    def gerar_kpis_por_tipo_loja(resultado):
         """Gera os KPIs por tipo de loja."""
         colunas_kpi_tipo_loja = []
-        tipos_loja_unicos = sorted(df_filtrado['StoreType'].unique())
+        # Médias por tipo de loja; tipos sem ticket médio calculável ficam com 0
+        medias_por_tipo = {
+            metrica: resultado.media_por('StoreType', metrica).set_index('StoreType')[metrica].fillna(0)
+            for metrica in ['Sales', 'Customers', 'SalesPerCustomer']
+        }
+        tipos_loja_unicos = sorted(medias_por_tipo['Sales'].index)
 
         for tipo in tipos_loja_unicos:
-            df_tipo_loja = df_filtrado[df_filtrado['StoreType'] == tipo]
-            media_vendas_tipo = df_tipo_loja['Sales'].mean() if not df_tipo_loja.empty else 0
-            media_clientes_tipo = df_tipo_loja['Customers'].mean() if not df_tipo_loja.empty else 0
-            ticket_medio_tipo = df_tipo_loja['SalesPerCustomer'].mean() if df_tipo_loja['SalesPerCustomer'].count() > 0 else 0
+            media_vendas_tipo = medias_por_tipo['Sales'][tipo]
+            media_clientes_tipo = medias_por_tipo['Customers'][tipo]
+            ticket_medio_tipo = medias_por_tipo['SalesPerCustomer'][tipo]
 
             colunas_kpi_tipo_loja.append(
                 dbc.Col(
@@ -289,9 +356,9 @@ def registrar_callbacks_dashboard_geral(aplicativo, dados):
 
         return colunas_kpi_tipo_loja
 
-    def verificar_valores_zero(df_filtrado):
+    def verificar_valores_zero(resultado):
         """Verifica se há lojas com vendas ou clientes zerados e retorna o alerta apropriado."""
-        if df_filtrado['Sales'].mean() == 0 or df_filtrado['Customers'].mean() == 0:
+        if resultado.media('Sales') == 0 or resultado.media('Customers') == 0:
             texto_alerta = html.P([
                 html.I(className="fas fa-exclamation-triangle me-2"),
                 "Atenção: Os dados filtrados incluem dias com Vendas ou Clientes zero. Isso pode indicar dias em que a loja estava aberta, mas sem registros de movimento. ",
@@ -317,17 +384,28 @@ def registrar_callbacks_dashboard_geral(aplicativo, dados):
         if df_filtrado.empty or metrica not in df_filtrado.columns:
             return criar_figura_vazia("Sem dados para análise de comportamento."), html.P("Filtros selecionados não retornaram dados.")
 
-        fig = px.box(
-            df_filtrado,
-            x='Promo',
-            y=metrica,
-            color='Promo',
-            notched=True,
-            labels={'Promo': 'Promoção Ativa?', metrica: titulo_eixo_y},
-            category_orders={"Promo": [0, 1]},
-            title=f'Distribuição de {titulo_eixo_y.replace(" (€)","")} por Promoção',
-            color_discrete_map={0: CINZA_NEUTRO, 1: VERMELHO_ROSSMANN}
-        )
+        if precisa_resumir(df_filtrado):
+            valores_promocao = valores_por_grupo(df_filtrado, 'Promo', metrica)
+            fig = go.Figure([
+                criar_trace_box_resumido({promo: valores_promocao[promo]}, str(promo), cor, notched=True)
+                for promo, cor in ((0, CINZA_NEUTRO), (1, VERMELHO_ROSSMANN)) if promo in valores_promocao
+            ])
+            fig.update_layout(
+                title=f'Distribuição de {titulo_eixo_y.replace(" (€)","")} por Promoção',
+                xaxis_title='Promoção Ativa?', yaxis_title=titulo_eixo_y, legend_title_text='Promoção Ativa?'
+            )
+        else:
+            fig = px.box(
+                df_filtrado,
+                x='Promo',
+                y=metrica,
+                color='Promo',
+                notched=True,
+                labels={'Promo': 'Promoção Ativa?', metrica: titulo_eixo_y},
+                category_orders={"Promo": [0, 1]},
+                title=f'Distribuição de {titulo_eixo_y.replace(" (€)","")} por Promoção',
+                color_discrete_map={0: CINZA_NEUTRO, 1: VERMELHO_ROSSMANN}
+            )
         fig.update_layout(
             xaxis_tickvals=[0, 1],
             xaxis_ticktext=['Sem Promoção', 'Com Promoção'],
@@ -346,9 +424,9 @@ def registrar_callbacks_dashboard_geral(aplicativo, dados):
 
         return fig, texto_analise
 
-    def obter_grafico_comportamento_sortimento(df_filtrado, metrica):
+    def obter_grafico_comportamento_sortimento(resultado, metrica):
         """Gera um gráfico de barras comparando métricas por tipo de sortimento."""
-        if metrica not in df_filtrado.columns or df_filtrado.empty:
+        if metrica not in resultado.df.columns or resultado.df.empty:
             return criar_figura_vazia("Métrica não disponível para análise de comportamento."), html.P("Filtros selecionados não retornaram dados ou a métrica é inválida.")
 
         mapeamento_metrica = {
@@ -357,7 +435,7 @@ def registrar_callbacks_dashboard_geral(aplicativo, dados):
             'SalesPerCustomer': 'Ticket Médio'
         }
         rotulo_eixo_y = mapeamento_metrica.get(metrica, metrica)
-        df_sortimento_metrica = df_filtrado.groupby('Assortment')[metrica].mean().reset_index()
+        df_sortimento_metrica = resultado.media_por('Assortment', metrica)
         fig = px.bar(df_sortimento_metrica, x='Assortment', y=metrica,
                      title=f'{rotulo_eixo_y} por Sortimento',
                      labels={metrica: f'{rotulo_eixo_y} (€)' if 'Sales' in metrica or 'SalesPerCustomer' in metrica else rotulo_eixo_y, 'Assortment': 'Tipo de Sortimento'},
@@ -455,97 +533,119 @@ def registrar_callbacks_dashboard_geral(aplicativo, dados):
         if not all([metrica_temporal, feriado_estadual_selecionado, feriado_escolar_selecionado]):
             return dash.no_update # Evita erros durante a inicialização
 
-        df_filtrado = filtrar_dataframe(df_principal, data_inicio, data_fim, tipos_loja_selecionados, lojas_especificas_selecionadas, feriado_estadual_selecionado, feriado_escolar_selecionado)
+        def montar_pagina():
+            cronometro = CronometroEtapas('atualizar_pagina_dashboard')
+            with cronometro.etapa('filtro'):
+                resultado = obter_resultado_filtrado(data_inicio, data_fim, tipos_loja_selecionados, lojas_especificas_selecionadas, feriado_estadual_selecionado, feriado_escolar_selecionado)
+                df_filtrado = resultado.df
+
+            if df_filtrado.empty:
+                figura_vazia = criar_figura_vazia("Sem dados para os filtros selecionados")
+                kpis_vazios = [html.Div("Sem dados para os filtros selecionados", className="alert alert-warning")] * 4
+                return (
+                    kpis_vazios,                                     # linha-kpi-dashboard
+                    "Sem dados para os filtros selecionados",        # alerta-vendas-clientes-zero children
+                    {'display': 'block'},                            # alerta-vendas-clientes-zero style
+                    kpis_vazios,                                     # linha-kpi-tipo-loja
+                    figura_vazia,                                    # grafico-vendas-clientes-mensal-dashboard
+                    "Sem dados para os filtros selecionados",        # analise-vendas-clientes-mensal
+                    figura_vazia,                                    # grafico-vendas-clientes-anual-dashboard
+                    "Sem dados para os filtros selecionados",        # analise-vendas-clientes-anual
+                    figura_vazia,                                    # grafico-promocao-por-tipo-loja-dashboard
+                    "Sem dados para os filtros selecionados",        # analise-promocao-por-tipo-loja-dashboard
+                    figura_vazia,                                    # grafico-dia-semana-dashboard
+                    "Sem dados para os filtros selecionados",        # analise-dia-semana
+                    figura_vazia,                                    # grafico-dia-dashboard
+                    "Sem dados para os filtros selecionados",        # analise-dia
+                    figura_vazia,                                    # grafico-impacto-promocao-por-tipo-loja-boxplot
+                    "Sem dados para os filtros selecionados",        # analise-impacto-promocao-por-tipo-loja-boxplot
+                    figura_vazia,                                    # grafico-impacto-promocao-geral-boxplot
+                    "Sem dados para os filtros selecionados",        # analise-impacto-promocao-boxplot
+                    figura_vazia,                                    # grafico-impacto-promocao-geral-hist
+                    "Sem dados para os filtros selecionados",        # analise-impacto-promocao-hist
+                    figura_vazia,                                    # grafico-impacto-distancia-concorrencia
+                    "Sem dados para os filtros selecionados",        # analise-impacto-distancia-concorrencia
+                    figura_vazia,                                    # grafico-impacto-promo2
+                    "Sem dados para os filtros selecionados",        # analise-impacto-promo2
+                    figura_vazia,                                    # grafico-impacto-sortimento
+                    "Sem dados para os filtros selecionados",        # analise-impacto-sortimento
+                    figura_vazia,                                    # grafico-vendas-por-tipo-feriado
+                    "Sem dados para os filtros selecionados"         # analise-vendas-por-tipo-feriado
+                )
+
+            titulo_eixo_y = TITULOS_EIXO_Y[metrica_temporal]
+            rotulo_eixo_y = ROUTULOS_EIXO_Y[metrica_temporal]
+
+            # Agregação em lote: todas as estatísticas da página são calculadas aqui, em poucas passadas
+            # (um agrupamento por dimensão para todas as métricas), e os gráficos abaixo apenas as leem.
+            with cronometro.etapa('totais'):
+                resultado.preparar_totais(METRICAS_KPI)
+            with cronometro.etapa('dimensoes'):
+                resultado.preparar_medias(['StoreType'], METRICAS_KPI)
+                resultado.preparar_medias(DIMENSOES_DASHBOARD, [metrica_temporal])
+            with cronometro.etapa('linhas'):
+                resultado.valores_por_promocao(metrica_temporal)
+                obter_dados_nivel_loja(resultado, metrica_temporal)
+
+            with cronometro.etapa('graficos'):
+                # Gera os KPIs
+                linha_kpis = gerar_kpis(resultado)
+                linha_kpis_tipo_loja = gerar_kpis_por_tipo_loja(resultado)
+
+                # Verifica se há lojas com vendas ou clientes zerados
+                alerta_zero_filhos, estilo_alerta_zero = verificar_valores_zero(resultado)
+
+                # A variável filtro_loja_especifica_ativo não é mais necessária para o obter_grafico_serie_temporal,
+                # pois a lógica de qual agrupamento usar foi movida para dentro da função.
+                fig_vendas_clientes_mensal, analise_mensal_text = obter_grafico_media_mensal(resultado, metrica_temporal, rotulo_eixo_y, titulo_eixo_y)
+                fig_vendas_clientes_anual, analise_vendas_clientes_anual_text = obter_grafico_media_anual(resultado, metrica_temporal, rotulo_eixo_y, titulo_eixo_y)
+                fig_promocao_tipo_loja, analise_promocao_tipo_loja_text = obter_grafico_promocao_tipo_loja(resultado, metrica_temporal, rotulo_eixo_y, titulo_eixo_y)
+                fig_dia_semana, analise_dia_semana_text = obter_grafico_dia_semana(resultado, metrica_temporal, rotulo_eixo_y, titulo_eixo_y)
+                fig_dia, analise_dia_text = obter_grafico_dia_do_mes(resultado, metrica_temporal, rotulo_eixo_y, titulo_eixo_y)
+                fig_impacto_promocao_tipo_loja_boxplot, analise_impacto_promocao_tipo_loja_boxplot_text = obter_boxplot_promocao_tipo_loja(resultado.com_atributos_loja(['Store', 'Promo', metrica_temporal], ['StoreType']), metrica_temporal, rotulo_eixo_y, titulo_eixo_y)
+                fig_impacto_promocao_geral_boxplot, analise_impacto_promocao_boxplot_text = obter_boxplot_promocao_geral(resultado, metrica_temporal, rotulo_eixo_y, titulo_eixo_y)
+                fig_impacto_promocao_geral_hist, analise_impacto_promocao_hist_text = obter_histograma_promocao_geral(resultado, metrica_temporal, rotulo_eixo_y, titulo_eixo_y)
+                fig_impacto_distancia_concorrencia, analise_impacto_distancia_concorrencia_text = obter_grafico_impacto_distancia_concorrencia(resultado, metrica_temporal, rotulo_eixo_y, titulo_eixo_y)
+                fig_impacto_promo2, analise_impacto_promo2_text = obter_grafico_impacto_promo2(resultado, metrica_temporal, rotulo_eixo_y, titulo_eixo_y)
+                fig_impacto_sortimento, analise_impacto_sortimento_text = obter_grafico_impacto_sortimento(resultado, metrica_temporal, rotulo_eixo_y, titulo_eixo_y)
+                fig_vendas_por_tipo_feriado, analise_vendas_por_tipo_feriado_text = obter_grafico_tipo_feriado(resultado, metrica_temporal, rotulo_eixo_y, titulo_eixo_y)
+
+            cronometro.registrar()
 
-        if df_filtrado.empty:
-            figura_vazia = criar_figura_vazia("Sem dados para os filtros selecionados")
-            kpis_vazios = [html.Div("Sem dados para os filtros selecionados", className="alert alert-warning")] * 4
             return (
-                kpis_vazios,                                     # linha-kpi-dashboard
-                "Sem dados para os filtros selecionados",        # alerta-vendas-clientes-zero children
-                {'display': 'block'},                            # alerta-vendas-clientes-zero style
-                kpis_vazios,                                     # linha-kpi-tipo-loja
-                figura_vazia,                                    # grafico-vendas-clientes-mensal-dashboard
-                "Sem dados para os filtros selecionados",        # analise-vendas-clientes-mensal
-                figura_vazia,                                    # grafico-vendas-clientes-anual-dashboard
-                "Sem dados para os filtros selecionados",        # analise-vendas-clientes-anual
-                figura_vazia,                                    # grafico-promocao-por-tipo-loja-dashboard
-                "Sem dados para os filtros selecionados",        # analise-promocao-por-tipo-loja-dashboard
-                figura_vazia,                                    # grafico-dia-semana-dashboard
-                "Sem dados para os filtros selecionados",        # analise-dia-semana
-                figura_vazia,                                    # grafico-dia-dashboard
-                "Sem dados para os filtros selecionados",        # analise-dia
-                figura_vazia,                                    # grafico-impacto-promocao-por-tipo-loja-boxplot
-                "Sem dados para os filtros selecionados",        # analise-impacto-promocao-por-tipo-loja-boxplot
-                figura_vazia,                                    # grafico-impacto-promocao-geral-boxplot
-                "Sem dados para os filtros selecionados",        # analise-impacto-promocao-boxplot
-                figura_vazia,                                    # grafico-impacto-promocao-geral-hist
-                "Sem dados para os filtros selecionados",        # analise-impacto-promocao-hist
-                figura_vazia,                                    # grafico-impacto-distancia-concorrencia
-                "Sem dados para os filtros selecionados",        # analise-impacto-distancia-concorrencia
-                figura_vazia,                                    # grafico-impacto-promo2
-                "Sem dados para os filtros selecionados",        # analise-impacto-promo2
-                figura_vazia,                                    # grafico-impacto-sortimento
-                "Sem dados para os filtros selecionados",        # analise-impacto-sortimento
-                figura_vazia,                                    # grafico-vendas-por-tipo-feriado
-                "Sem dados para os filtros selecionados"         # analise-vendas-por-tipo-feriado
+                linha_kpis,                                    # linha-kpi-dashboard
+                alerta_zero_filhos,                            # alerta-vendas-clientes-zero children
+                estilo_alerta_zero,                            # alerta-vendas-clientes-zero style
+                linha_kpis_tipo_loja,                          # linha-kpi-tipo-loja
+                fig_vendas_clientes_mensal,                    # grafico-vendas-clientes-mensal-dashboard
+                analise_mensal_text,                           # analise-vendas-clientes-mensal
+                fig_vendas_clientes_anual,                     # grafico-vendas-clientes-anual-dashboard
+                analise_vendas_clientes_anual_text,            # analise-vendas-clientes-anual
+                fig_promocao_tipo_loja,                        # grafico-promocao-por-tipo-loja-dashboard
+                analise_promocao_tipo_loja_text,               # analise-promocao-por-tipo-loja-dashboard
+                fig_dia_semana,                                # grafico-dia-semana-dashboard
+                analise_dia_semana_text,                       # analise-dia-semana
+                fig_dia,                                       # grafico-dia-dashboard
+                analise_dia_text,                              # analise-dia
+                fig_impacto_promocao_tipo_loja_boxplot,        # grafico-impacto-promocao-por-tipo-loja-boxplot
+                analise_impacto_promocao_tipo_loja_boxplot_text, # analise-impacto-promocao-por-tipo-loja-boxplot
+                fig_impacto_promocao_geral_boxplot,            # grafico-impacto-promocao-geral-boxplot
+                analise_impacto_promocao_boxplot_text,         # analise-impacto-promocao-boxplot
+                fig_impacto_promocao_geral_hist,               # grafico-impacto-promocao-geral-hist
+                analise_impacto_promocao_hist_text,            # analise-impacto-promocao-hist
+                fig_impacto_distancia_concorrencia,            # grafico-impacto-distancia-concorrencia
+                analise_impacto_distancia_concorrencia_text,   # analise-impacto-distancia-concorrencia
+                fig_impacto_promo2,                            # grafico-impacto-promo2
+                analise_impacto_promo2_text,                   # analise-impacto-promo2
+                fig_impacto_sortimento,                        # grafico-impacto-sortimento
+                analise_impacto_sortimento_text,               # analise-impacto-sortimento
+                fig_vendas_por_tipo_feriado,                   # grafico-vendas-por-tipo-feriado
+                analise_vendas_por_tipo_feriado_text           # analise-vendas-por-tipo-feriado
             )
 
-        titulo_eixo_y = TITULOS_EIXO_Y[metrica_temporal]
-        rotulo_eixo_y = ROUTULOS_EIXO_Y[metrica_temporal]
-
-        # Gera os KPIs
-        linha_kpis = gerar_kpis(df_filtrado)
-        linha_kpis_tipo_loja = gerar_kpis_por_tipo_loja(df_filtrado)
-
-        # Verifica se há lojas com vendas ou clientes zerados
-        alerta_zero_filhos, estilo_alerta_zero = verificar_valores_zero(df_filtrado)
-
-        # A variável filtro_loja_especifica_ativo não é mais necessária para o obter_grafico_serie_temporal,
-        # pois a lógica de qual agrupamento usar foi movida para dentro da função.
-        fig_vendas_clientes_mensal, analise_mensal_text = obter_grafico_media_mensal(df_filtrado, metrica_temporal, rotulo_eixo_y, titulo_eixo_y)
-        fig_vendas_clientes_anual, analise_vendas_clientes_anual_text = obter_grafico_media_anual(df_filtrado, metrica_temporal, rotulo_eixo_y, titulo_eixo_y)
-        fig_promocao_tipo_loja, analise_promocao_tipo_loja_text = obter_grafico_promocao_tipo_loja(df_filtrado, metrica_temporal, rotulo_eixo_y, titulo_eixo_y)
-        fig_dia_semana, analise_dia_semana_text = obter_grafico_dia_semana(df_filtrado, metrica_temporal, rotulo_eixo_y, titulo_eixo_y)
-        fig_dia, analise_dia_text = obter_grafico_dia_do_mes(df_filtrado, metrica_temporal, rotulo_eixo_y, titulo_eixo_y)
-        fig_impacto_promocao_tipo_loja_boxplot, analise_impacto_promocao_tipo_loja_boxplot_text = obter_boxplot_promocao_tipo_loja(df_filtrado, metrica_temporal, rotulo_eixo_y, titulo_eixo_y)
-        fig_impacto_promocao_geral_boxplot, analise_impacto_promocao_boxplot_text = obter_boxplot_promocao_geral(df_filtrado, metrica_temporal, rotulo_eixo_y, titulo_eixo_y)
-        fig_impacto_promocao_geral_hist, analise_impacto_promocao_hist_text = obter_histograma_promocao_geral(df_filtrado, metrica_temporal, rotulo_eixo_y, titulo_eixo_y)
-        fig_impacto_distancia_concorrencia, analise_impacto_distancia_concorrencia_text = obter_grafico_impacto_distancia_concorrencia(df_filtrado, metrica_temporal, rotulo_eixo_y, titulo_eixo_y)
-        fig_impacto_promo2, analise_impacto_promo2_text = obter_grafico_impacto_promo2(df_filtrado, metrica_temporal, rotulo_eixo_y, titulo_eixo_y)
-        fig_impacto_sortimento, analise_impacto_sortimento_text = obter_grafico_impacto_sortimento(df_filtrado, metrica_temporal, rotulo_eixo_y, titulo_eixo_y)
-        fig_vendas_por_tipo_feriado, analise_vendas_por_tipo_feriado_text = obter_grafico_tipo_feriado(df_filtrado, metrica_temporal, rotulo_eixo_y, titulo_eixo_y)
-
-        return (
-            linha_kpis,                                    # linha-kpi-dashboard
-            alerta_zero_filhos,                            # alerta-vendas-clientes-zero children
-            estilo_alerta_zero,                            # alerta-vendas-clientes-zero style
-            linha_kpis_tipo_loja,                          # linha-kpi-tipo-loja
-            fig_vendas_clientes_mensal,                    # grafico-vendas-clientes-mensal-dashboard
-            analise_mensal_text,                           # analise-vendas-clientes-mensal
-            fig_vendas_clientes_anual,                     # grafico-vendas-clientes-anual-dashboard
-            analise_vendas_clientes_anual_text,            # analise-vendas-clientes-anual
-            fig_promocao_tipo_loja,                        # grafico-promocao-por-tipo-loja-dashboard
-            analise_promocao_tipo_loja_text,               # analise-promocao-por-tipo-loja-dashboard
-            fig_dia_semana,                                # grafico-dia-semana-dashboard
-            analise_dia_semana_text,                       # analise-dia-semana
-            fig_dia,                                       # grafico-dia-dashboard
-            analise_dia_text,                              # analise-dia
-            fig_impacto_promocao_tipo_loja_boxplot,        # grafico-impacto-promocao-por-tipo-loja-boxplot
-            analise_impacto_promocao_tipo_loja_boxplot_text, # analise-impacto-promocao-por-tipo-loja-boxplot
-            fig_impacto_promocao_geral_boxplot,            # grafico-impacto-promocao-geral-boxplot
-            analise_impacto_promocao_boxplot_text,         # analise-impacto-promocao-boxplot
-            fig_impacto_promocao_geral_hist,               # grafico-impacto-promocao-geral-hist
-            analise_impacto_promocao_hist_text,            # analise-impacto-promocao-hist
-            fig_impacto_distancia_concorrencia,            # grafico-impacto-distancia-concorrencia
-            analise_impacto_distancia_concorrencia_text,   # analise-impacto-distancia-concorrencia
-            fig_impacto_promo2,                            # grafico-impacto-promo2
-            analise_impacto_promo2_text,                   # analise-impacto-promo2
-            fig_impacto_sortimento,                        # grafico-impacto-sortimento
-            analise_impacto_sortimento_text,               # analise-impacto-sortimento
-            fig_vendas_por_tipo_feriado,                   # grafico-vendas-por-tipo-feriado
-            analise_vendas_por_tipo_feriado_text           # analise-vendas-por-tipo-feriado
-        )
+        # Mesma combinação de filtros e métrica já servida (a outra sessão ou antes): resposta pronta do cache
+        filtros = (data_inicio, data_fim, tipos_loja_selecionados, lojas_especificas_selecionadas, feriado_estadual_selecionado, feriado_escolar_selecionado)
+        return saida_dashboard_em_cache('pagina-dashboard', filtros, metrica_temporal, montar_pagina)
 
     # --- Callbacks de Análise de Comportamento ---
     @aplicativo.callback(
@@ -563,14 +663,17 @@ def registrar_callbacks_dashboard_geral(aplicativo, dados):
         if not metrica or not data_inicio or not data_fim: # Adiciona verificação para os novos inputs
             return dash.no_update, dash.no_update
 
-        # Aplica os filtros globais ANTES de passar para a função do gráfico
-        df_filtrado_global = filtrar_dataframe(df_principal, data_inicio, data_fim, tipos_loja, lojas_especificas, feriado_estadual, feriado_escolar)
+        def construir():
+            # Aplica os filtros globais ANTES de passar para a função do gráfico
+            df_filtrado_global = obter_resultado_filtrado(data_inicio, data_fim, tipos_loja, lojas_especificas, feriado_estadual, feriado_escolar).df
 
-        if df_filtrado_global.empty: # Verifica se há dados após o filtro
-            return criar_figura_vazia("Sem dados para os filtros selecionados."), "Não há dados disponíveis para os filtros selecionados."
+            if df_filtrado_global.empty: # Verifica se há dados após o filtro
+                return criar_figura_vazia("Sem dados para os filtros selecionados."), "Não há dados disponíveis para os filtros selecionados."
 
-        fig, texto_analise = obter_grafico_comportamento_promocao(df_filtrado_global, metrica)
-        return fig, texto_analise
+            return obter_grafico_comportamento_promocao(df_filtrado_global, metrica)
+
+        filtros = (data_inicio, data_fim, tipos_loja, lojas_especificas, feriado_estadual, feriado_escolar)
+        return saida_dashboard_em_cache('grafico-comportamento-promocao-boxplot', filtros, metrica, construir)
 
     @aplicativo.callback(
         [Output('grafico-comportamento-sortimento-barras', 'figure'),
@@ -587,14 +690,17 @@ def registrar_callbacks_dashboard_geral(aplicativo, dados):
         if not metrica or not data_inicio or not data_fim: # Adiciona verificação para os novos inputs
             return dash.no_update, dash.no_update
 
-        # Aplica os filtros globais ANTES de passar para a função do gráfico
-        df_filtrado_global = filtrar_dataframe(df_principal, data_inicio, data_fim, tipos_loja, lojas_especificas, feriado_estadual, feriado_escolar)
+        def construir():
+            # Aplica os filtros globais ANTES de passar para a função do gráfico
+            resultado_global = obter_resultado_filtrado(data_inicio, data_fim, tipos_loja, lojas_especificas, feriado_estadual, feriado_escolar)
 
-        if df_filtrado_global.empty: # Verifica se há dados após o filtro
-            return criar_figura_vazia("Sem dados para os filtros selecionados."), "Não há dados disponíveis para os filtros selecionados."
+            if resultado_global.df.empty: # Verifica se há dados após o filtro
+                return criar_figura_vazia("Sem dados para os filtros selecionados."), "Não há dados disponíveis para os filtros selecionados."
 
-        fig, texto_analise = obter_grafico_comportamento_sortimento(df_filtrado_global, metrica)
-        return fig, texto_analise
+            return obter_grafico_comportamento_sortimento(resultado_global, metrica)
+
+        filtros = (data_inicio, data_fim, tipos_loja, lojas_especificas, feriado_estadual, feriado_escolar)
+        return saida_dashboard_em_cache('grafico-comportamento-sortimento-barras', filtros, metrica, construir)
 
     @aplicativo.callback(
         [Output('grafico-vendas-clientes-tempo-dashboard', 'figure'),
@@ -606,25 +712,45 @@ def registrar_callbacks_dashboard_geral(aplicativo, dados):
          Input('dashboard-filtro-tipo-loja', 'value'),
          Input('dashboard-filtro-loja-especifica', 'value'),
          Input('dashboard-filtro-feriado-estadual', 'value'),
-         Input('dashboard-filtro-feriado-escolar', 'value')]
+         Input('dashboard-filtro-feriado-escolar', 'value'),
+         Input('grafico-vendas-clientes-tempo-dashboard', 'relayoutData')]
     )
-    def atualizar_grafico_serie_temporal(granularidade, metrica, data_inicio, data_fim, tipos_loja, lojas_especificas, feriado_estadual, feriado_escolar):
+    def atualizar_grafico_serie_temporal(granularidade, metrica, data_inicio, data_fim, tipos_loja, lojas_especificas, feriado_estadual, feriado_escolar, dados_relayout):
         """Atualiza o gráfico de tendências temporais, respeitando os filtros globais."""
-        # O filtro de granularidade é independente, mas os dados base já são filtrados globalmente
-        df_filtrado = filtrar_dataframe(df_principal, data_inicio, data_fim, tipos_loja, lojas_especificas, feriado_estadual, feriado_escolar)
-
-        if df_filtrado.empty:
-            return criar_figura_vazia("Sem dados para o período selecionado."), "Não há dados disponíveis para os filtros selecionados."
-
-        titulo_eixo_y = TITULOS_EIXO_Y[metrica]
-        rotulo_eixo_y = ROUTULOS_EIXO_Y[metrica]
-
-        # Passa a informação se lojas específicas foram selecionadas para a lógica de agrupamento dentro da função
-        return obter_grafico_serie_temporal(
-            df_filtrado,
-            granularidade,
-            metrica,
-            rotulo_eixo_y,
-            titulo_eixo_y,
-            len(lojas_especificas) > 0 # Booleano para indicar se é para agrupar por loja ou tipo de loja
-        )
\ No newline at end of file
+        # Zoom no eixo de datas: as linhas são reduzidas de novo só para a faixa visível
+        # (sem relayoutData, como na carga inicial ou fora de uma requisição do Dash, não há zoom a tratar)
+        faixa_x = None
+        if dados_relayout and ctx.triggered_id == 'grafico-vendas-clientes-tempo-dashboard':
+            faixa_x = faixa_visivel(dados_relayout, 'xaxis', converter=pd.Timestamp)
+            if faixa_x is None and not dados_relayout.get('xaxis.autorange'):
+                return dash.no_update, dash.no_update  # Evento sem mudança de faixa (ex.: autosize)
+
+        def construir():
+            # O filtro de granularidade é independente, mas os dados base já são filtrados globalmente
+            resultado = obter_resultado_filtrado(data_inicio, data_fim, tipos_loja, lojas_especificas, feriado_estadual, feriado_escolar)
+
+            if resultado.df.empty:
+                return criar_figura_vazia("Sem dados para o período selecionado."), "Não há dados disponíveis para os filtros selecionados."
+
+            titulo_eixo_y = TITULOS_EIXO_Y[metrica]
+            rotulo_eixo_y = ROUTULOS_EIXO_Y[metrica]
+
+            # Passa a informação se lojas específicas foram selecionadas para a lógica de agrupamento dentro da função
+            return obter_grafico_serie_temporal(
+                resultado,
+                granularidade,
+                metrica,
+                rotulo_eixo_y,
+                titulo_eixo_y,
+                len(lojas_especificas) > 0, # Booleano para indicar se é para agrupar por loja ou tipo de loja
+                faixa_x
+            )
+
+        if faixa_x is not None:
+            fig, texto_analise = construir()
+            faixa_y = faixa_visivel(dados_relayout, 'yaxis')
+            if faixa_y is not None:
+                fig.update_yaxes(range=faixa_y)
+            return fig, texto_analise
+        filtros = (data_inicio, data_fim, tipos_loja, lojas_especificas, feriado_estadual, feriado_escolar)
+        return saida_dashboard_em_cache('grafico-vendas-clientes-tempo-dashboard', filtros, (granularidade, metrica), construir)
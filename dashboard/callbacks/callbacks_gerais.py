@@ -1,16 +1,21 @@
 # dashboard/callbacks/callbacks_gerais.py
-from dash import Input, Output, html, dcc, State, callback, ctx
+from dash import Input, Output, html, dcc, State, callback, ClientsideFunction
 import dash
-import pandas as pd
+import json
 
 from ..config import AZUL_DESTAQUE, VERDE_DESTAQUE, DESCRICOES_COLUNAS # Importar DESCRICOES_COLUNAS
-from ..utils import filtrar_dataframe
+from ..repositorio_dados import obter_dados, obter_dados_atuais
+from ..dimensao_lojas import COLUNAS_DIMENSAO_LOJAS, lojas_dos_tipos
+from ..exportacao import registrar_rota_exportacao, url_exportacao
+from ..layouts.paginas import PAGINAS, caminho_da_pagina, obter_layout_pagina
 
-def registrar_callbacks_gerais(aplicativo, dados):
-    df_principal = dados["df_principal"]
+def registrar_callbacks_gerais(aplicativo):
+    # Os DataFrames são resolvidos a cada chamada (obter_dados_atuais), para acompanhar recargas dos dados
 
-    # --- Callback para o estado da Barra Lateral ---
-    @aplicativo.callback(
+    # --- Callback para o estado da Barra Lateral (Clientside, assets/js/navegacao.js) ---
+    # Alterna a classe 'collapsed' da barra lateral e do conteúdo, salva o estado e troca o ícone e o logo
+    aplicativo.clientside_callback(
+        ClientsideFunction(namespace='navegacao', function_name='alternarBarraLateral'),
         [
             Output('barra-lateral', 'className'),
             Output('conteudo-pagina', 'className'),
@@ -25,104 +30,61 @@ def registrar_callbacks_gerais(aplicativo, dados):
             State('armazenamento-estado-barra-lateral', 'data')
         ]
     )
-    def alternar_sidebar(n_clicks, estado_atual):
-        """
-        Alterna a classe 'collapsed' para a barra lateral e para o contêiner de conteúdo,
-        controlando a visibilidade da barra lateral. Também salva o estado e troca o logo.
-        """
 
-        if n_clicks is None:
-            estado_aplicar = estado_atual or 'expanded'
-        else:
-            estado_aplicar = 'collapsed' if estado_atual == 'expanded' else 'expanded'
-
-        if estado_aplicar == 'collapsed':
-            classe_barra_lateral = 'sidebar d-flex flex-column collapsed'
-            classe_conteudo = 'content collapsed'
-            classe_icone = 'fas fa-angle-double-right'
-            src_logo = '/assets/images/rossmann_logo1.png'
-        else: # 'expanded'
-            classe_barra_lateral = 'sidebar d-flex flex-column'
-            classe_conteudo = 'content'
-            classe_icone = 'fas fa-angle-double-left'
-            src_logo = '/assets/images/rossmann_logo2.png'
-
-        return classe_barra_lateral, classe_conteudo, estado_aplicar, classe_icone, src_logo
-
-    # --- Callback Principal para Navegação entre Páginas (Modo Pré-carregado) ---
-    PAGINAS = [
-        "/",
-        "/limpeza-dados",
-        "/analise-preliminar",
-        "/dashboard",
-        "/analise-lojas",
-        "/analise-3d",
-        "/previsao-vendas",
-    ]
-
-    @aplicativo.callback(
+    # --- Callback Principal para Navegação entre Páginas (Clientside) ---
+    # Apenas altera o 'display' dos contêineres; o conteúdo é montado por `montar_pagina_visitada`
+    aplicativo.clientside_callback(
+        f"""
+        function(caminho_pagina) {{
+            return window.dash_clientside.navegacao.exibirPagina(caminho_pagina, {json.dumps(PAGINAS)});
+        }}
+        """,
         [Output(f'conteudo-pagina-{pagina}', 'style') for pagina in PAGINAS],
         [Input('url', 'pathname')]
     )
-    def renderizar_conteudo_pagina(caminho_pagina):
+
+    # --- Montagem das Páginas sob Demanda ---
+    @aplicativo.callback(
+        [Output(f'conteudo-pagina-{pagina}', 'children') for pagina in PAGINAS]
+        + [Output('armazenamento-paginas-montadas', 'data')],
+        [Input('url', 'pathname')],
+        [State('armazenamento-paginas-montadas', 'data'),
+         State('armazenamento-df-principal', 'data')]
+    )
+    def montar_pagina_visitada(caminho_pagina, paginas_montadas, versao_dados):
         """
-        Alterna a visibilidade dos contêineres de página com base na URL.
-        Em vez de recriar o layout, apenas altera a propriedade CSS 'display'.
+        Monta o conteúdo da página na primeira visita da sessão. As demais continuam vazias, e os
+        callbacks delas só disparam quando seus componentes entram no layout.
         """
-        estilos = [{'display': 'none'}] * len(PAGINAS)
-
-        try:
-            idx = PAGINAS.index(caminho_pagina) if caminho_pagina in PAGINAS else 0
-        except ValueError:
-            idx = 0
-
-        estilos[idx] = {'display': 'block'}
-
-        return estilos
-
-    # --- Callback para Tela Cheia (Clientside) ---
+        pagina = caminho_da_pagina(caminho_pagina)
+        paginas_montadas = paginas_montadas or []
+        if pagina in paginas_montadas:
+            return [dash.no_update] * (len(PAGINAS) + 1)
+
+        # A página usa a mesma versão dos dados que o restante da sessão
+        dados = obter_dados(versao_dados) or obter_dados_atuais()
+        conteudos = [dash.no_update] * len(PAGINAS)
+        conteudos[PAGINAS.index(pagina)] = obter_layout_pagina(pagina, dados)
+        return conteudos + [paginas_montadas + [pagina]]
+
+    # --- Callback para Tela Cheia (Clientside, assets/js/tela_cheia.js) ---
     aplicativo.clientside_callback(
-        """
-        function(n_clicks) {
-            if (n_clicks) {
-                if (!document.fullscreenElement) {
-                    document.documentElement.requestFullscreen();
-                } else {
-                    if (document.exitFullscreen) {
-                        document.exitFullscreen();
-                    }
-                }
-            }
-            return dash_clientside.no_update;
-        }
-        """,
+        ClientsideFunction(namespace='telaCheia', function_name='alternarTelaCheia'),
         Output({'type': 'saida-tela-cheia', 'index': dash.dependencies.MATCH}, 'data'),
         Input({'type': 'botao-tela-cheia', 'index': dash.dependencies.MATCH}, 'n_clicks'),
         prevent_initial_call=True
     )
 
-    # --- Callback Combinado para Validação de Datas ---
-    @aplicativo.callback(
+    # --- Callback Combinado para Validação de Datas (Clientside, assets/js/navegacao.js) ---
+    # Início depois da última data do dataset: a data final vira essa data; depois da data final: vira o início
+    aplicativo.clientside_callback(
+        ClientsideFunction(namespace='navegacao', function_name='validarDatas'),
         Output('filtro-data', 'end_date', allow_duplicate=True),
         Input('filtro-data', 'start_date'),
         Input('filtro-data', 'end_date'),
+        State('filtro-data', 'max_date_allowed'),
         prevent_initial_call=True
     )
-    def validar_datas(data_inicio, data_fim):
-        contexto = ctx
-        if not contexto.triggered:
-            return dash.no_update
-
-        id_gatilho = contexto.triggered[0]['prop_id'].split('.')[0]
-
-        if id_gatilho == 'filtro-data':
-            if data_inicio:
-                data_inicio_dt = pd.to_datetime(data_inicio)
-                if data_inicio_dt > pd.to_datetime(df_principal['Date'].max()):
-                    return df_principal['Date'].max().date()
-                if data_fim and data_inicio_dt > pd.to_datetime(data_fim):
-                    return data_inicio
-        return dash.no_update
 
     # --- Callback para Atualizar Opções de Lojas Específicas ---
     @aplicativo.callback(
@@ -135,7 +97,7 @@ def registrar_callbacks_gerais(aplicativo, dados):
         if not tipos_loja_selecionados:
             return [], []
 
-        lojas_filtradas = df_principal[df_principal['StoreType'].isin(tipos_loja_selecionados)]['Store'].unique()
+        lojas_filtradas = lojas_dos_tipos(obter_dados_atuais()["dimensao_lojas"], tipos_loja_selecionados)
         opcoes = [{'label': str(s), 'value': s} for s in sorted(lojas_filtradas)]
         return opcoes, [] # Limpa a seleção atual ao mudar os tipos de loja
 
@@ -159,10 +121,12 @@ def registrar_callbacks_gerais(aplicativo, dados):
     )
     def resetar_filtros(n_clicks):
         if n_clicks:
+            dados = obter_dados_atuais()
+            df_principal = dados["df_principal"]
             return (
                 df_principal['Date'].min().date(),
                 df_principal['Date'].max().date(),
-                sorted(df_principal['StoreType'].unique()),
+                sorted(dados["dimensao_lojas"]['StoreType'].unique()),
                 [], # Resetar seleção de lojas específicas
                 'M', # Permanece sem prefixo
                 'Sales', # Valor padrão para métrica temporal
@@ -173,25 +137,30 @@ def registrar_callbacks_gerais(aplicativo, dados):
             )
         return dash.no_update
 
-    # --- Callback para Download dos Dados Filtrados ---
+    # --- Link para Download dos Dados Filtrados ---
+    # O arquivo é gerado e enviado em blocos pela rota de exportação do servidor (ver exportacao.py);
+    # o callback só mantém o link do botão de acordo com os filtros, o formato e as colunas escolhidas
+    registrar_rota_exportacao(aplicativo.server)
+
     @aplicativo.callback(
-        Output("download-df-csv", "data"),
-        Input("dashboard-botao-baixar-dados-filtrados", "n_clicks"),
+        Output('dashboard-botao-baixar-dados-filtrados', 'href'),
         [
-            dash.State('dashboard-filtro-data', 'start_date'),
-            dash.State('dashboard-filtro-data', 'end_date'),
-            dash.State('dashboard-filtro-tipo-loja', 'value'),
-            dash.State('dashboard-filtro-loja-especifica', 'value'),
-            dash.State('dashboard-filtro-feriado-estadual', 'value'),
-            dash.State('dashboard-filtro-feriado-escolar', 'value')
+            Input('dashboard-formato-exportacao', 'value'),
+            Input('dashboard-colunas-exportacao', 'value'),
+            Input('dashboard-filtro-data', 'start_date'),
+            Input('dashboard-filtro-data', 'end_date'),
+            Input('dashboard-filtro-tipo-loja', 'value'),
+            Input('dashboard-filtro-loja-especifica', 'value'),
+            Input('dashboard-filtro-feriado-estadual', 'value'),
+            Input('dashboard-filtro-feriado-escolar', 'value')
         ],
-        prevent_initial_call=True,
+        State('armazenamento-df-principal', 'data')
     )
-    def baixar_dados_filtrados(n_clicks, data_inicio, data_fim, tipos_loja_selecionados, lojas_especificas_selecionadas, feriado_estadual_selecionado, feriado_escolar_selecionado):
-        if n_clicks:
-            df_download = filtrar_dataframe(df_principal, data_inicio, data_fim, tipos_loja_selecionados, lojas_especificas_selecionadas, feriado_estadual_selecionado, feriado_escolar_selecionado)
-            return dcc.send_data_frame(df_download.to_csv, f"rossmann_dados_filtrados_{data_inicio}_a_{data_fim}.csv", index=False)
-        return dash.no_update
+    def atualizar_link_exportacao(formato, colunas, data_inicio, data_fim, tipos_loja_selecionados, lojas_especificas_selecionadas, feriado_estadual_selecionado, feriado_escolar_selecionado, versao_dados):
+        return url_exportacao(
+            aplicativo, formato or 'csv', data_inicio, data_fim, tipos_loja_selecionados, lojas_especificas_selecionadas,
+            feriado_estadual_selecionado, feriado_escolar_selecionado, colunas, versao_dados
+        )
 
     @aplicativo.callback(
         Output('saida-descricao-coluna', 'children'),
@@ -207,11 +176,7 @@ def registrar_callbacks_gerais(aplicativo, dados):
 
         descricao = DESCRICOES_COLUNAS.get(coluna_selecionada, "Descrição não disponível.")
 
-        colunas_loja = ['StoreType', 'Assortment', 'CompetitionDistance',
-                        'CompetitionOpenSinceMonth', 'CompetitionOpenSinceYear',
-                        'Promo2', 'Promo2SinceWeek', 'Promo2SinceYear', 'PromoInterval']
-
-        eh_coluna_loja = coluna_selecionada in colunas_loja
+        eh_coluna_loja = coluna_selecionada in COLUNAS_DIMENSAO_LOJAS
 
         estilo_indicador = {
             'backgroundColor': VERDE_DESTAQUE if eh_coluna_loja else AZUL_DESTAQUE,
@@ -1,3 +1,5 @@
+import os
+
 # --- Cores da Paleta (Baseadas na Logo e expandida para UI) ---
 VERMELHO_ROSSMANN = '#E3001B'
 AZUL_ESCURO = '#002346'  # Um azul escuro corporativo para textos e elementos
@@ -22,6 +24,61 @@ ORDEM_DIAS_SEMANA = list(MAPEAMENTO_DIAS_SEMANA.values())
 # --- Constantes de Gráficos ---
 ALTURA_GRAFICO, ALTURA_GRAFICO_LARGURA_TOTAL = 450, 550
 
+# --- Constantes de Cache ---
+# Resultados de filtro do dashboard geral reaproveitados entre callbacks (por worker)
+MAX_ENTRADAS_CACHE_FILTROS = 16
+MAX_MB_CACHE_FILTROS = 256
+# Figuras já serializadas por gráfico e combinação de filtros (ver cache.saida_em_cache), por worker
+MAX_ENTRADAS_CACHE_FIGURAS = 512
+MAX_MB_CACHE_FIGURAS = 128
+TTL_CACHE_FIGURAS_S = float(os.environ.get('DASHBOARD_TTL_CACHE_FIGURAS', '600'))
+# Rankings de lojas (valor da métrica por loja) por métrica e combinação de filtros (ver ranking.py), por worker
+MAX_ENTRADAS_CACHE_RANKINGS = 64
+
+# --- Instrumentação ---
+# Com DASHBOARD_MEDIR_TEMPOS=1 os callbacks instrumentados imprimem o tempo de cada etapa
+MEDIR_TEMPOS_CALLBACKS = os.environ.get('DASHBOARD_MEDIR_TEMPOS', '0') == '1'
+
+# --- Dados compartilhados entre workers ---
+# Com DASHBOARD_DADOS_COMPARTILHADOS=0 cada processo carrega sua própria cópia dos dados
+USAR_DADOS_COMPARTILHADOS = os.environ.get('DASHBOARD_DADOS_COMPARTILHADOS', '1') == '1'
+
+# --- Recarga dos dados ---
+# Intervalo (s) entre verificações de mudança nos arquivos de dataset/; 0 desativa a recarga automática
+INTERVALO_RECARGA_DADOS_S = float(os.environ.get('DASHBOARD_INTERVALO_RECARGA', '30'))
+
+# --- Motor de consultas (ver consultas.py) ---
+# 'pandas' (padrão), 'duckdb' ou 'polars'; os dois últimos são dependências opcionais
+MOTOR_CONSULTAS = os.environ.get('DASHBOARD_MOTOR_CONSULTAS', 'pandas')
+# Threads dos motores DuckDB/Polars (0 = todos os núcleos)
+THREADS_MOTOR_CONSULTAS = int(os.environ.get('DASHBOARD_THREADS_CONSULTAS', '0'))
+# Diretório do dataset Parquet particionado lido pelos motores DuckDB/Polars (vazio = DataFrames em memória);
+# ignorado se o manifesto do ETL não for da versão dos dados carregada
+DIRETORIO_PARQUET_CONSULTAS = os.environ.get('DASHBOARD_PARQUET_CONSULTAS') or None
+
+# --- Exportação dos dados filtrados (ver exportacao.py) ---
+# Linhas montadas e enviadas por vez: a memória do download não cresce com o tamanho do recorte
+LINHAS_POR_BLOCO_EXPORTACAO = 50_000
+NIVEL_GZIP_EXPORTACAO = 6
+
+# --- Lojas semelhantes (ver lojas_semelhantes.py) ---
+# Vizinhos guardados por loja na tabela de cada versão dos dados e quantos o detalhe da loja exibe
+VIZINHOS_LOJAS_SEMELHANTES = 20
+LOJAS_SEMELHANTES_EXIBIDAS = 5
+
+# --- Gráficos com muitos pontos ---
+# Acima deste número de valores, boxplots e histogramas são enviados ao navegador já resumidos
+# (quartis/cercas e contagens por faixa) em vez das linhas brutas (ex.: modo de dados completo)
+LIMITE_PONTOS_BRUTOS_GRAFICO = 50_000
+# A dispersão da análise de correlação, acima do mesmo limite, vira um mapa de densidade com esta grade (células por eixo)
+CELULAS_DENSIDADE_DISPERSAO = 120
+# Séries de linha longas são reduzidas a no máximo um ponto por pixel desta largura de referência,
+# somando no máximo MAX_PONTOS_SERIES_GRAFICO pontos entre todas as séries de um gráfico
+LARGURA_REFERENCIA_SERIE_PX = 1200
+MAX_PONTOS_SERIES_GRAFICO = 20_000
+# 'lttb' (Largest-Triangle-Three-Buckets, preserva a forma) ou 'minmax' (mínimo e máximo de cada faixa)
+METODO_REDUCAO_SERIE = os.environ.get('DASHBOARD_REDUCAO_SERIE', 'lttb')
+
 # --- Colunas para Gráficos ---
 COLUNAS_NUMERICAS_VENDAS = ['Store', 'DayOfWeek', 'Sales', 'Customers', 'Open', 'Promo', 'SchoolHoliday']
 COLUNAS_NUMERICAS_LOJAS_PARA_PLOTAR = ['Store', 'CompetitionDistance', 'CompetitionOpenSinceMonth', 'CompetitionOpenSinceYear', 'Promo2', 'Promo2SinceWeek', 'Promo2SinceYear']
@@ -0,0 +1,354 @@
+# dashboard/consultas.py
+"""
+Camada de consultas: filtro + agrupamento + agregação com motores intercambiáveis.
+
+Os callbacks descrevem a consulta (chaves de agrupamento, agregações e os filtros do dashboard)
+e o motor a executa, devolvendo sempre um DataFrame do pandas com uma linha por grupo, as
+chaves como colunas (em ordem crescente) e uma coluna por agregação:
+
+    obter_motor(dados).agregar(['Store'], {'Métrica': ('Sales', 'sum')}, data_inicio, data_fim, tipos_loja)
+
+As chaves e as colunas agregadas podem ser colunas do fato, atributos da dimensão de lojas
+(ex.: 'StoreType') ou do calendário (ex.: 'Month'); cada motor resolve as junções necessárias.
+
+Motores (variável de ambiente DASHBOARD_MOTOR_CONSULTAS):
+- 'pandas' (padrão): usa o índice de filtragem e `groupby` sobre os DataFrames em memória;
+- 'duckdb': motor SQL colunar embutido e multi-thread;
+- 'polars': motor colunar multi-thread com execução preguiçosa.
+
+DuckDB e Polars são dependências opcionais; se não estiverem instalados, o motor pandas é usado.
+Por padrão eles leem os mesmos DataFrames em memória (via Arrow, sem cópia no DuckDB). Com
+DASHBOARD_PARQUET_CONSULTAS apontando para o dataset particionado gerado por
+`dataset/gerar_df_completo_reduzido.py`, os fatos são lidos direto dos arquivos Parquet locais,
+desde que o manifesto do ETL registre a mesma versão dos dados carregada (mesmo modo e mesmos
+arquivos); senão o motor usa os DataFrames em memória, para não misturar fatos de outra versão
+com as dimensões carregadas.
+
+A paridade entre os motores e o tempo de cada um são medidos com
+`python -m dashboard.benchmark --motores pandas duckdb polars`.
+"""
+import json
+import os
+import threading
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from .config import DIRETORIO_PARQUET_CONSULTAS, MOTOR_CONSULTAS, THREADS_MOTOR_CONSULTAS
+from .dimensao_datas import atributos_das_datas
+from .dimensao_lojas import atributos_das_lojas
+from .repositorio_dados import CachePorVersao, obter_dados_atuais
+from .utils import filtrar_dataframe
+
+FUNCOES_AGREGACAO = ('sum', 'mean', 'count', 'min', 'max')
+# Manifesto gravado por `dataset/gerar_df_completo_reduzido.py` no diretório particionado
+NOME_MANIFESTO_PARQUET = '_manifesto.json'
+
+
+def _periodo_valido(data_inicio, data_fim):
+    """Retorna (início, fim) como Timestamps, ou None se o período for vazio (mesma regra de `filtrar_dataframe`)."""
+    if not data_inicio or not data_fim:
+        return None
+    inicio, fim = pd.to_datetime(data_inicio), pd.to_datetime(data_fim)
+    return None if inicio > fim else (inicio, fim)
+
+
+def resultado_vazio(chaves, agregacoes):
+    return pd.DataFrame(columns=list(chaves) + list(agregacoes))
+
+
+class MotorConsultas:
+    """Base dos motores: resolve de que tabela vem cada coluna e valida a consulta."""
+
+    nome = None
+
+    def __init__(self, dados):
+        self.versao = dados["versao"]
+        self.dimensao_lojas = dados["dimensao_lojas"]
+        self.dimensao_datas = dados["dimensao_datas"]
+        self.colunas_fatos = set(dados["df_principal"].columns)
+
+    def origem(self, coluna):
+        """'fatos', 'lojas' ou 'datas': a tabela de onde `coluna` é lida."""
+        if coluna in self.colunas_fatos:
+            return 'fatos'
+        if coluna in self.dimensao_lojas.columns:
+            return 'lojas'
+        if coluna in self.dimensao_datas.columns:
+            return 'datas'
+        raise KeyError(f"Coluna desconhecida para o motor de consultas: '{coluna}'")
+
+    def agregar(self, chaves, agregacoes, data_inicio, data_fim, tipos_loja=None, lojas_especificas=None,
+                feriado_estadual='all', feriado_escolar='all', df_filtrado=None):
+        """
+        Filtra as vendas como `filtrar_dataframe`, agrupa por `chaves` e calcula `agregacoes`
+        ({coluna de saída: (coluna, função)}, função em FUNCOES_AGREGACAO).
+
+        `df_filtrado` são as linhas já filtradas com esses mesmos filtros, quando o chamador as tem:
+        o motor pandas as reaproveita e os demais as ignoram.
+        """
+        chaves = list(chaves)
+        for coluna, funcao in agregacoes.values():
+            if funcao not in FUNCOES_AGREGACAO:
+                raise ValueError(f"Função de agregação inválida: '{funcao}'. Use uma de {FUNCOES_AGREGACAO}.")
+        periodo = _periodo_valido(data_inicio, data_fim)
+        if periodo is None:
+            return resultado_vazio(chaves, agregacoes)
+        filtros = (periodo[0], periodo[1], list(tipos_loja or []), [int(loja) for loja in lojas_especificas or []],
+                   str(feriado_estadual), str(feriado_escolar))
+        return self._agregar(chaves, agregacoes, filtros, df_filtrado)
+
+    def _agregar(self, chaves, agregacoes, filtros, df_filtrado):
+        raise NotImplementedError
+
+    def fechar(self):
+        """Libera os recursos do motor (conexões, buffers) quando sua versão dos dados é descartada."""
+
+
+class MotorPandas(MotorConsultas):
+    """Motor padrão: índice de filtragem + `groupby` do pandas, em uma thread."""
+
+    nome = 'pandas'
+
+    def __init__(self, dados):
+        super().__init__(dados)
+        self.df_principal = dados["df_principal"]
+
+    def _series(self, df, colunas):
+        """Séries de `colunas` alinhadas a `df`; atributos de loja e de data vêm das dimensões."""
+        de_lojas = [coluna for coluna in colunas if self.origem(coluna) == 'lojas']
+        de_datas = [coluna for coluna in colunas if self.origem(coluna) == 'datas']
+        series = {}
+        if de_lojas:
+            series.update(atributos_das_lojas(self.dimensao_lojas, df['Store'].to_numpy(), de_lojas, indice=df.index).items())
+        if de_datas:
+            series.update(atributos_das_datas(self.dimensao_datas, df['DateKey'].to_numpy(), de_datas, indice=df.index).items())
+        return [df[coluna] if coluna in df.columns else series[coluna] for coluna in colunas]
+
+    def _agregar(self, chaves, agregacoes, filtros, df_filtrado):
+        if df_filtrado is None:
+            df_filtrado = filtrar_dataframe(self.df_principal, *filtros, self.dimensao_lojas)
+        if df_filtrado.empty:
+            return resultado_vazio(chaves, agregacoes)
+
+        colunas_agregadas = list(dict.fromkeys(coluna for coluna, _ in agregacoes.values()))
+        if all(coluna in df_filtrado.columns for coluna in colunas_agregadas):
+            valores = df_filtrado
+        else:
+            valores = pd.concat(self._series(df_filtrado, colunas_agregadas), axis=1)
+        if not chaves:
+            return pd.DataFrame({saida: [valores[coluna].agg(funcao)] for saida, (coluna, funcao) in agregacoes.items()})
+        agrupamento = valores.groupby(self._series(df_filtrado, chaves), observed=True, sort=True)
+        return agrupamento.agg(**agregacoes).reset_index()
+
+
+class MotorDuckDB(MotorConsultas):
+    """
+    Motor SQL embutido (DuckDB). Os DataFrames são registrados como tabelas virtuais (lidas via
+    Arrow, sem cópia); cada consulta usa todos os núcleos (ou THREADS_MOTOR_CONSULTAS).
+    """
+
+    nome = 'duckdb'
+    FUNCOES_SQL = {'sum': 'SUM', 'mean': 'AVG', 'count': 'COUNT', 'min': 'MIN', 'max': 'MAX'}
+    ALIAS = {'fatos': 'f', 'lojas': 'l', 'datas': 'd'}
+    TIPOS_INTEIROS = {'TINYINT', 'SMALLINT', 'INTEGER', 'BIGINT', 'HUGEINT', 'UTINYINT', 'USMALLINT', 'UINTEGER', 'UBIGINT'}
+
+    def __init__(self, dados, diretorio_parquet=None, threads=0):
+        import duckdb  # dependência opcional
+
+        super().__init__(dados)
+        self.conexao = duckdb.connect(':memory:')
+        if threads:
+            self.conexao.execute(f"SET threads TO {int(threads)}")
+        if diretorio_parquet:
+            caminho = str(Path(diretorio_parquet) / '**' / '*.parquet').replace("'", "''")
+            self.conexao.execute(f"CREATE VIEW fatos AS SELECT * FROM read_parquet('{caminho}', hive_partitioning = true)")
+        else:
+            self.conexao.register('fatos', dados["df_principal"])
+        self.conexao.register('lojas', self.dimensao_lojas.reset_index())
+        self.conexao.register('datas', self.dimensao_datas.reset_index())
+
+        esquema = self.conexao.execute("DESCRIBE fatos").fetchall()
+        self.colunas_fatos = {linha[0] for linha in esquema}
+        self.colunas_inteiras = {linha[0] for linha in esquema if linha[1] in self.TIPOS_INTEIROS}
+        # Uma conexão DuckDB não deve ser usada por várias threads ao mesmo tempo; cada consulta
+        # já é paralela internamente, então as requisições são atendidas uma de cada vez
+        self._trava = threading.Lock()
+
+    def _coluna(self, coluna):
+        return f'{self.ALIAS[self.origem(coluna)]}."{coluna}"'
+
+    def _expressao(self, coluna, funcao):
+        expressao = f"{self.FUNCOES_SQL[funcao]}({self._coluna(coluna)})"
+        # Soma de inteiros em BIGINT, como o pandas (o DuckDB devolveria HUGEINT)
+        if funcao == 'sum' and coluna in self.colunas_inteiras:
+            expressao = f"CAST({expressao} AS BIGINT)"
+        return expressao
+
+    def _agregar(self, chaves, agregacoes, filtros, df_filtrado):
+        inicio, fim, tipos_loja, lojas_especificas, feriado_estadual, feriado_escolar = filtros
+        selecao = [f'{self._coluna(chave)} AS "{chave}"' for chave in chaves]
+        selecao += [f'{self._expressao(coluna, funcao)} AS "{saida}"' for saida, (coluna, funcao) in agregacoes.items()]
+
+        condicoes, parametros = ['f."Date" BETWEEN ? AND ?'], [inicio.to_pydatetime(), fim.to_pydatetime()]
+        if tipos_loja:
+            condicoes.append(f'{self._coluna("StoreType")} IN ({", ".join("?" * len(tipos_loja))})')
+            parametros += [str(tipo) for tipo in tipos_loja]
+        if lojas_especificas:
+            condicoes.append(f'f."Store" IN ({", ".join("?" * len(lojas_especificas))})')
+            parametros += lojas_especificas
+        if feriado_estadual != 'all':
+            condicoes.append('CAST(f."StateHoliday" AS VARCHAR) = ?')
+            parametros.append(feriado_estadual)
+        if feriado_escolar != 'all':
+            condicoes.append('f."SchoolHoliday" = ?')
+            parametros.append(int(feriado_escolar))
+        # Grupos com chave nula são descartados, como no groupby do pandas
+        condicoes += [f'{self._coluna(chave)} IS NOT NULL' for chave in chaves]
+
+        colunas_usadas = chaves + [coluna for coluna, _ in agregacoes.values()] + (['StoreType'] if tipos_loja else [])
+        origens = {self.origem(coluna) for coluna in colunas_usadas}
+        sql = f"SELECT {', '.join(selecao)} FROM fatos f"
+        if 'lojas' in origens:
+            sql += ' JOIN lojas l ON l."Store" = f."Store"'
+        if 'datas' in origens:
+            sql += ' JOIN datas d ON d."Date" = f."Date"'
+        sql += f" WHERE {' AND '.join(condicoes)}"
+        if chaves:
+            posicoes = ', '.join(str(posicao) for posicao in range(1, len(chaves) + 1))
+            sql += f" GROUP BY {posicoes} ORDER BY {posicoes}"
+
+        with self._trava:
+            return self.conexao.execute(sql, parametros).df()
+
+    def fechar(self):
+        with self._trava:
+            self.conexao.close()
+
+
+class MotorPolars(MotorConsultas):
+    """Motor colunar Polars (consultas preguiçosas, executadas no pool de threads do Polars)."""
+
+    nome = 'polars'
+    FUNCOES_POLARS = {'sum': 'sum', 'mean': 'mean', 'count': 'count', 'min': 'min', 'max': 'max'}
+
+    def __init__(self, dados, diretorio_parquet=None, threads=0):
+        if threads:
+            # O pool do Polars é dimensionado na importação
+            os.environ.setdefault('POLARS_MAX_THREADS', str(int(threads)))
+        import polars as pl  # dependência opcional
+
+        super().__init__(dados)
+        self.pl = pl
+        if diretorio_parquet:
+            self.fatos = pl.scan_parquet(str(Path(diretorio_parquet) / '**' / '*.parquet'), hive_partitioning=True)
+        else:
+            self.fatos = pl.from_pandas(dados["df_principal"]).lazy()
+        esquema = self.fatos.collect_schema()
+        self.colunas_fatos = set(esquema.names())
+        # As chaves de junção precisam ter o mesmo tipo dos dois lados
+        self.lojas = pl.from_pandas(self.dimensao_lojas.reset_index()).lazy().with_columns(pl.col('Store').cast(esquema['Store']))
+        self.datas = pl.from_pandas(self.dimensao_datas.reset_index()).lazy().with_columns(pl.col('Date').cast(esquema['Date']))
+
+    def _agregar(self, chaves, agregacoes, filtros, df_filtrado):
+        pl = self.pl
+        inicio, fim, tipos_loja, lojas_especificas, feriado_estadual, feriado_escolar = filtros
+        consulta = self.fatos.filter(pl.col('Date').is_between(inicio.to_pydatetime(), fim.to_pydatetime()))
+        if lojas_especificas:
+            consulta = consulta.filter(pl.col('Store').is_in(lojas_especificas))
+        if feriado_estadual != 'all':
+            consulta = consulta.filter(pl.col('StateHoliday').cast(pl.Utf8) == feriado_estadual)
+        if feriado_escolar != 'all':
+            consulta = consulta.filter(pl.col('SchoolHoliday') == int(feriado_escolar))
+
+        colunas_usadas = chaves + [coluna for coluna, _ in agregacoes.values()] + (['StoreType'] if tipos_loja else [])
+        de_lojas = list(dict.fromkeys(coluna for coluna in colunas_usadas if self.origem(coluna) == 'lojas'))
+        de_datas = list(dict.fromkeys(coluna for coluna in colunas_usadas if self.origem(coluna) == 'datas'))
+        if de_lojas:
+            consulta = consulta.join(self.lojas.select(['Store'] + de_lojas), on='Store', how='inner')
+        if de_datas:
+            consulta = consulta.join(self.datas.select(['Date'] + de_datas), on='Date', how='inner')
+        if tipos_loja:
+            consulta = consulta.filter(pl.col('StoreType').cast(pl.Utf8).is_in([str(tipo) for tipo in tipos_loja]))
+
+        expressoes = [getattr(pl.col(coluna), self.FUNCOES_POLARS[funcao])().alias(saida) for saida, (coluna, funcao) in agregacoes.items()]
+        if chaves:
+            consulta = consulta.drop_nulls(chaves).group_by(chaves).agg(expressoes).sort(chaves)
+        else:
+            consulta = consulta.select(expressoes)
+        return consulta.collect().to_pandas()
+
+
+MOTORES = {motor.nome: motor for motor in (MotorPandas, MotorDuckDB, MotorPolars)}
+
+# Motores por (versão dos dados, nome); os de versões descartadas são fechados
+_motores = CachePorVersao(ao_descartar=lambda motor: motor.fechar())
+
+
+def diretorio_parquet_da_versao(diretorio_parquet, versao):
+    """
+    `diretorio_parquet` se o manifesto do ETL nele registra a versão dos dados `versao`; senão
+    None, e o motor lê os DataFrames em memória.
+    """
+    if not diretorio_parquet:
+        return None
+    try:
+        with open(Path(diretorio_parquet) / NOME_MANIFESTO_PARQUET, encoding='utf-8') as arquivo:
+            versao_parquet = json.load(arquivo).get('versao_dados')
+    except (OSError, ValueError) as e:
+        print(f"AVISO: Manifesto do dataset Parquet '{diretorio_parquet}' indisponível ({e}); usando os dados em memória.")
+        return None
+    if versao_parquet != versao:
+        print(f"AVISO: Dataset Parquet '{diretorio_parquet}' é da versão {versao_parquet}, não da versão carregada {versao}; usando os dados em memória.")
+        return None
+    return diretorio_parquet
+
+
+def criar_motor(nome, dados, diretorio_parquet=DIRETORIO_PARQUET_CONSULTAS, threads=THREADS_MOTOR_CONSULTAS):
+    """
+    Cria o motor `nome` para `dados`; se a dependência opcional faltar, cai para o motor pandas.
+    O Parquet em `diretorio_parquet` só é usado se for da versão de `dados` (ver `diretorio_parquet_da_versao`).
+    """
+    if nome not in MOTORES:
+        raise ValueError(f"Motor de consultas inválido: '{nome}'. Use um de {tuple(MOTORES)}.")
+    if nome == MotorPandas.nome:
+        return MotorPandas(dados)
+    try:
+        return MOTORES[nome](dados, diretorio_parquet=diretorio_parquet_da_versao(diretorio_parquet, dados["versao"]), threads=threads)
+    except ImportError as e:
+        print(f"AVISO: Motor de consultas '{nome}' indisponível ({e}); usando o motor pandas.")
+        return MotorPandas(dados)
+
+
+def obter_motor(dados=None, nome=None):
+    """Motor de consultas (padrão: DASHBOARD_MOTOR_CONSULTAS) para `dados` (padrão: a versão atual), criado uma vez por versão."""
+    dados = dados if dados is not None else obter_dados_atuais()
+    nome = nome or MOTOR_CONSULTAS
+    return _motores.obter_ou_montar(dados["versao"], lambda: criar_motor(nome, dados), nome)
+
+
+def resultados_equivalentes(esperado, obtido, chaves, tolerancia=1e-6):
+    """
+    Compara dois resultados de `agregar` (ex.: pandas vs. outro motor): mesmas chaves e valores
+    iguais dentro da tolerância relativa, sem considerar tipos (category vs. texto, int32 vs. int64)
+    nem a ordem de grupos de chaves categóricas. Retorna (equivalentes, descrição da diferença).
+    """
+    if list(esperado.columns) != list(obtido.columns):
+        return False, f"colunas {list(esperado.columns)} != {list(obtido.columns)}"
+    if len(esperado) != len(obtido):
+        return False, f"{len(esperado)} grupos != {len(obtido)} grupos"
+
+    def normalizar(df):
+        df = df.astype({coluna: object for coluna in df.select_dtypes('category').columns})
+        return df.sort_values(list(chaves), kind='stable').reset_index(drop=True) if chaves else df.reset_index(drop=True)
+
+    esperado, obtido = normalizar(esperado), normalizar(obtido)
+    for coluna in esperado.columns:
+        a, b = esperado[coluna], obtido[coluna]
+        if pd.api.types.is_numeric_dtype(a) and pd.api.types.is_numeric_dtype(b):
+            if not np.allclose(a.to_numpy(dtype='float64'), b.to_numpy(dtype='float64'), rtol=tolerancia, equal_nan=True):
+                return False, f"valores diferentes em '{coluna}'"
+        elif not (a.astype(str).to_numpy() == b.astype(str).to_numpy()).all():
+            return False, f"valores diferentes em '{coluna}'"
+    return True, ""
@@ -0,0 +1,175 @@
+# dashboard/cubo.py
+"""
+Cubo pré-agregado de vendas para os gráficos do dashboard geral.
+
+Quase todos os gráficos do dashboard são médias de uma métrica agrupadas por uma dimensão
+(mês, ano, dia da semana, tipo de loja × promoção, sortimento, feriado...). Como a média é
+soma / contagem, o cubo guarda somas e contagens parciais e responde a essas consultas
+somando parciais, sem voltar às linhas brutas.
+
+O cubo tem dois níveis, construídos uma única vez no carregamento:
+- `base`: grão (Date, Store), com os atributos da loja (vindos da dimensão de lojas) e do dia;
+- `diario`: `base` consolidado por (Date, StoreType, Assortment, Promo2, Promo, StateHoliday,
+  SchoolHoliday), ou seja, sem a dimensão loja. Todos os filtros do dashboard, exceto
+  "lojas específicas", são dimensões desse nível, que é ordens de grandeza menor que os dados.
+
+Os dois níveis guardam a chave 'DateKey' da dimensão de datas: ano, mês, dia e dia da semana
+vêm do calendário, e as séries semanais e mensais agrupam pelo início do período obtido por ela.
+"""
+import numpy as np
+import pandas as pd
+
+from .dimensao_datas import COLUNA_CHAVE_DATA, atributos_das_datas, inicio_periodo, separar_dimensao_datas
+from .dimensao_lojas import anexar_atributos_loja
+from .indice_filtro import obter_indice_filtro
+
+METRICAS_CUBO = ['Sales', 'Customers', 'SalesPerCustomer']
+ATRIBUTOS_LOJA = ['StoreType', 'Assortment', 'Promo2']
+ATRIBUTOS_DIA = ['Promo', 'StateHoliday', 'SchoolHoliday']
+ATRIBUTOS_DATA = ['Year', 'Month', 'Day', 'DayOfWeek']
+
+
+def coluna_soma(metrica):
+    return f'soma_{metrica}'
+
+
+def coluna_contagem(metrica):
+    return f'cont_{metrica}'
+
+
+COLUNAS_PARCIAIS = [coluna(m) for m in METRICAS_CUBO for coluna in (coluna_soma, coluna_contagem)]
+
+
+def _parciais_por_grupo(df, chaves):
+    """Soma e contagem de não nulos de cada métrica por grupo (somas em float64)."""
+    valores = pd.DataFrame({m: df[m].astype('float64') for m in METRICAS_CUBO})
+    for chave in chaves:
+        valores[chave] = df[chave].to_numpy()
+    agrupado = valores.groupby(chaves, observed=True, sort=True)
+    somas = agrupado[METRICAS_CUBO].sum().rename(columns=coluna_soma)
+    contagens = agrupado[METRICAS_CUBO].count().astype('int32').rename(columns=coluna_contagem)
+    return pd.concat([somas, contagens], axis=1)[COLUNAS_PARCIAIS]
+
+
+def _adicionar_atributos_data(df, dimensao_datas):
+    """Acrescenta Year/Month/Day/DayOfWeek a partir do calendário, pela chave 'DateKey' de cada linha."""
+    atributos = atributos_das_datas(dimensao_datas, df[COLUNA_CHAVE_DATA].to_numpy(), ATRIBUTOS_DATA)
+    for coluna in ATRIBUTOS_DATA:
+        df[coluna] = atributos[coluna].to_numpy()
+    return df
+
+
+class FatiaCubo:
+    """Parciais do cubo que atendem a um conjunto de filtros."""
+
+    def __init__(self, tabela, dimensao_datas=None):
+        self.tabela = tabela
+        self.dimensao_datas = dimensao_datas
+
+    @property
+    def vazia(self):
+        return self.tabela.empty
+
+    def suporta(self, chaves):
+        chaves = [chaves] if isinstance(chaves, str) else chaves
+        return all(chave in self.tabela.columns for chave in chaves)
+
+    def totais(self, metricas):
+        """Retorna ({métrica: soma}, {métrica: contagem}) em uma única passada pelas parciais."""
+        colunas = [coluna(m) for m in metricas for coluna in (coluna_soma, coluna_contagem)]
+        totais = self.tabela[colunas].sum()
+        return (
+            {m: float(totais[coluna_soma(m)]) for m in metricas},
+            {m: int(totais[coluna_contagem(m)]) for m in metricas},
+        )
+
+    def media_por(self, chaves, metrica):
+        """Equivalente a `df.groupby(chaves, observed=True)[metrica].mean().reset_index()` nas linhas filtradas."""
+        return self._medias_agrupadas(self.tabela, chaves, [metrica])
+
+    def medias_por(self, chaves, metricas):
+        """Médias de várias métricas por `chaves` com um único agrupamento das parciais."""
+        return self._medias_agrupadas(self.tabela, chaves, metricas)
+
+    def media_por_periodo(self, frequencia, chaves, metrica):
+        """
+        Média de `metrica` por período ('M' mensal, 'W' semanal, 'D' diário) e `chaves`.
+        A coluna do período se chama 'Date_Period' (início do período).
+        """
+        colunas = list(chaves) + [coluna_soma(metrica), coluna_contagem(metrica)]
+        if frequencia == 'D':
+            tabela = self.tabela[['Date'] + colunas].rename(columns={'Date': 'Date_Period'})
+        else:
+            periodo = inicio_periodo(self.dimensao_datas, self.tabela[COLUNA_CHAVE_DATA].to_numpy(), frequencia)
+            tabela = self.tabela[colunas].assign(Date_Period=periodo)
+        return self._medias_agrupadas(tabela, ['Date_Period'] + list(chaves), [metrica])
+
+    @staticmethod
+    def _medias_agrupadas(tabela, chaves, metricas):
+        colunas = [coluna(m) for m in metricas for coluna in (coluna_soma, coluna_contagem)]
+        parciais = tabela.groupby(chaves, observed=True, sort=True)[colunas].sum()
+        medias = pd.DataFrame(index=parciais.index)
+        for metrica in metricas:
+            contagem = parciais[coluna_contagem(metrica)]
+            medias[metrica] = parciais[coluna_soma(metrica)] / contagem.where(contagem > 0)
+        return medias.reset_index()
+
+
+class CuboVendas:
+    """Cubo de somas e contagens de Sales, Customers e SalesPerCustomer."""
+
+    def __init__(self, df_principal, dimensao_lojas=None, dimensao_datas=None):
+        if dimensao_datas is None or COLUNA_CHAVE_DATA not in df_principal.columns:
+            df_principal, dimensao_datas = separar_dimensao_datas(df_principal)
+        self.dimensao_datas = dimensao_datas
+        # 'DateKey' acompanha 'Date' (uma chave por data), então não altera os grupos
+        chaves_base = ['Date', COLUNA_CHAVE_DATA, 'Store']
+        atributos_dia = [c for c in ATRIBUTOS_DIA if c in df_principal.columns]
+        if dimensao_lojas is None:
+            atributos_loja = [c for c in ATRIBUTOS_LOJA if c in df_principal.columns]
+        else:
+            atributos_loja = [c for c in ATRIBUTOS_LOJA if c in dimensao_lojas.columns]
+        atributos = atributos_loja + atributos_dia
+
+        parciais_base = _parciais_por_grupo(df_principal, chaves_base)
+        if dimensao_lojas is None:
+            primeiros = df_principal.groupby(chaves_base, observed=True, sort=True)[atributos].first()
+            self.base = pd.concat([primeiros, parciais_base], axis=1).reset_index()
+        else:
+            # Atributos da loja vêm da dimensão, resolvidos pelo número da loja de cada linha do nível base
+            primeiros = df_principal.groupby(chaves_base, observed=True, sort=True)[atributos_dia].first()
+            base = pd.concat([primeiros, parciais_base], axis=1).reset_index()
+            base = anexar_atributos_loja(base, dimensao_lojas, atributos_loja)
+            self.base = base.reindex(columns=chaves_base + atributos + COLUNAS_PARCIAIS)
+
+        chaves_diario = ['Date', COLUNA_CHAVE_DATA] + atributos
+        self.diario = self.base.groupby(chaves_diario, observed=True, sort=True)[COLUNAS_PARCIAIS].sum().reset_index()
+
+        _adicionar_atributos_data(self.base, dimensao_datas)
+        _adicionar_atributos_data(self.diario, dimensao_datas)
+
+    @classmethod
+    def a_partir_de_tabelas(cls, base, diario, dimensao_datas):
+        """Recria o cubo a partir dos níveis já calculados (ex.: anexados da memória compartilhada)."""
+        cubo = cls.__new__(cls)
+        cubo.base = base
+        cubo.diario = diario
+        cubo.dimensao_datas = dimensao_datas
+        return cubo
+
+    def consultar(self, data_inicio, data_fim, tipos_loja, lojas_especificas, feriado_estadual, feriado_escolar):
+        """Retorna a fatia do cubo para os filtros do dashboard (nível diário, ou base se houver lojas específicas)."""
+        tabela = self.base if lojas_especificas else self.diario
+        if not data_inicio or not data_fim:
+            return FatiaCubo(tabela.iloc[0:0], self.dimensao_datas)
+        data_inicio_dt, data_fim_dt = pd.to_datetime(data_inicio), pd.to_datetime(data_fim)
+        if data_inicio_dt > data_fim_dt:
+            return FatiaCubo(tabela.iloc[0:0], self.dimensao_datas)
+        indice = obter_indice_filtro(tabela)
+        return FatiaCubo(
+            indice.filtrar(tabela, data_inicio_dt, data_fim_dt, tipos_loja, lojas_especificas, feriado_estadual, feriado_escolar),
+            self.dimensao_datas,
+        )
+
+    def memoria_mb(self):
+        return (self.base.memory_usage(deep=True).sum() + self.diario.memory_usage(deep=True).sum()) / 1024 ** 2
@@ -0,0 +1,164 @@
+# dashboard/dados_compartilhados.py
+"""
+Datasets compartilhados entre os workers do gunicorn.
+
+Cada worker importa `app.py`; sem compartilhamento, cada um chamaria `carregar_dados()` e
+manteria cópias privadas de todos os DataFrames. Aqui o primeiro processo carrega os dados e
+os publica como arquivos Arrow IPC sem compressão em `processados/cache/compartilhado/<versão>/`.
+Todos os processos (inclusive o que publicou) mapeiam esses arquivos em memória e montam os
+DataFrames por cima dos buffers mapeados, sem cópia: as páginas ficam no cache do sistema
+operacional e são as mesmas para todos os workers, que só as leem (os arrays são somente leitura).
+
+A publicação acontece sob uma trava de arquivo, então workers que sobem ao mesmo tempo esperam
+o primeiro terminar e apenas anexam o resultado. Se algo falhar (ex.: pyarrow ausente), o
+processo volta a carregar uma cópia privada com `carregar_dados`.
+"""
+import json
+import os
+import shutil
+from contextlib import contextmanager
+from pathlib import Path
+
+import pandas as pd
+
+try:
+    import fcntl
+except ImportError:  # Windows: sem trava entre processos (uso local com um único processo)
+    fcntl = None
+
+from .config import USAR_DADOS_COMPARTILHADOS
+from .cubo import CuboVendas
+from .data_loader import DIRETORIO_CACHE, carregar_dados, resolver_modo, versao_dados_do_modo
+
+DIRETORIO_COMPARTILHADO = Path(os.environ.get('DASHBOARD_DIRETORIO_COMPARTILHADO', DIRETORIO_CACHE / "compartilhado"))
+NOME_MANIFESTO = "manifesto.json"
+
+
+@contextmanager
+def _trava_arquivo(caminho):
+    """Trava exclusiva entre processos baseada em flock (no-op onde fcntl não existe)."""
+    caminho.parent.mkdir(parents=True, exist_ok=True)
+    with open(caminho, 'a+') as arquivo:
+        if fcntl is not None:
+            fcntl.flock(arquivo, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(arquivo, fcntl.LOCK_UN)
+
+
+def _gravar_tabela(df, caminho):
+    import pyarrow as pa
+
+    tabela = pa.Table.from_pandas(df)
+    with pa.OSFile(str(caminho), 'wb') as arquivo:
+        with pa.ipc.new_file(arquivo, tabela.schema) as escritor:
+            escritor.write_table(tabela)
+
+
+def _mapear_tabela(caminho):
+    """Abre um arquivo Arrow IPC por memory map e devolve um DataFrame sobre os buffers mapeados."""
+    import pyarrow as pa
+
+    tabela = pa.ipc.open_file(pa.memory_map(str(caminho), 'r')).read_all()
+    # split_blocks evita a consolidação em blocos 2D, que copiaria as colunas
+    return tabela.to_pandas(split_blocks=True, self_destruct=False)
+
+
+def _valor_json(valor):
+    return valor.item() if hasattr(valor, 'item') else valor
+
+
+def publicar_dados(dados, diretorio):
+    """
+    Grava os DataFrames de `dados` (e os níveis do cubo) em Arrow IPC dentro de `diretorio`.
+
+    O diretório é montado em uma pasta temporária e renomeado no final, então um diretório
+    existente está sempre completo. DataFrames repetidos no dicionário são gravados uma vez.
+    """
+    diretorio_temporario = diretorio.with_name(f"{diretorio.name}.{os.getpid()}.tmp")
+    shutil.rmtree(diretorio_temporario, ignore_errors=True)
+    diretorio_temporario.mkdir(parents=True)
+
+    manifesto = {'tabelas': {}, 'apelidos': {}, 'cubos': {}, 'escalares': {}}
+    chaves_por_objeto = {}
+    for chave, valor in dados.items():
+        if isinstance(valor, pd.DataFrame):
+            if id(valor) in chaves_por_objeto:
+                manifesto['apelidos'][chave] = chaves_por_objeto[id(valor)]
+                continue
+            chaves_por_objeto[id(valor)] = chave
+            _gravar_tabela(valor, diretorio_temporario / f"{chave}.arrow")
+            manifesto['tabelas'][chave] = f"{chave}.arrow"
+        elif isinstance(valor, CuboVendas):
+            niveis = {}
+            for nivel in ('base', 'diario'):
+                _gravar_tabela(getattr(valor, nivel), diretorio_temporario / f"{chave}_{nivel}.arrow")
+                niveis[nivel] = f"{chave}_{nivel}.arrow"
+            manifesto['cubos'][chave] = niveis
+        else:
+            manifesto['escalares'][chave] = _valor_json(valor)
+
+    with open(diretorio_temporario / NOME_MANIFESTO, 'w', encoding='utf-8') as arquivo:
+        json.dump(manifesto, arquivo)
+    os.replace(diretorio_temporario, diretorio)
+
+
+def anexar_dados(diretorio):
+    """Monta o dicionário de dados a partir de um diretório publicado, sem copiar as colunas."""
+    with open(diretorio / NOME_MANIFESTO, encoding='utf-8') as arquivo:
+        manifesto = json.load(arquivo)
+
+    dados = dict(manifesto['escalares'])
+    for chave, nome_arquivo in manifesto['tabelas'].items():
+        dados[chave] = _mapear_tabela(diretorio / nome_arquivo)
+    for chave, chave_original in manifesto['apelidos'].items():
+        dados[chave] = dados[chave_original]
+    for chave, niveis in manifesto['cubos'].items():
+        dados[chave] = CuboVendas.a_partir_de_tabelas(
+            _mapear_tabela(diretorio / niveis['base']), _mapear_tabela(diretorio / niveis['diario']),
+            dados.get("dimensao_datas"),
+        )
+    return dados
+
+
+def _remover_versoes_antigas(versao_atual):
+    """Apaga diretórios de versões anteriores (workers antigos mantêm seus mapeamentos até terminarem)."""
+    for caminho in DIRETORIO_COMPARTILHADO.iterdir():
+        if caminho.is_dir() and caminho.name != versao_atual and not caminho.name.endswith('.tmp'):
+            shutil.rmtree(caminho, ignore_errors=True)
+        elif caminho.suffix == '.lock' and caminho.stem != versao_atual:
+            caminho.unlink(missing_ok=True)
+
+
+def carregar_dados_compartilhados(modo=None):
+    """
+    Retorna os dados do modo informado anexados da memória compartilhada, publicando-os antes
+    se esta for a primeira vez que a versão atual dos arquivos é carregada.
+    """
+    modo, _ = resolver_modo(modo)
+    if not USAR_DADOS_COMPARTILHADOS:
+        return carregar_dados(modo)
+
+    versao = versao_dados_do_modo(modo)
+    diretorio = DIRETORIO_COMPARTILHADO / versao
+    try:
+        if not diretorio.exists():
+            with _trava_arquivo(DIRETORIO_COMPARTILHADO / f"{versao}.lock"):
+                if not diretorio.exists():
+                    dados = carregar_dados(modo)
+                    if dados["df_principal"].empty:
+                        # Dados incompletos (ex.: arquivo ausente) não são publicados
+                        return dados
+                    publicar_dados(dados, diretorio)
+                    del dados
+                    _remover_versoes_antigas(versao)
+                    print(f"Dados da versão {versao} publicados em {diretorio}.")
+
+        dados = anexar_dados(diretorio)
+        print(f"Dados da versão {versao} anexados por memory map (processo {os.getpid()}).")
+        return dados
+    except Exception as e:
+        print(f"AVISO: Dados compartilhados indisponíveis ({e}); carregando uma cópia privada.")
+        return carregar_dados(modo)
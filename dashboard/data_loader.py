@@ -1,24 +1,399 @@
 import pandas as pd
 import numpy as np
+import hashlib
+import json
+import os
 from pathlib import Path
 
-def carregar_dados():
+from .cubo import CuboVendas
+from .dimensao_datas import separar_dimensao_datas
+from .dimensao_lojas import separar_dimensao_lojas, montar_dimensao_lojas
+
+# --- Define o diretório base do projeto para caminhos relativos ---
+DIRETORIO_BASE = Path(__file__).resolve().parent
+# Pode ser apontado para outra pasta com a mesma estrutura (brutos/, reduzidos/, processados/)
+DIRETORIO_DADOS = Path(os.environ.get('DASHBOARD_DIRETORIO_DADOS', DIRETORIO_BASE.parent / "dataset"))
+
+# --- Modos de dados ---
+# 'reduzido': amostra de 50 dias por loja (dataset/reduzidos + df_completo_reduzido.csv).
+# 'completo': histórico integral do Kaggle (dataset/brutos/train.csv e store.csv), lido em blocos.
+# O modo é escolhido pela variável de ambiente DASHBOARD_MODO_DADOS ou pelo parâmetro de carregar_dados.
+MODOS_DADOS = ('reduzido', 'completo')
+MODO_DADOS_PADRAO = os.environ.get('DASHBOARD_MODO_DADOS', 'reduzido')
+CAMINHOS_POR_MODO = {
+    'reduzido': {
+        'treino': DIRETORIO_DADOS / "reduzidos" / "train_reduzido.csv",
+        'lojas': DIRETORIO_DADOS / "reduzidos" / "store_reduzido.csv",
+        'principal': DIRETORIO_DADOS / "processados" / "df_completo_reduzido.csv",
+    },
+    'completo': {
+        'treino': DIRETORIO_DADOS / "brutos" / "train.csv",
+        'lojas': DIRETORIO_DADOS / "brutos" / "store.csv",
+        'principal': None,  # montado a partir de treino + lojas por montar_df_principal_em_blocos
+    },
+}
+# Linhas lidas por bloco do train.csv completo (~1M linhas)
+TAMANHO_BLOCO_CSV = 200_000
+
+# --- Cache colunar (Feather/Arrow) gravado ao lado dos dados processados ---
+DIRETORIO_CACHE = DIRETORIO_DADOS / "processados" / "cache"
+# Incrementar sempre que a engenharia de features mudar, para invalidar caches antigos
+VERSAO_CACHE = 6
+
+# --- Esquema de tipos compactos para os DataFrames mantidos em memória ---
+# Cada worker do gunicorn mantém sua própria cópia; inteiros pequenos, float32 e
+# 'category' reduzem o DataFrame principal a uma fração do tamanho com int64/object.
+# Os atributos de loja do esquema são aplicados à dimensão de lojas (ver dimensao_lojas.py);
+# os atributos de data ficam na dimensão de datas, com seus próprios tipos (ver dimensao_datas.py).
+ESQUEMA_TIPOS_PRINCIPAL = {
+    'Store': 'int16',
+    'DayOfWeek': 'int8',
+    'Sales': 'int32',
+    'Customers': 'int16',
+    'Promo': 'int8',
+    'StateHoliday': 'category',
+    'SchoolHoliday': 'int8',
+    'StoreType': 'category',
+    'Assortment': 'category',
+    'CompetitionDistance': 'float32',
+    'CompetitionOpenSinceMonth': 'float32',
+    'CompetitionOpenSinceYear': 'float32',
+    'Promo2': 'int8',
+    'Promo2SinceWeek': 'float32',
+    'Promo2SinceYear': 'float32',
+    'PromoInterval': 'category',
+    'SalesPerCustomer': 'float32'
+}
+
+ESQUEMA_TIPOS_VENDAS = {
+    'Store': 'int16',
+    'DayOfWeek': 'int8',
+    'Sales': 'int32',
+    'Customers': 'int16',
+    'Open': 'int8',
+    'Promo': 'int8',
+    'StateHoliday': 'category',
+    'SchoolHoliday': 'int8'
+}
+# Tipos de leitura do train.csv: o esquema de vendas, com StateHoliday já categórico ('0' e 0 viram '0')
+TIPOS_LEITURA_VENDAS = {coluna: tipo for coluna, tipo in ESQUEMA_TIPOS_VENDAS.items() if tipo != 'category'}
+TIPOS_LEITURA_VENDAS['StateHoliday'] = pd.CategoricalDtype(['0', 'a', 'b', 'c'])
+
+
+def calcular_assinatura_arquivo(caminho):
+    """Retorna a assinatura (mtime, tamanho e hash SHA-256) de um arquivo de origem."""
+    estatisticas = os.stat(caminho)
+    hash_arquivo = hashlib.sha256()
+    with open(caminho, 'rb') as arquivo:
+        for bloco in iter(lambda: arquivo.read(1024 * 1024), b''):
+            hash_arquivo.update(bloco)
+    return {
+        'mtime_ns': estatisticas.st_mtime_ns,
+        'tamanho': estatisticas.st_size,
+        'sha256': hash_arquivo.hexdigest()
+    }
+
+
+def _caminhos_cache(caminho_origem, nome_cache=None):
+    """Retorna os caminhos do arquivo Feather e do arquivo de metadados para uma origem."""
+    nome_base = nome_cache or Path(caminho_origem).stem
+    return DIRETORIO_CACHE / f"{nome_base}.feather", DIRETORIO_CACHE / f"{nome_base}.meta.json"
+
+
+def _gravar_arquivo_atomico(caminho, conteudo):
+    """Grava bytes em um arquivo temporário e o move para o destino (seguro entre workers)."""
+    caminho_temporario = caminho.with_name(f"{caminho.name}.{os.getpid()}.tmp")
+    with open(caminho_temporario, 'wb') as arquivo:
+        arquivo.write(conteudo)
+    os.replace(caminho_temporario, caminho)
+
+
+def _conferir_assinatura(caminho, assinatura):
+    """
+    Retorna (válida, assinatura atualizada) comparando o arquivo com a assinatura registrada.
+    Se só o mtime mudou (ex.: checkout do git), o hash SHA-256 decide.
+    """
+    estatisticas = os.stat(caminho)
+    if (assinatura.get('mtime_ns'), assinatura.get('tamanho')) == (estatisticas.st_mtime_ns, estatisticas.st_size):
+        return True, assinatura
+    assinatura_atual = calcular_assinatura_arquivo(caminho)
+    return assinatura_atual['sha256'] == assinatura.get('sha256'), assinatura_atual
+
+
+def _ler_cache_colunar(caminho_origem, dependencias=(), nome_cache=None):
+    """
+    Lê o cache colunar de um CSV se ele ainda for válido; caso contrário retorna None.
+
+    O cache é considerado válido quando a versão do cache coincide e o arquivo de origem
+    (e cada arquivo em `dependencias`, ex.: a tabela de lojas juntada ao treino) tem o mesmo
+    mtime e tamanho registrados, ou o mesmo hash SHA-256; nesse caso os metadados são atualizados.
+    """
+    caminho_cache, caminho_meta = _caminhos_cache(caminho_origem, nome_cache)
+    if not caminho_cache.exists() or not caminho_meta.exists():
+        return None
+
+    try:
+        with open(caminho_meta, encoding='utf-8') as arquivo_meta:
+            metadados = json.load(arquivo_meta)
+        if metadados.get('versao_cache') != VERSAO_CACHE:
+            return None
+
+        metadados_alterados = False
+        valida, assinatura = _conferir_assinatura(caminho_origem, metadados.get('assinatura', {}))
+        if not valida:
+            return None
+        metadados_alterados |= assinatura is not metadados.get('assinatura')
+        metadados['assinatura'] = assinatura
+
+        assinaturas_dependencias = metadados.get('dependencias', {})
+        if set(assinaturas_dependencias) != {Path(d).name for d in dependencias}:
+            return None
+        for dependencia in dependencias:
+            nome = Path(dependencia).name
+            valida, assinatura = _conferir_assinatura(dependencia, assinaturas_dependencias[nome])
+            if not valida:
+                return None
+            metadados_alterados |= assinatura is not assinaturas_dependencias[nome]
+            assinaturas_dependencias[nome] = assinatura
+
+        if metadados_alterados:
+            _gravar_arquivo_atomico(caminho_meta, json.dumps(metadados).encode('utf-8'))
+
+        return pd.read_feather(caminho_cache)
+    except Exception as e:
+        print(f"AVISO: Cache colunar de '{Path(caminho_origem).name}' ignorado: {e}")
+        return None
+
+
+def _salvar_cache_colunar(df, caminho_origem, dependencias=(), nome_cache=None):
+    """Grava o DataFrame em Feather junto com a assinatura do arquivo de origem e das dependências."""
+    caminho_cache, caminho_meta = _caminhos_cache(caminho_origem, nome_cache)
+    try:
+        DIRETORIO_CACHE.mkdir(parents=True, exist_ok=True)
+        caminho_temporario = caminho_cache.with_name(f"{caminho_cache.name}.{os.getpid()}.tmp")
+        df.reset_index(drop=True).to_feather(caminho_temporario)
+        os.replace(caminho_temporario, caminho_cache)
+
+        metadados = {
+            'versao_cache': VERSAO_CACHE,
+            'assinatura': calcular_assinatura_arquivo(caminho_origem),
+            'dependencias': {Path(d).name: calcular_assinatura_arquivo(d) for d in dependencias},
+        }
+        _gravar_arquivo_atomico(caminho_meta, json.dumps(metadados).encode('utf-8'))
+    except Exception as e:
+        print(f"AVISO: Não foi possível gravar o cache colunar de '{Path(caminho_origem).name}': {e}")
+
+
+def ler_csv_com_cache(caminho_origem, processar=None, tamanho_bloco=None, **kwargs_leitura):
+    """
+    Lê um CSV usando o cache colunar quando disponível.
+
+    Se o cache estiver ausente, desatualizado ou ilegível (ex.: pyarrow não instalado),
+    o CSV é lido com `pd.read_csv` (em blocos de `tamanho_bloco` linhas, se informado), a
+    função `processar` (engenharia de features) é aplicada e o resultado é gravado no cache
+    para os próximos carregamentos.
+    """
+    df = _ler_cache_colunar(caminho_origem)
+    if df is not None:
+        return df
+
+    if tamanho_bloco:
+        df = pd.concat(pd.read_csv(caminho_origem, chunksize=tamanho_bloco, **kwargs_leitura), ignore_index=True)
+    else:
+        df = pd.read_csv(caminho_origem, **kwargs_leitura)
+    if processar is not None:
+        df = processar(df)
+    _salvar_cache_colunar(df, caminho_origem)
+    return df
+
+
+def tratar_df_lojas(df_lojas):
+    """Preenche os valores ausentes da tabela de lojas (mesma lógica do notebook; usada também pelo ETL de dataset/gerar_df_completo_reduzido.py)."""
+    # Primeiro, tratamos PromoInterval para evitar tipos mistos.
+    if 'PromoInterval' in df_lojas.columns:
+        df_lojas['PromoInterval'] = df_lojas['PromoInterval'].fillna("Nenhum")
+
+    colunas_preencher_zero = ['CompetitionOpenSinceMonth', 'CompetitionOpenSinceYear', 'Promo2SinceWeek', 'Promo2SinceYear']
+    for col in colunas_preencher_zero:
+        if col in df_lojas.columns:
+            df_lojas[col] = df_lojas[col].fillna(0)
+
+    # CompetitionDistance: Preencher com a MÉDIA (depois dos outros, como no notebook)
+    if 'CompetitionDistance' in df_lojas.columns:
+        df_lojas['CompetitionDistance'] = df_lojas['CompetitionDistance'].fillna(df_lojas['CompetitionDistance'].mean())
+    return df_lojas
+
+
+def montar_df_principal_em_blocos(caminho_treino, caminho_lojas, tamanho_bloco=TAMANHO_BLOCO_CSV):
+    """
+    Monta o DataFrame principal a partir do train.csv completo sem carregá-lo inteiro como texto.
+
+    O CSV é lido em blocos já com tipos compactos; cada bloco é reduzido aos dias de loja aberta
+    e recebe as colunas derivadas. Os atributos das lojas não são juntados às vendas: a tabela de
+    lojas tratada (~1 mil linhas) vira a dimensão de lojas. Retorna (df_principal, dimensao_lojas,
+    dimensao_datas), equivalentes ao df_completo_reduzido.csv processado, mas com o histórico integral.
+    """
+    df_lojas = tratar_df_lojas(pd.read_csv(caminho_lojas))
+    df_lojas = df_lojas.astype({coluna: tipo for coluna, tipo in ESQUEMA_TIPOS_PRINCIPAL.items() if coluna in df_lojas.columns})
+
+    blocos = []
+    for bloco in pd.read_csv(caminho_treino, dtype=TIPOS_LEITURA_VENDAS, parse_dates=['Date'], chunksize=tamanho_bloco):
+        bloco = bloco[bloco['Open'] == 1].drop(columns=['Open'])
+        blocos.append(derivar_colunas_principal(bloco))
+    df_principal = pd.concat(blocos, ignore_index=True)
+    del blocos
+
+    df_principal, dimensao_datas = processar_df_principal(df_principal, derivar=False)
+    return df_principal, montar_dimensao_lojas(df_lojas, lojas=df_principal['Store'].unique()), dimensao_datas
+
+
+def carregar_df_principal(caminhos):
+    """
+    Carrega o DataFrame principal (tabela de fatos) do modo informado e as dimensões de lojas e
+    de datas, usando o cache colunar (um arquivo para cada). Retorna (df_principal, dimensao_lojas,
+    dimensao_datas).
+    """
+    if caminhos['principal'] is not None:
+        origem, dependencias = caminhos['principal'], []
+        nome_cache = Path(origem).stem
+    else:
+        origem, dependencias = caminhos['treino'], [caminhos['lojas']]
+        nome_cache = f"{Path(origem).stem}_principal"
+    nome_cache_lojas = f"{nome_cache}_lojas"
+    nome_cache_datas = f"{nome_cache}_datas"
+
+    df_principal = _ler_cache_colunar(origem, dependencias, nome_cache)
+    dimensao_lojas = _ler_cache_colunar(origem, dependencias, nome_cache_lojas)
+    dimensao_datas = _ler_cache_colunar(origem, dependencias, nome_cache_datas)
+    if df_principal is not None and dimensao_lojas is not None and dimensao_datas is not None:
+        return df_principal, dimensao_lojas.set_index('Store'), dimensao_datas.set_index('DateKey')
+
+    if caminhos['principal'] is not None:
+        # O CSV processado ainda traz os atributos da loja em cada linha: separados aqui
+        df_completo, dimensao_datas = processar_df_principal(pd.read_csv(origem, dtype={'StateHoliday': str}))
+        df_principal, dimensao_lojas = separar_dimensao_lojas(df_completo)
+        del df_completo
+    else:
+        df_principal, dimensao_lojas, dimensao_datas = montar_df_principal_em_blocos(caminhos['treino'], caminhos['lojas'])
+    _salvar_cache_colunar(df_principal, origem, dependencias, nome_cache)
+    _salvar_cache_colunar(dimensao_lojas.reset_index(), origem, dependencias, nome_cache_lojas)
+    _salvar_cache_colunar(dimensao_datas.reset_index(), origem, dependencias, nome_cache_datas)
+    return df_principal, dimensao_lojas, dimensao_datas
+
+
+def derivar_colunas_principal(df_principal):
+    """
+    Aplica a engenharia de features por linha usada pelos filtros e gráficos do dashboard.
+    Ano, mês, dia, dia da semana e semana ISO vêm da dimensão de datas (ver `processar_df_principal`).
+    """
+    df_principal['Date'] = pd.to_datetime(df_principal['Date'])
+
+    # Cálculo de SalesPerCustomer (OTIMIZADO COM NUMPY)
+    df_principal['SalesPerCustomer'] = np.where(df_principal['Customers'] > 0, df_principal['Sales'] / df_principal['Customers'], 0)
+    return df_principal
+
+
+def calcular_versao_dados(caminhos, modo=None):
+    """
+    Gera uma chave curta e determinística que identifica a versão dos arquivos de dados.
+
+    A chave depende apenas do mtime e do tamanho de cada arquivo (e da versão do cache e do
+    modo de dados), então todos os workers que carregam os mesmos arquivos chegam à mesma chave.
+    """
+    hash_versao = hashlib.sha256(str(VERSAO_CACHE).encode('utf-8'))
+    if modo:
+        hash_versao.update(f"modo:{modo}".encode('utf-8'))
+    for caminho in caminhos:
+        try:
+            estatisticas = os.stat(caminho)
+            hash_versao.update(f"{Path(caminho).name}:{estatisticas.st_mtime_ns}:{estatisticas.st_size}".encode('utf-8'))
+        except FileNotFoundError:
+            hash_versao.update(f"{Path(caminho).name}:ausente".encode('utf-8'))
+    return hash_versao.hexdigest()[:16]
+
+
+def memoria_em_mb(df):
+    """Retorna o consumo de memória de um DataFrame em MB (incluindo strings)."""
+    return df.memory_usage(deep=True).sum() / 1024 ** 2
+
+
+def aplicar_esquema_tipos(df, esquema, nome="DataFrame"):
+    """
+    Converte as colunas presentes no esquema para os tipos compactos e imprime
+    o consumo de memória antes e depois da conversão.
+    """
+    memoria_antes = memoria_em_mb(df)
+    df = df.astype({coluna: tipo for coluna, tipo in esquema.items() if coluna in df.columns})
+    memoria_depois = memoria_em_mb(df)
+    reducao = (1 - memoria_depois / memoria_antes) * 100 if memoria_antes else 0
+    print(f"Memória de {nome}: {memoria_antes:,.1f} MB -> {memoria_depois:,.1f} MB ({reducao:.0f}% menor)")
+    return df
+
+
+def processar_df_principal(df_principal, derivar=True):
+    """
+    Deriva as colunas do DataFrame principal, ordena por data, separa o calendário e aplica o
+    esquema de tipos compactos. Retorna (df_principal com a chave 'DateKey', dimensao_datas).
+    """
+    if derivar:
+        df_principal = derivar_colunas_principal(df_principal)
+    # A ordenação por data permite que o índice de filtragem resolva períodos por busca binária
+    df_principal = df_principal.sort_values(['Date', 'Store'], kind='stable', ignore_index=True)
+    df_principal, dimensao_datas = separar_dimensao_datas(df_principal)
+    return aplicar_esquema_tipos(df_principal, ESQUEMA_TIPOS_PRINCIPAL, "df_principal"), dimensao_datas
+
+
+def resolver_modo(modo=None):
+    """Valida o modo de dados (padrão: DASHBOARD_MODO_DADOS) e retorna (modo, caminhos do modo)."""
+    modo = modo or MODO_DADOS_PADRAO
+    if modo not in MODOS_DADOS:
+        raise ValueError(f"Modo de dados inválido: '{modo}'. Use um de {MODOS_DADOS}.")
+    return modo, CAMINHOS_POR_MODO[modo]
+
+
+def versao_dados_do_modo(modo=None):
+    """Chave de versão que `carregar_dados(modo)` produziria, sem carregar os arquivos."""
+    modo, caminhos = resolver_modo(modo)
+    caminhos_versao = [caminhos[c] for c in ('principal', 'treino', 'lojas') if caminhos[c] is not None]
+    return calcular_versao_dados(caminhos_versao, modo)
+
+
+def versao_dados_dos_arquivos(caminho_treino, caminho_lojas, caminho_principal=None):
+    """
+    (modo, chave de versão) do modo de dados que lê exatamente estes arquivos, ou (None, None)
+    se nenhum modo os usa. Usado pelo ETL para registrar de que versão é o dataset Parquet.
+    """
+    arquivos = {'treino': caminho_treino, 'lojas': caminho_lojas, 'principal': caminho_principal}
+    for modo, caminhos in CAMINHOS_POR_MODO.items():
+        if all(caminho is None or (arquivos[chave] is not None and Path(arquivos[chave]).resolve() == Path(caminho).resolve())
+               for chave, caminho in caminhos.items()):
+            return modo, versao_dados_do_modo(modo)
+    return None, None
+
+
+def carregar_dados(modo=None):
     """
     Carrega todos os datasets necessários (processados e brutos), realiza a engenharia
     de features inicial e retorna os DataFrames prontos para uso no dashboard.
-    """
-    # --- Define o diretório base do projeto para caminhos relativos ---
-    DIRETORIO_BASE = Path(__file__).resolve().parent
-    DIRETORIO_DADOS = DIRETORIO_BASE.parent / "dataset"
 
-    # Modificando para usar os datasets reduzidos
-    CAMINHO_ARQUIVO_TREINO = DIRETORIO_DADOS / "reduzidos/train_reduzido.csv"
-    CAMINHO_ARQUIVO_LOJAS = DIRETORIO_DADOS / "reduzidos/store_reduzido.csv"
-    CAMINHO_DF_COMPLETO = DIRETORIO_DADOS / "processados/df_completo_reduzido.csv"
+    `modo` é 'reduzido' (padrão) ou 'completo' (ver MODOS_DADOS); se omitido, vale a variável
+    de ambiente DASHBOARD_MODO_DADOS. Os CSVs são lidos através de um cache colunar (Feather)
+    em `dataset/processados/cache`, que já contém as colunas derivadas; o CSV só é reprocessado
+    quando o cache está desatualizado.
+    """
+    modo, caminhos = resolver_modo(modo)
+    CAMINHO_ARQUIVO_TREINO = caminhos['treino']
+    CAMINHO_ARQUIVO_LOJAS = caminhos['lojas']
+    CAMINHO_DF_COMPLETO = caminhos['principal']
 
     # --- Dicionário para armazenar os dados carregados ---
     dados = {
+        "versao": versao_dados_do_modo(modo),
+        "modo": modo,
         "df_principal": pd.DataFrame(),
+        "dimensao_lojas": pd.DataFrame(),
+        "dimensao_datas": pd.DataFrame(),
+        "cubo_vendas": None,
         "df_vendas_original": pd.DataFrame(),
         "df_lojas_original": pd.DataFrame(),
         "distancia_max_global": 0,
@@ -33,36 +408,36 @@ def carregar_dados():
 
     # --- Carregamento do Dataset Principal (Processado) ---
     try:
-        df_principal = pd.read_csv(CAMINHO_DF_COMPLETO, dtype={'StateHoliday': str})
-        df_principal['Date'] = pd.to_datetime(df_principal['Date'])
-        # Engenharia de features para filtros e gráficos
-        df_principal['Year'] = df_principal['Date'].dt.year
-        df_principal['Month'] = df_principal['Date'].dt.month
-        df_principal['Day'] = df_principal['Date'].dt.day
-        df_principal['DayOfWeek'] = df_principal['Date'].dt.dayofweek + 1 # +1 para ser 1 (Seg) a 7 (Dom)
-        df_principal['WeekOfYear'] = df_principal['Date'].dt.isocalendar().week.astype(int)
+        # Engenharia de features para filtros e gráficos (já materializada no cache colunar)
+        # Esquema estrela: fatos de venda + uma linha por loja e uma linha por data com os atributos
+        df_principal, dimensao_lojas, dimensao_datas = carregar_df_principal(caminhos)
 
-        # Cálculo de SalesPerCustomer (OTIMIZADO COM NUMPY)
-        df_principal['SalesPerCustomer'] = np.where(df_principal['Customers'] > 0, df_principal['Sales'] / df_principal['Customers'], 0)
-
-        print(f"Arquivo df_completo_reduzido.csv carregado com sucesso de: {CAMINHO_DF_COMPLETO}")
+        print(f"DataFrame principal (modo {modo}) carregado com sucesso: {len(df_principal):,} linhas, {len(dimensao_lojas):,} lojas, {len(dimensao_datas):,} datas.")
+        print(f"Memória ocupada por df_principal: {memoria_em_mb(df_principal):,.1f} MB (dimensões de lojas e datas: {memoria_em_mb(dimensao_lojas):,.2f} MB e {memoria_em_mb(dimensao_datas):,.2f} MB)")
 
         dados["df_principal"] = df_principal
-        dados["distancia_max_global"] = df_principal['CompetitionDistance'].max()
+        dados["dimensao_lojas"] = dimensao_lojas
+        dados["dimensao_datas"] = dimensao_datas
+        # Somas/contagens pré-agregadas usadas pelos gráficos do dashboard geral
+        dados["cubo_vendas"] = CuboVendas(df_principal, dimensao_lojas, dimensao_datas)
+        print(f"Cubo de vendas construído: {len(dados['cubo_vendas'].diario):,} linhas no nível diário ({dados['cubo_vendas'].memoria_mb():,.1f} MB)")
+        dados["distancia_max_global"] = dimensao_lojas['CompetitionDistance'].max()
         dados["contagem_vendas_depois"] = df_principal['Sales'].count() if not df_principal.empty else 0
         dados["media_vendas_depois"] = df_principal['Sales'].mean() if not df_principal.empty else 0
 
     except FileNotFoundError:
-        print(f"ERRO: O arquivo 'df_completo_reduzido.csv' NÃO foi encontrado em '{CAMINHO_DF_COMPLETO}'.")
+        print(f"ERRO: Arquivos do DataFrame principal (modo {modo}) NÃO encontrados: {CAMINHO_DF_COMPLETO or CAMINHO_ARQUIVO_TREINO}.")
         print("Verifique se o caminho do arquivo está correto e se a estrutura de pastas corresponde à esperada.")
     except Exception as e:
-        print(f"ERRO ao carregar ou processar o arquivo df_completo_reduzido.csv: {e}")
+        print(f"ERRO ao carregar ou processar o DataFrame principal (modo {modo}): {e}")
 
     # --- Carregamento dos Datasets Brutos (para a página de Análise Preliminar) ---
     try:
-        df_vendas_original = pd.read_csv(CAMINHO_ARQUIVO_TREINO, dtype={'StateHoliday': str})
+        # Lido em blocos já com os tipos compactos: o CSV inteiro nunca fica em memória com int64/object
+        df_vendas_original = ler_csv_com_cache(CAMINHO_ARQUIVO_TREINO, tamanho_bloco=TAMANHO_BLOCO_CSV, dtype=TIPOS_LEITURA_VENDAS)
+        print(f"Memória ocupada por df_vendas_original: {memoria_em_mb(df_vendas_original):,.1f} MB")
         dados['df_vendas_original'] = df_vendas_original
-        df_lojas_bruto = pd.read_csv(CAMINHO_ARQUIVO_LOJAS)
+        df_lojas_bruto = ler_csv_com_cache(CAMINHO_ARQUIVO_LOJAS)
 
         # Guardar uma cópia do original para o gráfico "antes"
         dados["df_lojas_original"] = df_lojas_bruto.copy()
@@ -75,33 +450,20 @@ def carregar_dados():
         dados["media_vendas_antes"] = df_vendas_original['Sales'].mean()
 
         # Prepara dados para os histogramas comparativos de VENDAS
-        dados["df_vendas_antes_preprocessamento"] = df_vendas_original.copy()
-        dados["df_vendas_depois_preprocessamento"] = df_vendas_original[df_vendas_original['Open'] == 1].copy()
+        # (somente leitura: reaproveita os DataFrames em vez de manter cópias por worker). O "depois" são
+        # os dias de loja aberta, exatamente as linhas (e tipos) do DataFrame principal
+        dados["df_vendas_antes_preprocessamento"] = df_vendas_original
+        dados["df_vendas_depois_preprocessamento"] = dados["df_principal"]
 
         # Prepara dados para os histogramas comparativos de LOJAS
         # Preenchemos valores ausentes no dataframe TRATADO, seguindo a lógica do notebook
+        dados["df_lojas_tratado"] = tratar_df_lojas(df_lojas_tratado)
 
-        # 1. Demais colunas com NaN: Preencher com 0 ou "Nenhum" (conforme notebook)
-        # Primeiro, tratamos PromoInterval para evitar tipos mistos.
-        if 'PromoInterval' in df_lojas_tratado.columns:
-            df_lojas_tratado['PromoInterval'] = df_lojas_tratado['PromoInterval'].fillna("Nenhum")
-
-        colunas_preencher_zero = ['CompetitionOpenSinceMonth', 'CompetitionOpenSinceYear', 'Promo2SinceWeek', 'Promo2SinceYear']
-        for col in colunas_preencher_zero:
-            if col in df_lojas_tratado.columns:
-                df_lojas_tratado[col] = df_lojas_tratado[col].fillna(0)
-
-        # 2. CompetitionDistance: Preencher com a MÉDIA (depois dos outros, como no notebook)
-        if 'CompetitionDistance' in df_lojas_tratado.columns:
-            df_lojas_tratado['CompetitionDistance'] = df_lojas_tratado['CompetitionDistance'].fillna(df_lojas_tratado['CompetitionDistance'].mean())
-
-        dados["df_lojas_tratado"] = df_lojas_tratado
-
-        print(f"Arquivos train_reduzido.csv e store_reduzido.csv carregados com sucesso.")
+        print(f"Arquivos {CAMINHO_ARQUIVO_TREINO.name} e {CAMINHO_ARQUIVO_LOJAS.name} carregados com sucesso.")
 
     except FileNotFoundError:
-        print(f"AVISO: Arquivos reduzidos (train_reduzido.csv ou store_reduzido.csv) NÃO encontrados. Comparativos de histogramas serão limitados.")
+        print(f"AVISO: Arquivos {CAMINHO_ARQUIVO_TREINO.name} ou {CAMINHO_ARQUIVO_LOJAS.name} NÃO encontrados. Comparativos de histogramas serão limitados.")
     except Exception as e:
-        print(f"AVISO: ERRO ao carregar ou processar arquivos reduzidos: {e}.")
+        print(f"AVISO: ERRO ao carregar ou processar {CAMINHO_ARQUIVO_TREINO.name}/{CAMINHO_ARQUIVO_LOJAS.name}: {e}.")
 
     return dados
\ No newline at end of file
@@ -0,0 +1,106 @@
+# dashboard/dimensao_datas.py
+"""
+Dimensão de datas (calendário) do esquema estrela.
+
+O histórico tem algumas centenas de datas distintas e centenas de milhares de linhas de venda.
+Em vez de derivar ano, mês, dia e semana ISO em cada linha (e de recalcular o início da semana
+ou do mês com `dt.to_period` a cada requisição), o calendário tem uma linha por data, com esses
+atributos calculados uma única vez, e cada linha do fato guarda só a chave inteira 'DateKey'
+(a posição da data no calendário).
+
+Obter um atributo para um conjunto de linhas é um `take` pela chave; agrupar por período
+(semana, mês) é agrupar pelo início do período obtido da mesma forma.
+
+StateHoliday e SchoolHoliday dependem do estado da loja e continuam no fato; o calendário só
+marca as datas em que alguma loja teve o feriado.
+"""
+import numpy as np
+import pandas as pd
+
+COLUNA_CHAVE_DATA = 'DateKey'
+COLUNAS_DIMENSAO_DATAS = [
+    'Date', 'Year', 'Month', 'Day', 'DayOfWeek', 'WeekOfYear', 'WeekStart', 'MonthStart',
+    'HasStateHoliday', 'HasSchoolHoliday'
+]
+TIPOS_DIMENSAO_DATAS = {
+    'Year': 'int16', 'Month': 'int8', 'Day': 'int8', 'DayOfWeek': 'int8', 'WeekOfYear': 'int8',
+    'HasStateHoliday': 'int8', 'HasSchoolHoliday': 'int8'
+}
+# Atributos que o DataFrame principal "largo" trazia em cada linha; são anexados antes desta
+# coluna quando um recorte precisa deles (exportações, matriz de correlação)
+ATRIBUTOS_DATA_FATO = ['Year', 'Month', 'Day', 'WeekOfYear']
+COLUNA_APOS_ATRIBUTOS = 'SalesPerCustomer'
+# Coluna do calendário com o início do período de cada frequência ('D' diária, 'W' semanal, 'M' mensal)
+INICIO_PERIODO = {'D': 'Date', 'W': 'WeekStart', 'M': 'MonthStart'}
+
+
+def montar_dimensao_datas(datas, feriado_estadual=None, feriado_escolar=None):
+    """
+    Monta o calendário das datas distintas de `datas`, em ordem crescente e indexado por 'DateKey'
+    (0, 1, 2...). `feriado_estadual` e `feriado_escolar` são marcas alinhadas a `datas` (opcionais).
+    Retorna (dimensao, chave de cada elemento de `datas`).
+    """
+    unicas, chaves = np.unique(np.asarray(datas, dtype='datetime64[ns]'), return_inverse=True)
+    calendario = pd.DatetimeIndex(unicas)
+    dimensao = pd.DataFrame({
+        'Date': calendario,
+        'Year': calendario.year,
+        'Month': calendario.month,
+        'Day': calendario.day,
+        'DayOfWeek': calendario.dayofweek + 1,  # 1 (Seg) a 7 (Dom)
+        'WeekOfYear': calendario.isocalendar()['week'].to_numpy(),
+        'WeekStart': calendario - pd.to_timedelta(calendario.dayofweek, unit='D'),
+        'MonthStart': unicas.astype('datetime64[M]').astype('datetime64[ns]'),
+    }, index=pd.RangeIndex(len(unicas), name=COLUNA_CHAVE_DATA))
+    for coluna, marcas in (('HasStateHoliday', feriado_estadual), ('HasSchoolHoliday', feriado_escolar)):
+        if marcas is None:
+            dimensao[coluna] = 0
+        else:
+            dimensao[coluna] = np.bincount(chaves, weights=np.asarray(marcas, dtype='float64'), minlength=len(unicas)) > 0
+    return dimensao.astype(TIPOS_DIMENSAO_DATAS), chaves
+
+
+def separar_dimensao_datas(df):
+    """
+    Separa os atributos de data de `df` em um calendário. Retorna (fatos, dimensão): os fatos
+    ganham a coluna 'DateKey' e perdem Year/Month/Day/WeekOfYear; DayOfWeek (que já vem no
+    train.csv) continua no fato, preenchido pelo calendário.
+    """
+    feriado_estadual = (df['StateHoliday'] != '0').to_numpy() if 'StateHoliday' in df.columns else None
+    feriado_escolar = (df['SchoolHoliday'] == 1).to_numpy() if 'SchoolHoliday' in df.columns else None
+    dimensao, chaves = montar_dimensao_datas(df['Date'].to_numpy(), feriado_estadual, feriado_escolar)
+
+    fatos = df.drop(columns=[coluna for coluna in ATRIBUTOS_DATA_FATO if coluna in df.columns])
+    if 'DayOfWeek' in fatos.columns:
+        fatos['DayOfWeek'] = dimensao['DayOfWeek'].to_numpy()[chaves]
+    fatos[COLUNA_CHAVE_DATA] = chaves.astype(np.int16 if len(dimensao) <= np.iinfo(np.int16).max else np.int32)
+    return fatos, dimensao
+
+
+def atributos_das_datas(dimensao, chaves, colunas, indice=None):
+    """Retorna os atributos `colunas` do calendário para cada chave de `chaves` (na mesma ordem)."""
+    chaves = np.asarray(chaves)
+    return pd.DataFrame({coluna: dimensao[coluna].to_numpy()[chaves] for coluna in colunas}, index=indice)
+
+
+def inicio_periodo(dimensao, chaves, frequencia):
+    """Início do período ('D', 'W' ou 'M') de cada chave de `chaves`, como array datetime64."""
+    return dimensao[INICIO_PERIODO[frequencia]].to_numpy()[np.asarray(chaves)]
+
+
+def anexar_atributos_data(df, dimensao, colunas=None, remover_chave=False):
+    """
+    Retorna `df` com os atributos de data `colunas` (padrão: os que o fato largo tinha) que ainda
+    não estiverem nele, na posição que ocupavam (antes de SalesPerCustomer). Com `remover_chave`,
+    a coluna 'DateKey' sai do resultado (ex.: exportações no formato antigo).
+    """
+    colunas = ATRIBUTOS_DATA_FATO if colunas is None else list(colunas)
+    faltantes = [coluna for coluna in colunas if coluna not in df.columns]
+    if faltantes:
+        atributos = atributos_das_datas(dimensao, df[COLUNA_CHAVE_DATA].to_numpy(), faltantes, indice=df.index)
+        ordem = list(df.columns)
+        posicao = ordem.index(COLUNA_APOS_ATRIBUTOS) if COLUNA_APOS_ATRIBUTOS in ordem else len(ordem)
+        df = pd.concat([df, atributos], axis=1)[ordem[:posicao] + faltantes + ordem[posicao:]]
+    if remover_chave and COLUNA_CHAVE_DATA in df.columns:
+        df = df.drop(columns=COLUNA_CHAVE_DATA)
+    return df
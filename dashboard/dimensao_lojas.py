@@ -0,0 +1,95 @@
+# dashboard/dimensao_lojas.py
+"""
+Dimensão de lojas do esquema estrela.
+
+O DataFrame principal guarda só os fatos de cada dia de venda (loja, data, vendas, clientes,
+promoção, feriados e colunas derivadas de data). Os atributos da loja (tipo, sortimento,
+concorrência, Promo2...) ficam em `dimensao_lojas`, com uma linha por loja e índice 'Store',
+em vez de se repetirem em todas as linhas de venda.
+
+Quando um gráfico precisa de um atributo, ele é resolvido por posição: um vetor indexado
+pelo número da loja aponta para a linha correspondente da dimensão, e os valores são obtidos
+com um único `take`. Agrupamentos por atributo de loja podem ser feitos sobre as ~1 mil linhas
+da dimensão (ex.: agregar por loja e depois anexar o atributo).
+"""
+import numpy as np
+import pandas as pd
+
+COLUNAS_DIMENSAO_LOJAS = [
+    'StoreType', 'Assortment', 'CompetitionDistance', 'CompetitionOpenSinceMonth',
+    'CompetitionOpenSinceYear', 'Promo2', 'Promo2SinceWeek', 'Promo2SinceYear', 'PromoInterval'
+]
+# Os atributos anexados entram depois desta coluna, na mesma posição em que o merge de
+# train.csv com store.csv os colocava (mantém a ordem das colunas em exportações e na matriz de correlação)
+COLUNA_ANTES_ATRIBUTOS = 'SchoolHoliday'
+
+
+def separar_dimensao_lojas(df):
+    """
+    Separa um DataFrame "largo" (vendas já juntadas às lojas) em (fatos, dimensão).
+    A dimensão tem uma linha por loja presente em `df`, ordenada e indexada por 'Store'.
+    """
+    colunas = [coluna for coluna in COLUNAS_DIMENSAO_LOJAS if coluna in df.columns]
+    dimensao = df.drop_duplicates('Store')[['Store'] + colunas].set_index('Store').sort_index()
+    return df.drop(columns=colunas), dimensao
+
+
+def montar_dimensao_lojas(df_lojas, lojas=None):
+    """Monta a dimensão a partir da tabela de lojas tratada (opcionalmente restrita às `lojas` com vendas)."""
+    colunas = [coluna for coluna in COLUNAS_DIMENSAO_LOJAS if coluna in df_lojas.columns]
+    dimensao = df_lojas[['Store'] + colunas].drop_duplicates('Store').set_index('Store').sort_index()
+    if lojas is not None:
+        dimensao = dimensao[dimensao.index.isin(lojas)]
+    return dimensao
+
+
+def posicoes_lojas(dimensao, lojas):
+    """Posição de cada loja de `lojas` nas linhas da dimensão (-1 para lojas ausentes)."""
+    lojas = np.asarray(lojas, dtype=np.int64)
+    ids = dimensao.index.to_numpy(dtype=np.int64)
+    if len(ids) == 0:
+        return np.full(len(lojas), -1, dtype=np.intp)
+    mapa = np.full(int(ids.max()) + 1, -1, dtype=np.intp)
+    mapa[ids] = np.arange(len(ids))
+    posicoes = np.full(len(lojas), -1, dtype=np.intp)
+    validas = (lojas >= 0) & (lojas < len(mapa))
+    posicoes[validas] = mapa[lojas[validas]]
+    return posicoes
+
+
+def atributos_das_lojas(dimensao, lojas, colunas=None, indice=None):
+    """Retorna os atributos `colunas` de cada loja de `lojas` (na mesma ordem), com o `indice` informado."""
+    colunas = list(dimensao.columns) if colunas is None else list(colunas)
+    posicoes = posicoes_lojas(dimensao, lojas)
+    preencher = bool((posicoes < 0).any())
+    atributos = {}
+    for coluna in colunas:
+        serie = dimensao[coluna]
+        # Categóricas mantêm o tipo; as demais viram float apenas se houver loja ausente
+        valores = serie.array if isinstance(serie.dtype, pd.CategoricalDtype) else serie.to_numpy()
+        atributos[coluna] = pd.api.extensions.take(valores, posicoes, allow_fill=preencher)
+    return pd.DataFrame(atributos, index=indice)
+
+
+def anexar_atributos_loja(df, dimensao, colunas=None):
+    """
+    Retorna `df` com os atributos de loja `colunas` (padrão: todos) que ainda não estiverem nele.
+    Gera um novo DataFrame: use em recortes (linhas filtradas, uma linha por loja...), não no fato inteiro.
+    """
+    colunas = list(dimensao.columns) if colunas is None else list(colunas)
+    faltantes = [coluna for coluna in colunas if coluna not in df.columns]
+    if not faltantes:
+        return df
+    atributos = atributos_das_lojas(dimensao, df['Store'].to_numpy(), faltantes, indice=df.index)
+    resultado = pd.concat([df, atributos], axis=1)
+
+    if COLUNA_ANTES_ATRIBUTOS in df.columns:
+        posicao = df.columns.get_loc(COLUNA_ANTES_ATRIBUTOS) + 1
+        ordem = list(df.columns[:posicao]) + faltantes + list(df.columns[posicao:])
+        resultado = resultado[ordem]
+    return resultado
+
+
+def lojas_dos_tipos(dimensao, tipos_loja):
+    """Números das lojas cujos tipos estão em `tipos_loja`, em ordem crescente."""
+    return dimensao.index[dimensao['StoreType'].isin(tipos_loja)].to_numpy()
@@ -0,0 +1,206 @@
+# dashboard/exportacao.py
+"""
+Exportação dos dados filtrados do Dashboard Geral.
+
+Em vez de montar o recorte inteiro, convertê-lo em CSV e devolvê-lo em base64 pela resposta de
+um callback, o botão de exportação é um link para uma rota do servidor Flask que envia o arquivo
+em partes: o índice de filtros fornece as posições das linhas, e cada bloco de
+LINHAS_POR_BLOCO_EXPORTACAO linhas ganha os atributos de loja e de data, é convertido e enviado
+antes de o próximo ser montado. A memória usada não depende do tamanho do recorte, e o download
+ocupa só a thread que o atende.
+
+Formatos: CSV compactado com gzip, Parquet e Arrow IPC (stream). O parâmetro `coluna` (repetível)
+restringe as colunas exportadas; sem ele, o arquivo tem as mesmas colunas do CSV original.
+
+    /exportar/dados-filtrados?formato=parquet&data_inicio=2015-01-01&data_fim=2015-07-31&tipo=a&coluna=Store&coluna=Sales
+"""
+import io
+import zlib
+from urllib.parse import urlencode
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from flask import Response, abort, request, stream_with_context
+
+from .config import LINHAS_POR_BLOCO_EXPORTACAO, NIVEL_GZIP_EXPORTACAO
+from .dimensao_datas import ATRIBUTOS_DATA_FATO, anexar_atributos_data
+from .dimensao_lojas import anexar_atributos_loja
+from .indice_filtro import obter_indice_filtro
+from .repositorio_dados import obter_dados, obter_dados_atuais
+
+ROTA_EXPORTACAO = '/exportar/dados-filtrados'
+FORMATOS_EXPORTACAO = {
+    'csv': {'rotulo': 'CSV (gzip)', 'extensao': 'csv.gz', 'mimetype': 'application/gzip'},
+    'parquet': {'rotulo': 'Parquet', 'extensao': 'parquet', 'mimetype': 'application/vnd.apache.parquet'},
+    'arrow': {'rotulo': 'Arrow IPC', 'extensao': 'arrow', 'mimetype': 'application/vnd.apache.arrow.stream'},
+}
+# Valores aceitos pelos filtros de feriado (os mesmos dos dropdowns da barra de filtros)
+VALORES_FERIADO_ESTADUAL = ('all', '0', 'a', 'b', 'c')
+VALORES_FERIADO_ESCOLAR = ('all', '0', '1')
+
+
+def _montar_bloco(bloco, dados, colunas=None):
+    """Linhas do fato com os atributos de loja e de data (só os de `colunas`, se informadas), sem 'DateKey'."""
+    dimensao_lojas = dados["dimensao_lojas"]
+    atributos_loja = None if colunas is None else [coluna for coluna in colunas if coluna in dimensao_lojas.columns]
+    atributos_data = None if colunas is None else [coluna for coluna in colunas if coluna in ATRIBUTOS_DATA_FATO]
+    bloco = anexar_atributos_loja(bloco, dimensao_lojas, atributos_loja)
+    bloco = anexar_atributos_data(bloco, dados["dimensao_datas"], atributos_data, remover_chave=True)
+    return bloco if colunas is None else bloco[colunas]
+
+
+def colunas_exportacao(dados):
+    """Colunas do arquivo exportado completo, na ordem do CSV original (vendas + loja + data)."""
+    return list(_montar_bloco(dados["df_principal"].iloc[:0], dados).columns)
+
+
+def blocos_exportacao(dados, data_inicio, data_fim, tipos_loja=None, lojas_especificas=None,
+                      feriado_estadual='all', feriado_escolar='all', colunas=None,
+                      linhas_por_bloco=LINHAS_POR_BLOCO_EXPORTACAO):
+    """
+    Gera o recorte filtrado (mesmos filtros de `filtrar_dataframe`) em DataFrames de até
+    `linhas_por_bloco` linhas, em ordem de data. Um recorte vazio gera um único bloco vazio,
+    para que o arquivo tenha ao menos o cabeçalho/esquema.
+    """
+    df_principal = dados["df_principal"]
+    posicoes = slice(0, 0)
+    if data_inicio and data_fim and pd.to_datetime(data_inicio) <= pd.to_datetime(data_fim):
+        indice = obter_indice_filtro(df_principal, dados["dimensao_lojas"])
+        posicoes = indice.posicoes(pd.to_datetime(data_inicio), pd.to_datetime(data_fim), tipos_loja,
+                                   lojas_especificas, feriado_estadual, feriado_escolar)
+
+    if isinstance(posicoes, slice):
+        inicios = range(posicoes.start, posicoes.stop, linhas_por_bloco)
+        obter_bloco = lambda inicio: df_principal.iloc[inicio:min(inicio + linhas_por_bloco, posicoes.stop)]
+    else:
+        inicios = range(0, len(posicoes), linhas_por_bloco)
+        obter_bloco = lambda inicio: df_principal.take(posicoes[inicio:inicio + linhas_por_bloco])
+
+    if len(inicios) == 0:
+        yield _montar_bloco(df_principal.iloc[:0], dados, colunas)
+    for inicio in inicios:
+        yield _montar_bloco(obter_bloco(inicio), dados, colunas)
+
+
+class _SaidaEmMemoria(io.RawIOBase):
+    """Destino dos writers do pyarrow: acumula os bytes escritos até o próximo envio."""
+
+    def __init__(self):
+        super().__init__()
+        self.partes = []
+
+    def writable(self):
+        return True
+
+    def write(self, conteudo):
+        self.partes.append(bytes(conteudo))
+        return len(conteudo)
+
+    def esvaziar(self):
+        conteudo = b''.join(self.partes)
+        self.partes = []
+        return conteudo
+
+
+def _gerar_csv_gzip(blocos):
+    compressor = zlib.compressobj(NIVEL_GZIP_EXPORTACAO, zlib.DEFLATED, 16 + zlib.MAX_WBITS)  # cabeçalho gzip
+    for numero, bloco in enumerate(blocos):
+        conteudo = compressor.compress(bloco.to_csv(index=False, header=numero == 0).encode('utf-8'))
+        if conteudo:
+            yield conteudo
+    yield compressor.flush()
+
+
+def _gerar_arrow(blocos, formato):
+    """Parquet (um row group por bloco) ou Arrow IPC (um record batch por bloco)."""
+    saida = _SaidaEmMemoria()
+    escritor = None
+    esquema = None
+    for bloco in blocos:
+        tabela = pa.Table.from_pandas(bloco, schema=esquema, preserve_index=False)
+        if escritor is None:
+            esquema = tabela.schema
+            escritor = pq.ParquetWriter(saida, esquema) if formato == 'parquet' else pa.ipc.new_stream(saida, esquema)
+        escritor.write_table(tabela)
+        conteudo = saida.esvaziar()
+        if conteudo:
+            yield conteudo
+    escritor.close()
+    yield saida.esvaziar()
+
+
+def gerar_arquivo_exportacao(formato, blocos):
+    """Bytes do arquivo no `formato` informado, produzidos à medida que os `blocos` são consumidos."""
+    if formato == 'csv':
+        return _gerar_csv_gzip(blocos)
+    return _gerar_arrow(blocos, formato)
+
+
+def url_exportacao(aplicativo, formato, data_inicio, data_fim, tipos_loja=None, lojas_especificas=None,
+                   feriado_estadual='all', feriado_escolar='all', colunas=None, versao=None):
+    """Link (relativo ao prefixo do aplicativo Dash) que baixa o recorte com os filtros informados."""
+    parametros = {
+        'formato': formato,
+        'versao': versao or '',
+        'data_inicio': data_inicio or '',
+        'data_fim': data_fim or '',
+        'tipo': list(tipos_loja or []),
+        'loja': list(lojas_especificas or []),
+        'feriado_estadual': feriado_estadual or 'all',
+        'feriado_escolar': feriado_escolar or 'all',
+        'coluna': list(colunas or []),
+    }
+    return f"{aplicativo.get_relative_path(ROTA_EXPORTACAO)}?{urlencode(parametros, doseq=True)}"
+
+
+def registrar_rota_exportacao(servidor):
+    """Registra a rota de exportação no servidor Flask do aplicativo."""
+
+    @servidor.route(ROTA_EXPORTACAO)
+    def exportar_dados_filtrados():
+        formato = request.args.get('formato', 'csv')
+        if formato not in FORMATOS_EXPORTACAO:
+            abort(400, f"Formato inválido: '{formato}'. Use um de {tuple(FORMATOS_EXPORTACAO)}.")
+
+        # Todos os parâmetros são validados aqui: depois que a resposta começa, um erro só truncaria o arquivo
+        # O dicionário da versão fica referenciado pelo gerador: uma recarga durante o download não o afeta
+        dados = obter_dados(request.args.get('versao')) or obter_dados_atuais()
+        colunas = list(dict.fromkeys(request.args.getlist('coluna'))) or None
+        if colunas:
+            disponiveis = set(colunas_exportacao(dados))
+            desconhecidas = [coluna for coluna in colunas if coluna not in disponiveis]
+            if desconhecidas:
+                abort(400, f"Colunas desconhecidas: {desconhecidas}.")
+
+        data_inicio, data_fim = request.args.get('data_inicio'), request.args.get('data_fim')
+        try:
+            data_inicio_dt = pd.Timestamp(data_inicio) if data_inicio else None
+            data_fim_dt = pd.Timestamp(data_fim) if data_fim else None
+        except ValueError:
+            abort(400, "Datas devem estar no formato AAAA-MM-DD.")
+
+        feriado_estadual = request.args.get('feriado_estadual', 'all')
+        feriado_escolar = request.args.get('feriado_escolar', 'all')
+        if feriado_estadual not in VALORES_FERIADO_ESTADUAL:
+            abort(400, f"Feriado estadual inválido: '{feriado_estadual}'. Use um de {VALORES_FERIADO_ESTADUAL}.")
+        if feriado_escolar not in VALORES_FERIADO_ESCOLAR:
+            abort(400, f"Feriado escolar inválido: '{feriado_escolar}'. Use um de {VALORES_FERIADO_ESCOLAR}.")
+
+        lojas = request.args.getlist('loja')
+        if not all(loja.isdigit() for loja in lojas):
+            abort(400, "Lojas devem ser números inteiros.")
+        blocos = blocos_exportacao(
+            dados, data_inicio_dt, data_fim_dt, request.args.getlist('tipo'), [int(loja) for loja in lojas],
+            feriado_estadual, feriado_escolar, colunas
+        )
+
+        configuracao = FORMATOS_EXPORTACAO[formato]
+        nome_arquivo = f"rossmann_dados_filtrados_{data_inicio}_a_{data_fim}.{configuracao['extensao']}"
+        return Response(
+            stream_with_context(gerar_arquivo_exportacao(formato, blocos)),
+            mimetype=configuracao['mimetype'],
+            headers={'Content-Disposition': f'attachment; filename="{nome_arquivo}"'}
+        )
+
+    return exportar_dados_filtrados
@@ -0,0 +1,169 @@
+# dashboard/indice_filtro.py
+"""
+Índice pré-construído para os filtros do dashboard.
+
+Em vez de montar máscaras booleanas sobre o DataFrame inteiro a cada callback, o índice
+mantém as linhas ordenadas por data (faixas de datas viram buscas binárias) e, para cada
+loja e cada tipo de loja, o vetor ordenado de posições das suas linhas. Os filtros são
+resolvidos com NumPy sobre essas posições e o DataFrame só é tocado uma vez no final,
+por um fatiamento (view) ou por um único `take`.
+
+Em tabelas de fatos sem a coluna 'StoreType' (ver `dimensao_lojas`), o tipo de cada linha é
+resolvido pela dimensão de lojas uma única vez, na construção do índice.
+"""
+import weakref
+
+import numpy as np
+import pandas as pd
+
+from .dimensao_lojas import atributos_das_lojas
+
+# Índices já construídos, indexados pelo id() do DataFrame de origem.
+# A entrada é removida automaticamente quando o DataFrame é coletado.
+_INDICES = {}
+
+
+def _agrupar_posicoes(valores):
+    """Retorna {valor: posições ordenadas} usando uma única ordenação estável."""
+    ordem = np.argsort(valores, kind='stable')
+    valores_ordenados = valores[ordem]
+    inicios = np.flatnonzero(np.r_[True, valores_ordenados[1:] != valores_ordenados[:-1]])
+    fins = np.r_[inicios[1:], len(valores_ordenados)]
+    return {
+        valores_ordenados[inicio].item(): ordem[inicio:fim].astype(np.int32)
+        for inicio, fim in zip(inicios, fins)
+    }
+
+
+def _codigos_coluna(serie):
+    """Retorna (códigos inteiros, {valor: código}) para uma coluna categórica ou comum."""
+    if not isinstance(serie.dtype, pd.CategoricalDtype):
+        serie = serie.astype('category')
+    mapa_codigos = {valor: codigo for codigo, valor in enumerate(serie.cat.categories)}
+    return serie.cat.codes.to_numpy(), mapa_codigos
+
+
+class IndiceFiltro:
+    """Índice de filtragem por data, tipo de loja, loja e feriados para um DataFrame."""
+
+    def __init__(self, df, dimensao_lojas=None):
+        self.total_linhas = len(df)
+
+        datas = df['Date'].to_numpy()
+        # Se o DataFrame já estiver ordenado por data (caso do carregar_dados), não há permutação
+        self.ordem = None if df['Date'].is_monotonic_increasing else np.argsort(datas, kind='stable')
+        self.datas = datas if self.ordem is None else datas[self.ordem]
+
+        def reordenar(valores):
+            return valores if self.ordem is None else valores[self.ordem]
+
+        # Tabelas já consolidadas sem a dimensão loja (ex.: o nível diário do cubo) não têm 'Store'
+        self.posicoes_por_loja = _agrupar_posicoes(reordenar(df['Store'].to_numpy())) if 'Store' in df.columns else {}
+
+        if 'StoreType' in df.columns:
+            tipos = df['StoreType']
+        elif dimensao_lojas is not None:
+            tipos = atributos_das_lojas(dimensao_lojas, df['Store'].to_numpy(), ['StoreType'])['StoreType']
+        else:
+            tipos = None
+        # Sem tipos (fato sem dimensão informada) o filtro de tipo de loja não se aplica
+        self.posicoes_por_tipo = {}
+        if tipos is not None:
+            codigos_tipo, mapa_tipos = _codigos_coluna(tipos)
+            posicoes_por_codigo = _agrupar_posicoes(reordenar(codigos_tipo))
+            self.posicoes_por_tipo = {
+                tipo: posicoes_por_codigo[codigo] for tipo, codigo in mapa_tipos.items() if codigo in posicoes_por_codigo
+            }
+
+        codigos_feriado, self.mapa_feriado_estadual = _codigos_coluna(df['StateHoliday'])
+        self.codigos_feriado_estadual = reordenar(codigos_feriado)
+        self.feriado_escolar = reordenar(df['SchoolHoliday'].to_numpy())
+
+    def _faixa_datas(self, data_inicio_dt, data_fim_dt):
+        """Retorna o intervalo [inicio, fim) de posições dentro do período (inclusivo)."""
+        inicio = np.searchsorted(self.datas, pd.Timestamp(data_inicio_dt).to_datetime64().astype(self.datas.dtype), side='left')
+        fim = np.searchsorted(self.datas, pd.Timestamp(data_fim_dt).to_datetime64().astype(self.datas.dtype), side='right')
+        return inicio, fim
+
+    @staticmethod
+    def _posicoes_na_faixa(posicoes_por_chave, chaves, inicio, fim):
+        """Une as posições das chaves informadas, restritas ao intervalo [inicio, fim)."""
+        partes = []
+        for chave in chaves:
+            posicoes = posicoes_por_chave.get(chave)
+            if posicoes is None:
+                continue
+            partes.append(posicoes[np.searchsorted(posicoes, inicio):np.searchsorted(posicoes, fim)])
+        if not partes:
+            return np.empty(0, dtype=np.int32)
+        if len(partes) == 1:
+            return partes[0]
+        # Os conjuntos são disjuntos; ordenar mantém o resultado em ordem de data
+        return np.sort(np.concatenate(partes))
+
+    def filtrar(self, df, data_inicio_dt, data_fim_dt, tipos_loja=None, lojas_especificas=None,
+                feriado_estadual='all', feriado_escolar='all'):
+        """
+        Aplica os filtros e retorna as linhas correspondentes de `df` em ordem de data.
+
+        Quando só o período é filtrado e o DataFrame já está ordenado, o resultado é uma
+        view (fatiamento); nos demais casos é feito um único `take`. O resultado deve ser
+        tratado como somente leitura.
+        """
+        posicoes = self.posicoes(data_inicio_dt, data_fim_dt, tipos_loja, lojas_especificas, feriado_estadual, feriado_escolar)
+        if isinstance(posicoes, slice):
+            return df.iloc[posicoes]
+        return df.take(posicoes)
+
+    def posicoes(self, data_inicio_dt, data_fim_dt, tipos_loja=None, lojas_especificas=None,
+                 feriado_estadual='all', feriado_escolar='all'):
+        """
+        Posições em `df` das linhas que passam pelos filtros, em ordem de data: um `slice` quando
+        só o período é filtrado e o DataFrame já está ordenado, senão um array de posições.
+        Permite percorrer o resultado em blocos sem materializá-lo (ex.: exportações).
+        """
+        inicio, fim = self._faixa_datas(data_inicio_dt, data_fim_dt)
+        posicoes = None
+
+        # Seleções que cobrem todos os valores não restringem nada e dispensam o `take`
+        if tipos_loja and not self.posicoes_por_tipo.keys() <= set(tipos_loja):
+            posicoes = self._posicoes_na_faixa(self.posicoes_por_tipo, tipos_loja, inicio, fim)
+        if lojas_especificas:
+            posicoes_lojas = self._posicoes_na_faixa(self.posicoes_por_loja, [int(loja) for loja in lojas_especificas], inicio, fim)
+            posicoes = posicoes_lojas if posicoes is None else np.intersect1d(posicoes, posicoes_lojas, assume_unique=True)
+
+        filtra_feriado_estadual = feriado_estadual != 'all'
+        filtra_feriado_escolar = feriado_escolar != 'all'
+        if filtra_feriado_estadual or filtra_feriado_escolar:
+            if posicoes is None:
+                posicoes = np.arange(inicio, fim, dtype=np.int32)
+            mascara = np.ones(len(posicoes), dtype=bool)
+            if filtra_feriado_estadual:
+                codigo = self.mapa_feriado_estadual.get(feriado_estadual, -2)
+                mascara &= self.codigos_feriado_estadual[posicoes] == codigo
+            if filtra_feriado_escolar:
+                mascara &= self.feriado_escolar[posicoes] == int(feriado_escolar)
+            posicoes = posicoes[mascara]
+
+        if posicoes is None:
+            if self.ordem is None:
+                return slice(inicio, fim)
+            posicoes = np.arange(inicio, fim)
+        if self.ordem is not None:
+            posicoes = self.ordem[posicoes]
+        return posicoes
+
+
+def obter_indice_filtro(df, dimensao_lojas=None):
+    """
+    Retorna o índice de filtragem de `df`, construindo-o na primeira chamada.
+    `dimensao_lojas` é necessária para filtrar por tipo de loja um fato sem a coluna 'StoreType'.
+    """
+    chave = id(df)
+    indice = _INDICES.get(chave)
+    sem_tipos = indice is not None and not indice.posicoes_por_tipo and dimensao_lojas is not None
+    if indice is None or indice.total_linhas != len(df) or sem_tipos:
+        indice = IndiceFiltro(df, dimensao_lojas)
+        _INDICES[chave] = indice
+        weakref.finalize(df, _INDICES.pop, chave, None)
+    return indice
@@ -11,6 +11,7 @@ outros módulos como app.py e callbacks.py.
 Importa e expõe:
 1. Componentes compartilhados (barra lateral, cards, etc.)
 2. Layouts específicos de cada página
+3. O registro das páginas, montadas sob demanda na primeira visita
 """
 
 # Importação de Componentes Compartilhados
@@ -32,4 +33,7 @@ from .layout_analise_preliminar import criar_layout_analise_preliminar
 from .layout_dashboard_geral import criar_layout_dashboard_analise
 from .layout_analise_lojas import criar_layout_analise_lojas
 from .layout_analise_3d import criar_layout_analise_3d
-from .layout_previsao_vendas import criar_layout_previsao_vendas
\ No newline at end of file
+from .layout_previsao_vendas import criar_layout_previsao_vendas
+
+# Registro das Páginas (montadas sob demanda)
+from .paginas import PAGINAS, caminho_da_pagina, obter_layout_pagina
\ No newline at end of file
@@ -9,11 +9,12 @@ def criar_layout_analise_3d(dados): # Refatorar nome da função e parâmetro
     """Cria o layout da página de Análise 3D com filtros por gráfico."""
     nome_pagina = "analise-3d" # Refatorar nome da variável
     df_principal = dados['df_principal'] # Usar o novo nome do DataFrame principal
+    dimensao_lojas = dados['dimensao_lojas'] # Uma linha por loja, com tipo e demais atributos
 
     # Opções para os filtros
-    opcoes_tipo_loja = [{'label': f'Tipo {t.upper()}', 'value': t} for t in sorted(df_principal['StoreType'].unique())] # Refatorar nome da variável e DataFrame
-    todos_tipos_loja = sorted(df_principal['StoreType'].unique()) # Refatorar nome da variável e DataFrame
-    todas_lojas = sorted(df_principal['Store'].unique()) # Refatorar nome da variável e DataFrame
+    opcoes_tipo_loja = [{'label': f'Tipo {t.upper()}', 'value': t} for t in sorted(dimensao_lojas['StoreType'].unique())] # Refatorar nome da variável e DataFrame
+    todos_tipos_loja = sorted(dimensao_lojas['StoreType'].unique()) # Refatorar nome da variável e DataFrame
+    todas_lojas = list(dimensao_lojas.index) # Refatorar nome da variável e DataFrame
     opcoes_loja = [{'label': f'Loja {s}', 'value': s} for s in todas_lojas] # Refatorar nome da variável
 
     return dbc.Container(
@@ -236,7 +236,7 @@ barra_lateral = html.Div( # Refatorar nome da variável
 # ==============================================================================
 # PAINEL DE FILTROS REUTILIZÁVEL
 # ==============================================================================
-def criar_card_filtros(df_principal, prefix=''): # Refatorar nome da função e adiciona prefixo para IDs
+def criar_card_filtros(df_principal, dimensao_lojas, prefix=''): # Refatorar nome da função e adiciona prefixo para IDs
     """Cria o painel de filtros que pode ser usado em múltiplas páginas, com namespace opcional."""
     return dbc.Card([
         dbc.CardHeader(html.H4([html.I(className="fas fa-filter me-2"), "Painel de Filtros"], className="m-0 p-2 text-center fw-bold")),
@@ -260,8 +260,8 @@ def criar_card_filtros(df_principal, prefix=''): # Refatorar nome da função e
                         dbc.Label("Tipo(s) de Loja", html_for=prefix+"filtro-tipo-loja", className="fw-bold"),
                         dcc.Dropdown(
                             id=prefix+"filtro-tipo-loja",
-                            options=[{'label': t, 'value': t} for t in sorted(df_principal['StoreType'].unique())],
-                            value=sorted(df_principal['StoreType'].unique()),
+                            options=[{'label': t, 'value': t} for t in sorted(dimensao_lojas['StoreType'].unique())],
+                            value=sorted(dimensao_lojas['StoreType'].unique()),
                             multi=True,
                             placeholder="Selecione tipos de loja",
                             className="dropdown-dash"
@@ -271,7 +271,7 @@ def criar_card_filtros(df_principal, prefix=''): # Refatorar nome da função e
                         dbc.Label("Loja(s) Específica(s)", html_for=prefix+"filtro-loja-especifica", className="fw-bold mb-2"),
                         dcc.Dropdown(
                             id=prefix+"filtro-loja-especifica",
-                            options=[{'label': str(s), 'value': s} for s in sorted(df_principal['Store'].unique())],
+                            options=[{'label': str(s), 'value': s} for s in dimensao_lojas.index],
                             value=[],
                             multi=True,
                             placeholder="Busque por uma ou mais lojas...",
@@ -397,7 +397,7 @@ def criar_card_filtros_3d(df_principal): # Refatorar nome da função e parâmet
         ])
     ], className="custom-card mb-4")
 
-def criar_card_filtros_analise_lojas(df_principal): # Refatorar nome da função e parâmetro
+def criar_card_filtros_analise_lojas(df_principal, dimensao_lojas): # Refatorar nome da função e parâmetro
     """Cria um painel de filtros otimizado para a página de Análise de Lojas."""
     return dbc.Card([
         dbc.CardHeader(html.H4([html.I(className="fas fa-filter me-2"), "Painel de Filtros"], className="m-0 p-2 text-center fw-bold")),
@@ -421,8 +421,8 @@ def criar_card_filtros_analise_lojas(df_principal): # Refatorar nome da função
                         dbc.Label("Tipo(s) de Loja", html_for="filtro-tipo-loja", className="fw-bold"), # Refatorar ID
                         dcc.Dropdown(
                             id='filtro-tipo-loja', # Refatorar ID
-                            options=[{'label': t, 'value': t} for t in sorted(df_principal['StoreType'].unique())], # Usar novo DataFrame
-                            value=sorted(df_principal['StoreType'].unique()), # Usar novo DataFrame
+                            options=[{'label': t, 'value': t} for t in sorted(dimensao_lojas['StoreType'].unique())], # Tipos da dimensão de lojas
+                            value=sorted(dimensao_lojas['StoreType'].unique()), # Tipos da dimensão de lojas
                             multi=True,
                             placeholder="Selecione tipos de loja",
                             className="dropdown-dash" # Refatorar classe CSS
@@ -436,7 +436,7 @@ def criar_card_filtros_analise_lojas(df_principal): # Refatorar nome da função
                         dbc.Label("Loja(s) Específica(s)", html_for="filtro-loja-especifica", className="fw-bold mb-2"), # Refatorar ID
                         dcc.Dropdown(
                             id='filtro-loja-especifica', # Refatorar ID
-                            options=[{'label': str(s), 'value': s} for s in sorted(df_principal['Store'].unique())], # Usar novo DataFrame
+                            options=[{'label': str(s), 'value': s} for s in dimensao_lojas.index], # Lojas da dimensão (já ordenadas)
                             value=[],
                             multi=True,
                             placeholder="Busque por uma ou mais lojas...",
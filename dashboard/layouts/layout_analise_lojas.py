@@ -1,7 +1,8 @@
 import dash_bootstrap_components as dbc
-from dash import dcc, html
+from dash import dcc, html, dash_table
 
 from .componentes_compartilhados import criar_botoes_cabecalho, criar_card_filtros_analise_lojas # Refatorar nomes de módulos e funções
+from ..config import AZUL_ESCURO
 
 def criar_layout_analise_lojas(dados): # Refatorar nome da função e parâmetro
     """Cria o layout da página de Análise Comparativa de Lojas."""
@@ -16,7 +17,7 @@ def criar_layout_analise_lojas(dados): # Refatorar nome da função e parâmetro
 
         # --- Filtros Otimizados para esta página ---
         dbc.Row([
-            dbc.Col(criar_card_filtros_analise_lojas(df_principal), width=12) # Usar nova função e DataFrame
+            dbc.Col(criar_card_filtros_analise_lojas(df_principal, dados['dimensao_lojas']), width=12) # Usar nova função e DataFrame
         ], className="mb-4"),
 
         # --- Controles Específicos da Página ---
@@ -54,7 +55,7 @@ def criar_layout_analise_lojas(dados): # Refatorar nome da função e parâmetro
                         )
                     ], md=4),
                     dbc.Col([
-                        dbc.Label("Número de Lojas a Exibir", html_for="slider-contagem-ranking", className="fw-bold"), # Refatorar ID
+                        dbc.Label("Lojas por Página do Ranking", html_for="slider-contagem-ranking", className="fw-bold"), # Refatorar ID
                         dcc.Slider(id='slider-contagem-ranking', min=5, max=50, step=5, value=10, # Refatorar ID
                                    marks={i: str(i) for i in range(5, 51, 5)})
                     ], md=4)
@@ -72,7 +73,22 @@ def criar_layout_analise_lojas(dados): # Refatorar nome da função e parâmetro
                         dbc.CardHeader(html.H5("Ranking de Lojas", className="card-title fw-bold m-0")),
                         dbc.CardBody([
                             html.P("Selecione uma loja na tabela para ver seus detalhes ao lado. Se clicar em duas, os dados das duas serão comparados.", className="card-subtitle mb-3 text-muted"),
-                            dcc.Loading(type="circle", children=html.Div(id="tabela-ranking-lojas")) # Refatorar ID
+                            html.Div(id="aviso-ranking-lojas"),
+                            # Só a página atual do ranking vai ao navegador: paginação e ordenação são feitas no servidor
+                            dash_table.DataTable(
+                                id='tabela-ranking-lojas', # Refatorar ID
+                                data=[],
+                                page_action='custom',
+                                page_current=0,
+                                page_size=10,
+                                sort_action='custom',
+                                sort_mode='single',
+                                sort_by=[],
+                                style_as_list_view=True,
+                                style_table={'overflowX': 'auto', 'marginTop': '1rem'},
+                                style_header={'backgroundColor': AZUL_ESCURO, 'color': 'white', 'fontWeight': 'bold'},
+                                style_cell={'textAlign': 'left', 'padding': '8px', 'cursor': 'pointer', 'fontFamily': 'inherit'}
+                            )
                         ])
                     ], className="custom-card"
                 ),
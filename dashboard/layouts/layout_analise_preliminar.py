@@ -6,6 +6,8 @@ import pandas as pd
 
 from .componentes_compartilhados import criar_botoes_cabecalho # Refatorar nome do módulo e da função
 from ..utils import criar_figura_vazia # Refatorar nome do módulo e da função
+from ..dimensao_datas import anexar_atributos_data
+from ..dimensao_lojas import anexar_atributos_loja
 from ..config import (
     VERMELHO_ROSSMANN, CINZA_NEUTRO, COLUNAS_NUMERICAS_VENDAS, # Importar novas constantes
     COLUNAS_NUMERICAS_LOJAS_PARA_PLOTAR # Importar novas constantes
@@ -14,8 +16,13 @@ from ..config import (
 def criar_layout_analise_preliminar(dados): # Refatorar nome da função e parâmetro
     nome_pagina = "analise-preliminar" # Refatorar nome da variável
     df_principal = dados["df_principal"] # Usar o novo nome do DataFrame principal
+    dimensao_lojas = dados["dimensao_lojas"]
 
-    matriz_corr = df_principal.select_dtypes(include=np.number).corr() # Refatorar nome da variável e DataFrame
+    # A matriz inclui os atributos numéricos da loja e da data, resolvidos para cada linha pelas dimensões
+    df_numerico = anexar_atributos_loja(df_principal.select_dtypes(include=np.number), dimensao_lojas, dimensao_lojas.select_dtypes(include=np.number).columns)
+    df_numerico = anexar_atributos_data(df_numerico, dados["dimensao_datas"], remover_chave=True)
+    matriz_corr = df_numerico.corr() # Refatorar nome da variável e DataFrame
+    del df_numerico
     fig_matriz_corr = px.imshow( # Refatorar nome da variável
         matriz_corr, # Usar nova variável refatorada
         text_auto='.2f',
@@ -8,6 +8,7 @@ import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
 
 from dashboard.config import VERMELHO_ROSSMANN, AZUL_ESCURO, FUNDO_CINZA_CLARO, BRANCO_NEUTRO, AZUL_DESTAQUE, VERDE_DESTAQUE, AMARELO_DESTAQUE, PALETA_CORES_GRAFICO, CINZA_NEUTRO
+from dashboard.dimensao_datas import ATRIBUTOS_DATA_FATO, COLUNA_CHAVE_DATA
 # from .shared_components import generate_section_title # Esta função não está sendo usada no layout atual. Será removida ou traduzida se for usada em outro lugar.
 
 def criar_layout_contextualizacao(dados):
@@ -15,7 +16,11 @@ def criar_layout_contextualizacao(dados):
     df_principal = dados['df_principal']
     df_vendas_original = dados['df_vendas_original']
     df_caracteristicas_original = dados['df_lojas_original']
-    todas_colunas = sorted(df_principal.columns.tolist())
+    # Colunas do DataFrame original: fatos (sem a chave DateKey) + atributos das dimensões de lojas e de datas
+    todas_colunas = sorted(
+        [coluna for coluna in df_principal.columns if coluna != COLUNA_CHAVE_DATA]
+        + dados['dimensao_lojas'].columns.tolist() + ATRIBUTOS_DATA_FATO
+    )
     
     # Calcula algumas estatísticas básicas
     periodo_inicio = df_principal['Date'].min().strftime('%d/%m/%Y')
@@ -2,20 +2,36 @@ import dash_bootstrap_components as dbc
 from dash import dcc, html
 
 from .componentes_compartilhados import criar_card_filtros, criar_card_grafico
+from ..exportacao import FORMATOS_EXPORTACAO, colunas_exportacao
 from ..utils import criar_icone_informacao
 
 def criar_layout_dashboard_analise(dados):
     nome_pagina = "dashboard"
     df_principal = dados["df_principal"]
 
-    card_filtros = criar_card_filtros(df_principal, prefix='dashboard-')
+    card_filtros = criar_card_filtros(df_principal, dados["dimensao_lojas"], prefix='dashboard-')
 
     return html.Div([
         html.Div([
             html.H1("Visão Geral e Análise de Vendas", className="page-title"), # Título atualizado
             html.Div([
-                html.Button([html.I(className="fas fa-download me-2"), "Exportar CSV"], id='dashboard-botao-baixar-dados-filtrados', className='btn btn-primary-custom'),
-                dcc.Download(id="download-df-csv"),
+                dcc.Dropdown(
+                    id='dashboard-colunas-exportacao',
+                    options=[{'label': coluna, 'value': coluna} for coluna in colunas_exportacao(dados)],
+                    multi=True,
+                    placeholder="Todas as colunas",
+                    style={'minWidth': '220px'},
+                    className='me-2'
+                ),
+                dcc.Dropdown(
+                    id='dashboard-formato-exportacao',
+                    options=[{'label': formato['rotulo'], 'value': valor} for valor, formato in FORMATOS_EXPORTACAO.items()],
+                    value='csv',
+                    clearable=False,
+                    style={'width': '140px'},
+                    className='me-2'
+                ),
+                html.A([html.I(className="fas fa-download me-2"), "Exportar"], id='dashboard-botao-baixar-dados-filtrados', className='btn btn-primary-custom'),
                 html.Button(html.I(className="fas fa-sync-alt"), id='dashboard-botao-resetar-filtros', className='btn btn-outline-secondary ms-2', title='Resetar Filtros'),
                 html.Button(html.I(className="fas fa-expand-alt"), id={'type': 'botao-tela-cheia', 'index': nome_pagina}, className='btn btn-outline-secondary ms-2', title='Tela Cheia'),
                 dcc.Store(id={'type': 'saida-tela-cheia', 'index': nome_pagina})
@@ -0,0 +1,55 @@
+# dashboard/layouts/paginas.py
+"""
+Páginas do dashboard, montadas sob demanda.
+
+O layout inicial traz só a barra lateral e um contêiner vazio por página. O conteúdo de uma
+página é montado na primeira vez que ela é visitada na sessão (callback `montar_pagina_visitada`),
+e só então seus componentes passam a existir no navegador: os callbacks das páginas ainda não
+visitadas não disparam no carregamento inicial.
+
+Algumas páginas exibem valores do dataset, então cada layout montado fica guardado por versão
+dos dados e é reaproveitado pelas sessões seguintes do worker.
+"""
+from ..repositorio_dados import CachePorVersao, ao_preparar_versao, obter_versao_atual
+from .layout_contextualizacao import criar_layout_contextualizacao
+from .layout_limpeza_dados import criar_layout_limpeza_dados
+from .layout_analise_preliminar import criar_layout_analise_preliminar
+from .layout_dashboard_geral import criar_layout_dashboard_analise
+from .layout_analise_lojas import criar_layout_analise_lojas
+from .layout_analise_3d import criar_layout_analise_3d
+from .layout_previsao_vendas import criar_layout_previsao_vendas
+
+# Caminho de cada página e a função que monta seu layout a partir do dicionário de dados
+CONSTRUTORES_PAGINAS = {
+    "/": criar_layout_contextualizacao,
+    "/limpeza-dados": criar_layout_limpeza_dados,
+    "/analise-preliminar": criar_layout_analise_preliminar,
+    "/dashboard": criar_layout_dashboard_analise,
+    "/analise-lojas": criar_layout_analise_lojas,
+    "/analise-3d": criar_layout_analise_3d,
+    "/previsao-vendas": lambda dados: criar_layout_previsao_vendas(),
+}
+PAGINAS = list(CONSTRUTORES_PAGINAS)
+PAGINA_INICIAL = "/"
+
+# Layouts montados, por (versão dos dados, caminho)
+_layouts_paginas = CachePorVersao()
+
+
+def caminho_da_pagina(caminho):
+    """Página exibida para o caminho da URL (caminhos desconhecidos mostram a página inicial)."""
+    return caminho if caminho in CONSTRUTORES_PAGINAS else PAGINA_INICIAL
+
+
+def obter_layout_pagina(caminho, dados):
+    """Layout da página `caminho` para a versão de `dados`, montado na primeira chamada."""
+    return _layouts_paginas.obter_ou_montar(dados["versao"], lambda: CONSTRUTORES_PAGINAS[caminho](dados), caminho)
+
+
+@ao_preparar_versao
+def _preparar_paginas_visitadas(dados_novos):
+    # As páginas já visitadas na versão atual são montadas para a nova antes da troca
+    versao_atual = obter_versao_atual()
+    for versao, caminho in _layouts_paginas.chaves():
+        if versao == versao_atual:
+            obter_layout_pagina(caminho, dados_novos)
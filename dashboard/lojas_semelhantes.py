@@ -0,0 +1,130 @@
+# dashboard/lojas_semelhantes.py
+"""
+Lojas semelhantes: vizinhos mais próximos de cada loja pelo seu perfil de vendas.
+
+O perfil de uma loja é calculado sobre todo o histórico da versão dos dados e junta:
+- a curva do dia da semana e a sazonalidade mensal (média de vendas de cada dia/mês dividida
+  pela média da loja, ou seja, a forma da curva e não o tamanho da loja);
+- o ganho das promoções (média com promoção / média sem promoção - 1);
+- o ticket médio e a distância do concorrente (em escala log);
+- o tipo de loja e o sortimento (one-hot).
+
+As colunas são padronizadas (`StandardScaler`) e cada bloco é dividido pela raiz do seu número
+de colunas, para que as 12 colunas da sazonalidade não pesem mais que o ticket. A semelhança
+entre duas lojas é o cosseno entre os perfis; a tabela com as VIZINHOS_LOJAS_SEMELHANTES lojas
+mais semelhantes a cada uma é montada na primeira consulta da versão, e as consultas seguintes
+só leem uma linha dessa tabela.
+"""
+import numpy as np
+import pandas as pd
+from sklearn.metrics.pairwise import cosine_similarity
+from sklearn.preprocessing import StandardScaler
+
+from .config import VIZINHOS_LOJAS_SEMELHANTES, LOJAS_SEMELHANTES_EXIBIDAS
+from .dimensao_datas import COLUNA_CHAVE_DATA
+from .dimensao_lojas import posicoes_lojas
+from .repositorio_dados import CachePorVersao
+
+_indices_por_versao = CachePorVersao()
+
+
+def _perfis_lojas(df_principal, dimensao_lojas, dimensao_datas):
+    """Blocos do perfil de cada loja (linhas na ordem da dimensão de lojas), antes da padronização."""
+    quantidade = len(dimensao_lojas)
+    linhas = posicoes_lojas(dimensao_lojas, df_principal['Store'].to_numpy())
+    validas = linhas >= 0
+    linhas = linhas[validas]
+    vendas = df_principal['Sales'].to_numpy()[validas].astype(np.float64)
+
+    def media_por(grupos=None, tamanho=1):
+        # Média de vendas de cada (loja, grupo); NaN onde a loja não tem dias no grupo
+        celulas = linhas * tamanho + (0 if grupos is None else grupos)
+        soma = np.bincount(celulas, weights=vendas, minlength=quantidade * tamanho)
+        dias = np.bincount(celulas, minlength=quantidade * tamanho)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return (soma / dias).reshape(quantidade, tamanho)
+
+    media_loja = media_por()
+    with np.errstate(invalid='ignore', divide='ignore'):
+        dias_semana = df_principal['DayOfWeek'].to_numpy()[validas].astype(np.intp) - 1
+        # Dia da semana sem vendas é dia em que a loja não abre: proporção zero
+        curva_semana = np.nan_to_num(media_por(dias_semana, 7) / media_loja, nan=0.0)
+
+        meses = dimensao_datas['Month'].to_numpy()[df_principal[COLUNA_CHAVE_DATA].to_numpy()[validas]].astype(np.intp) - 1
+        # Mês fora do histórico da loja: proporção neutra
+        sazonalidade = np.nan_to_num(media_por(meses, 12) / media_loja, nan=1.0)
+
+        por_promo = media_por(df_principal['Promo'].to_numpy()[validas].astype(np.intp), 2)
+        ganho_promo = np.nan_to_num(por_promo[:, 1] / por_promo[:, 0] - 1, nan=0.0, posinf=0.0)
+
+    ticket = df_principal['SalesPerCustomer'].to_numpy()[validas].astype(np.float64)
+    com_ticket = ~np.isnan(ticket)
+    soma_ticket = np.bincount(linhas[com_ticket], weights=ticket[com_ticket], minlength=quantidade)
+    dias_ticket = np.bincount(linhas[com_ticket], minlength=quantidade)
+    ticket_medio = pd.Series(np.divide(soma_ticket, dias_ticket, out=np.full(quantidade, np.nan), where=dias_ticket > 0))
+
+    distancia = np.log1p(dimensao_lojas['CompetitionDistance'].astype(np.float64))
+
+    return [
+        curva_semana,
+        sazonalidade,
+        ganho_promo[:, None],
+        ticket_medio.fillna(ticket_medio.median()).fillna(0).to_numpy()[:, None],
+        distancia.fillna(distancia.median()).fillna(0).to_numpy()[:, None],
+        pd.get_dummies(dimensao_lojas['StoreType']).to_numpy(dtype=np.float64),
+        pd.get_dummies(dimensao_lojas['Assortment']).to_numpy(dtype=np.float64),
+    ]
+
+
+class IndiceLojasSemelhantes:
+    """Perfis padronizados das lojas e tabela dos vizinhos mais semelhantes de cada uma."""
+
+    def __init__(self, df_principal, dimensao_lojas, dimensao_datas, vizinhos=VIZINHOS_LOJAS_SEMELHANTES):
+        self.dimensao_lojas = dimensao_lojas
+        self.lojas = dimensao_lojas.index.to_numpy()
+
+        blocos = [bloco for bloco in _perfis_lojas(df_principal, dimensao_lojas, dimensao_datas) if bloco.shape[1]]
+        self.perfis = np.hstack([
+            StandardScaler().fit_transform(bloco) / np.sqrt(bloco.shape[1]) for bloco in blocos
+        ]) if len(self.lojas) else np.empty((0, 0))
+
+        # Tabela de vizinhos: as `vizinhos` lojas de maior cosseno (sem a própria loja), em ordem
+        vizinhos = max(min(vizinhos, len(self.lojas) - 1), 0)
+        self.vizinhos = np.empty((len(self.lojas), vizinhos), dtype=np.intp)
+        self.similaridades = np.empty((len(self.lojas), vizinhos), dtype=np.float32)
+        if vizinhos:
+            similaridade = cosine_similarity(self.perfis)
+            np.fill_diagonal(similaridade, -np.inf)
+            candidatos = np.argpartition(-similaridade, vizinhos - 1, axis=1)[:, :vizinhos]
+            valores = np.take_along_axis(similaridade, candidatos, axis=1)
+            ordem = np.argsort(-valores, axis=1, kind='stable')
+            self.vizinhos = np.take_along_axis(candidatos, ordem, axis=1)
+            self.similaridades = np.take_along_axis(valores, ordem, axis=1).astype(np.float32)
+
+    def semelhantes(self, loja, k=LOJAS_SEMELHANTES_EXIBIDAS):
+        """
+        As `k` lojas mais semelhantes a `loja` (no máximo as guardadas na tabela), da mais para a
+        menos semelhante: colunas 'Store', 'Similaridade' (cosseno, até 1), 'StoreType' e 'Assortment'.
+        Loja fora da dimensão retorna um DataFrame vazio.
+        """
+        posicao = posicoes_lojas(self.dimensao_lojas, [int(loja)])[0]
+        indices = self.vizinhos[posicao, :max(int(k), 0)] if posicao >= 0 else np.empty(0, dtype=np.intp)
+        similaridades = self.similaridades[posicao, :len(indices)] if posicao >= 0 else np.empty(0, dtype=np.float32)
+        resultado = pd.DataFrame({'Store': self.lojas[indices], 'Similaridade': similaridades})
+        for coluna in ['StoreType', 'Assortment']:
+            if coluna in self.dimensao_lojas.columns:
+                resultado[coluna] = self.dimensao_lojas[coluna].to_numpy()[indices]
+        return resultado
+
+
+def obter_indice_semelhanca(dados):
+    """Índice de lojas semelhantes da versão de `dados`, montado na primeira chamada."""
+    return _indices_por_versao.obter_ou_montar(
+        dados["versao"],
+        lambda: IndiceLojasSemelhantes(dados["df_principal"], dados["dimensao_lojas"], dados["dimensao_datas"])
+    )
+
+
+def lojas_semelhantes(dados, loja, k=LOJAS_SEMELHANTES_EXIBIDAS):
+    """As `k` lojas mais semelhantes a `loja` na versão de `dados` (ver `IndiceLojasSemelhantes.semelhantes`)."""
+    return obter_indice_semelhanca(dados).semelhantes(loja, k)
@@ -0,0 +1,160 @@
+# dashboard/ranking.py
+"""
+Ranking de lojas da página de Análise de Lojas.
+
+O ranking é separado em duas etapas. A agregação (diferenças das somas acumuladas por loja, ver
+`somas_acumuladas`, ou uma consulta ao motor quando há filtro de feriado) produz, para cada
+combinação de filtros e métrica, um vetor com o valor da métrica de cada loja; esse vetor fica
+em cache. Ordem (crescente ou decrescente), páginas da tabela e posição de uma
+loja são respondidas sobre o vetor, sem tocar nas linhas: as primeiras k lojas vêm de uma seleção
+parcial (`np.argpartition`) seguida da ordenação só dessas k, e a ordem completa só é calculada
+quando uma posição qualquer é pedida.
+
+O `dcc.Store` do ranking guarda apenas a referência (versão dos dados, métrica e filtros) devolvida
+por `referencia_ranking`; os callbacks obtêm o `RankingLojas` correspondente com `obter_ranking`.
+"""
+import threading
+
+import numpy as np
+
+from .cache import CacheLRU
+from .config import MAX_ENTRADAS_CACHE_RANKINGS
+from .dimensao_lojas import atributos_das_lojas
+from .repositorio_dados import descartar_versoes_removidas, obter_dados
+from .somas_acumuladas import agregar_por_loja
+from .utils import normalizar_filtros
+
+# Métrica do ranking -> (coluna, função de agregação)
+METRICAS_RANKING = {
+    'Sales_sum': ('Sales', 'sum'), 'Sales_mean': ('Sales', 'mean'),
+    'Customers_sum': ('Customers', 'sum'), 'Customers_mean': ('Customers', 'mean'),
+    'SalesPerCustomer_mean': ('SalesPerCustomer', 'mean')
+}
+
+# Rankings por (versão dos dados, métrica, filtros normalizados), um cache por worker
+CACHE_RANKINGS = descartar_versoes_removidas(CacheLRU(MAX_ENTRADAS_CACHE_RANKINGS), lambda chave: chave[0])
+
+
+def _primeiros(chaves, k):
+    """
+    Índices dos `k` menores valores de `chaves`, em ordem. Empates ficam na ordem das posições e
+    NaN por último, como em `np.argsort(chaves, kind='stable')[:k]`.
+    """
+    if k >= len(chaves):
+        return np.argsort(chaves, kind='stable')
+    if k <= 0:
+        return np.empty(0, dtype=np.intp)
+    limite = chaves[np.argpartition(chaves, k - 1)[k - 1]]
+    # Todos os empatados com o k-ésimo valor entram, para que o desempate seja o da ordenação estável
+    candidatos = np.flatnonzero(~(chaves > limite))
+    return candidatos[np.argsort(chaves[candidatos], kind='stable')][:k]
+
+
+class RankingLojas:
+    """
+    Valor da métrica de cada loja para uma combinação de filtros (vetores alinhados, na ordem
+    das lojas), com o tipo e o sortimento de cada uma. As ordens completas e as posições são
+    calculadas na primeira vez que são pedidas e guardadas no próprio objeto.
+    """
+
+    def __init__(self, lojas, valores, tipos_loja, sortimentos):
+        self.lojas = np.asarray(lojas)
+        self.valores = np.asarray(valores)
+        self.tipos_loja = np.asarray(tipos_loja)
+        self.sortimentos = np.asarray(sortimentos)
+        self._indices_lojas = {int(loja): indice for indice, loja in enumerate(self.lojas)}
+        self._ordens = {}
+        self._posicoes = {}
+        self._trava = threading.Lock()
+
+    def __len__(self):
+        return len(self.lojas)
+
+    def _chaves_ordenacao(self, ordem):
+        # Negar os valores inverte a ordem sem mudar o desempate nem tirar os NaN do fim
+        return -self.valores if ordem == 'desc' else self.valores
+
+    def ordem(self, ordem):
+        """Índices de todas as lojas da primeira à última posição ('asc' ou 'desc')."""
+        with self._trava:
+            indices = self._ordens.get(ordem)
+        if indices is None:
+            indices = np.argsort(self._chaves_ordenacao(ordem), kind='stable')
+            with self._trava:
+                indices = self._ordens.setdefault(ordem, indices)
+        return indices
+
+    def primeiros(self, k, ordem):
+        """Índices das `k` primeiras lojas na `ordem`, por seleção parcial (sem ordenar as demais)."""
+        with self._trava:
+            indices = self._ordens.get(ordem)
+        if indices is not None:
+            return indices[:k]
+        return _primeiros(self._chaves_ordenacao(ordem), k)
+
+    def posicoes(self, ordem):
+        """Posição (1 = primeira) de cada loja no ranking na `ordem`, alinhada a `lojas`."""
+        with self._trava:
+            posicoes = self._posicoes.get(ordem)
+        if posicoes is None:
+            posicoes = np.empty(len(self), dtype=np.int64)
+            posicoes[self.ordem(ordem)] = np.arange(1, len(self) + 1)
+            with self._trava:
+                posicoes = self._posicoes.setdefault(ordem, posicoes)
+        return posicoes
+
+    def indices_das_lojas(self, lojas):
+        """Índices das lojas de `lojas` que estão no ranking, na ordem do vetor."""
+        return np.flatnonzero(np.isin(self.lojas, np.asarray(list(lojas), dtype=self.lojas.dtype)))
+
+    def posicao(self, loja, ordem):
+        """Posição da loja no ranking na `ordem`, ou None se ela não estiver no ranking."""
+        indice = self._indices_lojas.get(int(loja))
+        return None if indice is None else int(self.posicoes(ordem)[indice])
+
+    def tamanho_bytes(self):
+        vetores = [self.lojas, self.valores, self.tipos_loja, self.sortimentos]
+        vetores += list(self._ordens.values()) + list(self._posicoes.values())
+        return sum(vetor.nbytes for vetor in vetores) + 64 * len(self._indices_lojas)
+
+
+def referencia_ranking(versao, metrica, data_inicio, data_fim, tipos_loja, feriado_estadual, feriado_escolar):
+    """Referência do ranking (guardada no dcc.Store da página) para a versão, métrica e filtros."""
+    return {
+        'versao': versao,
+        'metrica': metrica,
+        'filtros': [data_inicio, data_fim, list(tipos_loja or []), feriado_estadual, feriado_escolar],
+    }
+
+
+def obter_ranking(referencia):
+    """
+    `RankingLojas` da `referencia` (ver `referencia_ranking`), agregado na primeira chamada e
+    reaproveitado depois. Se a versão da referência já foi descartada, o ranking é montado sobre
+    a versão atual (ver `obter_dados`); retorna None sem referência ou sem dados registrados.
+
+    O ranking considera todas as lojas que passam pelos filtros globais: a seleção de lojas
+    específicas só restringe o que a tabela exibe.
+    """
+    if not referencia:
+        return None
+    dados = obter_dados(referencia['versao'])
+    if dados is None:
+        return None
+    data_inicio, data_fim, tipos_loja, feriado_estadual, feriado_escolar = referencia['filtros']
+    metrica = referencia['metrica']
+    chave = (dados['versao'], metrica, normalizar_filtros(data_inicio, data_fim, tipos_loja, None, feriado_estadual, feriado_escolar))
+
+    def agregar():
+        # Total ou média por loja no período, pelas somas acumuladas (com filtro de feriado, pelo motor de consultas)
+        df_ranking = agregar_por_loja(
+            dados, {'Métrica': METRICAS_RANKING[metrica]},
+            data_inicio, data_fim, tipos_loja, None, feriado_estadual, feriado_escolar
+        )
+        lojas = df_ranking['Store'].to_numpy()
+        # Tipo e sortimento vêm da dimensão de lojas (uma linha por loja)
+        atributos = atributos_das_lojas(dados['dimensao_lojas'], lojas, ['StoreType', 'Assortment'])
+        return RankingLojas(lojas, df_ranking['Métrica'].to_numpy(), atributos['StoreType'].to_numpy(),
+                            atributos['Assortment'].to_numpy())
+
+    return CACHE_RANKINGS.obter_ou_calcular(chave, agregar)
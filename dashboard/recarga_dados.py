@@ -0,0 +1,65 @@
+# dashboard/recarga_dados.py
+"""
+Recarga dos dados sem reiniciar o servidor.
+
+Uma thread em segundo plano verifica periodicamente a chave de versão dos arquivos de
+`dataset/` (mtime e tamanho, ver `data_loader.calcular_versao_dados`). Quando a chave muda e
+permanece igual por duas verificações seguidas (o arquivo terminou de ser gravado), a nova
+versão é carregada, suas estruturas derivadas são preparadas e só então ela é trocada pela
+atual em `repositorio_dados.trocar_versao`. Se o carregamento falhar, a versão atual continua
+em uso e a troca é tentada de novo na verificação seguinte.
+"""
+import threading
+import time
+
+from .config import INTERVALO_RECARGA_DADOS_S
+from .dados_compartilhados import carregar_dados_compartilhados
+from .data_loader import versao_dados_do_modo
+from .indice_filtro import obter_indice_filtro
+from .repositorio_dados import obter_versao_atual, trocar_versao
+
+_monitor = None
+
+
+def recarregar_se_mudou(modo, versao_pendente=None):
+    """
+    Executa uma verificação. Retorna a versão vista nos arquivos, que deve ser passada como
+    `versao_pendente` na verificação seguinte (a troca só acontece quando as duas coincidem).
+    """
+    versao_arquivos = versao_dados_do_modo(modo)
+    if versao_arquivos == obter_versao_atual() or versao_arquivos != versao_pendente:
+        return versao_arquivos
+
+    print(f"Arquivos de dados alterados; carregando a versão {versao_arquivos}...")
+    try:
+        dados = carregar_dados_compartilhados(modo)
+        if dados["df_principal"].empty:
+            print("AVISO: Nova versão dos dados sem linhas; mantendo a versão atual.")
+            return versao_arquivos
+        # Pré-aquece o índice de filtros para que a primeira requisição após a troca não pague por ele
+        obter_indice_filtro(dados["df_principal"], dados["dimensao_lojas"])
+        trocar_versao(dados)
+        print(f"Versão {dados['versao']} dos dados em uso.")
+    except Exception as e:
+        print(f"AVISO: Falha ao recarregar os dados ({e}); mantendo a versão {obter_versao_atual()}.")
+    return versao_arquivos
+
+
+def iniciar_monitor_dados(modo=None, intervalo=INTERVALO_RECARGA_DADOS_S):
+    """Inicia (uma vez por processo) a thread que recarrega os dados quando os arquivos mudam."""
+    global _monitor
+    if intervalo <= 0 or (_monitor is not None and _monitor.is_alive()):
+        return _monitor
+
+    def monitorar():
+        versao_pendente = None
+        while True:
+            time.sleep(intervalo)
+            try:
+                versao_pendente = recarregar_se_mudou(modo, versao_pendente)
+            except Exception as e:
+                print(f"AVISO: Erro ao verificar os arquivos de dados: {e}")
+
+    _monitor = threading.Thread(target=monitorar, name='monitor-dados', daemon=True)
+    _monitor.start()
+    return _monitor
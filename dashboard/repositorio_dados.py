@@ -0,0 +1,164 @@
+# dashboard/repositorio_dados.py
+"""
+Registro em memória dos datasets carregados no processo.
+
+Em vez de serializar o DataFrame principal para dentro de um dcc.Store, o layout guarda
+apenas a chave de versão do dataset. Os callbacks usam essa chave (ou a versão atual) para
+obter o DataFrame que já está na memória do worker, sem tráfego de JSON nem desserialização.
+
+Quando os arquivos de dados mudam, a nova versão é montada em segundo plano e trocada por
+`trocar_versao` de uma só vez: requisições em andamento continuam com o dicionário que já
+obtiveram, e as seguintes passam a usar o novo. A versão anterior continua registrada para as
+sessões abertas antes da troca; versões mais antigas são descartadas.
+
+As estruturas derivadas de uma versão (layouts, índices, motores de consulta, caches de
+figuras...) seguem a mesma regra: `CachePorVersao` guarda o que é montado uma vez por versão, e
+`descartar_versoes_removidas` faz qualquer cache com `remover_se` perder, a cada troca, as
+entradas das versões que deixaram de estar registradas.
+"""
+import threading
+
+# Versão atual e a imediatamente anterior
+MAX_VERSOES_REGISTRADAS = 2
+
+_DATASETS = {}
+_versao_atual = None
+_trava = threading.Lock()
+_preparadores = []
+_ouvintes_troca = []
+
+
+def registrar_dados(dados):
+    """Registra o dicionário retornado por `carregar_dados` como versão atual e devolve sua chave."""
+    global _versao_atual
+    versao = dados["versao"]
+    with _trava:
+        _DATASETS[versao] = dados
+        _versao_atual = versao
+    return versao
+
+
+def obter_versao_atual():
+    return _versao_atual
+
+
+def obter_dados_atuais():
+    """Retorna o dicionário de dados da versão atual (resolvido a cada chamada, nunca guardado em closures)."""
+    return _DATASETS.get(_versao_atual)
+
+
+def obter_dados(versao):
+    """
+    Retorna o dicionário de dados da versão informada. Se a versão já foi descartada
+    (sessão aberta antes de duas recargas), retorna a versão atual; None se nada foi registrado.
+    """
+    if not versao:
+        return None
+    return _DATASETS.get(versao) or obter_dados_atuais()
+
+
+def obter_df_principal(versao):
+    """Retorna o DataFrame principal da versão informada (ver `obter_dados`), ou None."""
+    dados = obter_dados(versao)
+    if dados is None:
+        return None
+    return dados["df_principal"]
+
+
+def obter_dimensao_lojas(versao):
+    """Retorna a dimensão de lojas (uma linha por loja, índice 'Store') da versão informada, ou None."""
+    dados = obter_dados(versao)
+    if dados is None:
+        return None
+    return dados["dimensao_lojas"]
+
+
+def ao_preparar_versao(funcao):
+    """Registra `funcao(dados)`, chamada com uma nova versão antes de ela se tornar a atual (ex.: pré-montar layouts)."""
+    _preparadores.append(funcao)
+    return funcao
+
+
+def ao_trocar_versao(funcao):
+    """Registra `funcao(versao_antiga, versao_nova)`, chamada depois de cada troca (ex.: limpar caches)."""
+    _ouvintes_troca.append(funcao)
+    return funcao
+
+
+def descartar_versoes_removidas(cache, versao_da_chave):
+    """
+    Registra o descarte, depois de cada troca, das entradas de `cache` (qualquer objeto com
+    `remover_se(condicao)`) cuja versão, dada por `versao_da_chave(chave)`, não está mais registrada.
+    Retorna o próprio `cache`.
+    """
+    @ao_trocar_versao
+    def _descartar(versao_antiga, versao_nova):
+        with _trava:
+            registradas = set(_DATASETS)
+        cache.remover_se(lambda chave: versao_da_chave(chave) not in registradas)
+
+    return cache
+
+
+class CachePorVersao:
+    """
+    Estruturas derivadas de uma versão dos dados, montadas na primeira chamada e guardadas por
+    (versão, chave). As entradas de versões descartadas saem do cache depois da troca, passando
+    antes por `ao_descartar(valor)` se informado (ex.: fechar conexões).
+    """
+
+    def __init__(self, ao_descartar=None):
+        self._entradas = {}
+        self._trava = threading.RLock()
+        self._ao_descartar = ao_descartar
+        descartar_versoes_removidas(self, lambda chave: chave[0])
+
+    def obter_ou_montar(self, versao, montar, chave=None):
+        """Valor de (`versao`, `chave`); na primeira chamada, `montar()` é executado uma única vez."""
+        entrada = (versao, chave)
+        valor = self._entradas.get(entrada)
+        if valor is None:
+            with self._trava:
+                valor = self._entradas.get(entrada)
+                if valor is None:
+                    valor = self._entradas[entrada] = montar()
+        return valor
+
+    def chaves(self):
+        """Pares (versão, chave) já montados."""
+        with self._trava:
+            return list(self._entradas)
+
+    def remover_se(self, condicao):
+        """Remove as entradas cujo par (versão, chave) satisfaz `condicao`."""
+        with self._trava:
+            removidos = [self._entradas.pop(entrada) for entrada in list(self._entradas) if condicao(entrada)]
+        if self._ao_descartar is not None:
+            for valor in removidos:
+                self._ao_descartar(valor)
+
+
+def trocar_versao(dados):
+    """
+    Prepara `dados` (estruturas derivadas, layouts), torna-o a versão atual e descarta as
+    versões excedentes. A troca é uma única atribuição: nenhuma requisição vê um estado misto.
+    """
+    global _versao_atual
+    for preparar in _preparadores:
+        preparar(dados)
+
+    versao_nova = dados["versao"]
+    with _trava:
+        versao_antiga = _versao_atual
+        _DATASETS[versao_nova] = dados
+        _versao_atual = versao_nova
+        for versao in list(_DATASETS)[:-MAX_VERSOES_REGISTRADAS]:
+            if versao != versao_nova:
+                del _DATASETS[versao]
+
+    for ouvinte in _ouvintes_troca:
+        try:
+            ouvinte(versao_antiga, versao_nova)
+        except Exception as e:
+            print(f"AVISO: Erro ao notificar a troca de versão dos dados: {e}")
+    return versao_nova
@@ -0,0 +1,159 @@
+# dashboard/somas_acumuladas.py
+"""
+Somas acumuladas por loja ao longo do calendário.
+
+Para cada métrica (Sales, Customers, SalesPerCustomer e Promo), uma matriz lojas × (datas + 1)
+guarda, em cada coluna, a soma da métrica do início do histórico até aquela data (a primeira
+coluna é zero); outras guardam, do mesmo jeito, a contagem de valores de cada métrica. Cada linha
+do fato é um dia de loja aberta, então a contagem de linhas é a de dias abertos e a soma de
+'Promo' é a de dias com promoção.
+
+O total de qualquer período, para todas as lojas de uma vez, é a diferença entre duas colunas
+(a média é total / contagem): mover o período não volta às linhas de venda. O período e o tipo
+de loja (um recorte das lojas) são resolvidos assim; os filtros de feriado dependem do dia e da
+loja, e com eles `agregar_por_loja` usa o motor de consultas.
+
+As matrizes são montadas na primeira consulta de cada versão dos dados.
+"""
+import numpy as np
+import pandas as pd
+
+from .consultas import obter_motor, resultado_vazio
+from .dimensao_datas import COLUNA_CHAVE_DATA
+from .dimensao_lojas import posicoes_lojas
+from .repositorio_dados import CachePorVersao
+
+METRICAS_ACUMULADAS = ['Sales', 'Customers', 'SalesPerCustomer', 'Promo']
+FUNCOES_ACUMULADAS = ('sum', 'mean', 'count')
+
+_somas_por_versao = CachePorVersao()
+
+
+def _menor_tipo_inteiro(maximo):
+    """Menor tipo inteiro com sinal que comporta `maximo`."""
+    for tipo in (np.int16, np.int32):
+        if maximo <= np.iinfo(tipo).max:
+            return tipo
+    return np.int64
+
+
+class SomasAcumuladasLojas:
+    """Somas e contagens acumuladas de cada métrica por loja (linhas na ordem da dimensão de lojas)."""
+
+    def __init__(self, df_principal, dimensao_lojas, dimensao_datas):
+        self.dimensao_lojas = dimensao_lojas
+        self.lojas = dimensao_lojas.index.to_numpy()
+        self.tipos_loja = dimensao_lojas['StoreType'].to_numpy() if 'StoreType' in dimensao_lojas.columns else None
+        self.datas = dimensao_datas['Date'].to_numpy()
+
+        # Posição de cada linha do fato na matriz achatada (loja, data + 1)
+        largura = len(self.datas) + 1
+        linhas = posicoes_lojas(dimensao_lojas, df_principal['Store'].to_numpy())
+        validas = linhas >= 0
+        celulas = linhas[validas] * largura + df_principal[COLUNA_CHAVE_DATA].to_numpy()[validas] + 1
+        tamanho = len(self.lojas) * largura
+
+        def acumular(pesos, inteiro=True):
+            por_dia = np.bincount(celulas, weights=pesos, minlength=tamanho).reshape(len(self.lojas), largura)
+            acumulado = np.cumsum(por_dia, axis=1)
+            if not inteiro:
+                return acumulado
+            # Contagens e métricas inteiras (não negativas) no menor tipo que comporta o total de cada loja
+            return acumulado.astype(_menor_tipo_inteiro(acumulado[:, -1].max(initial=0)))
+
+        self.dias_abertos = acumular(None)
+        self.somas = {}
+        self.contagens = {}
+        for metrica in METRICAS_ACUMULADAS:
+            if metrica not in df_principal.columns:
+                continue
+            valores = df_principal[metrica].to_numpy()[validas]
+            nulos = pd.isna(valores)
+            # Métricas inteiras continuam inteiras (como a soma do pandas); as demais, em float64
+            inteira = np.issubdtype(valores.dtype, np.integer)
+            self.somas[metrica] = acumular(np.where(nulos, 0, valores).astype(np.float64), inteira)
+            # Sem valores nulos, a contagem da métrica é a de dias abertos (a mesma matriz)
+            self.contagens[metrica] = acumular((~nulos).astype(np.float64)) if nulos.any() else self.dias_abertos
+
+    def suporta(self, agregacoes, feriado_estadual='all', feriado_escolar='all'):
+        """Se as `agregacoes` com esses filtros de feriado podem ser respondidas pelas somas acumuladas."""
+        return (
+            feriado_estadual == 'all' and feriado_escolar == 'all'
+            and all(coluna in self.somas and funcao in FUNCOES_ACUMULADAS for coluna, funcao in agregacoes.values())
+        )
+
+    def faixa(self, data_inicio_dt, data_fim_dt):
+        """Colunas (inicio, fim) das matrizes cuja diferença é o período [data_inicio, data_fim]."""
+        inicio = np.searchsorted(self.datas, pd.Timestamp(data_inicio_dt).to_datetime64().astype(self.datas.dtype), side='left')
+        fim = np.searchsorted(self.datas, pd.Timestamp(data_fim_dt).to_datetime64().astype(self.datas.dtype), side='right')
+        return inicio, fim
+
+    def linhas_lojas(self, tipos_loja=None, lojas_especificas=None):
+        """Linhas das matrizes das lojas que passam pelos filtros de tipo e de lojas específicas."""
+        linhas = np.arange(len(self.lojas))
+        if tipos_loja and self.tipos_loja is not None:
+            linhas = linhas[np.isin(self.tipos_loja, list(tipos_loja))]
+        if lojas_especificas:
+            posicoes = posicoes_lojas(self.dimensao_lojas, [int(loja) for loja in lojas_especificas])
+            linhas = np.intersect1d(linhas, posicoes[posicoes >= 0])
+        return linhas
+
+    def agregar(self, agregacoes, data_inicio_dt, data_fim_dt, tipos_loja=None, lojas_especificas=None):
+        """
+        Equivalente a `MotorConsultas.agregar(['Store'], agregacoes, ...)` sem filtros de feriado:
+        uma linha por loja com ao menos um dia aberto no período, em ordem de loja.
+        """
+        inicio, fim = self.faixa(data_inicio_dt, data_fim_dt)
+        linhas = self.linhas_lojas(tipos_loja, lojas_especificas)
+
+        def no_periodo(matriz):
+            # Matrizes inteiras podem estar em int16/int32: a diferença é feita em int64
+            tipo = np.float64 if matriz.dtype.kind == 'f' else np.int64
+            return matriz[linhas, fim].astype(tipo) - matriz[linhas, inicio]
+
+        com_vendas = no_periodo(self.dias_abertos) > 0
+
+        resultado = {'Store': self.lojas[linhas][com_vendas]}
+        for saida, (coluna, funcao) in agregacoes.items():
+            if funcao == 'sum':
+                valores = no_periodo(self.somas[coluna])
+            else:
+                contagem = no_periodo(self.contagens[coluna])
+                if funcao == 'count':
+                    valores = contagem
+                else:
+                    soma = no_periodo(self.somas[coluna])
+                    with np.errstate(invalid='ignore', divide='ignore'):
+                        valores = np.where(contagem > 0, soma / np.maximum(contagem, 1), np.nan)
+            resultado[saida] = valores[com_vendas]
+        return pd.DataFrame(resultado)
+
+
+def obter_somas_acumuladas(dados):
+    """Somas acumuladas da versão de `dados`, montadas na primeira chamada."""
+    return _somas_por_versao.obter_ou_montar(
+        dados["versao"],
+        lambda: SomasAcumuladasLojas(dados["df_principal"], dados["dimensao_lojas"], dados["dimensao_datas"])
+    )
+
+
+def agregar_por_loja(dados, agregacoes, data_inicio, data_fim, tipos_loja=None, lojas_especificas=None,
+                     feriado_estadual='all', feriado_escolar='all', df_filtrado=None):
+    """
+    Agrega `agregacoes` ({coluna de saída: (coluna, função)}) por loja, com o mesmo resultado de
+    `obter_motor(dados).agregar(['Store'], agregacoes, ...)`. Somas, médias e contagens sem filtro de
+    feriado vêm das somas acumuladas; as demais consultas vão para o motor (que reaproveita
+    `df_filtrado`, as linhas já filtradas com esses filtros, quando informado).
+    """
+    if dados["df_principal"].empty:
+        return resultado_vazio(['Store'], agregacoes)
+    somas = obter_somas_acumuladas(dados)
+    if not somas.suporta(agregacoes, feriado_estadual, feriado_escolar):
+        return obter_motor(dados).agregar(['Store'], agregacoes, data_inicio, data_fim, tipos_loja, lojas_especificas,
+                                          feriado_estadual, feriado_escolar, df_filtrado=df_filtrado)
+    if not data_inicio or not data_fim:
+        return resultado_vazio(['Store'], agregacoes)
+    data_inicio_dt, data_fim_dt = pd.Timestamp(data_inicio), pd.Timestamp(data_fim)
+    if data_inicio_dt > data_fim_dt:
+        return resultado_vazio(['Store'], agregacoes)
+    return somas.agregar(agregacoes, data_inicio_dt, data_fim_dt, tipos_loja, lojas_especificas)
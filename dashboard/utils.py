@@ -1,8 +1,13 @@
+import time
+from contextlib import contextmanager
+
+import numpy as np
 import pandas as pd
 import plotly.graph_objects as go
 from dash import html
 import dash_bootstrap_components as dbc
-from .config import CINZA_NEUTRO, ALTURA_GRAFICO # Importar as novas constantes
+from .config import CINZA_NEUTRO, ALTURA_GRAFICO, MEDIR_TEMPOS_CALLBACKS, LIMITE_PONTOS_BRUTOS_GRAFICO, CELULAS_DENSIDADE_DISPERSAO, LARGURA_REFERENCIA_SERIE_PX, MAX_PONTOS_SERIES_GRAFICO, METODO_REDUCAO_SERIE # Importar as novas constantes
+from .indice_filtro import obter_indice_filtro
 
 def criar_figura_vazia(texto_titulo="Sem dados para os filtros selecionados", altura=ALTURA_GRAFICO): # Refatorar nome da função e parâmetros
     """Cria uma figura Plotly vazia com uma mensagem central."""
@@ -27,32 +32,274 @@ def criar_icone_informacao(id_icone, texto_tooltip): # Refatorar nome da funçã
         dbc.Tooltip(texto_tooltip, target=id_icone, placement='top')
     ], className="d-inline-block")
 
-def filtrar_dataframe_para_3d(df_original, data_inicio, data_fim, feriado_estadual, feriado_escolar): # Refatorar nome da função e parâmetros
-    """Filtra o DataFrame para a página 3D, aplicando apenas filtros de data e feriado."""
-    if not data_inicio or not data_fim: # Usar novos parâmetros
-        return pd.DataFrame()
+class CronometroEtapas:
+    """Mede o tempo de cada etapa de um callback e imprime o resumo quando a instrumentação está ativa."""
 
-    data_inicio_dt = pd.to_datetime(data_inicio) # Usar novo parâmetro
-    data_fim_dt = pd.to_datetime(data_fim) # Usar novo parâmetro
+    def __init__(self, nome):
+        self.nome = nome
+        self.tempos_ms = {}
 
-    if data_inicio_dt > data_fim_dt: # Usar novos parâmetros
-        return pd.DataFrame()
+    @contextmanager
+    def etapa(self, nome_etapa):
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.tempos_ms[nome_etapa] = self.tempos_ms.get(nome_etapa, 0.0) + (time.perf_counter() - inicio) * 1000
+
+    def resumo(self):
+        etapas = " | ".join(f"{nome} {tempo:.1f} ms" for nome, tempo in self.tempos_ms.items())
+        return f"{self.nome}: {etapas} | total {sum(self.tempos_ms.values()):.1f} ms"
+
+    def registrar(self):
+        if MEDIR_TEMPOS_CALLBACKS:
+            print(self.resumo())
+
+def remover_categorias_nao_usadas(df):
+    """
+    Remove, nas colunas categóricas, as categorias que não aparecem nas linhas.
+    O Plotly Express cria um grupo por categoria em `color`/`symbol` e falha nas que estão vazias.
+    """
+    for coluna in df.select_dtypes('category').columns:
+        df[coluna] = df[coluna].cat.remove_unused_categories()
+    return df
+
+def precisa_resumir(*colecoes):
+    """Indica se as coleções somam valores demais para enviar ao navegador (ver LIMITE_PONTOS_BRUTOS_GRAFICO)."""
+    return sum(len(colecao) for colecao in colecoes) > LIMITE_PONTOS_BRUTOS_GRAFICO
+
+def _valores_validos(valores):
+    valores = np.asarray(valores, dtype='float64')
+    return valores[~np.isnan(valores)]
+
+def estatisticas_boxplot(valores):
+    """
+    Estatísticas de um boxplot calculadas no servidor, como o Plotly as calcularia no navegador:
+    quartis (interpolação linear), cercas em 1,5 × IQR limitadas aos dados, média e entalhe.
+    """
+    valores = _valores_validos(valores)
+    if len(valores) == 0:
+        return None
+    q1, mediana, q3 = np.percentile(valores, [25, 50, 75])
+    amplitude = q3 - q1
+    return {
+        'q1': q1,
+        'median': mediana,
+        'q3': q3,
+        'lowerfence': valores[valores >= q1 - 1.5 * amplitude].min(),
+        'upperfence': valores[valores <= q3 + 1.5 * amplitude].max(),
+        'mean': valores.mean(),
+        'notchspan': 1.57 * amplitude / np.sqrt(len(valores)),
+    }
+
+def criar_trace_box_resumido(valores_por_posicao, nome, cor, notched=False, **propriedades):
+    """
+    Cria um go.Box com as estatísticas pré-calculadas de cada posição do eixo x
+    (`valores_por_posicao` = {posição: valores}). Só as caixas e cercas são enviadas;
+    os outliers individuais não são desenhados.
+    """
+    posicoes, estatisticas = [], []
+    for posicao, valores in valores_por_posicao.items():
+        estatistica = estatisticas_boxplot(valores)
+        if estatistica is not None:
+            posicoes.append(posicao)
+            estatisticas.append(estatistica)
+    campos = {campo: [e[campo] for e in estatisticas] for campo in ('q1', 'median', 'q3', 'lowerfence', 'upperfence', 'mean')}
+    if notched:
+        campos['notchspan'] = [e['notchspan'] for e in estatisticas]
+    return go.Box(x=posicoes, name=nome, marker_color=cor, notched=notched, **campos, **propriedades)
+
+def criar_tracos_histograma(grupos, nbins, histnorm=None, **propriedades):
+    """
+    Cria os traços de um histograma sobreposto para `grupos` = [(nome, valores, cor), ...].
+
+    Com poucos valores usa go.Histogram (binning no navegador). Acima de LIMITE_PONTOS_BRUTOS_GRAFICO
+    as contagens são calculadas no servidor, com as mesmas faixas para todos os grupos, e enviadas
+    como barras. `histnorm` aceita None (contagem), 'density' ou 'probability density'.
+    """
+    if not precisa_resumir(*(valores for _, valores, _ in grupos)):
+        return [go.Histogram(x=valores, name=nome, marker_color=cor, histnorm=histnorm, nbinsx=nbins, **propriedades)
+                for nome, valores, cor in grupos]
 
-    # Aplica o filtro de data
-    mascara_data = (df_original['Date'] >= data_inicio_dt) & (df_original['Date'] <= data_fim_dt) # Usar novos parâmetros
-    df_filtrado = df_original[mascara_data].copy() # Refatorar nome da variável
+    valores_validos = [_valores_validos(valores) for _, valores, _ in grupos]
+    bordas = np.histogram_bin_edges(np.concatenate(valores_validos), bins=nbins)
+    larguras = np.diff(bordas)
+    centros = bordas[:-1] + larguras / 2
+    tracos = []
+    for (nome, _, cor), valores in zip(grupos, valores_validos):
+        contagens, _ = np.histogram(valores, bins=bordas)
+        if histnorm == 'density':
+            alturas = contagens / larguras
+        elif histnorm == 'probability density':
+            alturas = contagens / (larguras * max(len(valores), 1))
+        else:
+            alturas = contagens
+        tracos.append(go.Bar(x=centros, y=alturas, width=larguras, name=nome, marker_color=cor, **propriedades))
+    return tracos
 
-    # Aplica filtros de feriado
-    if feriado_estadual != 'all': # Usar novo parâmetro
-        df_filtrado = df_filtrado[df_filtrado['StateHoliday'] == feriado_estadual] # Usar novo parâmetro
+def faixa_visivel(dados_relayout, eixo, converter=float):
+    """
+    Faixa [mínimo, máximo] do `eixo` ('xaxis' ou 'yaxis') definida por um zoom, a partir do
+    `relayoutData` de um dcc.Graph. None se o evento não trouxer faixa (ex.: autorange, autosize).
+    Eixos de datas trazem textos: use `converter=pd.Timestamp`.
+    """
+    if not dados_relayout:
+        return None
+    if f'{eixo}.range[0]' in dados_relayout and f'{eixo}.range[1]' in dados_relayout:
+        return [converter(dados_relayout[f'{eixo}.range[0]']), converter(dados_relayout[f'{eixo}.range[1]'])]
+    if f'{eixo}.range' in dados_relayout:
+        return [converter(valor) for valor in dados_relayout[f'{eixo}.range']]
+    return None
 
-    if feriado_escolar != 'all': # Usar novo parâmetro
-        df_filtrado = df_filtrado[df_filtrado['SchoolHoliday'] == int(feriado_escolar)] # Usar novo parâmetro
+def mascara_faixa(x, y, faixa_x=None, faixa_y=None):
+    """Pontos (x, y) válidos (sem NaN) e dentro das faixas informadas."""
+    x, y = np.asarray(x, dtype='float64'), np.asarray(y, dtype='float64')
+    mascara = ~(np.isnan(x) | np.isnan(y))
+    for valores, faixa in ((x, faixa_x), (y, faixa_y)):
+        if faixa is not None:
+            mascara &= (valores >= min(faixa)) & (valores <= max(faixa))
+    return mascara
 
-    return df_filtrado # Retornar novo nome de variável
+def criar_traco_densidade(x, y, faixa_x=None, faixa_y=None, celulas=CELULAS_DENSIDADE_DISPERSAO, **propriedades):
+    """
+    Substitui os marcadores de uma dispersão grande por uma grade `celulas` × `celulas` com a
+    contagem de pontos de cada célula, calculada no servidor: o navegador recebe só a grade
+    (um go.Heatmap com as células vazias transparentes). `faixa_x` e `faixa_y` restringem a
+    grade à área visível (zoom); sem elas, a grade cobre todos os pontos.
+    """
+    x, y = np.asarray(x, dtype='float64'), np.asarray(y, dtype='float64')
+    mascara = mascara_faixa(x, y, faixa_x, faixa_y)
+    x, y = x[mascara], y[mascara]
+    faixas = []
+    for valores, faixa in ((x, faixa_x), (y, faixa_y)):
+        if faixa is not None:
+            faixas.append(sorted(faixa))
+        else:
+            faixas.append([valores.min(), valores.max()] if len(valores) else [0.0, 1.0])
+    contagens, bordas_x, bordas_y = np.histogram2d(x, y, bins=celulas, range=faixas)
+    centros_x = (bordas_x[:-1] + bordas_x[1:]) / 2
+    centros_y = (bordas_y[:-1] + bordas_y[1:]) / 2
+    # A grade do Plotly é indexada por [linha = y][coluna = x]
+    contagens = contagens.T
+    dica = 'x: %{x:,.1f}<br>y: %{y:,.1f}<br>Pontos: %{z:,}<extra></extra>'
+    contagens[contagens == 0] = np.nan
+    return go.Heatmap(
+        x=centros_x, y=centros_y, z=contagens, colorscale='Reds', colorbar=dict(title='Pontos'),
+        hovertemplate=dica, **propriedades
+    )
+
+def criar_traco_tendencia(x, y, **propriedades):
+    """Reta de mínimos quadrados de y em função de x, desenhada só pelos dois extremos (para dispersões resumidas)."""
+    mascara = mascara_faixa(x, y)
+    x, y = np.asarray(x, dtype='float64')[mascara], np.asarray(y, dtype='float64')[mascara]
+    inclinacao, intercepto = np.polyfit(x, y, 1)
+    extremos = np.array([x.min(), x.max()])
+    return go.Scatter(x=extremos, y=intercepto + inclinacao * extremos, mode='lines', **propriedades)
+
+def _indices_lttb(x, y, max_pontos):
+    """Largest-Triangle-Three-Buckets: em cada faixa, o ponto que forma o maior triângulo com o escolhido antes e a média da faixa seguinte."""
+    n = len(x)
+    bordas = np.linspace(1, n - 1, max_pontos - 1).astype(np.int64)
+    indices = np.empty(max_pontos, dtype=np.int64)
+    indices[0], indices[-1] = 0, n - 1
+    anterior = 0
+    for balde in range(max_pontos - 2):
+        inicio, fim = bordas[balde], bordas[balde + 1]
+        if balde + 2 < len(bordas):
+            media_x, media_y = x[fim:bordas[balde + 2]].mean(), y[fim:bordas[balde + 2]].mean()
+        else:
+            media_x, media_y = x[n - 1], y[n - 1]
+        areas = np.abs((x[anterior] - media_x) * (y[inicio:fim] - y[anterior])
+                       - (x[anterior] - x[inicio:fim]) * (media_y - y[anterior]))
+        anterior = inicio + int(np.argmax(areas))
+        indices[balde + 1] = anterior
+    return indices
+
+def _indices_min_max(y, max_pontos):
+    """Mínimo e máximo de cada uma de `max_pontos` / 2 faixas de posições (mais o primeiro e o último ponto)."""
+    n = len(y)
+    bordas = np.linspace(0, n, max(max_pontos // 2, 1) + 1).astype(np.int64)
+    balde = np.repeat(np.arange(len(bordas) - 1), np.diff(bordas))
+    # Ordenadas por faixa e, dentro dela, por valor: o primeiro é o mínimo e o último, o máximo
+    ordem = np.lexsort((y, balde))
+    extremos = np.concatenate([ordem[bordas[:-1]], ordem[bordas[1:] - 1], [0, n - 1]])
+    return np.unique(extremos)
+
+def indices_reducao_serie(x, y, max_pontos, metodo=METODO_REDUCAO_SERIE):
+    """
+    Posições (crescentes) dos pontos de uma série de linha, já ordenada por `x`, que bastam para
+    desenhá-la com `max_pontos` pontos: 'lttb' preserva a forma, 'minmax' preserva picos e vales.
+    Séries que já cabem em `max_pontos` são mantidas inteiras.
+    """
+    n = len(y)
+    if n <= max(max_pontos, 3):
+        return np.arange(n)
+    y = np.asarray(y, dtype='float64')
+    if metodo == 'minmax':
+        return _indices_min_max(y, max_pontos)
+    x = np.asarray(x)
+    x = x.astype('datetime64[ns]').astype('int64').astype('float64') if np.issubdtype(x.dtype, np.datetime64) else x.astype('float64')
+    return _indices_lttb(x, y, max(max_pontos, 3))
+
+def reduzir_series(df, coluna_x, coluna_y, coluna_serie=None, faixa_x=None,
+                   largura_px=LARGURA_REFERENCIA_SERIE_PX, max_pontos=MAX_PONTOS_SERIES_GRAFICO):
+    """
+    Reduz as séries de linha de `df` (uma por valor de `coluna_serie`, ou uma só) para que o gráfico
+    envie no máximo `max_pontos` pontos, repartidos entre as séries e nunca mais que `largura_px`
+    por série. `faixa_x` (zoom) restringe cada série à área visível (mais um ponto de cada lado),
+    de modo que o detalhe volta ao aproximar. Sem redução nem faixa, retorna `df` inalterado.
+    """
+    # Séries numeradas na ordem em que aparecem (a ordem das legendas e cores não muda)
+    codigos = pd.factorize(df[coluna_serie])[0] if coluna_serie is not None else np.zeros(len(df), dtype=np.int64)
+    tamanhos = np.bincount(codigos[codigos >= 0])
+    pontos_por_serie = min(largura_px, max(max_pontos // max(len(tamanhos), 1), 2))
+    if faixa_x is None and (tamanhos <= pontos_por_serie).all():
+        return df
+
+    x = df[coluna_x].to_numpy()
+    y = df[coluna_y].to_numpy(dtype='float64')
+    ordem = np.lexsort((x, codigos))
+    ordem = ordem[~np.isnan(y[ordem]) & (codigos[ordem] >= 0)]
+    cortes = np.flatnonzero(np.diff(codigos[ordem])) + 1
+    if faixa_x is not None:
+        faixa_x = np.asarray(faixa_x, dtype=x.dtype)
+
+    selecionadas = []
+    for posicoes in np.split(ordem, cortes):
+        if faixa_x is not None:
+            inicio = max(np.searchsorted(x[posicoes], faixa_x[0], side='left') - 1, 0)
+            fim = np.searchsorted(x[posicoes], faixa_x[1], side='right') + 1
+            posicoes = posicoes[inicio:fim]
+        selecionadas.append(posicoes[indices_reducao_serie(x[posicoes], y[posicoes], pontos_por_serie)])
+    return df.iloc[np.concatenate(selecionadas)] if selecionadas else df.iloc[:0]
+
+def normalizar_filtros(data_inicio, data_fim, tipos_loja, lojas_especificas, feriado_estadual, feriado_escolar):
+    """
+    Converte os valores dos filtros em uma tupla canônica e hashable, usada como chave de cache.
+    Seleções equivalentes (ordem diferente, None vs lista vazia, data com ou sem hora) geram a mesma chave.
+    """
+    return (
+        str(pd.to_datetime(data_inicio).date()) if data_inicio else None,
+        str(pd.to_datetime(data_fim).date()) if data_fim else None,
+        tuple(sorted(tipos_loja)) if tipos_loja else (),
+        tuple(sorted(int(loja) for loja in lojas_especificas)) if lojas_especificas else (),
+        str(feriado_estadual),
+        str(feriado_escolar),
+    )
+
+def filtrar_dataframe_para_3d(df_original, data_inicio, data_fim, feriado_estadual, feriado_escolar): # Refatorar nome da função e parâmetros
+    """Filtra o DataFrame para a página 3D, aplicando apenas filtros de data e feriado."""
+    return filtrar_dataframe(df_original, data_inicio, data_fim, None, None, feriado_estadual, feriado_escolar)
+
+def filtrar_dataframe(df_original, data_inicio, data_fim, tipos_loja, lojas_especificas, feriado_estadual, feriado_escolar, dimensao_lojas=None): # Refatorar nome da função e parâmetros
+    """
+    Filtra o DataFrame principal com base nos inputs do usuário (LÓGICA CENTRALIZADA).
 
-def filtrar_dataframe(df_original, data_inicio, data_fim, tipos_loja, lojas_especificas, feriado_estadual, feriado_escolar): # Refatorar nome da função e parâmetros
-    """Filtra o DataFrame principal com base nos inputs do usuário (LÓGICA CENTRALIZADA)."""
+    A filtragem usa o índice de `indice_filtro` (busca binária por data e posições por
+    loja/tipo de loja) em vez de varrer o DataFrame inteiro. O resultado pode ser uma view
+    do DataFrame original e deve ser tratado como somente leitura. Para filtrar por tipo de
+    loja o DataFrame de fatos, informe `dimensao_lojas` (o tipo não é uma coluna do fato).
+    """
 
     # Validação de datas
     if not data_inicio or not data_fim: # Usar novos parâmetros
@@ -64,21 +311,6 @@ def filtrar_dataframe(df_original, data_inicio, data_fim, tipos_loja, lojas_espe
     if data_inicio_dt > data_fim_dt: # Usar novos parâmetros
         return pd.DataFrame()
 
-    # Aplica o filtro de data que é comum a todos
-    mascara_data = (df_original['Date'] >= data_inicio_dt) & (df_original['Date'] <= data_fim_dt) # Usar novos parâmetros
-    df_filtrado = df_original[mascara_data].copy() # Refatorar nome da variável
-
-    # Aplica filtros de tipo de loja e loja específica de forma cumulativa
-    if tipos_loja:
-        df_filtrado = df_filtrado[df_filtrado['StoreType'].isin(tipos_loja)].copy()
-    if lojas_especificas:
-        df_filtrado = df_filtrado[df_filtrado['Store'].isin(lojas_especificas)].copy()
-
-    # Aplica filtros de feriado
-    if feriado_estadual != 'all': # Usar novo parâmetro
-        df_filtrado = df_filtrado[df_filtrado['StateHoliday'] == feriado_estadual] # Usar novo parâmetro
-
-    if feriado_escolar != 'all': # Usar novo parâmetro
-        df_filtrado = df_filtrado[df_filtrado['SchoolHoliday'] == int(feriado_escolar)] # Usar novo parâmetro
-
-    return df_filtrado # Retornar novo nome de variável
\ No newline at end of file
+    indice = obter_indice_filtro(df_original, dimensao_lojas)
+    return indice.filtrar(df_original, data_inicio_dt, data_fim_dt, tipos_loja, lojas_especificas,
+                          feriado_estadual, feriado_escolar)
@@ -1,42 +1,236 @@
-import pandas as pd
-import numpy as np
+"""
+ETL do DataFrame completo (vendas + lojas) usado pelo dashboard.
+
+As vendas são lidas em blocos; cada bloco é juntado à tabela de lojas (pequena, mantida em
+memória), reduzido aos dias de loja aberta e gravado assim que é processado, de modo que o
+pico de memória depende do tamanho do bloco e não do histórico. São gerados:
+
+- `processados/df_completo_reduzido.csv`: o CSV lido pelo dashboard (mesmas colunas de antes);
+- `processados/df_completo_particionado/`: tabela de fatos em Parquet particionada por Year/Month,
+  só com as colunas de venda e as derivadas (Year, Month, Day, WeekOfYear, SalesPerCustomer);
+- `processados/dim_lojas.parquet`: a dimensão de lojas (uma linha por loja), que completa os
+  fatos pela coluna 'Store' (ver `dashboard/dimensao_lojas.py`).
+
+Execuções incrementais (`--incremental`) só acrescentam as datas posteriores à última data já
+processada, registrada em `_manifesto.json` no diretório particionado: os arquivos existentes
+não são reescritos, apenas novos arquivos são adicionados às partições. O manifesto também lista
+os arquivos gravados; uma execução completa remove só esses arquivos e se recusa a usar um
+diretório não vazio sem manifesto (que não foi gerado por este ETL). Quando as entradas e o CSV
+são os arquivos de um modo do dashboard, o manifesto registra também esse modo e a versão dos
+dados ('versao_dados'): os motores de consultas só leem o Parquet se ela for a versão carregada.
+
+Uso:
+    python dataset/gerar_df_completo_reduzido.py
+    python dataset/gerar_df_completo_reduzido.py --treino brutos/train.csv --lojas brutos/store.csv --incremental
+"""
+import argparse
+import json
 import os
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+DIRETORIO_DATASET = Path(__file__).resolve().parent
+# A tabela de lojas é tratada pela mesma função do dashboard
+sys.path.append(str(DIRETORIO_DATASET.parent))
+from dashboard.data_loader import tratar_df_lojas, versao_dados_dos_arquivos
+CAMINHO_TREINO_PADRAO = DIRETORIO_DATASET / 'reduzidos' / 'train_reduzido.csv'
+CAMINHO_LOJAS_PADRAO = DIRETORIO_DATASET / 'reduzidos' / 'store_reduzido.csv'
+CAMINHO_CSV_PADRAO = DIRETORIO_DATASET / 'processados' / 'df_completo_reduzido.csv'
+DIRETORIO_PARTICOES_PADRAO = DIRETORIO_DATASET / 'processados' / 'df_completo_particionado'
+CAMINHO_DIMENSAO_LOJAS_PADRAO = DIRETORIO_DATASET / 'processados' / 'dim_lojas.parquet'
+
+TAMANHO_BLOCO_CSV = 200_000
+COLUNAS_PARTICAO = ['Year', 'Month']
+NOME_MANIFESTO = '_manifesto.json'
+# Nome dos arquivos gravados pelo ETL (usado com manifestos anteriores à lista de arquivos)
+PADRAO_ARQUIVOS_PARTICAO = 'Year=*/Month=*/lote*-bloco*-*.parquet'
+
+
+def juntar_e_filtrar(bloco_vendas, df_lojas):
+    """Junta um bloco de vendas às lojas e mantém apenas os dias de loja aberta (sem a coluna Open)."""
+    bloco = pd.merge(bloco_vendas, df_lojas, on='Store', how='left')
+    return bloco[bloco['Open'] == 1].drop(columns=['Open'])
+
+
+def derivar_colunas(bloco, colunas_lojas=()):
+    """Colunas derivadas de data e o ticket médio, gravadas no dataset particionado (sem as `colunas_lojas`)."""
+    bloco = bloco.drop(columns=list(colunas_lojas))
+    datas = bloco['Date'].dt
+    bloco['Year'] = datas.year.astype('int16')
+    bloco['Month'] = datas.month.astype('int8')
+    bloco['Day'] = datas.day.astype('int8')
+    bloco['WeekOfYear'] = datas.isocalendar().week.astype('int8')
+    bloco['SalesPerCustomer'] = np.where(bloco['Customers'] > 0, bloco['Sales'] / bloco['Customers'], 0)
+    return bloco
+
+
+def ler_manifesto(diretorio_particoes):
+    caminho = Path(diretorio_particoes) / NOME_MANIFESTO
+    if not caminho.exists():
+        return None
+    with open(caminho, encoding='utf-8') as arquivo:
+        return json.load(arquivo)
+
+
+def _gravar_manifesto(diretorio_particoes, manifesto):
+    caminho = Path(diretorio_particoes) / NOME_MANIFESTO
+    caminho_temporario = caminho.with_suffix('.tmp')
+    with open(caminho_temporario, 'w', encoding='utf-8') as arquivo:
+        json.dump(manifesto, arquivo, indent=2)
+    os.replace(caminho_temporario, caminho)
+
+
+def _arquivos_do_manifesto(diretorio_particoes, manifesto):
+    """Arquivos de dados gravados pelo ETL segundo o manifesto, restritos ao diretório particionado."""
+    if 'arquivos' not in manifesto:
+        return list(diretorio_particoes.glob(PADRAO_ARQUIVOS_PARTICAO))
+    raiz = diretorio_particoes.resolve()
+    caminhos = [(diretorio_particoes / relativo).resolve() for relativo in manifesto['arquivos']]
+    return [caminho for caminho in caminhos if caminho.is_relative_to(raiz)]
+
+
+def remover_saidas_anteriores(diretorio_particoes):
+    """
+    Remove do diretório particionado só o que uma execução anterior do ETL gravou (arquivos do
+    manifesto, partições que ficaram vazias e o manifesto). Um diretório não vazio sem manifesto
+    não é uma saída do ETL: gera ValueError sem remover nada.
+    """
+    diretorio_particoes = Path(diretorio_particoes)
+    if not diretorio_particoes.exists():
+        return
+    manifesto = ler_manifesto(diretorio_particoes)
+    if manifesto is None:
+        if any(diretorio_particoes.iterdir()):
+            raise ValueError(f"{diretorio_particoes} não está vazio e não tem {NOME_MANIFESTO}; "
+                             "escolha um diretório vazio ou gerado por este ETL.")
+        return
+    for caminho in _arquivos_do_manifesto(diretorio_particoes, manifesto):
+        caminho.unlink(missing_ok=True)
+    # Partições que ficaram vazias, das mais internas para as externas
+    pastas = sorted((pasta for pasta in diretorio_particoes.rglob('*') if pasta.is_dir()), key=lambda pasta: len(pasta.parts), reverse=True)
+    for pasta in pastas:
+        if not any(pasta.iterdir()):
+            pasta.rmdir()
+    (diretorio_particoes / NOME_MANIFESTO).unlink()
+
+
+def executar_etl(caminho_treino=CAMINHO_TREINO_PADRAO, caminho_lojas=CAMINHO_LOJAS_PADRAO,
+                 diretorio_particoes=DIRETORIO_PARTICOES_PADRAO, caminho_csv=CAMINHO_CSV_PADRAO,
+                 incremental=False, tamanho_bloco=TAMANHO_BLOCO_CSV,
+                 caminho_dimensao=CAMINHO_DIMENSAO_LOJAS_PADRAO):
+    """
+    Processa `caminho_treino` em blocos e grava os fatos particionados, a dimensão de lojas e
+    (se informado) o CSV.
+
+    Com `incremental=True` e um manifesto existente, só as linhas com data posterior à última
+    data processada são acrescentadas; caso contrário as saídas são recriadas do zero (ver
+    `remover_saidas_anteriores`). Retorna o manifesto atualizado.
+    """
+    diretorio_particoes = Path(diretorio_particoes)
+    manifesto = ler_manifesto(diretorio_particoes) if incremental else None
+    if manifesto is None:
+        remover_saidas_anteriores(diretorio_particoes)
+        if caminho_csv is not None and Path(caminho_csv).exists():
+            os.remove(caminho_csv)
+        manifesto = {'ultima_data': None, 'linhas': 0, 'lotes': 0, 'arquivos': []}
+    diretorio_particoes.mkdir(parents=True, exist_ok=True)
+
+    ultima_data = pd.Timestamp(manifesto['ultima_data']) if manifesto['ultima_data'] else None
+    df_lojas = tratar_df_lojas(pd.read_csv(caminho_lojas))
+    colunas_lojas = [coluna for coluna in df_lojas.columns if coluna != 'Store']
+    # A dimensão é pequena e sempre regravada inteira (lojas novas ou atributos alterados)
+    Path(caminho_dimensao).parent.mkdir(parents=True, exist_ok=True)
+    df_lojas.to_parquet(caminho_dimensao, index=False)
+    # Um identificador por execução mantém os nomes dos arquivos únicos entre execuções incrementais
+    lote = manifesto['lotes'] + 1
+    escrever_cabecalho = caminho_csv is not None and not Path(caminho_csv).exists()
+    linhas_novas, maior_data, numero_bloco = 0, ultima_data, 0
+    # Arquivos gravados (caminhos relativos ao diretório), acumulados no manifesto
+    arquivos = [str(caminho.relative_to(diretorio_particoes)) for caminho in _arquivos_do_manifesto(diretorio_particoes, manifesto)]
+
+    for bloco_vendas in pd.read_csv(caminho_treino, dtype={'StateHoliday': str}, parse_dates=['Date'], chunksize=tamanho_bloco):
+        if ultima_data is not None:
+            bloco_vendas = bloco_vendas[bloco_vendas['Date'] > ultima_data]
+        bloco = juntar_e_filtrar(bloco_vendas, df_lojas)
+        if bloco.empty:
+            continue
+
+        if caminho_csv is not None:
+            bloco.to_csv(caminho_csv, mode='a', header=escrever_cabecalho, index=False)
+            escrever_cabecalho = False
+
+        tabela = pa.Table.from_pandas(derivar_colunas(bloco, colunas_lojas), preserve_index=False)
+        pq.write_to_dataset(
+            tabela, diretorio_particoes, partition_cols=COLUNAS_PARTICAO,
+            basename_template=f'lote{lote:04d}-bloco{numero_bloco:04d}-{{i}}.parquet',
+            file_visitor=lambda arquivo: arquivos.append(os.path.relpath(arquivo.path, diretorio_particoes)),
+        )
+        numero_bloco += 1
+        linhas_novas += len(bloco)
+        maior_data = bloco['Date'].max() if maior_data is None else max(maior_data, bloco['Date'].max())
+
+    # Calculada depois de gravar o CSV, que faz parte da versão no modo reduzido
+    modo, versao_dados = versao_dados_dos_arquivos(caminho_treino, caminho_lojas, caminho_csv)
+    manifesto = {
+        'modo': modo,
+        'versao_dados': versao_dados,
+        'ultima_data': str(maior_data.date()) if maior_data is not None else None,
+        'linhas': manifesto['linhas'] + linhas_novas,
+        'lotes': lote if linhas_novas else manifesto['lotes'],
+        'atualizado_em': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'arquivos': arquivos,
+    }
+    _gravar_manifesto(diretorio_particoes, manifesto)
+    print(f"{linhas_novas:,} linhas acrescentadas ({numero_bloco} blocos); total {manifesto['linhas']:,} linhas até {manifesto['ultima_data']}.")
+    return manifesto
 
-# Criar diretório processados se não existir
-os.makedirs('processados', exist_ok=True)
 
-print("Carregando datasets reduzidos...")
-df_vendas = pd.read_csv('reduzidos/train_reduzido.csv', dtype={'StateHoliday': str})
-df_lojas = pd.read_csv('reduzidos/store_reduzido.csv')
+def ler_particoes(diretorio_particoes=DIRETORIO_PARTICOES_PADRAO, colunas=None, filtros=None):
+    """Lê o dataset particionado (opcionalmente só algumas colunas/partições, ex.: [('Year', '=', 2015)])."""
+    return pd.read_parquet(diretorio_particoes, columns=colunas, filters=filtros)
 
-print("\nTratando dados...")
-# Convertendo a coluna Date para datetime
-df_vendas['Date'] = pd.to_datetime(df_vendas['Date'])
 
-# Tratamento do dataset de lojas
-# Preenchendo valores ausentes
-df_lojas['PromoInterval'] = df_lojas['PromoInterval'].fillna("Nenhum")
+def ler_dimensao_lojas(caminho_dimensao=CAMINHO_DIMENSAO_LOJAS_PADRAO):
+    """Lê a dimensão de lojas gravada pelo ETL, indexada por 'Store'."""
+    return pd.read_parquet(caminho_dimensao).set_index('Store').sort_index()
 
-colunas_preencher_zero = ['CompetitionOpenSinceMonth', 'CompetitionOpenSinceYear', 'Promo2SinceWeek', 'Promo2SinceYear']
-for col in colunas_preencher_zero:
-    df_lojas[col] = df_lojas[col].fillna(0)
 
-# CompetitionDistance: Preencher com a MÉDIA
-df_lojas['CompetitionDistance'] = df_lojas['CompetitionDistance'].fillna(df_lojas['CompetitionDistance'].mean())
+def main():
+    parser = argparse.ArgumentParser(description="Gera o DataFrame completo (vendas + lojas) em blocos.")
+    parser.add_argument('--treino', type=Path, default=CAMINHO_TREINO_PADRAO)
+    parser.add_argument('--lojas', type=Path, default=CAMINHO_LOJAS_PADRAO)
+    parser.add_argument('--destino', type=Path, default=DIRETORIO_PARTICOES_PADRAO, help="Diretório do dataset particionado")
+    parser.add_argument('--dimensao', type=Path, default=CAMINHO_DIMENSAO_LOJAS_PADRAO, help="Parquet da dimensão de lojas")
+    parser.add_argument('--csv', type=Path, default=CAMINHO_CSV_PADRAO, help="CSV lido pelo dashboard")
+    parser.add_argument('--sem-csv', action='store_true', help="Não grava o CSV, só o dataset particionado")
+    parser.add_argument('--incremental', action='store_true', help="Acrescenta só as datas posteriores à última processada")
+    parser.add_argument('--tamanho-bloco', type=int, default=TAMANHO_BLOCO_CSV)
+    argumentos = parser.parse_args()
 
-print("\nRealizando merge dos datasets...")
-# Merge dos dataframes
-df_completo = pd.merge(df_vendas, df_lojas, on='Store', how='left')
+    print("Processando vendas em blocos...")
+    try:
+        executar_etl(
+            argumentos.treino, argumentos.lojas, argumentos.destino,
+            None if argumentos.sem_csv else argumentos.csv,
+            incremental=argumentos.incremental, tamanho_bloco=argumentos.tamanho_bloco,
+            caminho_dimensao=argumentos.dimensao,
+        )
+    except ValueError as erro:
+        print(f"ERRO: {erro}")
+        sys.exit(1)
 
-# Filtrando apenas lojas abertas
-df_completo = df_completo[df_completo['Open'] == 1].copy()
-df_completo.drop(['Open'], axis=1, inplace=True)
+    df_completo = ler_particoes(argumentos.destino, colunas=['Store', 'Date'])
+    print("\nEstatísticas do novo df_completo:")
+    print(f"Total de registros: {len(df_completo)}")
+    print(f"Número de lojas únicas: {df_completo['Store'].nunique()} (dimensão: {len(ler_dimensao_lojas(argumentos.dimensao))} lojas)")
+    print(f"Período: de {df_completo['Date'].min().strftime('%d/%m/%Y')} até {df_completo['Date'].max().strftime('%d/%m/%Y')}")
 
-print("\nSalvando novo df_completo...")
-# Salvando o novo df_completo
-df_completo.to_csv('processados/df_completo_reduzido.csv', index=False)
 
-print("\nEstatísticas do novo df_completo:")
-print(f"Total de registros: {len(df_completo)}")
-print(f"Número de lojas únicas: {df_completo['Store'].nunique()}")
-print(f"Período: de {df_completo['Date'].min().strftime('%d/%m/%Y')} até {df_completo['Date'].max().strftime('%d/%m/%Y')}") 
\ No newline at end of file
+if __name__ == '__main__':
+    main()
@@ -1,45 +1,231 @@
-import pandas as pd
-import numpy as np
+"""
+Gera os datasets reduzidos (dataset/reduzidos/) a partir dos CSVs originais do Kaggle.
+
+A amostragem é estratificada por loja e vetorizada: cada linha recebe uma chave aleatória
+(gerador com semente fixa, sorteada na ordem das linhas do arquivo) e, em cada estrato, são
+mantidas as linhas de menores chaves até a cota do estrato. Como as chaves dependem apenas da
+semente e da ordem das linhas, o resultado é o mesmo com o DataFrame inteiro em memória ou
+lendo o CSV em blocos de qualquer tamanho.
+
+As cotas podem ser um número fixo por grupo, uma fração do grupo ou tamanhos explícitos por
+grupo; opcionalmente a cota de cada grupo é repartida entre períodos de tempo (ex.: meses),
+proporcionalmente ao número de linhas de cada período.
+
+Uso:
+    python dataset/reduzir_dataset.py                      # 50 linhas por loja
+    python dataset/reduzir_dataset.py --fracao 0.05 --frequencia M
+"""
+import argparse
 import os
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
 
 # Configuração para reprodutibilidade
-np.random.seed(42)
+SEMENTE = 42
+
+DIRETORIO_DATASET = Path(__file__).resolve().parent
+TAMANHO_BLOCO_CSV = 200_000
+
+
+def calcular_cotas(tamanhos_grupos, n_amostras=None, fracao=None, tamanhos_amostra=None):
+    """
+    Retorna a cota de linhas de cada grupo (Series com o mesmo índice de `tamanhos_grupos`).
+
+    Informe exatamente um entre `n_amostras` (mesmo número para todos os grupos), `fracao`
+    (arredondada por grupo) ou `tamanhos_amostra` (dict/Series grupo -> tamanho; grupos
+    ausentes ficam com zero). A cota nunca passa do tamanho do grupo.
+    """
+    if sum(opcao is not None for opcao in (n_amostras, fracao, tamanhos_amostra)) != 1:
+        raise ValueError("Informe exatamente um entre n_amostras, fracao e tamanhos_amostra.")
+    if n_amostras is not None:
+        cotas = pd.Series(n_amostras, index=tamanhos_grupos.index)
+    elif fracao is not None:
+        if not 0 <= fracao <= 1:
+            raise ValueError(f"fracao deve estar entre 0 e 1, recebido {fracao}.")
+        cotas = np.round(tamanhos_grupos * fracao)
+    else:
+        cotas = pd.Series(tamanhos_amostra).reindex(tamanhos_grupos.index, fill_value=0)
+    return np.minimum(cotas, tamanhos_grupos).astype('int64')
+
+
+def _posicao_no_estrato(codigos_estrato, chaves):
+    """Retorna (ordem, posição de cada linha ordenada dentro do seu estrato por chave crescente)."""
+    ordem = np.lexsort((chaves, codigos_estrato))
+    codigos_ordenados = codigos_estrato[ordem]
+    inicios = np.flatnonzero(np.r_[True, codigos_ordenados[1:] != codigos_ordenados[:-1]])
+    tamanhos = np.diff(np.r_[inicios, len(ordem)])
+    posicoes = np.arange(len(ordem)) - np.repeat(inicios, tamanhos)
+    return ordem, posicoes
+
+
+def _distribuir_cotas_no_tempo(tamanhos_estratos, cotas_grupos):
+    """
+    Reparte a cota de cada grupo entre seus períodos, proporcionalmente ao tamanho de cada
+    período (método dos maiores restos). `tamanhos_estratos` é indexado por (grupo, período).
+    """
+    grupos = tamanhos_estratos.index.get_level_values(0)
+    total_grupo = tamanhos_estratos.groupby(level=0).transform('sum').to_numpy()
+    cota_grupo = cotas_grupos.reindex(grupos).to_numpy()
+    ideal = cota_grupo * tamanhos_estratos.to_numpy() / total_grupo
+    base = np.floor(ideal).astype('int64')
+    sobra = cota_grupo - pd.Series(base, index=grupos).groupby(level=0).transform('sum').to_numpy()
+
+    # Os maiores restos de cada grupo recebem uma linha a mais (desempate pela ordem dos períodos)
+    codigos_grupo = pd.factorize(grupos)[0]
+    ordem, posicoes = _posicao_no_estrato(codigos_grupo, -(ideal - base))
+    extra = np.zeros(len(base), dtype='int64')
+    extra[ordem] = posicoes < sobra[ordem]
+    return pd.Series(base + extra, index=tamanhos_estratos.index)
+
+
+def _chaves_estrato(df, coluna_grupo, coluna_data, frequencia):
+    if coluna_data is None:
+        return [df[coluna_grupo]]
+    return [df[coluna_grupo], pd.to_datetime(df[coluna_data]).dt.to_period(frequencia)]
+
+
+def _tamanhos_estratos(chaves_estrato):
+    """Número de linhas de cada estrato (índice simples por grupo ou (grupo, período))."""
+    tamanhos = pd.concat(chaves_estrato, axis=1).value_counts(sort=False)
+    if len(chaves_estrato) == 1:
+        tamanhos.index = tamanhos.index.get_level_values(0)
+    return tamanhos
+
+
+def _cotas_por_estrato(tamanhos_estratos, n_amostras, fracao, tamanhos_amostra):
+    """Calcula as cotas de cada estrato (por grupo ou por grupo × período)."""
+    tamanhos_estratos = tamanhos_estratos.sort_index()
+    if tamanhos_estratos.index.nlevels == 1:
+        return calcular_cotas(tamanhos_estratos, n_amostras, fracao, tamanhos_amostra)
+    tamanhos_grupos = tamanhos_estratos.groupby(level=0).sum()
+    cotas_grupos = calcular_cotas(tamanhos_grupos, n_amostras, fracao, tamanhos_amostra)
+    return _distribuir_cotas_no_tempo(tamanhos_estratos, cotas_grupos)
 
-# Criar diretório reduzidos se não existir
-os.makedirs('reduzidos', exist_ok=True)
 
-# Carregando os datasets
-print("Carregando datasets originais...")
-df_store = pd.read_csv('brutos/store.csv')
-df_train = pd.read_csv('brutos/train.csv')
+def _codigos_estrato(cotas, chaves_estrato):
+    if len(chaves_estrato) == 1:
+        return cotas.index.get_indexer(chaves_estrato[0])
+    return cotas.index.get_indexer(pd.MultiIndex.from_arrays(chaves_estrato))
+
+
+def _selecionar(chaves_aleatorias, posicoes_originais, cotas, chaves_estrato):
+    """Mantém, em cada estrato, as linhas de menores chaves aleatórias até a cota."""
+    codigos = _codigos_estrato(cotas, chaves_estrato)
+    limites = np.append(cotas.to_numpy(), 0)  # Estratos desconhecidos (código -1) não têm cota
+    ordem, posicoes = _posicao_no_estrato(codigos, chaves_aleatorias)
+    selecionadas = ordem[posicoes < limites[codigos[ordem]]]
+    # Resultado agrupado por estrato e, dentro dele, na ordem original das linhas
+    return selecionadas[np.lexsort((posicoes_originais[selecionadas], codigos[selecionadas]))]
+
+
+def amostrar_estratificado(df, coluna_grupo='Store', n_amostras=None, fracao=None, tamanhos_amostra=None,
+                           coluna_data=None, frequencia='M', semente=SEMENTE):
+    """
+    Amostra estratificada de `df` por `coluna_grupo`, sem laço Python por grupo.
+
+    Se `coluna_data` for informada, a cota de cada grupo é repartida entre os períodos
+    `frequencia` ('M' mensal, 'W' semanal...) proporcionalmente às linhas de cada período.
+    A mesma `semente` com as mesmas linhas, na mesma ordem, gera sempre a mesma amostra.
+    """
+    chaves_aleatorias = np.random.default_rng(semente).random(len(df))
+    chaves_estrato = _chaves_estrato(df, coluna_grupo, coluna_data, frequencia)
+    cotas = _cotas_por_estrato(_tamanhos_estratos(chaves_estrato), n_amostras, fracao, tamanhos_amostra)
+    selecionadas = _selecionar(chaves_aleatorias, np.arange(len(df)), cotas, chaves_estrato)
+    return df.take(selecionadas).reset_index(drop=True)
+
+
+def amostrar_csv_em_blocos(caminho_csv, coluna_grupo='Store', n_amostras=None, fracao=None, tamanhos_amostra=None,
+                           coluna_data=None, frequencia='M', semente=SEMENTE, tamanho_bloco=TAMANHO_BLOCO_CSV, **opcoes_leitura):
+    """
+    Mesma amostra de `amostrar_estratificado(pd.read_csv(caminho_csv), ...)`, lendo o CSV em blocos.
+
+    Uma primeira passada lê só as colunas de estratificação para contar as linhas de cada
+    estrato; na segunda, só os candidatos de cada estrato (no máximo a cota) ficam em memória.
+    """
+    colunas_estrato = [coluna_grupo] + ([coluna_data] if coluna_data else [])
+    tamanhos_estratos = None
+    for bloco in pd.read_csv(caminho_csv, usecols=colunas_estrato, chunksize=tamanho_bloco, **opcoes_leitura):
+        tamanhos_bloco = _tamanhos_estratos(_chaves_estrato(bloco, coluna_grupo, coluna_data, frequencia))
+        tamanhos_estratos = tamanhos_bloco if tamanhos_estratos is None else tamanhos_estratos.add(tamanhos_bloco, fill_value=0)
+    if tamanhos_estratos is None:
+        return pd.DataFrame()
+    cotas = _cotas_por_estrato(tamanhos_estratos.astype('int64'), n_amostras, fracao, tamanhos_amostra)
+
+    gerador = np.random.default_rng(semente)
+    candidatos, chaves_candidatos, posicoes_candidatos = None, np.empty(0), np.empty(0, dtype='int64')
+    linhas_lidas = 0
+    for bloco in pd.read_csv(caminho_csv, chunksize=tamanho_bloco, **opcoes_leitura):
+        # As chaves são sorteadas na ordem das linhas, como em amostrar_estratificado
+        chaves_bloco = gerador.random(len(bloco))
+        posicoes_bloco = np.arange(linhas_lidas, linhas_lidas + len(bloco))
+        linhas_lidas += len(bloco)
+        bloco = bloco.reset_index(drop=True)
+        if candidatos is not None:
+            bloco = pd.concat([candidatos, bloco], ignore_index=True)
+            chaves_bloco = np.concatenate([chaves_candidatos, chaves_bloco])
+            posicoes_bloco = np.concatenate([posicoes_candidatos, posicoes_bloco])
+        selecionadas = _selecionar(chaves_bloco, posicoes_bloco, cotas,
+                                   _chaves_estrato(bloco, coluna_grupo, coluna_data, frequencia))
+        candidatos = bloco.take(selecionadas).reset_index(drop=True)
+        chaves_candidatos, posicoes_candidatos = chaves_bloco[selecionadas], posicoes_bloco[selecionadas]
+
+    return candidatos if candidatos is not None else pd.DataFrame()
+
 
 # Função para amostrar n linhas por loja
 def amostrar_por_loja(df, n_amostras=50):
-    return df.groupby('Store').apply(
-        lambda x: x.sample(n=min(len(x), n_amostras), random_state=42)
-    ).reset_index(drop=True)
-
-# Amostrando dados do dataset de vendas
-print("Amostrando dados...")
-df_train_reduzido = amostrar_por_loja(df_train, n_amostras=50)
-
-# Pegando apenas as lojas que estão no dataset de vendas reduzido
-lojas_selecionadas = df_train_reduzido['Store'].unique()
-df_store_reduzido = df_store[df_store['Store'].isin(lojas_selecionadas)]
-
-# Salvando os datasets reduzidos
-print("Salvando datasets reduzidos...")
-df_store_reduzido.to_csv('reduzidos/store_reduzido.csv', index=False)
-df_train_reduzido.to_csv('reduzidos/train_reduzido.csv', index=False)
-
-# Imprimindo estatísticas
-print("\nEstatísticas dos datasets:")
-print(f"Dataset de lojas original: {len(df_store)} registros")
-print(f"Dataset de lojas reduzido: {len(df_store_reduzido)} registros")
-print(f"Dataset de vendas original: {len(df_train)} registros")
-print(f"Dataset de vendas reduzido: {len(df_train_reduzido)} registros")
-
-# Verificando número de registros por loja no dataset reduzido
-registros_por_loja = df_train_reduzido['Store'].value_counts()
-print("\nNúmero de registros por loja (primeiras 5 lojas):")
-print(registros_por_loja.head()) 
\ No newline at end of file
+    return amostrar_estratificado(df, coluna_grupo='Store', n_amostras=n_amostras)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Gera os datasets reduzidos a partir de brutos/train.csv e brutos/store.csv.")
+    parser.add_argument('--n-amostras', type=int, help="Linhas por loja (padrão: 50)")
+    parser.add_argument('--fracao', type=float, help="Fração das linhas de cada loja, em vez de um número fixo")
+    parser.add_argument('--frequencia', help="Reparte a cota de cada loja entre períodos de Date (ex.: M, W)")
+    parser.add_argument('--semente', type=int, default=SEMENTE)
+    parser.add_argument('--tamanho-bloco', type=int, default=TAMANHO_BLOCO_CSV)
+    argumentos = parser.parse_args()
+    n_amostras = argumentos.n_amostras if argumentos.n_amostras is not None or argumentos.fracao is not None else 50
+
+    # Criar diretório reduzidos se não existir
+    os.makedirs(DIRETORIO_DATASET / 'reduzidos', exist_ok=True)
+
+    # Carregando os datasets
+    print("Carregando datasets originais...")
+    df_store = pd.read_csv(DIRETORIO_DATASET / 'brutos' / 'store.csv')
+
+    # Amostrando dados do dataset de vendas (train.csv é lido em blocos)
+    print("Amostrando dados...")
+    df_train_reduzido = amostrar_csv_em_blocos(
+        DIRETORIO_DATASET / 'brutos' / 'train.csv', coluna_grupo='Store',
+        n_amostras=n_amostras, fracao=argumentos.fracao,
+        coluna_data='Date' if argumentos.frequencia else None, frequencia=argumentos.frequencia or 'M',
+        semente=argumentos.semente, tamanho_bloco=argumentos.tamanho_bloco,
+        dtype={'StateHoliday': str},
+    )
+
+    # Pegando apenas as lojas que estão no dataset de vendas reduzido
+    lojas_selecionadas = df_train_reduzido['Store'].unique()
+    df_store_reduzido = df_store[df_store['Store'].isin(lojas_selecionadas)]
+
+    # Salvando os datasets reduzidos
+    print("Salvando datasets reduzidos...")
+    df_store_reduzido.to_csv(DIRETORIO_DATASET / 'reduzidos' / 'store_reduzido.csv', index=False)
+    df_train_reduzido.to_csv(DIRETORIO_DATASET / 'reduzidos' / 'train_reduzido.csv', index=False)
+
+    # Imprimindo estatísticas
+    print("\nEstatísticas dos datasets:")
+    print(f"Dataset de lojas original: {len(df_store)} registros")
+    print(f"Dataset de lojas reduzido: {len(df_store_reduzido)} registros")
+    print(f"Dataset de vendas reduzido: {len(df_train_reduzido)} registros")
+
+    # Verificando número de registros por loja no dataset reduzido
+    registros_por_loja = df_train_reduzido['Store'].value_counts()
+    print("\nNúmero de registros por loja (primeiras 5 lojas):")
+    print(registros_por_loja.head())
+
+
+if __name__ == '__main__':
+    main()
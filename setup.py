@@ -13,6 +13,13 @@ setup(
         "numpy==1.26.2",
         "statsmodels==0.14.1",
         "scikit-learn==1.3.2",
+        "pyarrow==14.0.2",
         "gunicorn==21.2.0",
     ],
+    extras_require={
+        # Motores de consulta multi-thread (DASHBOARD_MOTOR_CONSULTAS=duckdb ou polars)
+        "motores": ["duckdb>=0.9", "polars>=1.0"],
+        # Testes, incluindo a paridade dos motores opcionais com o pandas
+        "testes": ["pytest", "duckdb>=0.9", "polars>=1.0"],
+    },
 ) 
\ No newline at end of file
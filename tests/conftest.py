@@ -0,0 +1,23 @@
+import dash
+import pytest
+
+from dashboard.benchmark import _funcoes_callbacks
+from dashboard.callbacks import registrar_callbacks
+from dashboard.data_loader import carregar_dados
+from dashboard.repositorio_dados import registrar_dados
+
+
+@pytest.fixture(scope='session')
+def dados():
+    """Dataset reduzido, registrado como versão atual (como no app)."""
+    dados = carregar_dados('reduzido')
+    registrar_dados(dados)
+    return dados
+
+
+@pytest.fixture(scope='session')
+def callbacks(dados):
+    """{nome da função: função original} dos callbacks registrados num app de teste."""
+    aplicativo = dash.Dash(__name__, suppress_callback_exceptions=True)
+    registrar_callbacks(aplicativo)
+    return _funcoes_callbacks(aplicativo)
@@ -0,0 +1,43 @@
+"""Histograma e estatísticas comparativas de vendas (antes/depois do pré-processamento) da Análise Preliminar."""
+import pytest
+
+from dashboard.config import COLUNAS_NUMERICAS_VENDAS
+from dashboard.layouts.layout_analise_preliminar import criar_layout_analise_preliminar
+
+
+def procurar_componente(componente, id_componente):
+    if getattr(componente, 'id', None) == id_componente:
+        return componente
+    filhos = getattr(componente, 'children', None)
+    for filho in filhos if isinstance(filhos, (list, tuple)) else [filhos]:
+        if hasattr(filho, 'to_plotly_json'):
+            encontrado = procurar_componente(filho, id_componente)
+            if encontrado is not None:
+                return encontrado
+    return None
+
+
+@pytest.fixture(scope='module')
+def colunas_oferecidas(dados):
+    dropdown = procurar_componente(criar_layout_analise_preliminar(dados), 'dropdown-histograma-vendas')
+    return [opcao['value'] for opcao in dropdown.options]
+
+
+def valores_do_traco(traco):
+    return traco.y if traco.type == 'bar' else traco.x
+
+
+@pytest.mark.parametrize('coluna', COLUNAS_NUMERICAS_VENDAS)
+def test_histograma_e_estatisticas_de_vendas(coluna, callbacks, colunas_oferecidas):
+    histograma = callbacks['atualizar_histograma_vendas'](coluna)
+    estatisticas = callbacks['atualizar_grafico_estatisticas_vendas'](coluna)
+
+    if coluna not in colunas_oferecidas:
+        # Coluna fora do dropdown (ex.: Open, que não existe depois do filtro de lojas abertas): figura vazia, sem erro
+        assert not histograma.data and not estatisticas.data
+        return
+
+    assert [traco.name for traco in histograma.data] == ['Antes', 'Depois']
+    assert all(len(valores_do_traco(traco)) for traco in histograma.data)
+    assert {traco.name for traco in estatisticas.data} == {'Antes', 'Depois'}
+    assert all(len(traco.y) for traco in estatisticas.data)
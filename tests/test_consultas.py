@@ -0,0 +1,85 @@
+"""
+Paridade dos motores de consultas com o motor pandas, sobre o dataset reduzido.
+
+DuckDB e Polars são dependências opcionais: os testes de cada motor são pulados se ele não
+estiver instalado.
+"""
+import importlib.util
+import json
+from pathlib import Path
+
+import pytest
+
+from dashboard.benchmark import _consultas_referencia
+from dashboard.consultas import (NOME_MANIFESTO_PARQUET, MotorPandas, criar_motor, diretorio_parquet_da_versao,
+                                 resultados_equivalentes)
+from dashboard.data_loader import CAMINHOS_POR_MODO, versao_dados_dos_arquivos
+
+MOTORES_OPCIONAIS = ['duckdb', 'polars']
+CAMINHO_ETL = Path(__file__).resolve().parent.parent / 'dataset' / 'gerar_df_completo_reduzido.py'
+
+
+@pytest.fixture(scope='module')
+def esperados(dados):
+    referencia = MotorPandas(dados)
+    return [(descricao, argumentos, referencia.agregar(*argumentos)) for descricao, argumentos in _consultas_referencia(dados)]
+
+
+@pytest.fixture(scope='module')
+def diretorio_parquet(dados, tmp_path_factory):
+    """Dataset particionado gerado pelo ETL a partir das mesmas entradas do modo reduzido."""
+    especificacao = importlib.util.spec_from_file_location('gerar_df_completo_reduzido', CAMINHO_ETL)
+    etl = importlib.util.module_from_spec(especificacao)
+    especificacao.loader.exec_module(etl)
+    diretorio = tmp_path_factory.mktemp('particionado') / 'df_completo_particionado'
+    caminhos = CAMINHOS_POR_MODO['reduzido']
+    # Sem o CSV o ETL não identifica o modo; o manifesto é marcado com a versão carregada
+    etl.executar_etl(caminhos['treino'], caminhos['lojas'], diretorio, caminho_csv=None,
+                     caminho_dimensao=diretorio.parent / 'dim_lojas.parquet')
+    marcar_versao(diretorio, dados["versao"])
+    return diretorio
+
+
+def marcar_versao(diretorio, versao):
+    caminho = Path(diretorio) / NOME_MANIFESTO_PARQUET
+    manifesto = json.loads(caminho.read_text(encoding='utf-8')) if caminho.exists() else {}
+    manifesto['versao_dados'] = versao
+    caminho.write_text(json.dumps(manifesto), encoding='utf-8')
+
+
+def verificar_paridade(motor, esperados):
+    try:
+        for descricao, argumentos, esperado in esperados:
+            iguais, diferenca = resultados_equivalentes(esperado, motor.agregar(*argumentos), argumentos[0])
+            assert iguais, f"{motor.nome}, {descricao}: {diferenca}"
+    finally:
+        motor.fechar()
+
+
+@pytest.mark.parametrize('nome', MOTORES_OPCIONAIS)
+def test_paridade_em_memoria(nome, dados, esperados):
+    pytest.importorskip(nome)
+    motor = criar_motor(nome, dados, diretorio_parquet=None)
+    assert motor.nome == nome
+    verificar_paridade(motor, esperados)
+
+
+@pytest.mark.parametrize('nome', MOTORES_OPCIONAIS)
+def test_paridade_parquet(nome, dados, esperados, diretorio_parquet):
+    pytest.importorskip(nome)
+    verificar_paridade(criar_motor(nome, dados, diretorio_parquet=diretorio_parquet), esperados)
+
+
+def test_parquet_so_da_versao_carregada(tmp_path):
+    assert diretorio_parquet_da_versao(None, 'v1') is None
+    # Sem manifesto (diretório que não foi gerado pelo ETL)
+    assert diretorio_parquet_da_versao(tmp_path, 'v1') is None
+    marcar_versao(tmp_path, 'v1')
+    assert diretorio_parquet_da_versao(tmp_path, 'v1') == tmp_path
+    assert diretorio_parquet_da_versao(tmp_path, 'v2') is None
+
+
+def test_etl_identifica_a_versao_do_modo(dados):
+    caminhos = CAMINHOS_POR_MODO['reduzido']
+    assert versao_dados_dos_arquivos(caminhos['treino'], caminhos['lojas'], caminhos['principal']) == ('reduzido', dados["versao"])
+    assert versao_dados_dos_arquivos(caminhos['treino'], caminhos['lojas'], None) == (None, None)
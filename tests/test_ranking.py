@@ -0,0 +1,44 @@
+"""Ordem do ranking de lojas: seleção parcial, empates e NaN como na ordenação estável."""
+import numpy as np
+import pytest
+
+from dashboard.ranking import RankingLojas
+
+
+def criar_ranking(valores):
+    quantidade = len(valores)
+    return RankingLojas(np.arange(1, quantidade + 1), valores, np.full(quantidade, 'a'), np.full(quantidade, 'a'))
+
+
+def vetores_de_teste():
+    gerador = np.random.default_rng(0)
+    vetores = [np.array([]), np.array([np.nan]), np.full(5, np.nan), np.full(6, 3.0)]
+    for tamanho in (1, 2, 7, 50, 300):
+        # Poucos valores distintos (muitos empates) e uma parte de NaN
+        valores = gerador.integers(0, max(tamanho // 4, 2), tamanho).astype(np.float64)
+        valores[gerador.random(tamanho) < 0.2] = np.nan
+        vetores.append(valores)
+        vetores.append(gerador.normal(size=tamanho))
+    return vetores
+
+
+@pytest.mark.parametrize('ordem', ['asc', 'desc'])
+@pytest.mark.parametrize('valores', vetores_de_teste(), ids=lambda valores: f'{len(valores)} valores')
+def test_primeiros_igual_a_ordem_completa(valores, ordem):
+    completa = criar_ranking(valores).ordem(ordem)
+    chaves = -valores if ordem == 'desc' else valores
+    np.testing.assert_array_equal(completa, np.argsort(chaves, kind='stable'))
+
+    for k in sorted({0, 1, len(valores) // 2, max(len(valores) - 1, 0), len(valores), len(valores) + 5}):
+        # Ranking novo a cada k: sem a ordem completa em cache, `primeiros` usa a seleção parcial
+        np.testing.assert_array_equal(criar_ranking(valores).primeiros(k, ordem), completa[:k], err_msg=f'k={k}')
+
+
+@pytest.mark.parametrize('ordem', ['asc', 'desc'])
+@pytest.mark.parametrize('valores', vetores_de_teste(), ids=lambda valores: f'{len(valores)} valores')
+def test_posicoes_seguem_a_ordem(valores, ordem):
+    ranking = criar_ranking(valores)
+    posicoes = ranking.posicoes(ordem)
+    np.testing.assert_array_equal(posicoes[ranking.ordem(ordem)], np.arange(1, len(valores) + 1))
+    # NaN ficam nas últimas posições nas duas ordens
+    assert posicoes[np.isnan(valores)].min(initial=len(valores) + 1) > posicoes[~np.isnan(valores)].max(initial=0)
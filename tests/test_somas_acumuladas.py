@@ -0,0 +1,80 @@
+"""Paridade de `agregar_por_loja` (somas acumuladas ou motor de consultas) com o groupby do pandas sobre as linhas filtradas."""
+import itertools
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from dashboard.consultas import resultado_vazio, resultados_equivalentes
+from dashboard.somas_acumuladas import _menor_tipo_inteiro, agregar_por_loja
+from dashboard.utils import filtrar_dataframe
+
+AGREGACOES = {
+    'Vendas': ('Sales', 'sum'), 'Vendas Médias': ('Sales', 'mean'), 'Dias': ('Sales', 'count'),
+    'Clientes': ('Customers', 'sum'), 'Clientes Médios': ('Customers', 'mean'),
+    'Ticket': ('SalesPerCustomer', 'sum'), 'Ticket Médio': ('SalesPerCustomer', 'mean'),
+    'Dias de Promoção': ('Promo', 'sum'),
+}
+TIPOS_LOJA = [None, ['a'], ['b', 'd']]
+# Loja 99999 não existe na dimensão
+LOJAS_ESPECIFICAS = [None, [1, 2, 99999]]
+# Sem filtro de feriado as somas acumuladas respondem; com filtro, o motor de consultas
+FERIADOS = [('all', 'all'), ('0', 'all'), ('all', '1'), ('a', '0')]
+PERIODOS = ['histórico completo', 'segunda metade', 'um dia', 'vazio (início depois do fim)',
+            'antes do histórico', 'depois do histórico', 'cobrindo o início']
+
+
+def periodo(nome, datas):
+    """(início, fim) do período `nome` de PERIODOS, relativo às `datas` com vendas."""
+    datas = datas.drop_duplicates().sort_values(ignore_index=True)
+    inicio, fim, meio = datas.iloc[0], datas.iloc[-1], datas.iloc[len(datas) // 2]
+    dia = pd.Timedelta(days=1)
+    periodos = {
+        'histórico completo': (inicio, fim),
+        'segunda metade': (meio, fim),
+        'um dia': (meio, meio),
+        'vazio (início depois do fim)': (fim, inicio),
+        'antes do histórico': (inicio - 60 * dia, inicio - dia),
+        'depois do histórico': (fim + dia, fim + 60 * dia),
+        'cobrindo o início': (inicio - 30 * dia, inicio + 30 * dia),
+    }
+    return periodos[nome]
+
+
+def agregar_com_pandas(dados, agregacoes, data_inicio, data_fim, tipos_loja, lojas_especificas, feriado_estadual, feriado_escolar):
+    df = filtrar_dataframe(dados["df_principal"], data_inicio, data_fim, tipos_loja, lojas_especificas,
+                           feriado_estadual, feriado_escolar, dados["dimensao_lojas"])
+    if df.empty:
+        return resultado_vazio(['Store'], agregacoes)
+    return df.groupby('Store', observed=True, sort=True).agg(**agregacoes).reset_index()
+
+
+@pytest.mark.parametrize('nome_periodo', PERIODOS)
+def test_agregar_por_loja_igual_ao_groupby(nome_periodo, dados):
+    inicio, fim = periodo(nome_periodo, dados["df_principal"]['Date'])
+    data_inicio, data_fim = str(inicio.date()), str(fim.date())
+    for tipos_loja, lojas_especificas, (feriado_estadual, feriado_escolar) in itertools.product(TIPOS_LOJA, LOJAS_ESPECIFICAS, FERIADOS):
+        filtros = (data_inicio, data_fim, tipos_loja, lojas_especificas, feriado_estadual, feriado_escolar)
+        esperado = agregar_com_pandas(dados, AGREGACOES, *filtros)
+        obtido = agregar_por_loja(dados, AGREGACOES, *filtros)
+        iguais, diferenca = resultados_equivalentes(esperado, obtido, ['Store'])
+        assert iguais, f"{filtros}: {diferenca}"
+
+
+def test_lojas_especificas_desconhecidas(dados):
+    data_inicio, data_fim = (str(data.date()) for data in (dados["dimensao_datas"]['Date'].min(), dados["dimensao_datas"]['Date'].max()))
+    assert agregar_por_loja(dados, AGREGACOES, data_inicio, data_fim, None, [99999]).empty
+    assert agregar_por_loja(dados, AGREGACOES, data_inicio, data_fim, None, [1, 99999])['Store'].tolist() == [1]
+
+
+def test_periodo_incompleto(dados):
+    assert agregar_por_loja(dados, AGREGACOES, None, '2014-01-01').empty
+    assert list(agregar_por_loja(dados, AGREGACOES, '2014-01-01', None).columns) == ['Store'] + list(AGREGACOES)
+
+
+@pytest.mark.parametrize('maximo, tipo', [
+    (0, np.int16), (np.iinfo(np.int16).max, np.int16), (np.iinfo(np.int16).max + 1, np.int32),
+    (np.iinfo(np.int32).max, np.int32), (np.iinfo(np.int32).max + 1, np.int64),
+])
+def test_menor_tipo_inteiro(maximo, tipo):
+    assert _menor_tipo_inteiro(maximo) is tipo